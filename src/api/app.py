@@ -0,0 +1,165 @@
+"""FastAPI application factory."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from api.routes import chat, history, metrics
+from background.queue import init_task_queue
+from background.scheduler import PeriodicScheduler
+from background.tasks.memory_decay import run_memory_decay
+from background.tasks.partition_maintenance import run_partition_maintenance
+from background.tasks.reflection import ReflectionScheduler
+from core.config import get_settings
+from database.connection import (
+    close_db,
+    get_engine,
+    get_read_router,
+    get_session_factory,
+    init_db,
+    register_shutdown_hook,
+)
+from services.dialogue.chat import DEFAULT_MESSAGE_IMPORTANCE, ChatService
+from services.emotion.state import CharacterStateCache
+from services.llm.cache import CachedLLM, LLMResponseCacheStore
+from services.llm.providers.embedding import EmbeddingService
+from services.llm.providers.router import LLMRouter
+from services.memory.access_buffer import MemoryAccessBuffer
+from services.memory.context import ContextAssembler
+from services.memory.embedding_cache import EmbeddingCache
+from services.memory.episode_summaries import LLMEpisodeSummarizer
+from services.memory.episodes import EpisodeSegmenter
+from services.memory.importance import LLMImportanceScorer
+from services.memory.reflections import ReflectionGenerator
+from services.memory.retrieval import MemoryRetriever
+from services.memory.store import MemoryStore
+from services.memory.vector_search import VectorSearch
+from services.portrait.extraction import LLMPortraitExtractor
+from services.portrait.updater import DeferredPortraitUpdater
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings()
+    init_db(settings.db)
+    # Off by default; enabling it maps files under embedding_cache_dir.
+    embedding_cache = (
+        EmbeddingCache(settings.memory) if settings.memory.embedding_cache_max_bytes > 0 else None
+    )
+    store = MemoryStore(settings.memory, embedding_cache)
+    # Hooks run in reverse, so cache appends from jobs drained with the queue are awaited.
+    register_shutdown_hook(store.close)
+    # Started before the queue for the same reason: scoring jobs still feed it while
+    # the queue drains, and its final flush runs after that.
+    portraits = DeferredPortraitUpdater(get_session_factory(), settings.portrait)
+    portraits.start()
+    queue = init_task_queue()
+    reads = get_read_router()
+    reads.start()
+
+    router = LLMRouter(settings.llm)
+    embeddings = EmbeddingService(
+        settings.llm,
+        router.client(settings.llm.embedding_provider),
+        dimension=settings.memory.embedding_dimension,
+    )
+    response_cache = LLMResponseCacheStore(get_session_factory(), settings.llm, embeddings)
+    register_shutdown_hook(response_cache.flush_hits)
+    vector_search = VectorSearch(
+        settings.memory, queue=queue, session_factory=get_session_factory()
+    )
+    async with get_session_factory()() as session:
+        await vector_search.check_index(session)
+    metrics.register_vector_search(vector_search)
+    character_states = CharacterStateCache(get_engine(), get_session_factory(), settings.emotion)
+    character_states.start()
+    app.state.character_states = character_states
+    access_buffer = MemoryAccessBuffer(get_session_factory(), settings.memory)
+    access_buffer.start()
+    segmenter = EpisodeSegmenter(
+        settings.memory,
+        store,
+        session_factory=get_session_factory(),
+        queue=queue,
+        summarizer=LLMEpisodeSummarizer(router),
+        character_states=character_states,
+    )
+    cached_llm = CachedLLM(router, response_cache)
+    chat_service = ChatService(
+        session_factory=get_session_factory(),
+        provider=router,
+        embeddings=embeddings,
+        retriever=MemoryRetriever(
+            settings.memory, embedding_cache, vector_search, access_buffer=access_buffer
+        ),
+        assembler=ContextAssembler(settings.memory),
+        store=store,
+        queue=queue,
+        reads=reads,
+        reflections=ReflectionScheduler(
+            settings.memory,
+            queue,
+            get_session_factory(),
+            ReflectionGenerator(settings.memory, store, get_session_factory(), router, embeddings),
+        ),
+        character_states=character_states,
+        segmenter=segmenter,
+        importance_scorer=LLMImportanceScorer(cached_llm, DEFAULT_MESSAGE_IMPORTANCE),
+        portrait_extractor=LLMPortraitExtractor(cached_llm),
+        portraits=portraits,
+    )
+    # Registered after the task queue, so turn writes finish before it drains.
+    register_shutdown_hook(chat_service.close)
+    app.state.chat_service = chat_service
+
+    scheduler = PeriodicScheduler(queue, get_engine())
+    scheduler.add(
+        "memory_decay",
+        settings.memory.memory_decay_interval_seconds,
+        lambda: run_memory_decay(get_session_factory(), settings.memory),
+        exclusive=True,
+    )
+    scheduler.add(
+        "partition_maintenance",
+        settings.db.partition_maintenance_interval_seconds,
+        lambda: run_partition_maintenance(get_engine(), settings.db),
+        exclusive=True,
+    )
+    scheduler.add(
+        "episode_idle_sweep",
+        settings.memory.episode_idle_sweep_interval_seconds,
+        segmenter.close_idle,
+        exclusive=True,
+    )
+    scheduler.add(
+        "llm_cache_hits", settings.llm.llm_cache_hit_flush_seconds, response_cache.flush_hits
+    )
+    scheduler.start()
+    try:
+        yield
+    finally:
+        # close_db() finishes turn writes and drains the task queue first, so
+        # persistence still has its embedding client and database.
+        await close_db()
+        await embeddings.close()
+        await router.close()
+
+
+def create_app() -> FastAPI:
+    settings = get_settings()
+    app = FastAPI(title="AI Character Chat", debug=settings.app.app_debug, lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.app.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(chat.router)
+    app.include_router(history.router)
+    app.include_router(metrics.router)
+    return app
@@ -0,0 +1,54 @@
+"""WebSocket chat endpoint that streams reply tokens as they are generated."""
+
+from __future__ import annotations
+
+import uuid
+
+import structlog
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from models.dto.chat import ChatEvent, ChatRequest
+from services.dialogue.chat import ChatService, ChatTurn
+
+logger = structlog.get_logger(__name__)
+
+router = APIRouter(tags=["chat"])
+
+
+async def _send(websocket: WebSocket, event: ChatEvent) -> None:
+    await websocket.send_text(event.model_dump_json())
+
+
+@router.websocket("/ws/chat/{character_id}")
+async def chat(websocket: WebSocket, character_id: uuid.UUID) -> None:
+    """One connection per conversation; each inbound message is answered as a token stream."""
+    service: ChatService = websocket.app.state.chat_service
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                request = ChatRequest.model_validate_json(await websocket.receive_text())
+            except ValidationError as exc:
+                await _send(websocket, ChatEvent(type="error", content=str(exc)))
+                continue
+
+            turn = ChatTurn(
+                character_id=character_id,
+                user_id=request.user_id,
+                content=request.content,
+                episode_id=request.episode_id,
+            )
+            await _send(websocket, ChatEvent(type="start"))
+            try:
+                async for delta in service.stream_reply(turn):
+                    await _send(websocket, ChatEvent(type="token", content=delta))
+            except WebSocketDisconnect:
+                raise
+            except Exception:
+                logger.exception("chat.stream_failed", character_id=str(character_id))
+                await _send(websocket, ChatEvent(type="error", content="generation failed"))
+                continue
+            await _send(websocket, ChatEvent(type="end"))
+    except WebSocketDisconnect:
+        logger.info("chat.disconnected", character_id=str(character_id))
@@ -0,0 +1,65 @@
+"""Conversation history endpoints."""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.connection import read_session
+from models.dto.message import MessagePage
+from services.dialogue import history
+from services.dialogue.history import MAX_PAGE_SIZE, InvalidCursor, Order
+
+router = APIRouter(tags=["history"])
+
+
+# History is served from a replica unless the episode or sender was written to
+# more recently than the replica has replayed.
+async def _episode_session(episode_id: int) -> AsyncIterator[AsyncSession]:
+    async with read_session(f"episode:{episode_id}") as session:
+        yield session
+
+
+async def _sender_session(sender_id: uuid.UUID) -> AsyncIterator[AsyncSession]:
+    async with read_session(f"participant:{sender_id}") as session:
+        yield session
+
+
+EpisodeSession = Annotated[AsyncSession, Depends(_episode_session)]
+SenderSession = Annotated[AsyncSession, Depends(_sender_session)]
+
+
+@router.get("/episodes/{episode_id}/messages", response_model=MessagePage)
+async def episode_messages(
+    episode_id: int,
+    session: EpisodeSession,
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    order: Order = "desc",
+) -> MessagePage:
+    try:
+        return await history.episode_messages(
+            session, episode_id, cursor=cursor, limit=limit, order=order
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail="invalid cursor") from exc
+
+
+@router.get("/participants/{sender_id}/messages", response_model=MessagePage)
+async def sender_messages(
+    sender_id: uuid.UUID,
+    session: SenderSession,
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    order: Order = "desc",
+) -> MessagePage:
+    try:
+        return await history.sender_messages(
+            session, sender_id, cursor=cursor, limit=limit, order=order
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail="invalid cursor") from exc
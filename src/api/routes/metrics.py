@@ -0,0 +1,68 @@
+"""Prometheus scrape endpoint.
+
+Database pool and statement metrics are registered by ``database.connection``;
+vector search counters are read from :meth:`VectorSearch.stats` at scrape time.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from fastapi import APIRouter, Response
+
+from core.utils.metrics import CONTENT_TYPE, REGISTRY, CallbackCounter, CallbackGauge, Sample
+from services.memory.vector_search import SearchStats, VectorSearch
+
+router = APIRouter(tags=["metrics"])
+
+
+def register_vector_search(search: VectorSearch) -> None:
+    def per_path(read: Callable[[SearchStats], float | None]) -> Callable[[], list[Sample]]:
+        def collect() -> list[Sample]:
+            samples: list[Sample] = []
+            for path, stats in search.stats().items():
+                value = read(stats)
+                if value is not None:
+                    samples.append(((path,), float(value)))
+            return samples
+
+        return collect
+
+    for metric in (
+        CallbackCounter(
+            "vector_search_queries_total",
+            "Vector searches per path (hnsw or exact).",
+            ("path",),
+            per_path(lambda s: s.calls),
+        ),
+        CallbackCounter(
+            "vector_search_duration_seconds_total",
+            "Total time spent in vector searches per path.",
+            ("path",),
+            per_path(lambda s: s.latency_ms_total / 1000.0),
+        ),
+        CallbackCounter(
+            "vector_search_widened_total",
+            "HNSW searches that retried with a larger ef_search.",
+            ("path",),
+            per_path(lambda s: s.widened),
+        ),
+        CallbackCounter(
+            "vector_search_exact_fallback_total",
+            "HNSW searches answered by the exact path.",
+            ("path",),
+            per_path(lambda s: s.fell_back),
+        ),
+        CallbackGauge(
+            "vector_search_sampled_recall",
+            "Mean recall of sampled searches against the exact result.",
+            ("path",),
+            per_path(lambda s: s.mean_recall),
+        ),
+    ):
+        REGISTRY.register(metric)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
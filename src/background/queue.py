@@ -0,0 +1,92 @@
+"""In-process background task queue.
+
+Work that must not block a chat turn (reflection generation, post-stream
+persistence, summarisation) is submitted here and run by a small pool of worker
+tasks. Jobs may carry a key; a key that is already queued or running is not
+queued again, so bursts of identical triggers collapse into one job.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import structlog
+
+from database.connection import register_shutdown_hook
+
+logger = structlog.get_logger(__name__)
+
+JobFactory = Callable[[], Awaitable[Any]]
+
+_queue: TaskQueue | None = None
+
+
+class TaskQueue:
+    def __init__(self, concurrency: int = 4, max_size: int = 10_000) -> None:
+        self._concurrency = concurrency
+        self._jobs: asyncio.Queue[tuple[str | None, JobFactory]] = asyncio.Queue(max_size)
+        self._keys: set[str] = set()
+        self._workers: list[asyncio.Task[None]] = []
+
+    def submit(self, factory: JobFactory, *, key: str | None = None) -> bool:
+        """Queue a job. Returns ``False`` if ``key`` is already pending or the queue is full."""
+        if key is not None and key in self._keys:
+            return False
+        try:
+            self._jobs.put_nowait((key, factory))
+        except asyncio.QueueFull:
+            logger.warning("task_queue.full", key=key)
+            return False
+        if key is not None:
+            self._keys.add(key)
+        return True
+
+    def start(self) -> None:
+        """Start the workers; pending jobs are drained by ``close_db()`` on shutdown."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"task-queue-{i}")
+            for i in range(self._concurrency)
+        ]
+        register_shutdown_hook(self.close)
+
+    async def close(self) -> None:
+        """Finish queued jobs, then stop the workers."""
+        if self._workers:
+            await self._jobs.join()
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await worker
+        self._workers = []
+
+    async def _work(self) -> None:
+        while True:
+            key, factory = await self._jobs.get()
+            try:
+                await factory()
+            except Exception:
+                logger.exception("task_queue.job_failed", key=key)
+            finally:
+                if key is not None:
+                    self._keys.discard(key)
+                self._jobs.task_done()
+
+
+def init_task_queue(concurrency: int = 4) -> TaskQueue:
+    """Create and start the global task queue."""
+    global _queue
+    _queue = TaskQueue(concurrency=concurrency)
+    _queue.start()
+    return _queue
+
+
+def get_task_queue() -> TaskQueue:
+    if _queue is None:
+        raise RuntimeError("Task queue not initialised. Call init_task_queue() first.")
+    return _queue
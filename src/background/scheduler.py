@@ -0,0 +1,89 @@
+"""Periodic maintenance jobs.
+
+Each job is submitted to the :class:`TaskQueue` every ``interval`` seconds under
+its own key, so a run that is still queued or running is never overlapped by the
+next one. Every worker process runs its own scheduler; jobs registered with
+``exclusive=True`` first take a session-level advisory lock named after the job
+and skip the run when another process holds it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import random
+from dataclasses import dataclass
+
+import structlog
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from background.queue import JobFactory, TaskQueue
+from database.connection import register_shutdown_hook
+
+logger = structlog.get_logger(__name__)
+
+# Session-level advisory lock namespace for exclusive periodic jobs ("JOB").
+_LOCK_NAMESPACE = 0x4A4F42
+
+
+@dataclass(frozen=True, slots=True)
+class PeriodicJob:
+    name: str
+    interval: float
+    factory: JobFactory
+    exclusive: bool
+
+
+class PeriodicScheduler:
+    def __init__(self, queue: TaskQueue, engine: AsyncEngine | None = None) -> None:
+        self._queue = queue
+        self._engine = engine
+        self._jobs: list[PeriodicJob] = []
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def add(
+        self, name: str, interval: float, factory: JobFactory, *, exclusive: bool = False
+    ) -> None:
+        """Run ``factory`` every ``interval`` seconds, starting one interval after start."""
+        if exclusive and self._engine is None:
+            raise ValueError(f"exclusive job {name!r} needs an engine for its advisory lock")
+        self._jobs.append(PeriodicJob(name, interval, factory, exclusive))
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._loop(job), name=f"periodic-{job.name}") for job in self._jobs
+        ]
+        register_shutdown_hook(self.close)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    async def _loop(self, job: PeriodicJob) -> None:
+        # Spread the first run so workers started together do not all wake at once.
+        await asyncio.sleep(job.interval * random.uniform(0.5, 1.0))
+        while True:
+            factory = (lambda: self._run_exclusive(job)) if job.exclusive else job.factory
+            self._queue.submit(factory, key=f"periodic:{job.name}")
+            await asyncio.sleep(job.interval)
+
+    async def _run_exclusive(self, job: PeriodicJob) -> None:
+        assert self._engine is not None
+        key = (_LOCK_NAMESPACE, func.hashtext(job.name))
+        async with self._engine.connect() as conn:
+            # Autocommit, so the lock connection never sits idle in a transaction.
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not await conn.scalar(select(func.pg_try_advisory_lock(*key))):
+                logger.debug("periodic_job.skipped", job=job.name)
+                return
+            try:
+                await job.factory()
+            finally:
+                await conn.execute(select(func.pg_advisory_unlock(*key)))
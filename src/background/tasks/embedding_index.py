@@ -0,0 +1,96 @@
+"""Switch the HNSW index on ``memory_base.embedding`` to the configured quantization.
+
+Run after changing ``EMBEDDING_QUANTIZATION`` or ``EMBEDDING_DIMENSION``::
+
+    python -m background.tasks.embedding_index [--keep-others]
+
+The index for the configured representation is built with
+``CREATE INDEX CONCURRENTLY``, so reads and writes on ``memory_base`` continue
+while it builds. The indexes for the other representations are then dropped with
+``DROP INDEX CONCURRENTLY``. A build that fails half way leaves an invalid index
+behind; the next run drops and rebuilds it, as it does an index built for a
+different ``embedding_dimension``.
+
+Workers refuse to start unless the index their settings expect can serve
+searches (:meth:`VectorSearch.check_index`). To switch without downtime, run the
+command with ``--keep-others``, roll the setting out to the workers, then run it
+again to drop the old index.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+
+import structlog
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import MemorySettings, get_settings
+from database.connection import create_engine
+from services.memory.vector_search import INDEX_NAMES, index_definition, index_problem
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(slots=True)
+class IndexReport:
+    built: str | None = None
+    dropped: list[str] = field(default_factory=list)
+
+
+async def switch_embedding_index(
+    engine: AsyncEngine, settings: MemorySettings, *, drop_others: bool = True
+) -> IndexReport:
+    """Ensure the configured embedding index exists and, optionally, drop the others."""
+    quantization = settings.embedding_quantization
+    target = INDEX_NAMES[quantization]
+    report = IndexReport()
+    async with engine.connect() as conn:
+        # CONCURRENTLY cannot run inside a transaction block.
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        problem = await index_problem(conn, quantization, settings.embedding_dimension)
+        if problem is not None:
+            logger.info("embedding_index.building", index=target, reason=problem)
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {target}"))
+            await conn.execute(text(index_definition(quantization, settings.embedding_dimension)))
+            report.built = target
+        if drop_others:
+            for name in INDEX_NAMES.values():
+                if name != target and await conn.scalar(select(func.to_regclass(name))):
+                    await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                    report.dropped.append(name)
+    return report
+
+
+async def _main(drop_others: bool) -> None:
+    settings = get_settings()
+    engine = create_engine(settings.db)
+    try:
+        report = await switch_embedding_index(engine, settings.memory, drop_others=drop_others)
+    finally:
+        await engine.dispose()
+    logger.info(
+        "embedding_index.switched",
+        quantization=settings.memory.embedding_quantization,
+        built=report.built,
+        dropped=report.dropped,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Switch the memory_base embedding index to the configured quantization."
+    )
+    parser.add_argument(
+        "--keep-others",
+        action="store_true",
+        help="leave the indexes for other quantizations in place",
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(drop_others=not args.keep_others))
+
+
+if __name__ == "__main__":
+    main()
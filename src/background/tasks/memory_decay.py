@@ -0,0 +1,102 @@
+"""Set-based memory decay.
+
+A memory starts decaying ``memory_decay_threshold_days`` after its last access, at
+``memory_decay_rate`` per day::
+
+    strength(t) = memory_strength * exp(-rate * days_since(decay_start))
+    decay_start = max(strength_updated_at, last_accessed_at + threshold_days)
+
+Because the exponential composes, the stored strength only needs to be rewritten
+occasionally. Readers use :func:`current_strength` to get the exact value at query
+time. :func:`run_memory_decay` folds the accumulated decay back into the table. It
+walks ``memory_base`` in primary-key ranges of ``memory_decay_batch_rows`` ids, with
+one UPDATE and one commit per range, so no statement locks more than a range's
+rows, however many memories a single owner has. Rows are never loaded into ORM
+objects.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, cast
+
+import structlog
+from sqlalchemy import ColumnElement, CursorResult, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import MemorySettings
+from database.models import MemoryBase
+
+logger = structlog.get_logger(__name__)
+
+_SECONDS_PER_DAY = 86_400.0
+
+
+@dataclass(frozen=True, slots=True)
+class DecayReport:
+    ranges_scanned: int
+    rows_updated: int
+
+
+def _decay_start(settings: MemorySettings) -> ColumnElement:
+    return func.greatest(
+        MemoryBase.strength_updated_at,
+        MemoryBase.last_accessed_at + timedelta(days=settings.memory_decay_threshold_days),
+    )
+
+
+def current_strength(settings: MemorySettings) -> ColumnElement[float]:
+    """SQL expression for a memory's strength right now (lazy decay read mode)."""
+    elapsed_days = (
+        func.greatest(func.extract("epoch", func.now() - _decay_start(settings)), 0.0)
+        / _SECONDS_PER_DAY
+    )
+    return MemoryBase.memory_strength * func.exp(-settings.memory_decay_rate * elapsed_days)
+
+
+async def decay_range(
+    session: AsyncSession, first_id: int, last_id: int, settings: MemorySettings
+) -> int:
+    """Fold pending decay into ``memory_strength`` for ids in ``[first_id, last_id]``.
+
+    Only rows at or above ``memory_weak_threshold`` are touched, so weak memories
+    are left for pruning. Returns the number of rows updated.
+    """
+    threshold = timedelta(days=settings.memory_decay_threshold_days)
+    stmt = (
+        update(MemoryBase)
+        .where(
+            MemoryBase.id.between(first_id, last_id),
+            MemoryBase.memory_strength >= settings.memory_weak_threshold,
+            MemoryBase.last_accessed_at < func.now() - threshold,
+        )
+        .values(memory_strength=current_strength(settings), strength_updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    result = await session.execute(stmt)
+    return cast(CursorResult[Any], result).rowcount or 0
+
+
+async def run_memory_decay(
+    session_factory: async_sessionmaker[AsyncSession], settings: MemorySettings
+) -> DecayReport:
+    """Apply decay to every memory, committing once per id range to keep locks short.
+
+    Rows inserted after the run starts are fresh and are left for the next run.
+    """
+    async with session_factory() as session:
+        bounds = (
+            await session.execute(select(func.min(MemoryBase.id), func.max(MemoryBase.id)))
+        ).one()
+    ranges_scanned = 0
+    rows_updated = 0
+    if bounds[0] is not None:
+        step = settings.memory_decay_batch_rows
+        for first_id in range(bounds[0], bounds[1] + 1, step):
+            async with session_factory() as session, session.begin():
+                rows_updated += await decay_range(session, first_id, first_id + step - 1, settings)
+            ranges_scanned += 1
+
+    logger.info("memory_decay.completed", ranges=ranges_scanned, rows=rows_updated)
+    return DecayReport(ranges_scanned=ranges_scanned, rows_updated=rows_updated)
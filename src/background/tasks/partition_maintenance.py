@@ -0,0 +1,175 @@
+"""Partition upkeep for the append-only log tables.
+
+``memory_access_log`` and ``emotion_history`` are range-partitioned by month
+(migration 0006). This task creates partitions ``partition_months_ahead`` months
+in advance through the ``ensure_monthly_partition()`` SQL function, and applies
+retention by dropping whole partitions instead of deleting rows, so neither
+table accumulates dead tuples or index bloat from cleanup.
+
+Dropping a partition while it is attached locks the parent ACCESS EXCLUSIVE, so
+expired partitions are detached first and dropped once they stand alone.
+``DETACH PARTITION ... CONCURRENTLY`` is used when the parent has no DEFAULT
+partition; it runs outside a transaction, and a detach interrupted half way is
+finalized on the next run. Parents with a DEFAULT partition (both tables, as
+created by 0006) do not allow it. They are detached in a short transaction
+under ``partition_detach_lock_timeout_ms``, so a busy parent makes the run skip
+the partition rather than queue every reader behind the lock.
+
+Rows outside every monthly partition land in the ``<table>_default`` partition;
+``ensure_monthly_partition()`` moves them out when their month is created. A
+non-empty default partition therefore means maintenance has not been running.
+The app runs :func:`run_partition_maintenance` every
+``partition_maintenance_interval_seconds``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from core.config import DatabaseSettings
+from database.connection import create_session_factory
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PartitionedTable:
+    name: str
+    key_column: str
+
+
+MEMORY_ACCESS_LOG = PartitionedTable("memory_access_log", "accessed_at")
+EMOTION_HISTORY = PartitionedTable("emotion_history", "created_at")
+
+
+@dataclass(slots=True)
+class PartitionReport:
+    ensured: list[str] = field(default_factory=list)
+    dropped: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)  # parent busy; retried next run
+
+
+def _retention(table: PartitionedTable, settings: DatabaseSettings) -> int | None:
+    if table is MEMORY_ACCESS_LOG:
+        return settings.memory_access_log_retention_months
+    return settings.emotion_history_retention_months
+
+
+async def ensure_partitions(
+    session: AsyncSession, table: PartitionedTable, months_ahead: int
+) -> list[str]:
+    """Create the current month's partition and ``months_ahead`` after it."""
+    result = await session.scalars(
+        text(
+            "SELECT ensure_monthly_partition(:parent, :key_column, "
+            "(date_trunc('month', now()) + make_interval(months => n))::date) "
+            "FROM generate_series(0, :months_ahead) AS n"
+        ),
+        {"parent": table.name, "key_column": table.key_column, "months_ahead": months_ahead},
+    )
+    return list(result.all())
+
+
+def _is_lock_timeout(exc: DBAPIError) -> bool:
+    return getattr(exc.orig, "sqlstate", None) == "55P03"  # lock_not_available
+
+
+async def drop_expired_partitions(
+    engine: AsyncEngine, table: PartitionedTable, retention_months: int, lock_timeout_ms: int
+) -> tuple[list[str], list[str]]:
+    """Detach and drop monthly partitions that ended more than ``retention_months`` ago.
+
+    Returns the partitions dropped and those skipped because the parent was busy.
+    """
+    dropped: list[str] = []
+    skipped: list[str] = []
+    async with engine.connect() as conn:
+        # DETACH ... CONCURRENTLY and FINALIZE refuse to run inside a transaction block.
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        has_default = await conn.scalar(
+            text(
+                "SELECT partdefid <> 0 FROM pg_partitioned_table "
+                "WHERE partrelid = CAST(:parent AS regclass)"
+            ),
+            {"parent": table.name},
+        )
+        expired = (
+            await conn.execute(
+                text(
+                    "SELECT c.relname, i.inhdetachpending FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = CAST(:parent AS regclass) "
+                    "AND c.relname ~ '_y[0-9]{4}m[0-9]{2}$' "
+                    'AND to_date(right(c.relname, 8), \'"y"YYYY"m"MM\') '
+                    "    < date_trunc('month', now()) - make_interval(months => :retention) "
+                    "ORDER BY c.relname"
+                ),
+                {"parent": table.name, "retention": retention_months},
+            )
+        ).all()
+
+        # Names come from pg_class and matched the pattern above.
+        for name, pending in expired:
+            detach = f'ALTER TABLE "{table.name}" DETACH PARTITION "{name}"'
+            if pending:
+                await conn.execute(text(f"{detach} FINALIZE"))
+            elif not has_default:
+                await conn.execute(text(f"{detach} CONCURRENTLY"))
+            else:
+                try:
+                    async with engine.begin() as tx:
+                        await tx.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+                        await tx.execute(text(detach))
+                except DBAPIError as exc:
+                    if not _is_lock_timeout(exc):
+                        raise
+                    logger.warning(
+                        "partition_maintenance.detach_skipped", table=table.name, partition=name
+                    )
+                    skipped.append(name)
+                    continue
+            await conn.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+    return dropped, skipped
+
+
+async def _default_has_rows(session: AsyncSession, table: PartitionedTable) -> bool:
+    return bool(await session.scalar(text(f'SELECT EXISTS (SELECT 1 FROM "{table.name}_default")')))
+
+
+async def run_partition_maintenance(
+    engine: AsyncEngine,
+    settings: DatabaseSettings,
+    tables: tuple[PartitionedTable, ...] = (MEMORY_ACCESS_LOG, EMOTION_HISTORY),
+) -> PartitionReport:
+    """Create upcoming partitions (one transaction per table), then drop expired ones."""
+    session_factory = create_session_factory(engine)
+    report = PartitionReport()
+    for table in tables:
+        async with session_factory() as session, session.begin():
+            report.ensured += await ensure_partitions(
+                session, table, settings.partition_months_ahead
+            )
+            if await _default_has_rows(session, table):
+                logger.warning("partition_maintenance.default_not_empty", table=table.name)
+
+        retention = _retention(table, settings)
+        if retention is not None:
+            dropped, skipped = await drop_expired_partitions(
+                engine, table, retention, settings.partition_detach_lock_timeout_ms
+            )
+            report.dropped += dropped
+            report.skipped += skipped
+
+    logger.info(
+        "partition_maintenance.completed",
+        ensured=len(report.ensured),
+        dropped=report.dropped,
+        skipped=report.skipped,
+    )
+    return report
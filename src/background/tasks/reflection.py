@@ -0,0 +1,76 @@
+"""Background reflection jobs.
+
+Reflection generation is an LLM call, so it is queued off the chat turn as soon as
+the owner's accumulated importance crosses ``reflection_importance_threshold``.
+The queue key only collapses duplicate jobs within one process, so a job first
+claims the owner's accumulator row; a job that finds the owner no longer due, or
+already claimed by another worker, does nothing. The reflection is drafted
+outside any transaction; writing it and consuming the importance it covers then
+commit together, so a crash can neither lose the reflection's credit nor reflect
+twice on the same memories. A job that gives up releases its claim, and a claim
+left by a crashed worker expires after ``reflection_claim_ttl_seconds``.
+"""
+
+from __future__ import annotations
+
+import uuid
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from background.queue import TaskQueue
+from core.config import MemorySettings
+from services.memory.reflection_trigger import (
+    claim_importance,
+    consume_importance,
+    release_claim,
+)
+from services.memory.reflections import ReflectionGenerator
+
+logger = structlog.get_logger(__name__)
+
+
+class ReflectionScheduler:
+    def __init__(
+        self,
+        settings: MemorySettings,
+        queue: TaskQueue,
+        session_factory: async_sessionmaker[AsyncSession],
+        generator: ReflectionGenerator,
+    ) -> None:
+        self._threshold = settings.reflection_importance_threshold
+        self._claim_ttl = settings.reflection_claim_ttl_seconds
+        self._queue = queue
+        self._session_factory = session_factory
+        self._generator = generator
+
+    def schedule(self, owner_id: uuid.UUID) -> bool:
+        """Queue a reflection for ``owner_id`` unless one is already pending."""
+        return self._queue.submit(lambda: self._run(owner_id), key=f"reflection:{owner_id}")
+
+    async def _run(self, owner_id: uuid.UUID) -> None:
+        async with self._session_factory() as session, session.begin():
+            consumed = await claim_importance(session, owner_id, self._threshold, self._claim_ttl)
+        if consumed is None:
+            logger.debug("reflection.skipped", owner_id=str(owner_id))
+            return
+
+        written = False
+        try:
+            draft = await self._generator.draft(owner_id)
+            if draft is None:
+                return
+            async with self._session_factory() as session, session.begin():
+                reflection_id = await self._generator.write(session, draft)
+                await consume_importance(session, owner_id, consumed)
+            written = True
+        finally:
+            if not written:
+                async with self._session_factory() as session, session.begin():
+                    await release_claim(session, owner_id)
+        logger.info(
+            "reflection.written",
+            owner_id=str(owner_id),
+            reflection_id=reflection_id,
+            importance=consumed,
+        )
@@ -0,0 +1,288 @@
+"""Bulk transcript ingestion.
+
+Turns existing chat logs into ``participant``, ``episode``, ``memory_base`` and
+``message`` rows without going through the ORM unit of work:
+
+- messages are embedded in parallel through a bounded pool of workers on top of
+  the micro-batching :class:`EmbeddingService`
+- ``memory_base`` ids are reserved from the sequence up front, then both tables
+  are loaded with binary ``COPY`` in large chunks
+- each chunk commits together with its progress row in ``transcript_import``, so
+  an interrupted import resumes at the first chunk that did not commit
+
+An import runs on one connection that holds a session-level advisory lock on
+the transcript's ``import_key`` throughout, so a second import of the same
+transcript fails fast with :class:`ImportInProgress` instead of loading the same
+chunk twice. The pgvector codec is registered on that connection once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+import structlog
+from pgvector.asyncpg import register_vector
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from core.utils.tokens import TOKEN_COUNT_KEY, count_tokens
+from database.connection import create_session_factory
+from database.models import (
+    Episode,
+    EpisodeStatus,
+    MemoryBase,
+    Participant,
+    ParticipantType,
+    TranscriptImport,
+)
+from models.domain.transcript import Transcript, TranscriptMessage
+from services.dialogue.chat import DEFAULT_MESSAGE_IMPORTANCE
+from services.llm.providers.embedding import EmbeddingService
+from services.memory.embedding_cache import EmbeddingCache
+from services.memory.reflection_trigger import add_importance
+
+logger = structlog.get_logger(__name__)
+
+# Session-level advisory lock namespace for import keys ("TRN").
+_LOCK_NAMESPACE = 0x54524E
+
+_MEMORY_COLUMNS = (
+    "id",
+    "owner_id",
+    "memory_type",
+    "importance_score",
+    "memory_strength",
+    "access_count",
+    "created_at",
+    "last_accessed_at",
+    "strength_updated_at",
+    "embedding",
+    "metadata",
+)
+_MESSAGE_COLUMNS = ("id", "memory_id", "episode_id", "sender_id", "content", "created_at")
+
+
+class ImportInProgress(RuntimeError):
+    """Another session is importing the same transcript."""
+
+
+@dataclass(frozen=True, slots=True)
+class ImportResult:
+    import_key: str
+    episode_id: int
+    imported_messages: int
+    resumed_from: int
+
+
+class TranscriptImporter:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        embeddings: EmbeddingService,
+        *,
+        embedding_cache: EmbeddingCache | None = None,
+        chunk_size: int = 2_000,
+        embedding_batch_size: int = 64,
+        embedding_workers: int = 8,
+    ) -> None:
+        self._engine = engine
+        self._session_factory = create_session_factory(engine)
+        self._embeddings = embeddings
+        self._cache = embedding_cache
+        self._chunk_size = chunk_size
+        self._embedding_batch_size = embedding_batch_size
+        self._embedding_workers = asyncio.Semaphore(embedding_workers)
+
+    async def run(self, transcript: Transcript) -> ImportResult:
+        """Import (or resume importing) one transcript.
+
+        Raises :class:`ImportInProgress` if the transcript is already being imported.
+        """
+        key = (_LOCK_NAMESPACE, func.hashtext(transcript.import_key))
+        async with self._engine.connect() as conn:
+            locked = await conn.scalar(select(func.pg_try_advisory_lock(*key)))
+            await conn.commit()
+            if not locked:
+                raise ImportInProgress(transcript.import_key)
+            try:
+                raw = await conn.get_raw_connection()
+                await register_vector(raw.driver_connection)
+                return await self._import(conn, transcript)
+            finally:
+                # The lock outlives transactions, so release it before the
+                # connection goes back to the pool.
+                await conn.rollback()
+                await conn.execute(select(func.pg_advisory_unlock(*key)))
+                await conn.commit()
+
+    async def _import(self, conn: AsyncConnection, transcript: Transcript) -> ImportResult:
+        progress = await self._start(conn, transcript)
+        resumed_from = progress.imported_messages
+        offset = resumed_from
+        messages = transcript.messages
+
+        while offset < len(messages):
+            chunk = messages[offset : offset + self._chunk_size]
+            embeddings = await self._embed([m.content for m in chunk])
+            async with self._session_factory(bind=conn) as session, session.begin():
+                await self._load_chunk(session, transcript, progress, chunk, embeddings)
+                offset += len(chunk)
+                await session.execute(
+                    update(TranscriptImport)
+                    .where(TranscriptImport.import_key == transcript.import_key)
+                    .values(imported_messages=offset, completed=offset >= len(messages))
+                )
+            logger.info("transcript_import.chunk", key=transcript.import_key, imported=offset)
+
+        if self._cache is not None and offset > resumed_from:
+            await asyncio.to_thread(self._cache.invalidate, transcript.character_id)
+        return ImportResult(
+            import_key=transcript.import_key,
+            episode_id=progress.episode_id,
+            imported_messages=offset,
+            resumed_from=resumed_from,
+        )
+
+    # ------------------------------------------------------------------
+    # Setup
+    # ------------------------------------------------------------------
+
+    async def _start(self, conn: AsyncConnection, transcript: Transcript) -> TranscriptImport:
+        """Load the progress row, creating the user, episode and row on first run."""
+        async with self._session_factory(bind=conn) as session, session.begin():
+            progress = await session.scalar(
+                select(TranscriptImport).where(TranscriptImport.import_key == transcript.import_key)
+            )
+            if progress is not None:
+                return progress
+
+            user_id = transcript.user_id or await session.scalar(
+                insert(Participant)
+                .values(type=ParticipantType.HUMAN, name=transcript.user_name)
+                .returning(Participant.id)
+            )
+            title = transcript.title or f"Conversation with {transcript.user_name}"
+            summary = f"Imported conversation ({len(transcript.messages)} messages)."
+            first_at = transcript.messages[0].created_at if transcript.messages else None
+            episode_memory_id = await session.scalar(
+                insert(MemoryBase)
+                .values(
+                    owner_id=transcript.character_id,
+                    memory_type="episode",
+                    importance_score=DEFAULT_MESSAGE_IMPORTANCE,
+                    memory_strength=1.0,
+                    metadata_={TOKEN_COUNT_KEY: count_tokens(summary)},
+                    **({"created_at": first_at} if first_at else {}),
+                )
+                .returning(MemoryBase.id)
+            )
+            episode_id = await session.scalar(
+                insert(Episode)
+                .values(
+                    memory_id=episode_memory_id,
+                    title=title,
+                    summary=summary,
+                    character_id=transcript.character_id,
+                    user_id=user_id,
+                    status=EpisodeStatus.COMPLETED,
+                )
+                .returning(Episode.id)
+            )
+            progress = TranscriptImport(
+                import_key=transcript.import_key,
+                user_id=user_id,
+                character_id=transcript.character_id,
+                episode_id=episode_id,
+                total_messages=len(transcript.messages),
+                imported_messages=0,
+                completed=not transcript.messages,
+            )
+            session.add(progress)
+        return progress
+
+    # ------------------------------------------------------------------
+    # Chunks
+    # ------------------------------------------------------------------
+
+    async def _embed(self, texts: list[str]) -> list[np.ndarray]:
+        async def batch(part: list[str]) -> list[np.ndarray]:
+            async with self._embedding_workers:
+                return await self._embeddings.embed_many(part)
+
+        size = self._embedding_batch_size
+        parts = await asyncio.gather(
+            *(batch(texts[i : i + size]) for i in range(0, len(texts), size))
+        )
+        return [vector for part in parts for vector in part]
+
+    async def _load_chunk(
+        self,
+        session: AsyncSession,
+        transcript: Transcript,
+        progress: TranscriptImport,
+        chunk: Sequence[TranscriptMessage],
+        embeddings: list[np.ndarray],
+    ) -> None:
+        memory_ids = list(
+            await session.scalars(
+                text(
+                    "SELECT nextval(pg_get_serial_sequence('memory_base', 'id')) "
+                    "FROM generate_series(1, :n)"
+                ),
+                {"n": len(chunk)},
+            )
+        )
+
+        memory_rows = []
+        message_rows = []
+        for memory_id, message, embedding in zip(memory_ids, chunk, embeddings, strict=True):
+            metadata = json.dumps({TOKEN_COUNT_KEY: count_tokens(message.content)})
+            memory_rows.append(
+                (
+                    memory_id,
+                    transcript.character_id,
+                    "message",
+                    DEFAULT_MESSAGE_IMPORTANCE,
+                    1.0,
+                    0,
+                    message.created_at,
+                    message.created_at,
+                    message.created_at,
+                    embedding,
+                    metadata,
+                )
+            )
+            sender_id = progress.user_id if message.role == "user" else transcript.character_id
+            message_rows.append(
+                (
+                    uuid.uuid4(),
+                    memory_id,
+                    progress.episode_id,
+                    sender_id,
+                    message.content,
+                    message.created_at,
+                )
+            )
+
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        driver = raw.driver_connection
+        assert driver is not None
+        await driver.copy_records_to_table(
+            "memory_base", records=memory_rows, columns=_MEMORY_COLUMNS
+        )
+        await driver.copy_records_to_table(
+            "message", records=message_rows, columns=_MESSAGE_COLUMNS
+        )
+
+        await add_importance(
+            session,
+            transcript.character_id,
+            DEFAULT_MESSAGE_IMPORTANCE * len(chunk),
+            count=len(chunk),
+        )
@@ -24,12 +24,49 @@ class DatabaseSettings(BaseSettings):
     max_overflow: int = Field(default=20, ge=0, le=100)
     pool_timeout: int = Field(default=30, ge=1)
 
+    # Read replicas (JSON list of async URLs) with their own pools. Read-only work
+    # goes to a replica that has replayed the primary's WAL to within
+    # replica_max_lag_seconds, and to one that has seen the caller's latest write
+    replica_urls: list[str] = Field(default_factory=list)
+    replica_pool_size: int = Field(default=10, ge=1, le=100)
+    replica_max_overflow: int = Field(default=20, ge=0, le=100)
+    replica_pool_timeout: int = Field(default=30, ge=1)
+    replica_max_lag_seconds: float = Field(default=5.0, gt=0.0)
+    replica_lag_check_interval_seconds: float = Field(default=1.0, gt=0.0)
+
+    # Monthly partitions of memory_access_log / emotion_history: how far ahead to
+    # create them and how many past months to keep (None keeps everything)
+    partition_months_ahead: int = Field(default=3, ge=1, le=24)
+    memory_access_log_retention_months: int | None = Field(default=6, ge=1)
+    emotion_history_retention_months: int | None = Field(default=24, ge=1)
+    # How often maintenance runs, and how long detaching an expired partition may
+    # wait for the parent's lock before it is retried on the next run
+    partition_maintenance_interval_seconds: float = Field(default=24 * 3600.0, gt=0.0)
+    partition_detach_lock_timeout_ms: int = Field(default=2000, ge=1)
+
+    # Development aid: count SQL statements per operation and warn or raise when an
+    # operation exceeds its query budget
+    query_budget_mode: Literal["off", "warn", "raise"] = Field(default="off")
+
+    # /metrics: statement latency is labelled by normalised-SQL fingerprint; past
+    # this many distinct fingerprints new ones are counted as "other"
+    statement_metrics_max_fingerprints: int = Field(default=500, ge=1)
+
 
 class LLMSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     default_llm_provider: str = Field(default="openai")
 
+    # Provider router: failover order, admission control and pooled HTTP clients
+    llm_fallback_providers: list[str] = Field(default_factory=list)
+    llm_max_concurrency: int = Field(default=16, ge=1)
+    llm_provider_concurrency: dict[str, int] = Field(default_factory=dict)
+    llm_admission_timeout_seconds: float = Field(default=2.0, gt=0.0)
+    llm_request_timeout_seconds: float = Field(default=60.0, gt=0.0)
+    llm_connect_timeout_seconds: float = Field(default=5.0, gt=0.0)
+    llm_max_retries: int = Field(default=2, ge=0)
+
     # OpenAI
     openai_api_key: str = Field(default="")
     openai_model: str = Field(default="gpt-4o")
@@ -46,34 +83,91 @@ class LLMSettings(BaseSettings):
     # Ollama
     ollama_base_url: str = Field(default="http://localhost:11434")
     ollama_model: str = Field(default="llama3")
+    ollama_embedding_model: str = Field(default="nomic-embed-text")
 
     # LM Studio
     lm_studio_base_url: str = Field(default="http://localhost:1234/v1")
     lm_studio_model: str = Field(default="local-model")
+    lm_studio_embedding_model: str = Field(default="local-embedding-model")
 
     # LocalAI
     local_ai_base_url: str = Field(default="http://localhost:8080/v1")
     local_ai_model: str = Field(default="gpt-3.5-turbo")
+    local_ai_embedding_model: str = Field(default="text-embedding-ada-002")
+
+    # Embeddings: openai | ollama | lmstudio | localai
+    embedding_provider: str = Field(default="openai")
+    embedding_batch_size: int = Field(default=64, ge=1, le=2048)
+    embedding_batch_wait_ms: float = Field(default=10.0, ge=0.0)
+    embedding_result_cache_size: int = Field(default=10_000, ge=0)
+
+    # Response cache for deterministic side calls (scoring, tagging, extraction)
+    llm_cache_ttl_seconds: int = Field(default=7 * 24 * 3600, ge=1)
+    llm_cache_max_entries: int = Field(default=100_000, ge=1)
+    llm_cache_similarity_threshold: float | None = Field(default=None, gt=0.0, le=1.0)
+    llm_cache_hit_flush_seconds: float = Field(default=30.0, gt=0.0)
 
 
 class MemorySettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     embedding_dimension: int = Field(default=1536, ge=1)
+    # Index representation: none (full-precision HNSW) | halfvec | binary. Quantized
+    # indexes over-fetch by embedding_rerank_factor and re-rank with exact vectors.
+    # Applied to the schema by `python -m background.tasks.embedding_index`.
+    embedding_quantization: Literal["none", "halfvec", "binary"] = Field(default="none")
+    embedding_rerank_factor: int = Field(default=4, ge=1, le=100)
+
+    # Owner-filtered vector search: owners below the threshold are scanned exactly;
+    # larger ones use HNSW with ef_search sized to the owner's share of the table
+    vector_search_exact_threshold: int = Field(default=2000, ge=0)
+    vector_search_ef_search: int = Field(default=40, ge=1, le=1000)
+    vector_search_max_ef_search: int = Field(default=1000, ge=1, le=1000)
+    vector_search_owner_stats_ttl_seconds: float = Field(default=60.0, ge=0.0)
+    vector_search_recall_sample_rate: float = Field(default=0.0, ge=0.0, le=1.0)
 
     # Retrieval weights
     retrieval_weight_recency: float = Field(default=0.3, ge=0.0, le=1.0)
     retrieval_weight_importance: float = Field(default=0.3, ge=0.0, le=1.0)
     retrieval_weight_relevance: float = Field(default=0.4, ge=0.0, le=1.0)
+    retrieval_recency_decay: float = Field(default=0.995, gt=0.0, le=1.0)  # per hour
+    retrieval_candidate_pool: int = Field(default=100, ge=1)
+
+    # Shared embedding cache (memory-mapped, shared by all workers on a host). Off
+    # by default: when enabled, retrieval ranks from the cached matrices instead of
+    # VectorSearch, bypassing its HNSW and quantized-index paths
+    embedding_cache_dir: str = Field(default="/dev/shm/ene-embedding-cache")
+    embedding_cache_max_bytes: int = Field(default=0, ge=0)
 
     # Reflection
     reflection_importance_threshold: float = Field(default=10.0, gt=0.0)
+    # Most recent memories a reflection is drafted from
+    reflection_source_limit: int = Field(default=50, ge=1)
+    # How long a reflection job's claim on an owner lasts if the job dies mid-draft
+    reflection_claim_ttl_seconds: float = Field(default=600.0, gt=0.0)
 
     # Memory evolution
     memory_decay_rate: float = Field(default=0.01, gt=0.0)
     memory_reinforcement_factor: float = Field(default=0.1, gt=0.0)
     memory_weak_threshold: float = Field(default=0.1, ge=0.0, le=1.0)
     memory_decay_threshold_days: int = Field(default=30, ge=1)
+    # Background decay pass: how often it runs and how many ids each UPDATE covers
+    memory_decay_interval_seconds: float = Field(default=3600.0, gt=0.0)
+    memory_decay_batch_rows: int = Field(default=5000, ge=1)
+
+    # Write-behind buffer for access logs and reinforcement
+    access_flush_interval_seconds: float = Field(default=2.0, gt=0.0)
+    access_buffer_max_events: int = Field(default=5000, ge=1)
+
+    # Episode segmentation: an ongoing episode ends when a turn drifts further than
+    # this cosine distance from its centroid, after an idle gap, or at the size cap
+    episode_drift_threshold: float = Field(default=0.35, gt=0.0, le=2.0)
+    episode_min_messages: int = Field(default=6, ge=1)
+    episode_max_messages: int = Field(default=200, ge=2)
+    episode_idle_minutes: float = Field(default=30.0, gt=0.0)
+    episode_summary_every_messages: int = Field(default=10, ge=1)
+    # Background sweep closing episodes of pairs that never came back
+    episode_idle_sweep_interval_seconds: float = Field(default=300.0, gt=0.0)
 
     # Context window
     max_context_tokens: int = Field(default=200_000, ge=1000)
@@ -85,6 +179,32 @@ class MemorySettings(BaseSettings):
         return v
 
 
+class EmotionSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # In-process character_state cache: dirty states are written at most this
+    # often, and characters idle for longer are flushed and released
+    character_state_flush_interval_seconds: float = Field(default=5.0, gt=0.0)
+    character_state_idle_seconds: float = Field(default=300.0, gt=0.0)
+
+    # Mood: time-decayed blend of the most recent emotion_history rows
+    mood_half_life_minutes: float = Field(default=30.0, gt=0.0)
+    mood_window_hours: float = Field(default=24.0, gt=0.0)
+    mood_window_rows: int = Field(default=200, ge=1)
+
+
+class PortraitSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Delta snapshots: a full keyframe is written after this many deltas
+    snapshot_keyframe_interval: int = Field(default=20, ge=1)
+
+    # Deferred interest/preference upserts: merged across turns and written at
+    # most this often, or sooner once this many (user, key) entries are pending
+    portrait_flush_interval_seconds: float = Field(default=30.0, gt=0.0)
+    portrait_buffer_max_keys: int = Field(default=1000, ge=1)
+
+
 class AppSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -108,6 +228,8 @@ class Settings(BaseSettings):
     db: DatabaseSettings = Field(default_factory=DatabaseSettings)
     llm: LLMSettings = Field(default_factory=LLMSettings)
     memory: MemorySettings = Field(default_factory=MemorySettings)
+    emotion: EmotionSettings = Field(default_factory=EmotionSettings)
+    portrait: PortraitSettings = Field(default_factory=PortraitSettings)
     app: AppSettings = Field(default_factory=AppSettings)
 
 
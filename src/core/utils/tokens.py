@@ -0,0 +1,36 @@
+"""Token counting."""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Any
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+TOKEN_COUNT_KEY = "token_count"
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Any:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # noqa: BLE001
+        # The BPE file is downloaded on first use; hosts without egress (and no
+        # TIKTOKEN_CACHE_DIR) fall back to the estimate instead of failing turns.
+        logger.warning("tokens.encoding_unavailable", error=repr(exc))
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, else estimate at ~4 chars per token."""
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, math.ceil(len(text) / 4))
+    return len(encoding.encode(text, disallowed_special=()))
@@ -1,33 +1,92 @@
-"""Database connection pool and session management."""
+"""Database connection pools, session management and read-replica routing.
+
+Writes always use the primary. Read-only work that tolerates a few seconds of
+staleness (vector retrieval, history paging, analytics) can take a session from
+:class:`ReadRouter`, which picks a replica that is fresh enough, or falls back to
+the primary.
+
+Freshness is measured in WAL positions rather than replay timestamps, so an idle
+primary does not make replicas look stale. Every
+``replica_lag_check_interval_seconds`` the router samples the primary's
+``pg_current_wal_lsn()``, then asks each replica for ``pg_last_wal_replay_lsn()``.
+A replica's ``caught_up_at`` is the time of the newest primary sample it has
+replayed. A read is routed to a replica only if:
+
+- ``caught_up_at`` is within ``replica_max_lag_seconds``, and
+- for read-your-writes, ``caught_up_at`` is later than the last write noted for
+  the read's key (:meth:`ReadRouter.note_write`)
+
+Every engine is instrumented for ``/metrics``. :class:`TimedQueuePool` records
+how long checkouts wait and how often they time out. Scrape-time gauges report
+pool size, checked-out connections and overflow in use. Cursor events feed a
+per-statement latency histogram labelled by a fingerprint of the normalised SQL.
+"""
 
 from __future__ import annotations
 
-from collections.abc import AsyncGenerator
-from typing import Any
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import math
+import re
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, cast
 
+import structlog
+from sqlalchemy import event, text
+from sqlalchemy import exc as sa_exc
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from core.config import DatabaseSettings
+from core.utils.metrics import REGISTRY, CallbackGauge, Counter, Histogram, Sample
+from database.query_counter import install_query_counter
+
+logger = structlog.get_logger(__name__)
 
 _engine: AsyncEngine | None = None
 _session_factory: async_sessionmaker[AsyncSession] | None = None
+_read_router: ReadRouter | None = None
+_shutdown_hooks: list[Callable[[], Awaitable[None]]] = []
 
 
 def create_engine(settings: DatabaseSettings) -> AsyncEngine:
     """Create an async SQLAlchemy engine with connection pooling."""
-    return create_async_engine(
+    engine = create_async_engine(
         settings.url,
+        poolclass=TimedQueuePool,
         pool_size=settings.pool_size,
         max_overflow=settings.max_overflow,
         pool_timeout=settings.pool_timeout,
         pool_pre_ping=True,
         echo=False,
     )
+    instrument_engine(engine, "primary", settings)
+    return engine
+
+
+def create_replica_engine(url: str, settings: DatabaseSettings, name: str) -> AsyncEngine:
+    """Create an engine for a read replica with the replica pool settings."""
+    engine = create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=settings.replica_pool_size,
+        max_overflow=settings.replica_max_overflow,
+        pool_timeout=settings.replica_pool_timeout,
+        pool_pre_ping=True,
+        echo=False,
+    )
+    instrument_engine(engine, name, settings)
+    return engine
 
 
 def create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
@@ -42,10 +101,18 @@ def create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSessi
 
 
 def init_db(settings: DatabaseSettings) -> None:
-    """Initialise the global engine and session factory."""
-    global _engine, _session_factory
+    """Initialise the global engine, session factory and read router."""
+    global _engine, _session_factory, _read_router
     _engine = create_engine(settings)
+    install_query_counter(_engine, settings.query_budget_mode)
     _session_factory = create_session_factory(_engine)
+    replicas = [
+        create_replica_engine(url, settings, f"replica-{i}")
+        for i, url in enumerate(settings.replica_urls)
+    ]
+    for replica in replicas:
+        install_query_counter(replica, settings.query_budget_mode)
+    _read_router = ReadRouter(_engine, _session_factory, replicas, settings)
 
 
 def get_engine() -> AsyncEngine:
@@ -60,6 +127,12 @@ def get_session_factory() -> async_sessionmaker[AsyncSession]:
     return _session_factory
 
 
+def get_read_router() -> ReadRouter:
+    if _read_router is None:
+        raise RuntimeError("Database not initialised. Call init_db() first.")
+    return _read_router
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, Any]:
     """FastAPI dependency that yields a database session."""
     factory = get_session_factory()
@@ -72,10 +145,348 @@ async def get_session() -> AsyncGenerator[AsyncSession, Any]:
             raise
 
 
+@contextlib.asynccontextmanager
+async def read_session(key: str | None = None) -> AsyncIterator[AsyncSession]:
+    """A read-only session on a fresh-enough replica, or on the primary."""
+    async with get_read_router()(key) as session:
+        yield session
+
+
+def register_shutdown_hook(hook: Callable[[], Awaitable[None]]) -> None:
+    """Run ``hook`` in :func:`close_db` while the engine is still usable.
+
+    Used by write-behind buffers to flush pending rows on shutdown.
+    """
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+
+
 async def close_db() -> None:
-    """Dispose the engine and release all connections."""
-    global _engine, _session_factory
+    """Flush registered shutdown hooks, then dispose the engine and release all connections."""
+    global _engine, _session_factory, _read_router
+    while _shutdown_hooks:
+        hook = _shutdown_hooks.pop()
+        try:
+            await hook()
+        except Exception:
+            logger.exception("database.shutdown_hook_failed", hook=repr(hook))
+    if _read_router is not None:
+        await _read_router.dispose()
+        _read_router = None
     if _engine is not None:
         await _engine.dispose()
         _engine = None
         _session_factory = None
+
+
+# ---------------------------------------------------------------------------
+# Pool and statement metrics
+# ---------------------------------------------------------------------------
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ("engine",),
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout.",
+    ("engine",),
+)
+STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "Cursor execution time per normalised statement.",
+    ("engine", "operation", "fingerprint"),
+)
+STATEMENT_ERRORS = Counter(
+    "db_statement_errors_total",
+    "Statements that raised, per normalised statement.",
+    ("engine", "operation", "fingerprint"),
+)
+OTHER_FINGERPRINT = "other"
+
+_instrumented: dict[str, AsyncEngine] = {}
+_fingerprints: dict[str, tuple[str, str]] = {}  # raw SQL -> (operation, fingerprint)
+_fingerprint_sql: dict[str, str] = {}  # fingerprint -> normalised SQL
+
+_SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|\$\d+|%\(\w+\)s|%s|\b\d+(?:\.\d+)?\b")
+_SQL_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SQL_SPACE = re.compile(r"\s+")
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection."""
+
+    metrics_name = "primary"
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            POOL_TIMEOUTS.inc(self.metrics_name)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, self.metrics_name)
+
+    def recreate(self) -> TimedQueuePool:
+        pool = cast(TimedQueuePool, super().recreate())
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+def normalise_statement(statement: str) -> str:
+    """SQL with literals and bind parameters replaced by ``?`` and IN-lists collapsed."""
+    normalised = _SQL_LIST.sub("(...)", _SQL_LITERAL.sub("?", statement))
+    return _SQL_SPACE.sub(" ", normalised).strip()
+
+
+def _classify(statement: str, max_fingerprints: int) -> tuple[str, str]:
+    cached = _fingerprints.get(statement)
+    if cached is not None:
+        return cached
+    normalised = normalise_statement(statement)
+    operation = normalised.split(" ", 1)[0].lower() if normalised else "unknown"
+    fingerprint = hashlib.blake2b(normalised.encode(), digest_size=6).hexdigest()
+    if fingerprint not in _fingerprint_sql:
+        if len(_fingerprint_sql) >= max_fingerprints:
+            fingerprint = OTHER_FINGERPRINT
+        else:
+            _fingerprint_sql[fingerprint] = normalised
+    # Compiled statements repeat, so this stays small; stop caching if it doesn't.
+    if len(_fingerprints) < 10 * max_fingerprints:
+        _fingerprints[statement] = (operation, fingerprint)
+    return operation, fingerprint
+
+
+def instrument_engine(engine: AsyncEngine, name: str, settings: DatabaseSettings) -> None:
+    """Attach checkout and statement timing to ``engine`` under the label ``name``."""
+    sync_engine = engine.sync_engine
+    if isinstance(sync_engine.pool, TimedQueuePool):
+        sync_engine.pool.metrics_name = name
+    max_fingerprints = settings.statement_metrics_max_fingerprints
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _finish(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            operation, fingerprint = _classify(statement, max_fingerprints)
+            STATEMENT_LATENCY.observe(time.perf_counter() - started, name, operation, fingerprint)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context: Any) -> None:
+        if exception_context.statement is not None:
+            operation, fingerprint = _classify(exception_context.statement, max_fingerprints)
+            STATEMENT_ERRORS.inc(name, operation, fingerprint)
+
+    _instrumented[name] = engine
+
+
+def _pool_samples(read: Callable[[Any], float]) -> Callable[[], list[Sample]]:
+    def collect() -> list[Sample]:
+        samples: list[Sample] = []
+        for name, engine in _instrumented.items():
+            pool = engine.sync_engine.pool
+            if isinstance(pool, AsyncAdaptedQueuePool):
+                samples.append(((name,), float(read(pool))))
+        return samples
+
+    return collect
+
+
+def _replica_lag_samples() -> list[Sample]:
+    if _read_router is None:
+        return []
+    return [((url,), lag) for url, lag in _read_router.lag_seconds().items()]
+
+
+for _metric in (
+    CallbackGauge(
+        "db_pool_size",
+        "Connections the pool keeps open (pool_size).",
+        ("engine",),
+        _pool_samples(lambda pool: pool.size()),
+    ),
+    CallbackGauge(
+        "db_pool_max_overflow",
+        "Connections allowed beyond pool_size (max_overflow).",
+        ("engine",),
+        _pool_samples(lambda pool: pool._max_overflow),
+    ),
+    CallbackGauge(
+        "db_pool_checked_out",
+        "Connections currently checked out.",
+        ("engine",),
+        _pool_samples(lambda pool: pool.checkedout()),
+    ),
+    CallbackGauge(
+        "db_pool_overflow_in_use",
+        "Checked-out connections beyond pool_size.",
+        ("engine",),
+        _pool_samples(lambda pool: max(pool.overflow(), 0)),
+    ),
+    CallbackGauge(
+        "db_statement_info",
+        "Normalised SQL for each statement fingerprint.",
+        ("fingerprint", "statement"),
+        lambda: [((fp, sql[:300]), 1.0) for fp, sql in _fingerprint_sql.items()],
+    ),
+    CallbackGauge(
+        "db_replica_lag_seconds",
+        "Seconds since each replica was last known to be caught up.",
+        ("replica",),
+        _replica_lag_samples,
+    ),
+    POOL_CHECKOUT_WAIT,
+    POOL_TIMEOUTS,
+    STATEMENT_LATENCY,
+    STATEMENT_ERRORS,
+):
+    REGISTRY.register(_metric)
+
+
+# ---------------------------------------------------------------------------
+# Read replicas
+# ---------------------------------------------------------------------------
+
+_LSN_BYTES = text("SELECT pg_current_wal_lsn() - '0/0'::pg_lsn")
+# NULL on a server that is not in recovery, which is then treated as current.
+_REPLAY_LSN_BYTES = text("SELECT pg_last_wal_replay_lsn() - '0/0'::pg_lsn")
+
+
+@dataclass(slots=True)
+class _Replica:
+    url: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    caught_up_at: float = -math.inf  # monotonic time of the newest replayed sample
+
+
+class ReadRouter:
+    """Hands out read-only sessions on replicas that are fresh enough.
+
+    Calling the router returns a session like an ``async_sessionmaker`` would.
+    Without replicas, or before the first lag check, every read uses the primary.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        primary_sessions: async_sessionmaker[AsyncSession],
+        replicas: list[AsyncEngine],
+        settings: DatabaseSettings,
+    ) -> None:
+        self._primary = primary
+        self._primary_sessions = primary_sessions
+        self._replicas = [
+            _Replica(
+                engine.url.render_as_string(hide_password=True),
+                engine,
+                create_session_factory(engine),
+            )
+            for engine in replicas
+        ]
+        self._max_lag = settings.replica_max_lag_seconds
+        self._interval = settings.replica_lag_check_interval_seconds
+        self._samples: deque[tuple[float, int]] = deque()  # (monotonic, primary LSN)
+        self._writes: dict[str, float] = {}
+        self._next = itertools.count()
+        self._task: asyncio.Task[None] | None = None
+
+    def __call__(self, key: str | None = None) -> AsyncSession:
+        replica = self.pick(key)
+        return replica.session_factory() if replica else self._primary_sessions()
+
+    def pick(self, key: str | None = None) -> _Replica | None:
+        now = time.monotonic()
+        required = now - self._max_lag
+        if key is not None:
+            required = max(required, self._writes.get(key, -math.inf))
+        fresh = [r for r in self._replicas if r.caught_up_at > required]
+        if not fresh:
+            return None
+        return fresh[next(self._next) % len(fresh)]
+
+    def note_write(self, *keys: str) -> None:
+        """Keep reads for ``keys`` on the primary until a replica has this write."""
+        if not self._replicas:
+            return  # every read already goes to the primary
+        now = time.monotonic()
+        for key in keys:
+            # Re-insert so the dict stays ordered oldest write first.
+            self._writes.pop(key, None)
+            self._writes[key] = now
+        self._prune_writes(now)
+
+    def _prune_writes(self, now: float) -> None:
+        # Writes older than the lag bound no longer pin reads; they sit at the front.
+        stale = now - self._max_lag
+        while self._writes:
+            key, at = next(iter(self._writes.items()))
+            if at > stale:
+                break
+            del self._writes[key]
+
+    def lag_seconds(self) -> dict[str, float]:
+        """Seconds since each replica was last known to be caught up."""
+        now = time.monotonic()
+        return {r.url: now - r.caught_up_at for r in self._replicas}
+
+    def start(self) -> None:
+        if self._replicas and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="replica-lag-monitor")
+            register_shutdown_hook(self.close)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def dispose(self) -> None:
+        await self.close()
+        for replica in self._replicas:
+            await replica.engine.dispose()
+
+    async def refresh(self) -> None:
+        """Sample the primary's WAL position and each replica's replay position."""
+        now = time.monotonic()
+        async with self._primary.connect() as conn:
+            self._samples.append((now, int(await conn.scalar(_LSN_BYTES))))
+        while len(self._samples) > 1 and self._samples[1][0] < now - 2 * self._max_lag:
+            self._samples.popleft()
+
+        for replica in self._replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    replayed = await conn.scalar(_REPLAY_LSN_BYTES)
+            except Exception:  # noqa: BLE001 - any failure marks it lagging
+                replica.caught_up_at = -math.inf
+                logger.warning("database.replica_unreachable", replica=replica.url)
+                continue
+            if replayed is None:
+                replica.caught_up_at = now
+                continue
+            caught_up = [at for at, lsn in self._samples if lsn <= int(replayed)]
+            if caught_up:
+                replica.caught_up_at = max(replica.caught_up_at, caught_up[-1])
+
+        self._prune_writes(now)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("database.replica_lag_check_failed")
+            await asyncio.sleep(self._interval)
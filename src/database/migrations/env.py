@@ -27,23 +27,31 @@ if src_path not in sys.path:
 # ---------------------------------------------------------------------------
 from database.models import (  # noqa: E402, F401
     Base,
-    Person,
+    Participant,
+    MemoryBase,
     Message,
     Observation,
     Episode,
-    EpisodeMessage,
     Reflection,
     ReflectionSource,
-    Tag,
-    TagMessage,
-    TagObservation,
-    TagReflection,
-    TagEpisode,
-    EmotionRecord,
-    Interest,
-    DialoguePlan,
+    ReflectionClosure,
+    ReflectionAccumulator,
+    MemoryAccessLog,
+    LLMResponseCache,
+    TranscriptImport,
+    CharacterState,
+    EmotionHistory,
+    EmotionRollupHourly,
+    EmotionRollupDaily,
     UserPortrait,
-    MemoryAccessHistory,
+    UserTrait,
+    UserInterest,
+    UserPreference,
+    UserStateSnapshot,
+    SnapshotInterest,
+    SnapshotTrait,
+    SnapshotPreference,
+    SnapshotEntry,
 )
 from core.config import get_settings  # noqa: E402
 
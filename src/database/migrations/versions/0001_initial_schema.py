@@ -41,7 +41,9 @@ def upgrade() -> None:
             server_default=sa.text("gen_random_uuid()"),
         ),
         sa.Column(
-            "type", sa.Enum("HUMAN", "AI_CHARACTER", name="participant_type"), nullable=False
+            "type",
+            postgresql.ENUM("HUMAN", "AI_CHARACTER", name="participant_type", create_type=False),
+            nullable=False,
         ),
         sa.Column("name", sa.Text(), nullable=False),
         sa.Column("profile", sa.Text(), nullable=True),
@@ -98,7 +100,7 @@ def upgrade() -> None:
         sa.Column("conclusion", sa.Text(), nullable=True),
         sa.Column(
             "status",
-            sa.Enum("ONGOING", "COMPLETED", name="episode_status"),
+            postgresql.ENUM("ONGOING", "COMPLETED", name="episode_status", create_type=False),
             nullable=False,
             server_default="ONGOING",
         ),
@@ -0,0 +1,31 @@
+"""Track when memory_strength was last decayed or reinforced.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-15 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: str | None = "0001"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "memory_base",
+        sa.Column(
+            "strength_updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+    )
+    # Existing strengths are treated as current as of their last access.
+    op.execute("UPDATE memory_base SET strength_updated_at = last_accessed_at")
+
+
+def downgrade() -> None:
+    op.drop_column("memory_base", "strength_updated_at")
@@ -0,0 +1,60 @@
+"""Per-owner running importance accumulator for reflection triggering.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-22 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0003"
+down_revision: str | None = "0002"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reflection_accumulator",
+        sa.Column(
+            "owner_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("participant.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("importance_sum", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("memory_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_reflection_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+    )
+
+    # Backfill: importance of non-reflection memories created since each owner's
+    # latest reflection.
+    op.execute(
+        """
+        INSERT INTO reflection_accumulator
+            (owner_id, importance_sum, memory_count, last_reflection_at)
+        SELECT m.owner_id,
+               coalesce(sum(m.importance_score)
+                        FILTER (WHERE lr.last_at IS NULL OR m.created_at > lr.last_at), 0),
+               count(*) FILTER (WHERE lr.last_at IS NULL OR m.created_at > lr.last_at),
+               lr.last_at
+        FROM memory_base m
+        LEFT JOIN (
+            SELECT mb.owner_id, max(r.created_at) AS last_at
+            FROM reflection r
+            JOIN memory_base mb ON mb.id = r.memory_id
+            GROUP BY mb.owner_id
+        ) lr ON lr.owner_id = m.owner_id
+        WHERE m.memory_type <> 'reflection'
+        GROUP BY m.owner_id, lr.last_at
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reflection_accumulator")
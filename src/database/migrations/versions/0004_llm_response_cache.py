@@ -0,0 +1,41 @@
+"""LLM response cache for deterministic side calls.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-02-03 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from pgvector.sqlalchemy import Vector
+
+revision: str = "0004"
+down_revision: str | None = "0003"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_response_cache",
+        sa.Column("template_id", sa.Text(), primary_key=True),
+        sa.Column("input_hash", sa.Text(), primary_key=True),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column("embedding", Vector(1536), nullable=True),
+        sa.Column("hit_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.Column("last_hit_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("llm_response_cache_expires_idx", "llm_response_cache", ["expires_at"])
+    op.create_index("llm_response_cache_last_hit_idx", "llm_response_cache", ["last_hit_at"])
+    op.execute(
+        "CREATE INDEX llm_response_cache_embedding_idx ON llm_response_cache "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("llm_response_cache")
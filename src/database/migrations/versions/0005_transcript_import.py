@@ -0,0 +1,46 @@
+"""Progress tracking for resumable bulk transcript imports.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-02-10 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0005"
+down_revision: str | None = "0004"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transcript_import",
+        sa.Column("import_key", sa.Text(), primary_key=True),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("participant.id"),
+            nullable=False,
+        ),
+        sa.Column(
+            "character_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("participant.id"),
+            nullable=False,
+        ),
+        sa.Column("episode_id", sa.Integer(), sa.ForeignKey("episode.id"), nullable=False),
+        sa.Column("total_messages", sa.Integer(), nullable=False),
+        sa.Column("imported_messages", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed", sa.Boolean(), nullable=False, server_default="false"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("transcript_import")
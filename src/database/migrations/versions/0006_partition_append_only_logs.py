@@ -0,0 +1,251 @@
+"""Monthly range partitioning for memory_access_log and emotion_history.
+
+Both tables are rebuilt as ``PARTITION BY RANGE`` parents with one partition per
+month plus a DEFAULT partition, and existing rows are copied across. Partitions are
+created through ``ensure_monthly_partition()``, which is also what the runtime
+maintenance task calls; it moves any rows that already landed in the DEFAULT
+partition into the new one before attaching it.
+
+The partition key must be part of every unique constraint, so the primary keys
+become ``(id, accessed_at)`` / ``(id, created_at)`` and
+``character_state.latest_emotion_id`` loses its foreign key.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-02-17 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0006"
+down_revision: str | None = "0005"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+# Matches the DATABASE_PARTITION_MONTHS_AHEAD default.
+_MONTHS_AHEAD = 3
+
+_ENSURE_MONTHLY_PARTITION = """
+CREATE OR REPLACE FUNCTION ensure_monthly_partition(parent text, key_column text, month date)
+RETURNS text
+LANGUAGE plpgsql AS $$
+DECLARE
+    lower_bound date := date_trunc('month', month)::date;
+    upper_bound date := (date_trunc('month', month) + interval '1 month')::date;
+    partition_name text := format('%s_y%sm%s', parent,
+                                  to_char(lower_bound, 'YYYY'), to_char(lower_bound, 'MM'));
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext(partition_name));
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                   partition_name, parent);
+    -- ATTACH fails if the DEFAULT partition already holds rows for this range.
+    IF to_regclass(parent || '_default') IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            parent || '_default', key_column, lower_bound, key_column, upper_bound,
+            partition_name);
+    END IF;
+    EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                   parent, partition_name, lower_bound, upper_bound);
+    RETURN partition_name;
+END
+$$
+"""
+
+_EMOTIONS = ("joy", "sadness", "anger", "surprise", "fear", "disgust")
+
+
+def _emotion_check_constraints() -> list[sa.CheckConstraint]:
+    return [
+        sa.CheckConstraint(f"{name} BETWEEN 0 AND 1", name=f"ck_emotion_{name}")
+        for name in _EMOTIONS
+    ]
+
+
+def _retire(table: str, indexes: list[str]) -> None:
+    """Rename a table and its named objects out of the way of its replacement."""
+    op.rename_table(table, f"{table}_legacy")
+    op.execute(f"ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey TO {table}_legacy_pkey")
+    for index in indexes:
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_legacy")
+
+
+def _partition_and_copy(table: str, key_column: str, columns: list[str]) -> None:
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    op.execute(
+        f"""
+        SELECT ensure_monthly_partition('{table}', '{key_column}', month::date)
+        FROM generate_series(
+            date_trunc('month', coalesce((SELECT min({key_column}) FROM {table}_legacy), now())),
+            date_trunc('month', now()) + interval '{_MONTHS_AHEAD} months',
+            interval '1 month'
+        ) AS month
+        """
+    )
+    column_list = ", ".join(columns)
+    op.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {table}_legacy")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.drop_table(f"{table}_legacy")
+
+
+def upgrade() -> None:
+    op.execute(_ENSURE_MONTHLY_PARTITION)
+    op.drop_constraint(
+        "character_state_latest_emotion_id_fkey", "character_state", type_="foreignkey"
+    )
+
+    # memory_access_log
+    _retire("memory_access_log", ["memory_access_log_memory_idx"])
+    op.create_table(
+        "memory_access_log",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('memory_access_log_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column(
+            "memory_id",
+            sa.Integer(),
+            sa.ForeignKey("memory_base.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("accessed_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.Column("access_context", sa.Text(), nullable=True),
+        sa.Column("retrieval_score", sa.Float(), nullable=True),
+        sa.Column("reinforcement_applied", sa.Boolean(), nullable=False, server_default="false"),
+        sa.PrimaryKeyConstraint("id", "accessed_at", name="memory_access_log_pkey"),
+        postgresql_partition_by="RANGE (accessed_at)",
+    )
+    op.create_index(
+        "memory_access_log_memory_idx", "memory_access_log", ["memory_id", "accessed_at"]
+    )
+    _partition_and_copy(
+        "memory_access_log",
+        "accessed_at",
+        [
+            "id",
+            "memory_id",
+            "accessed_at",
+            "access_context",
+            "retrieval_score",
+            "reinforcement_applied",
+        ],
+    )
+
+    # emotion_history
+    _retire("emotion_history", ["emotion_history_character_idx", "emotion_history_message_idx"])
+    op.create_table(
+        "emotion_history",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('emotion_history_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column(
+            "character_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("participant.id"),
+            nullable=False,
+        ),
+        sa.Column(
+            "message_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("message.id"), nullable=True
+        ),
+        *(sa.Column(name, sa.Float(), nullable=False) for name in _EMOTIONS),
+        sa.Column("trigger_reason", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        *_emotion_check_constraints(),
+        sa.PrimaryKeyConstraint("id", "created_at", name="emotion_history_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(
+        "emotion_history_character_idx", "emotion_history", ["character_id", "created_at"]
+    )
+    op.create_index("emotion_history_message_idx", "emotion_history", ["message_id"])
+    _partition_and_copy(
+        "emotion_history",
+        "created_at",
+        ["id", "character_id", "message_id", *_EMOTIONS, "trigger_reason", "created_at"],
+    )
+
+
+def _unpartition(table: str, columns: list[str]) -> None:
+    op.rename_table(table, f"{table}_partitioned")
+    op.execute(
+        f"ALTER TABLE {table}_partitioned "
+        f"RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey"
+    )
+    op.execute(f"CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS)")
+    column_list = ", ".join(columns)
+    op.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {table}_partitioned")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    # Dropping the parent drops every partition and the partitioned indexes.
+    op.drop_table(f"{table}_partitioned")
+    op.create_primary_key(f"{table}_pkey", table, ["id"])
+
+
+def downgrade() -> None:
+    _unpartition(
+        "memory_access_log",
+        [
+            "id",
+            "memory_id",
+            "accessed_at",
+            "access_context",
+            "retrieval_score",
+            "reinforcement_applied",
+        ],
+    )
+    op.create_foreign_key(
+        "memory_access_log_memory_id_fkey",
+        "memory_access_log",
+        "memory_base",
+        ["memory_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_index(
+        "memory_access_log_memory_idx", "memory_access_log", ["memory_id", "accessed_at"]
+    )
+
+    _unpartition(
+        "emotion_history",
+        ["id", "character_id", "message_id", *_EMOTIONS, "trigger_reason", "created_at"],
+    )
+    op.create_foreign_key(
+        "emotion_history_character_id_fkey",
+        "emotion_history",
+        "participant",
+        ["character_id"],
+        ["id"],
+    )
+    op.create_foreign_key(
+        "emotion_history_message_id_fkey", "emotion_history", "message", ["message_id"], ["id"]
+    )
+    for name in _EMOTIONS:
+        op.create_check_constraint(
+            f"ck_emotion_{name}", "emotion_history", f"{name} BETWEEN 0 AND 1"
+        )
+    op.create_index(
+        "emotion_history_character_idx", "emotion_history", ["character_id", "created_at"]
+    )
+    op.create_index("emotion_history_message_idx", "emotion_history", ["message_id"])
+
+    op.create_foreign_key(
+        "character_state_latest_emotion_id_fkey",
+        "character_state",
+        "emotion_history",
+        ["latest_emotion_id"],
+        ["id"],
+    )
+    op.execute("DROP FUNCTION IF EXISTS ensure_monthly_partition(text, text, date)")
@@ -0,0 +1,35 @@
+"""Index a quantized embedding expression instead of the full vector.
+
+This revision used to build the halfvec or binary HNSW index from the
+application settings at migration time, which made the schema depend on the
+environment that happened to run ``alembic upgrade``. It is now a no-op: the
+index is switched by ``python -m background.tasks.embedding_index``, which builds
+it with ``CREATE INDEX CONCURRENTLY``. Downgrading still restores the
+full-precision index that 0001 created.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-02-24 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision: str = "0007"
+down_revision: str | None = "0006"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS memory_base_embedding_idx ON memory_base "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+    op.execute("DROP INDEX IF EXISTS memory_base_embedding_halfvec_idx")
+    op.execute("DROP INDEX IF EXISTS memory_base_embedding_binary_idx")
@@ -0,0 +1,27 @@
+"""Version counter on character_state for coalesced writers.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-03-03 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0008"
+down_revision: str | None = "0007"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "character_state",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("character_state", "version")
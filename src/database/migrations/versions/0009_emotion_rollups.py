@@ -0,0 +1,104 @@
+"""Hourly and daily emotion rollups maintained by a statement-level trigger.
+
+Each bucket stores the sample count plus the sum, min and max of every emotion.
+An AFTER INSERT trigger on ``emotion_history`` aggregates the inserted rows
+(transition table ``new_rows``) and upserts both rollup tables, so a multi-row
+insert costs one upsert per bucket rather than one per row. Dropping old
+``emotion_history`` partitions leaves the rollups untouched.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-03-10 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0009"
+down_revision: str | None = "0008"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+_EMOTIONS = ("joy", "sadness", "anger", "surprise", "fear", "disgust")
+_ROLLUPS = (("emotion_rollup_hourly", "hour"), ("emotion_rollup_daily", "day"))
+_AGGREGATES = ("sum", "min", "max")
+
+
+def _rollup_columns() -> list[sa.Column]:
+    return [
+        sa.Column(f"{emotion}_{agg}", sa.Float(), nullable=False)
+        for emotion in _EMOTIONS
+        for agg in _AGGREGATES
+    ]
+
+
+def _upsert(table: str, unit: str, source: str) -> str:
+    columns = ", ".join(f"{e}_{agg}" for e in _EMOTIONS for agg in _AGGREGATES)
+    aggregates = ", ".join(f"{agg}({e})" for e in _EMOTIONS for agg in _AGGREGATES)
+    merge = {"sum": "r.{c} + EXCLUDED.{c}", "min": "least(r.{c}, EXCLUDED.{c})"}
+    merge["max"] = "greatest(r.{c}, EXCLUDED.{c})"
+    updates = ",\n            ".join(
+        f"{e}_{agg} = " + merge[agg].format(c=f"{e}_{agg}")
+        for e in _EMOTIONS
+        for agg in _AGGREGATES
+    )
+    return f"""
+        INSERT INTO {table} AS r (character_id, bucket_start, sample_count, {columns})
+        SELECT character_id, date_trunc('{unit}', created_at), count(*), {aggregates}
+        FROM {source}
+        GROUP BY 1, 2
+        ON CONFLICT (character_id, bucket_start) DO UPDATE SET
+            sample_count = r.sample_count + EXCLUDED.sample_count,
+            {updates}
+    """
+
+
+def upgrade() -> None:
+    for table, _ in _ROLLUPS:
+        op.create_table(
+            table,
+            sa.Column(
+                "character_id",
+                postgresql.UUID(as_uuid=True),
+                sa.ForeignKey("participant.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+            sa.Column("sample_count", sa.Integer(), nullable=False),
+            *_rollup_columns(),
+        )
+
+    upserts = ";".join(_upsert(table, unit, "new_rows") for table, unit in _ROLLUPS)
+    op.execute(
+        f"""
+        CREATE FUNCTION emotion_rollup_apply() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            {upserts};
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER emotion_history_rollup
+        AFTER INSERT ON emotion_history
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION emotion_rollup_apply()
+        """
+    )
+
+    # Backfill from existing history.
+    for table, unit in _ROLLUPS:
+        op.execute(_upsert(table, unit, "emotion_history"))
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS emotion_history_rollup ON emotion_history")
+    op.execute("DROP FUNCTION IF EXISTS emotion_rollup_apply()")
+    for table, _ in reversed(_ROLLUPS):
+        op.drop_table(table)
@@ -0,0 +1,51 @@
+"""Keyframe/delta storage for user state snapshots.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-03-17 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0010"
+down_revision: str | None = "0009"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user_state_snapshot",
+        sa.Column("storage", sa.Text(), nullable=False, server_default="links"),
+    )
+    op.create_table(
+        "snapshot_entry",
+        sa.Column(
+            "snapshot_id",
+            sa.Integer(),
+            sa.ForeignKey("user_state_snapshot.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("kind", sa.Text(), primary_key=True),
+        sa.Column("entry_key", sa.Text(), primary_key=True),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("participant.id"),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("data", postgresql.JSONB(), nullable=True),
+        sa.Column("removed", sa.Boolean(), nullable=False, server_default="false"),
+    )
+    op.create_index("snapshot_entry_user_idx", "snapshot_entry", ["user_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("snapshot_entry_user_idx", table_name="snapshot_entry")
+    op.drop_table("snapshot_entry")
+    op.drop_column("user_state_snapshot", "storage")
@@ -0,0 +1,72 @@
+"""Episode segmentation state.
+
+Episodes now record their character and user, and have counters for the
+streaming segmenter. A partial unique index allows at most one ONGOING episode
+per pair. Existing episodes get ``character_id`` from their memory owner; their
+user is unknown, so the segmenter never resumes them.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-03-24 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0011"
+down_revision: str | None = "0010"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    for column in ("character_id", "user_id"):
+        op.add_column(
+            "episode",
+            sa.Column(column, postgresql.UUID(as_uuid=True), sa.ForeignKey("participant.id")),
+        )
+    op.add_column(
+        "episode", sa.Column("message_count", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column(
+        "episode",
+        sa.Column("summarized_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("episode", sa.Column("last_message_at", sa.DateTime()))
+
+    op.execute(
+        """
+        UPDATE episode e
+        SET character_id = m.owner_id,
+            message_count = (SELECT count(*) FROM message WHERE episode_id = e.id),
+            last_message_at = (SELECT max(created_at) FROM message WHERE episode_id = e.id)
+        FROM memory_base m
+        WHERE m.id = e.memory_id
+        """
+    )
+    op.execute("UPDATE episode SET summarized_count = message_count")
+
+    op.create_index(
+        "episode_ongoing_pair_idx",
+        "episode",
+        ["character_id", "user_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'ONGOING'"),
+    )
+    op.create_index(
+        "episode_ongoing_idle_idx",
+        "episode",
+        ["last_message_at"],
+        postgresql_where=sa.text("status = 'ONGOING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("episode_ongoing_idle_idx", table_name="episode")
+    op.drop_index("episode_ongoing_pair_idx", table_name="episode")
+    for column in ("last_message_at", "summarized_count", "message_count", "user_id"):
+        op.drop_column("episode", column)
+    op.drop_column("episode", "character_id")
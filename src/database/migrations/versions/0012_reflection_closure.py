@@ -0,0 +1,203 @@
+"""Closure table for the reflection hierarchy.
+
+``reflection_closure`` holds one row per (ancestor, descendant) pair of the
+reflection DAG, with the shortest depth. Edges come from
+``reflection.parent_reflection_id`` (parent above child) and from
+``reflection_source`` rows that cite another reflection's memory (citing
+reflection above cited one).
+
+Inserts are maintained incrementally by row triggers: a new edge ``upper ->
+lower`` adds the cross product of ``upper``'s ancestors and ``lower``'s
+descendants, and edges that would close a cycle are rejected. Removing or
+re-parenting reflections is rare and can disconnect paths, so those statements
+rebuild the table from scratch with ``reflection_closure_rebuild()``.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2025-03-31 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0012"
+down_revision: str | None = "0011"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reflection_closure",
+        sa.Column(
+            "ancestor_id",
+            sa.Integer(),
+            sa.ForeignKey("reflection.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "descendant_id",
+            sa.Integer(),
+            sa.ForeignKey("reflection.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("depth", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "reflection_closure_descendant_idx",
+        "reflection_closure",
+        ["descendant_id", "ancestor_id"],
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_link(upper integer, lower integer) RETURNS void
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM reflection_closure
+                WHERE ancestor_id = lower AND descendant_id = upper
+            ) THEN
+                RAISE EXCEPTION 'reflection % cannot derive from its own descendant %',
+                    lower, upper;
+            END IF;
+            INSERT INTO reflection_closure AS c (ancestor_id, descendant_id, depth)
+            SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+            FROM reflection_closure a, reflection_closure d
+            WHERE a.descendant_id = upper AND d.ancestor_id = lower
+            ON CONFLICT (ancestor_id, descendant_id)
+                DO UPDATE SET depth = least(c.depth, EXCLUDED.depth);
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_rebuild() RETURNS void
+        LANGUAGE sql AS $$
+            DELETE FROM reflection_closure;
+            WITH RECURSIVE edge (upper, lower) AS (
+                SELECT parent_reflection_id, id FROM reflection
+                WHERE parent_reflection_id IS NOT NULL
+                UNION
+                SELECT s.reflection_id, r.id
+                FROM reflection_source s JOIN reflection r ON r.memory_id = s.source_memory_id
+            ), walk (ancestor_id, descendant_id, depth) AS (
+                SELECT id, id, 0 FROM reflection
+                UNION
+                SELECT w.ancestor_id, e.lower, w.depth + 1
+                FROM walk w JOIN edge e ON e.upper = w.descendant_id
+                WHERE w.depth < 1000
+            )
+            INSERT INTO reflection_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, descendant_id, min(depth) FROM walk GROUP BY 1, 2;
+        $$
+        """
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_on_reflection() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO reflection_closure (ancestor_id, descendant_id, depth)
+            VALUES (NEW.id, NEW.id, 0);
+            IF NEW.parent_reflection_id IS NOT NULL THEN
+                PERFORM reflection_closure_link(NEW.parent_reflection_id, NEW.id);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_on_source() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            cited integer;
+        BEGIN
+            SELECT id INTO cited FROM reflection WHERE memory_id = NEW.source_memory_id;
+            IF cited IS NOT NULL THEN
+                PERFORM reflection_closure_link(NEW.reflection_id, cited);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_on_source_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM old_rows o JOIN reflection r ON r.memory_id = o.source_memory_id
+            ) THEN
+                PERFORM reflection_closure_rebuild();
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_rebuild_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM reflection_closure_rebuild();
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+
+    op.execute(
+        """
+        CREATE TRIGGER reflection_closure_insert
+        AFTER INSERT ON reflection
+        FOR EACH ROW EXECUTE FUNCTION reflection_closure_on_reflection()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER reflection_closure_reshape
+        AFTER UPDATE OF parent_reflection_id OR DELETE ON reflection
+        FOR EACH STATEMENT EXECUTE FUNCTION reflection_closure_rebuild_trigger()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER reflection_closure_source_insert
+        AFTER INSERT ON reflection_source
+        FOR EACH ROW EXECUTE FUNCTION reflection_closure_on_source()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER reflection_closure_source_delete
+        AFTER DELETE ON reflection_source
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION reflection_closure_on_source_delete()
+        """
+    )
+
+    # Backfill existing reflections.
+    op.execute("SELECT reflection_closure_rebuild()")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS reflection_closure_source_delete ON reflection_source")
+    op.execute("DROP TRIGGER IF EXISTS reflection_closure_source_insert ON reflection_source")
+    op.execute("DROP TRIGGER IF EXISTS reflection_closure_reshape ON reflection")
+    op.execute("DROP TRIGGER IF EXISTS reflection_closure_insert ON reflection")
+    op.execute("DROP FUNCTION IF EXISTS reflection_closure_rebuild_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS reflection_closure_on_source_delete()")
+    op.execute("DROP FUNCTION IF EXISTS reflection_closure_on_source()")
+    op.execute("DROP FUNCTION IF EXISTS reflection_closure_on_reflection()")
+    op.execute("DROP FUNCTION IF EXISTS reflection_closure_rebuild()")
+    op.execute("DROP FUNCTION IF EXISTS reflection_closure_link(integer, integer)")
+    op.drop_table("reflection_closure")
@@ -0,0 +1,143 @@
+"""Guard and serialise reflection_closure rebuilds.
+
+``reflection_closure_reshape`` (0012) rebuilt the closure after every UPDATE of
+``parent_reflection_id`` and every DELETE on ``reflection``, including statements
+that touched no rows. It is replaced by two statement triggers with transition
+tables: the UPDATE trigger rebuilds only when some row's parent actually changed,
+and the DELETE trigger only when rows were deleted. Transition tables cannot be
+combined with an ``UPDATE OF`` column list, so the UPDATE trigger fires on every
+update and compares the parents itself.
+
+``reflection_closure_rebuild()`` now takes SHARE ROW EXCLUSIVE on the closure
+table first. That waits for transactions still linking new edges and holds new
+links back until the rebuild commits, so the rebuilt rows cannot collide with a
+concurrent link; ``ON CONFLICT DO NOTHING`` covers rows that were committed in
+between anyway.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2025-04-07 00:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision: str = "0013"
+down_revision: str | None = "0012"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+_REBUILD_BODY = """
+    WITH RECURSIVE edge (upper, lower) AS (
+        SELECT parent_reflection_id, id FROM reflection
+        WHERE parent_reflection_id IS NOT NULL
+        UNION
+        SELECT s.reflection_id, r.id
+        FROM reflection_source s JOIN reflection r ON r.memory_id = s.source_memory_id
+    ), walk (ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0 FROM reflection
+        UNION
+        SELECT w.ancestor_id, e.lower, w.depth + 1
+        FROM walk w JOIN edge e ON e.upper = w.descendant_id
+        WHERE w.depth < 1000
+    )
+    INSERT INTO reflection_closure (ancestor_id, descendant_id, depth)
+    SELECT ancestor_id, descendant_id, min(depth) FROM walk GROUP BY 1, 2
+"""
+
+
+def upgrade() -> None:
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION reflection_closure_rebuild() RETURNS void
+        LANGUAGE sql AS $$
+            LOCK TABLE reflection_closure IN SHARE ROW EXCLUSIVE MODE;
+            DELETE FROM reflection_closure;
+            {_REBUILD_BODY}
+            ON CONFLICT DO NOTHING;
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_on_reparent() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE n.parent_reflection_id IS DISTINCT FROM o.parent_reflection_id
+            ) THEN
+                PERFORM reflection_closure_rebuild();
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_on_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM old_rows) THEN
+                PERFORM reflection_closure_rebuild();
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+
+    op.execute("DROP TRIGGER reflection_closure_reshape ON reflection")
+    op.execute("DROP FUNCTION reflection_closure_rebuild_trigger()")
+    op.execute(
+        """
+        CREATE TRIGGER reflection_closure_reparent
+        AFTER UPDATE ON reflection
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION reflection_closure_on_reparent()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER reflection_closure_delete
+        AFTER DELETE ON reflection
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION reflection_closure_on_delete()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS reflection_closure_delete ON reflection")
+    op.execute("DROP TRIGGER IF EXISTS reflection_closure_reparent ON reflection")
+    op.execute("DROP FUNCTION IF EXISTS reflection_closure_on_delete()")
+    op.execute("DROP FUNCTION IF EXISTS reflection_closure_on_reparent()")
+    op.execute(
+        """
+        CREATE FUNCTION reflection_closure_rebuild_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM reflection_closure_rebuild();
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER reflection_closure_reshape
+        AFTER UPDATE OF parent_reflection_id OR DELETE ON reflection
+        FOR EACH STATEMENT EXECUTE FUNCTION reflection_closure_rebuild_trigger()
+        """
+    )
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION reflection_closure_rebuild() RETURNS void
+        LANGUAGE sql AS $$
+            DELETE FROM reflection_closure;
+            {_REBUILD_BODY};
+        $$
+        """
+    )
@@ -0,0 +1,30 @@
+"""Claim lease on reflection_accumulator.
+
+A reflection job claims the owner's accumulator row before drafting by setting
+``claimed_at`` in a single conditional UPDATE, so at most one worker (in any
+process) drafts a reflection for an owner at a time. Writing the reflection
+clears the claim; a claim left behind by a crashed worker expires after
+``reflection_claim_ttl_seconds``.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2025-04-14 00:00:00
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0014"
+down_revision: str | None = "0013"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    op.add_column("reflection_accumulator", sa.Column("claimed_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("reflection_accumulator", "claimed_at")
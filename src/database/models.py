@@ -27,6 +27,7 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -125,9 +126,13 @@ class MemoryBase(Base):
     last_accessed_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), nullable=False
     )
+    strength_updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )  # decay is applied lazily from here; see background.tasks.memory_decay
 
     embedding: Mapped[list[float] | None] = mapped_column(Vector(1536))
-    metadata: Mapped[dict[str, Any] | None] = mapped_column(JSONB)
+    # "metadata" is reserved on declarative classes, so the attribute carries a suffix.
+    metadata_: Mapped[dict[str, Any] | None] = mapped_column("metadata", JSONB(none_as_null=True))
 
     # Relationships
     owner: Mapped[Participant] = relationship("Participant", back_populates="memory_bases")
@@ -157,6 +162,8 @@ class MemoryBase(Base):
         Index("memory_base_type_idx", "memory_type"),
         Index("memory_base_strength_idx", "memory_strength"),
         Index("memory_base_owner_strength_idx", "owner_id", "memory_strength"),
+        # Replaced by a halfvec/binary expression index when EMBEDDING_QUANTIZATION
+        # is set (background.tasks.embedding_index, services.memory.vector_search).
         Index(
             "memory_base_embedding_idx",
             "embedding",
@@ -241,6 +248,16 @@ class Episode(Base):
     purpose: Mapped[str | None] = mapped_column(Text)
     turning_point: Mapped[str | None] = mapped_column(Text)
     conclusion: Mapped[str | None] = mapped_column(Text)
+    character_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("participant.id")
+    )
+    user_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("participant.id")
+    )
+    # Segmentation state; the running centroid is memory_base.embedding
+    message_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    summarized_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_message_at: Mapped[datetime | None] = mapped_column(DateTime)
     status: Mapped[EpisodeStatus] = mapped_column(
         Enum(EpisodeStatus, name="episode_status"),
         default=EpisodeStatus.ONGOING,
@@ -260,6 +277,18 @@ class Episode(Base):
     __table_args__ = (
         Index("episode_memory_idx", "memory_id"),
         Index("episode_status_idx", "status"),
+        Index(
+            "episode_ongoing_pair_idx",
+            "character_id",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status = 'ONGOING'"),
+        ),
+        Index(
+            "episode_ongoing_idle_idx",
+            "last_message_at",
+            postgresql_where=text("status = 'ONGOING'"),
+        ),
     )
 
 
@@ -319,6 +348,42 @@ class ReflectionSource(Base):
     )
 
 
+class ReflectionClosure(Base):
+    # Transitive "derived from" pairs over reflections, maintained by triggers
+    # (migrations 0012 and 0013). The ancestor is the higher-order reflection: a parent is
+    # an ancestor of its children, and a reflection is an ancestor of any
+    # reflection whose memory it cites as a source. Every reflection has a
+    # depth-0 row for itself.
+    __tablename__ = "reflection_closure"
+
+    ancestor_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("reflection.id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("reflection.id", ondelete="CASCADE"), primary_key=True
+    )
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)  # shortest path length
+
+    __table_args__ = (Index("reflection_closure_descendant_idx", "descendant_id", "ancestor_id"),)
+
+
+class ReflectionAccumulator(Base):
+    # Running importance total per owner since their last reflection
+    __tablename__ = "reflection_accumulator"
+
+    owner_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("participant.id", ondelete="CASCADE"), primary_key=True
+    )
+    importance_sum: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    memory_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_reflection_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # Set while a reflection job drafts for this owner; cleared when it writes or gives up
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
 # ---------------------------------------------------------------------------
 # Memory Access Log
 # ---------------------------------------------------------------------------
@@ -327,12 +392,14 @@ class ReflectionSource(Base):
 class MemoryAccessLog(Base):
     __tablename__ = "memory_access_log"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Range-partitioned by month on accessed_at (see background.tasks.partition_maintenance),
+    # so the partition key is part of the primary key.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     memory_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("memory_base.id", ondelete="CASCADE"), nullable=False
     )
     accessed_at: Mapped[datetime] = mapped_column(
-        DateTime, server_default=func.now(), nullable=False
+        DateTime, primary_key=True, server_default=func.now(), nullable=False
     )
     access_context: Mapped[str | None] = mapped_column(Text)
     retrieval_score: Mapped[float | None] = mapped_column(Float)
@@ -341,7 +408,71 @@ class MemoryAccessLog(Base):
     # Relationships
     memory: Mapped[MemoryBase] = relationship("MemoryBase", back_populates="access_logs")
 
-    __table_args__ = (Index("memory_access_log_memory_idx", "memory_id", "accessed_at"),)
+    __table_args__ = (
+        Index("memory_access_log_memory_idx", "memory_id", "accessed_at"),
+        {"postgresql_partition_by": "RANGE (accessed_at)"},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Transcript Import
+# ---------------------------------------------------------------------------
+
+
+class TranscriptImport(Base):
+    __tablename__ = "transcript_import"
+
+    import_key: Mapped[str] = mapped_column(Text, primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("participant.id"), nullable=False
+    )
+    character_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("participant.id"), nullable=False
+    )
+    episode_id: Mapped[int] = mapped_column(Integer, ForeignKey("episode.id"), nullable=False)
+    total_messages: Mapped[int] = mapped_column(Integer, nullable=False)
+    imported_messages: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    completed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+# ---------------------------------------------------------------------------
+# LLM Response Cache
+# ---------------------------------------------------------------------------
+
+
+class LLMResponseCache(Base):
+    __tablename__ = "llm_response_cache"
+
+    template_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    input_hash: Mapped[str] = mapped_column(Text, primary_key=True)
+    response: Mapped[str] = mapped_column(Text, nullable=False)
+    embedding: Mapped[list[float] | None] = mapped_column(Vector(1536))
+    hit_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+    last_hit_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("llm_response_cache_expires_idx", "expires_at"),
+        Index("llm_response_cache_last_hit_idx", "last_hit_at"),
+        Index(
+            "llm_response_cache_embedding_idx",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -356,10 +487,13 @@ class CharacterState(Base):
     character_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("participant.id"), unique=True, nullable=False
     )
-    latest_emotion_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("emotion_history.id"))
+    # No FK: emotion_history is partitioned, so its unique keys include created_at.
+    latest_emotion_id: Mapped[int | None] = mapped_column(Integer)
     energy_level: Mapped[float] = mapped_column(Float, default=0.5, nullable=False)
     engagement_level: Mapped[float] = mapped_column(Float, default=0.5, nullable=False)
     conversation_mode: Mapped[str | None] = mapped_column(Text)
+    # Bumped on every write; coalesced writers use it to detect concurrent updates.
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
     )
@@ -367,7 +501,9 @@ class CharacterState(Base):
     # Relationships
     character: Mapped[Participant] = relationship("Participant", back_populates="character_state")
     latest_emotion: Mapped[EmotionHistory | None] = relationship(
-        "EmotionHistory", foreign_keys=[latest_emotion_id]
+        "EmotionHistory",
+        primaryjoin="foreign(CharacterState.latest_emotion_id) == EmotionHistory.id",
+        viewonly=True,
     )
 
     __table_args__ = (
@@ -379,7 +515,8 @@ class CharacterState(Base):
 class EmotionHistory(Base):
     __tablename__ = "emotion_history"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Range-partitioned by month on created_at, like memory_access_log.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     character_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("participant.id"), nullable=False
     )
@@ -394,7 +531,7 @@ class EmotionHistory(Base):
     disgust: Mapped[float] = mapped_column(Float, nullable=False)
     trigger_reason: Mapped[str | None] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, server_default=func.now(), nullable=False
+        DateTime, primary_key=True, server_default=func.now(), nullable=False
     )
 
     # Relationships
@@ -410,9 +547,49 @@ class EmotionHistory(Base):
         CheckConstraint("disgust BETWEEN 0 AND 1", name="ck_emotion_disgust"),
         Index("emotion_history_character_idx", "character_id", "created_at"),
         Index("emotion_history_message_idx", "message_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
 
+class EmotionRollupColumns:
+    """Per-bucket aggregates of emotion_history, maintained by a trigger (migration 0009).
+
+    Sums rather than means are stored so buckets merge exactly when re-bucketed.
+    """
+
+    character_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("participant.id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    sample_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    joy_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    joy_min: Mapped[float] = mapped_column(Float, nullable=False)
+    joy_max: Mapped[float] = mapped_column(Float, nullable=False)
+    sadness_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    sadness_min: Mapped[float] = mapped_column(Float, nullable=False)
+    sadness_max: Mapped[float] = mapped_column(Float, nullable=False)
+    anger_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    anger_min: Mapped[float] = mapped_column(Float, nullable=False)
+    anger_max: Mapped[float] = mapped_column(Float, nullable=False)
+    surprise_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    surprise_min: Mapped[float] = mapped_column(Float, nullable=False)
+    surprise_max: Mapped[float] = mapped_column(Float, nullable=False)
+    fear_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    fear_min: Mapped[float] = mapped_column(Float, nullable=False)
+    fear_max: Mapped[float] = mapped_column(Float, nullable=False)
+    disgust_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    disgust_min: Mapped[float] = mapped_column(Float, nullable=False)
+    disgust_max: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class EmotionRollupHourly(EmotionRollupColumns, Base):
+    __tablename__ = "emotion_rollup_hourly"
+
+
+class EmotionRollupDaily(EmotionRollupColumns, Base):
+    __tablename__ = "emotion_rollup_daily"
+
+
 # ---------------------------------------------------------------------------
 # User Understanding
 # ---------------------------------------------------------------------------
@@ -547,6 +724,9 @@ class UserStateSnapshot(Base):
     user_portrait_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("user_portrait.id"), nullable=False
     )
+    # links: membership via snapshot_trait/interest/preference (legacy);
+    # keyframe / delta: values in snapshot_entry (services.portrait.snapshots)
+    storage: Mapped[str] = mapped_column(Text, default="links", nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), nullable=False
     )
@@ -565,6 +745,9 @@ class UserStateSnapshot(Base):
     snapshot_preferences: Mapped[list[SnapshotPreference]] = relationship(
         "SnapshotPreference", back_populates="snapshot"
     )
+    entries: Mapped[list[SnapshotEntry]] = relationship(
+        "SnapshotEntry", back_populates="snapshot", cascade="all, delete-orphan"
+    )
 
     __table_args__ = (Index("user_state_snapshot_user_idx", "user_id", "created_at"),)
 
@@ -625,3 +808,33 @@ class SnapshotPreference(Base):
     )
 
     __table_args__ = (Index("snapshot_preference_preference_idx", "preference_id"),)
+
+
+class SnapshotEntry(Base):
+    """One profile entry recorded by a keyframe or delta snapshot.
+
+    A keyframe records every entry; a delta only entries that changed since the
+    previous snapshot, with ``removed`` marking entries that disappeared.
+    ``user_id`` and ``created_at`` are copied from the snapshot so reconstruction
+    can range-scan one index.
+    """
+
+    __tablename__ = "snapshot_entry"
+
+    snapshot_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("user_state_snapshot.id", ondelete="CASCADE"), primary_key=True
+    )
+    kind: Mapped[str] = mapped_column(Text, primary_key=True)  # trait/interest/preference
+    entry_key: Mapped[str] = mapped_column(Text, primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("participant.id"), nullable=False
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    data: Mapped[dict[str, Any] | None] = mapped_column(JSONB)
+    removed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+    snapshot: Mapped[UserStateSnapshot] = relationship(
+        "UserStateSnapshot", back_populates="entries"
+    )
+
+    __table_args__ = (Index("snapshot_entry_user_idx", "user_id", "created_at"),)
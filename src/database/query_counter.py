@@ -0,0 +1,118 @@
+"""SQL statement counting and per-operation query budgets.
+
+When ``DATABASE_QUERY_BUDGET_MODE`` is ``warn`` or ``raise``, :func:`init_db`
+installs a ``before_cursor_execute`` listener that records every statement
+against the innermost active :func:`count_queries` scope and all enclosing ones.
+Scopes live in a context variable, so concurrent tasks never count each other's
+queries. :func:`query_budget` wraps an operation with an upper bound. An N+1
+pattern (one lazy query per row) shows up as a budget overrun in development,
+long before it becomes a query storm in production. With the mode ``off``
+(the default) no listener is installed and budgets cost nothing.
+"""
+
+from __future__ import annotations
+
+import functools
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Literal, ParamSpec, TypeVar
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = structlog.get_logger(__name__)
+
+BudgetMode = Literal["off", "warn", "raise"]
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+_mode: BudgetMode = "off"
+_scope: ContextVar[QueryCount | None] = ContextVar("query_count_scope", default=None)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    def __init__(self, count: QueryCount, limit: int) -> None:
+        statements = "\n".join(f"  {s}" for s in count.statements)
+        super().__init__(
+            f"{count.label}: {count.total} SQL statements, budget {limit}\n{statements}"
+        )
+        self.count = count
+        self.limit = limit
+
+
+@dataclass(slots=True)
+class QueryCount:
+    label: str
+    parent: QueryCount | None = None
+    statements: list[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return len(self.statements)
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    scope = _scope.get()
+    while scope is not None:
+        scope.statements.append(statement)
+        scope = scope.parent
+
+
+def install_query_counter(engine: AsyncEngine, mode: BudgetMode) -> None:
+    """Start counting statements on ``engine`` unless ``mode`` is ``off``."""
+    global _mode
+    _mode = mode
+    if mode == "off":
+        return
+    target = engine.sync_engine
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def count_queries(label: str) -> Iterator[QueryCount]:
+    """Count statements executed inside the block (including nested scopes)."""
+    count = QueryCount(label=label, parent=_scope.get())
+    token = _scope.set(count)
+    try:
+        yield count
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def query_budget(limit: int, label: str) -> Iterator[QueryCount | None]:
+    """Fail (or warn) when the block issues more than ``limit`` statements."""
+    if _mode == "off":
+        yield None
+        return
+    with count_queries(label) as count:
+        yield count
+    if count.total > limit:
+        if _mode == "raise":
+            raise QueryBudgetExceeded(count, limit)
+        logger.warning("query_budget.exceeded", label=label, count=count.total, limit=limit)
+
+
+def budgeted(
+    limit: int, label: str | None = None
+) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """Decorator form of :func:`query_budget` for async functions."""
+
+    def decorate(fn: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        name = label or fn.__qualname__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with query_budget(limit, name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
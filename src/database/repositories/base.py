@@ -0,0 +1,31 @@
+"""Shared repository plumbing.
+
+Repositories are thin, session-bound wrappers around purpose-built queries. Every
+ORM query ends with ``raiseload("*")``, so a relationship that was not loaded
+explicitly raises instead of issuing a hidden query per row. Each public method
+declares its statement count with :func:`database.query_counter.budgeted`.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
+from sqlalchemy.orm.interfaces import ORMOption
+
+from database.models import Base
+
+ModelT = TypeVar("ModelT", bound=Base)
+
+
+class Repository(Generic[ModelT]):
+    # Set on each subclass; ClassVar cannot carry the type parameter.
+    model: type[ModelT]
+
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def get(self, pk: Any, *options: ORMOption) -> ModelT | None:
+        """Load one row with only the relationships named in ``options``."""
+        return await self._session.get(self.model, pk, options=[*options, raiseload("*")])
@@ -0,0 +1,36 @@
+"""Message loading with sender and emotion data."""
+
+from __future__ import annotations
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from database.models import Message, Participant
+from database.query_counter import budgeted
+from database.repositories.base import Repository
+
+
+class MessageRepository(Repository[Message]):
+    model = Message
+
+    @budgeted(2)
+    async def episode_tail(self, episode_id: int, limit: int = 50) -> list[Message]:
+        """The newest ``limit`` messages of an episode, oldest first.
+
+        Senders are joined with only ``name`` and ``type`` loaded; emotion rows come
+        from a single ``selectin`` query for the whole page.
+        """
+        messages = (
+            await self._session.scalars(
+                select(Message)
+                .where(Message.episode_id == episode_id)
+                .order_by(Message.created_at.desc(), Message.memory_id.desc())
+                .limit(limit)
+                .options(
+                    joinedload(Message.sender).load_only(Participant.name, Participant.type),
+                    selectinload(Message.emotion_histories),
+                    raiseload("*"),
+                )
+            )
+        ).all()
+        return list(reversed(messages))
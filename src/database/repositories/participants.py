@@ -0,0 +1,74 @@
+"""Participant lookups."""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from database.models import Participant, ParticipantType, UserPortrait
+from database.query_counter import budgeted
+from database.repositories.base import Repository
+
+
+@dataclass(frozen=True, slots=True)
+class CharacterCard:
+    id: uuid.UUID
+    name: str
+    profile: str | None
+
+
+class ParticipantRepository(Repository[Participant]):
+    model = Participant
+
+    @budgeted(1)
+    async def character_card(self, character_id: uuid.UUID) -> CharacterCard:
+        """Name and profile only; raises ``NoResultFound`` for an unknown id."""
+        row = (
+            await self._session.execute(
+                select(Participant.id, Participant.name, Participant.profile).where(
+                    Participant.id == character_id
+                )
+            )
+        ).one()
+        return CharacterCard(*row)
+
+    @budgeted(1)
+    async def names(self, participant_ids: Sequence[uuid.UUID]) -> dict[uuid.UUID, str]:
+        """Display names for many participants in one query."""
+        if not participant_ids:
+            return {}
+        rows = await self._session.execute(
+            select(Participant.id, Participant.name).where(Participant.id.in_(set(participant_ids)))
+        )
+        return dict(rows.tuples().all())
+
+    @budgeted(1)
+    async def characters(self) -> list[CharacterCard]:
+        rows = await self._session.execute(
+            select(Participant.id, Participant.name, Participant.profile)
+            .where(Participant.type == ParticipantType.AI_CHARACTER)
+            .order_by(Participant.name)
+        )
+        return [CharacterCard(*row) for row in rows]
+
+    @budgeted(4)
+    async def user_profile(self, user_id: uuid.UUID) -> Participant | None:
+        """A user with portrait, traits, interests and preferences loaded.
+
+        Four statements: the user joined to its portrait, then one ``selectin``
+        query each for traits, interests and preferences.
+        """
+        return await self._session.scalar(
+            select(Participant)
+            .where(Participant.id == user_id)
+            .options(
+                joinedload(Participant.user_portrait).selectinload(UserPortrait.traits),
+                selectinload(Participant.user_interests),
+                selectinload(Participant.user_preferences),
+                raiseload("*"),
+            )
+        )
@@ -0,0 +1,44 @@
+"""Reflection loading with their source memories."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import raiseload, selectinload
+
+from database.models import MemoryBase, Reflection, ReflectionSource
+from database.query_counter import budgeted
+from database.repositories.base import Repository
+
+
+class ReflectionRepository(Repository[Reflection]):
+    model = Reflection
+
+    @budgeted(2)
+    async def with_sources(self, reflection_ids: Sequence[int]) -> list[Reflection]:
+        """Reflections with their direct sources and each source's memory header.
+
+        For whole hierarchies use :mod:`services.memory.reflection_graph`.
+        """
+        if not reflection_ids:
+            return []
+        return list(
+            (
+                await self._session.scalars(
+                    select(Reflection)
+                    .where(Reflection.id.in_(set(reflection_ids)))
+                    .order_by(Reflection.id)
+                    .options(
+                        selectinload(Reflection.sources)
+                        .joinedload(ReflectionSource.source_memory)
+                        .load_only(
+                            MemoryBase.memory_type,
+                            MemoryBase.importance_score,
+                            MemoryBase.created_at,
+                        ),
+                        raiseload("*"),
+                    )
+                )
+            ).all()
+        )
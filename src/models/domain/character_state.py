@@ -0,0 +1,57 @@
+"""Domain objects for a character's mutable conversational state."""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass, replace
+
+
+def _clamp(value: float) -> float:
+    return min(max(value, 0.0), 1.0)
+
+
+@dataclass(frozen=True, slots=True)
+class CharacterStateSnapshot:
+    character_id: uuid.UUID
+    energy_level: float = 0.5
+    engagement_level: float = 0.5
+    conversation_mode: str | None = None
+    latest_emotion_id: int | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class StateUpdate:
+    """A change to a character's state.
+
+    Updates are applied to whatever the current state is rather than carrying
+    absolute values only, so they can be replayed on top of a concurrent write.
+    ``None`` leaves a field unchanged.
+    """
+
+    energy_delta: float = 0.0
+    engagement_delta: float = 0.0
+    energy_level: float | None = None
+    engagement_level: float | None = None
+    conversation_mode: str | None = None
+    latest_emotion_id: int | None = None
+
+    def apply(self, state: CharacterStateSnapshot) -> CharacterStateSnapshot:
+        energy = self.energy_level if self.energy_level is not None else state.energy_level
+        engagement = (
+            self.engagement_level if self.engagement_level is not None else state.engagement_level
+        )
+        return replace(
+            state,
+            energy_level=_clamp(energy + self.energy_delta),
+            engagement_level=_clamp(engagement + self.engagement_delta),
+            conversation_mode=(
+                self.conversation_mode
+                if self.conversation_mode is not None
+                else state.conversation_mode
+            ),
+            latest_emotion_id=(
+                self.latest_emotion_id
+                if self.latest_emotion_id is not None
+                else state.latest_emotion_id
+            ),
+        )
@@ -0,0 +1,29 @@
+"""Domain objects for character emotion."""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+# Column order of the emotion vector everywhere it is handled as an array.
+EMOTIONS = ("joy", "sadness", "anger", "surprise", "fear", "disgust")
+
+
+@dataclass(frozen=True, slots=True)
+class Mood:
+    """A character's current emotional state, blended from recent emotion_history rows."""
+
+    character_id: uuid.UUID
+    vector: np.ndarray  # (6,) in EMOTIONS order
+    samples: int
+    as_of: datetime | None = None
+
+    @property
+    def dominant(self) -> str:
+        return EMOTIONS[int(np.argmax(self.vector))]
+
+    def as_dict(self) -> dict[str, float]:
+        return dict(zip(EMOTIONS, self.vector.tolist()))
@@ -0,0 +1,23 @@
+"""Domain objects for episode segmentation and summaries."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class EpisodeSummary:
+    title: str
+    summary: str
+    purpose: str | None = None
+    turning_point: str | None = None
+    conclusion: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class EpisodeAssignment:
+    """Where a turn's messages belong, and what the segmenter did to get there."""
+
+    episode_id: int
+    closed_episode_id: int | None = None
+    summary_due: bool = False
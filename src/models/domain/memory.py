@@ -0,0 +1,22 @@
+"""Domain objects for memory retrieval."""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True, slots=True)
+class RetrievedMemory:
+    """A memory_base row scored by the hybrid retriever."""
+
+    memory_id: int
+    owner_id: uuid.UUID
+    memory_type: str
+    importance_score: float
+    memory_strength: float
+    last_accessed_at: datetime
+    recency: float
+    relevance: float
+    score: float
@@ -0,0 +1,27 @@
+"""Domain objects for incremental user portrait updates."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+
+def _utcnow() -> datetime:
+    # Columns are naive DateTime holding UTC.
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+@dataclass(frozen=True, slots=True)
+class InterestSignal:
+    """A topic the user showed interest in (confidence > 0) or avoided (< 0)."""
+
+    topic: str
+    confidence: float
+    mentioned_at: datetime = field(default_factory=_utcnow)
+
+
+@dataclass(frozen=True, slots=True)
+class PreferenceSignal:
+    preference_type: str
+    preference_value: str
+    confidence: float = 0.5
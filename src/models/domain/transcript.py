@@ -0,0 +1,32 @@
+"""Domain objects for bulk transcript import."""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Literal
+
+
+@dataclass(frozen=True, slots=True)
+class TranscriptMessage:
+    role: Literal["user", "character"]
+    content: str
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class Transcript:
+    """One imported conversation between a user and a character.
+
+    ``import_key`` identifies the transcript across retries so an interrupted
+    import resumes instead of duplicating rows.
+    """
+
+    import_key: str
+    character_id: uuid.UUID
+    user_name: str
+    messages: Sequence[TranscriptMessage]
+    user_id: uuid.UUID | None = None
+    title: str | None = None
@@ -0,0 +1,19 @@
+"""WebSocket chat payloads."""
+
+from __future__ import annotations
+
+import uuid
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class ChatRequest(BaseModel):
+    user_id: uuid.UUID
+    content: str = Field(min_length=1)
+    episode_id: int | None = None
+
+
+class ChatEvent(BaseModel):
+    type: Literal["start", "token", "end", "error"]
+    content: str = ""
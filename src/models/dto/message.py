@@ -0,0 +1,23 @@
+"""Conversation history payloads."""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class MessageDTO(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    episode_id: int | None
+    sender_id: uuid.UUID
+    content: str
+    created_at: datetime
+
+
+class MessagePage(BaseModel):
+    items: list[MessageDTO]
+    next_cursor: str | None = None
@@ -0,0 +1,315 @@
+"""Chat turn orchestration: stream first, persist afterwards.
+
+The reply is streamed straight from the provider. Once the stream has finished,
+a write task stores the turn's message and memory_base rows with the default
+importance. Write tasks are chained per conversation (character and user), so
+turns commit in the order they were spoken. The next turn of the conversation
+waits for the previous write before building its prompt, so the prompt always
+includes the last exchange. Importance scoring, emotion tagging and portrait
+extraction need LLM calls; they run afterwards as a task-queue job, or inline in
+the write task if the queue is full. Extracted interests and preferences go to the
+:class:`DeferredPortraitUpdater`, which merges them across turns and writes them
+in batches.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+import structlog
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from background.queue import TaskQueue
+from background.tasks.reflection import ReflectionScheduler
+from database.connection import ReadRouter
+from database.models import EmotionHistory, Message
+from database.query_counter import query_budget
+from database.repositories.participants import ParticipantRepository
+from models.domain.character_state import StateUpdate
+from models.domain.emotion import EMOTIONS
+from models.domain.episode import EpisodeAssignment
+from services.emotion.state import CharacterStateCache
+from services.llm.providers.base import ChatMessage, LLMProvider
+from services.llm.providers.embedding import EmbeddingService
+from services.memory.context import RECENT_MESSAGES, ContextAssembler
+from services.memory.episodes import EpisodeSegmenter
+from services.memory.retrieval import MemoryRetriever
+from services.memory.store import MemoryStore
+from services.portrait.extraction import PortraitSignals
+from services.portrait.updater import DeferredPortraitUpdater
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_MESSAGE_IMPORTANCE = 0.3
+
+# Statement upper bounds per turn, checked when DATABASE_QUERY_BUDGET_MODE is on.
+# They leave room for the adaptive ef_search retries in vector search; an
+# overrun means a per-row query has crept in.
+PROMPT_QUERY_BUDGET = 32
+PERSIST_QUERY_BUDGET = 24
+SCORE_QUERY_BUDGET = 8
+
+ImportanceScorer = Callable[[str], Awaitable[float]]
+EmotionTagger = Callable[[str], Awaitable[dict[str, float] | None]]
+PortraitExtractor = Callable[[str], Awaitable[PortraitSignals]]
+
+
+@dataclass(frozen=True, slots=True)
+class ChatTurn:
+    character_id: uuid.UUID
+    user_id: uuid.UUID
+    content: str
+    episode_id: int | None = None  # None lets the segmenter pick the episode
+
+    @property
+    def conversation(self) -> tuple[uuid.UUID, uuid.UUID]:
+        return self.character_id, self.user_id
+
+
+@dataclass(frozen=True, slots=True)
+class _WrittenTurn:
+    user_memory_id: int
+    reply_memory_id: int
+    reply_message_id: uuid.UUID
+
+
+class ChatService:
+    def __init__(
+        self,
+        *,
+        session_factory: async_sessionmaker[AsyncSession],
+        provider: LLMProvider,
+        embeddings: EmbeddingService,
+        retriever: MemoryRetriever,
+        assembler: ContextAssembler,
+        store: MemoryStore,
+        queue: TaskQueue,
+        reads: ReadRouter | None = None,
+        reflections: ReflectionScheduler | None = None,
+        character_states: CharacterStateCache | None = None,
+        segmenter: EpisodeSegmenter | None = None,
+        importance_scorer: ImportanceScorer | None = None,
+        emotion_tagger: EmotionTagger | None = None,
+        portrait_extractor: PortraitExtractor | None = None,
+        portraits: DeferredPortraitUpdater | None = None,
+        reply_token_reserve: int = 2_000,
+    ) -> None:
+        self._session_factory = session_factory
+        self._provider = provider
+        self._embeddings = embeddings
+        self._retriever = retriever
+        self._assembler = assembler
+        self._store = store
+        self._queue = queue
+        self._reads = reads
+        self._reflections = reflections
+        self._character_states = character_states
+        self._segmenter = segmenter
+        self._importance_scorer = importance_scorer
+        self._emotion_tagger = emotion_tagger
+        # Extraction is only worth its LLM call if something consumes the signals.
+        self._portrait_extractor = portrait_extractor if portraits is not None else None
+        self._portraits = portraits
+        self._reply_token_reserve = reply_token_reserve
+        self._writes: dict[tuple[uuid.UUID, uuid.UUID], asyncio.Task[None]] = {}
+
+    async def stream_reply(self, turn: ChatTurn) -> AsyncIterator[str]:
+        """Yield reply tokens; the turn is persisted once the stream completes."""
+        query_embedding = await self._embeddings.embed(turn.content)
+        pending = self._writes.get(turn.conversation)
+        if pending is not None:
+            await asyncio.wait((pending,))
+        prompt = await self._build_prompt(turn, query_embedding)
+
+        parts: list[str] = []
+        async for delta in self._provider.stream(prompt):
+            parts.append(delta)
+            yield delta
+
+        reply = "".join(parts)
+        previous = self._writes.get(turn.conversation)
+        task = asyncio.create_task(self._persist(previous, turn, query_embedding, reply))
+        self._writes[turn.conversation] = task
+        task.add_done_callback(partial(self._persisted, turn))
+
+    async def close(self) -> None:
+        """Wait for every pending turn write."""
+        while self._writes:
+            await asyncio.wait(list(self._writes.values()))
+
+    def _persisted(self, turn: ChatTurn, task: asyncio.Task[None]) -> None:
+        if self._writes.get(turn.conversation) is task:
+            del self._writes[turn.conversation]
+        if not task.cancelled() and (exc := task.exception()) is not None:
+            logger.error(
+                "chat.persist_failed",
+                character_id=str(turn.character_id),
+                user_id=str(turn.user_id),
+                exc_info=exc,
+            )
+
+    async def _build_prompt(self, turn: ChatTurn, query_embedding: np.ndarray) -> list[ChatMessage]:
+        with query_budget(PROMPT_QUERY_BUDGET, "chat.build_prompt"):
+            # Vector retrieval is the CPU-heavy part of a turn and tolerates bounded
+            # staleness, so it runs on a replica when one is fresh enough.
+            reads = self._reads or self._session_factory
+            async with reads() as read_session:
+                retrieved = await self._retriever.retrieve(
+                    read_session, turn.character_id, query_embedding, access_context="chat"
+                )
+            async with self._session_factory() as session:
+                character = await ParticipantRepository(session).character_card(turn.character_id)
+                episode_id = turn.episode_id
+                if episode_id is None and self._segmenter is not None:
+                    episode_id = await self._segmenter.current(
+                        session, turn.character_id, turn.user_id
+                    )
+                context = await self._assembler.assemble(
+                    session,
+                    owner_id=turn.character_id,
+                    retrieved=retrieved,
+                    episode_id=episode_id,
+                    reserved_tokens=self._reply_token_reserve,
+                )
+                await session.commit()  # keeps any token-count backfill
+
+        system = f"You are {character.name}."
+        if character.profile:
+            system += f"\n\n{character.profile}"
+        memories = [item.content for item in context.items if item.section != RECENT_MESSAGES]
+        if memories:
+            system += "\n\nRelevant memories:\n" + "\n".join(f"- {m}" for m in memories)
+
+        history = [
+            ChatMessage(
+                role="assistant" if item.sender_id == turn.character_id else "user",
+                content=item.content,
+            )
+            for item in context.section(RECENT_MESSAGES)
+        ]
+        return [
+            ChatMessage(role="system", content=system),
+            *history,
+            ChatMessage(role="user", content=turn.content),
+        ]
+
+    async def _persist(
+        self,
+        previous: asyncio.Task[None] | None,
+        turn: ChatTurn,
+        user_embedding: np.ndarray,
+        reply: str,
+    ) -> None:
+        if previous is not None:
+            # Its failure is logged by its own callback; this turn is written regardless.
+            await asyncio.wait((previous,))
+        written = await self._write(turn, user_embedding, reply)
+        if (
+            self._importance_scorer is None
+            and self._emotion_tagger is None
+            and self._portrait_extractor is None
+        ):
+            return
+        if not self._queue.submit(lambda: self._score(turn, reply, written)):
+            logger.warning("chat.scoring_inline", character_id=str(turn.character_id))
+            await self._score(turn, reply, written)
+
+    async def _write(self, turn: ChatTurn, user_embedding: np.ndarray, reply: str) -> _WrittenTurn:
+        reply_embedding = await self._embeddings.embed(reply)
+
+        reflection_due = False
+        assignment: EpisodeAssignment | None = None
+        memory_ids: list[int] = []
+        with query_budget(PERSIST_QUERY_BUDGET, "chat.persist"):
+            async with self._session_factory() as session, session.begin():
+                episode_id = turn.episode_id
+                if episode_id is None and self._segmenter is not None:
+                    assignment = await self._segmenter.observe(
+                        session,
+                        character_id=turn.character_id,
+                        user_id=turn.user_id,
+                        embeddings=np.stack([user_embedding, reply_embedding]),
+                    )
+                    episode_id = assignment.episode_id
+                for sender_id, content, embedding in (
+                    (turn.user_id, turn.content, user_embedding),
+                    (turn.character_id, reply, reply_embedding),
+                ):
+                    stored = await self._store.insert(
+                        session,
+                        owner_id=turn.character_id,
+                        memory_type="message",
+                        importance_score=DEFAULT_MESSAGE_IMPORTANCE,
+                        content=content,
+                        embedding=embedding,
+                    )
+                    reflection_due |= stored.reflection_due
+                    memory_ids.append(stored.memory_id)
+                    message_id = (
+                        await session.execute(
+                            insert(Message)
+                            .values(
+                                memory_id=stored.memory_id,
+                                episode_id=episode_id,
+                                sender_id=sender_id,
+                                content=content,
+                            )
+                            .returning(Message.id)
+                        )
+                    ).scalar_one()
+
+        if self._reads is not None:
+            keys = [f"participant:{turn.user_id}", f"participant:{turn.character_id}"]
+            if episode_id is not None:
+                keys.append(f"episode:{episode_id}")
+            self._reads.note_write(*keys)
+        if assignment is not None and self._segmenter is not None:
+            await self._segmenter.committed(turn.character_id, assignment)
+        if reflection_due and self._reflections is not None:
+            self._reflections.schedule(turn.character_id)
+        return _WrittenTurn(memory_ids[0], memory_ids[1], message_id)
+
+    async def _score(self, turn: ChatTurn, reply: str, written: _WrittenTurn) -> None:
+        scores: dict[int, float] = {}
+        if self._importance_scorer is not None:
+            scores[written.user_memory_id] = await self._importance_scorer(turn.content)
+            scores[written.reply_memory_id] = await self._importance_scorer(reply)
+        emotion = await self._emotion_tagger(reply) if self._emotion_tagger else None
+        if self._portrait_extractor is not None and self._portraits is not None:
+            interests, preferences = await self._portrait_extractor(turn.content)
+            self._portraits.add(turn.user_id, interests, preferences)
+
+        reflection_due = False
+        emotion_id: int | None = None
+        with query_budget(SCORE_QUERY_BUDGET, "chat.score"):
+            async with self._session_factory() as session, session.begin():
+                if scores:
+                    reflection_due = await self._store.rescore(
+                        session,
+                        owner_id=turn.character_id,
+                        scores=scores,
+                        previous=DEFAULT_MESSAGE_IMPORTANCE,
+                    )
+                if emotion is not None:
+                    emotion_id = await session.scalar(
+                        insert(EmotionHistory)
+                        .values(
+                            character_id=turn.character_id,
+                            message_id=written.reply_message_id,
+                            **{name: emotion.get(name, 0.0) for name in EMOTIONS},
+                        )
+                        .returning(EmotionHistory.id)
+                    )
+
+        if emotion_id is not None and self._character_states is not None:
+            await self._character_states.update(
+                turn.character_id, StateUpdate(latest_emotion_id=emotion_id)
+            )
+        if reflection_due and self._reflections is not None:
+            self._reflections.schedule(turn.character_id)
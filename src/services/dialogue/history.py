@@ -0,0 +1,124 @@
+"""Keyset-paginated conversation history.
+
+Pages are ordered by ``(created_at, memory_id)`` and continued from an opaque
+cursor holding the last row's key, so each page is a range scan on
+``message_episode_idx`` or ``message_sender_idx`` no matter how deep it is. A
+turn's messages are written in one transaction and share ``created_at``; their
+``memory_base`` ids follow insert order, so ties keep the question before the
+reply.
+Only the columns needed for the DTO are selected; no ORM objects or
+relationships are loaded.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Literal
+
+from sqlalchemy import ColumnElement, and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Message
+from models.dto.message import MessageDTO, MessagePage
+
+Order = Literal["desc", "asc"]
+
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, memory_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), memory_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, memory_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(memory_id, int) or isinstance(memory_id, bool):
+            raise TypeError(memory_id)
+        return datetime.fromisoformat(created_at), memory_id
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _after(cursor: str, order: Order) -> ColumnElement[bool]:
+    created_at, memory_id = decode_cursor(cursor)
+    if order == "desc":
+        # created_at <= :ts bounds the index range; the OR breaks ties on memory_id.
+        return and_(
+            Message.created_at <= created_at,
+            or_(Message.created_at < created_at, Message.memory_id < memory_id),
+        )
+    return and_(
+        Message.created_at >= created_at,
+        or_(Message.created_at > created_at, Message.memory_id > memory_id),
+    )
+
+
+async def _page(
+    session: AsyncSession,
+    scope: ColumnElement[bool],
+    cursor: str | None,
+    limit: int,
+    order: Order,
+) -> MessagePage:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    ordering = (
+        (Message.created_at.desc(), Message.memory_id.desc())
+        if order == "desc"
+        else (Message.created_at.asc(), Message.memory_id.asc())
+    )
+    stmt = (
+        select(
+            Message.id,
+            Message.memory_id,
+            Message.episode_id,
+            Message.sender_id,
+            Message.content,
+            Message.created_at,
+        )
+        .where(scope)
+        .order_by(*ordering)
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        stmt = stmt.where(_after(cursor, order))
+
+    rows = (await session.execute(stmt)).all()
+    items = [MessageDTO.model_validate(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].memory_id)
+    return MessagePage(items=items, next_cursor=next_cursor)
+
+
+async def episode_messages(
+    session: AsyncSession,
+    episode_id: int,
+    *,
+    cursor: str | None = None,
+    limit: int = 50,
+    order: Order = "desc",
+) -> MessagePage:
+    """Page through one episode (``message_episode_idx``)."""
+    return await _page(session, Message.episode_id == episode_id, cursor, limit, order)
+
+
+async def sender_messages(
+    session: AsyncSession,
+    sender_id: uuid.UUID,
+    *,
+    cursor: str | None = None,
+    limit: int = 50,
+    order: Order = "desc",
+) -> MessagePage:
+    """Page through everything one participant sent (``message_sender_idx``)."""
+    return await _page(session, Message.sender_id == sender_id, cursor, limit, order)
@@ -0,0 +1,149 @@
+"""Vectorised emotion dynamics over ``emotion_history``.
+
+A character's mood is the exponentially time-decayed average of its recent
+emotion vectors::
+
+    weight_i = 0.5 ** (age_i / mood_half_life)
+    mood     = sum(weight_i * emotion_i) / sum(weight_i)
+
+The window (at most ``mood_window_rows`` rows from the last ``mood_window_hours``)
+is read in one query that walks ``emotion_history_character_idx`` backwards; the
+time bound also prunes the monthly partitions. The blend is a single NumPy pass
+over an ``(n, 6)`` array. :meth:`EmotionDynamics.moods` does the same for many
+characters at once with one LATERAL query and a grouped ``np.add.at``.
+"""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+from sqlalchemy import ARRAY, ColumnElement, Select, bindparam, func, select, true
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import EmotionSettings
+from database.models import EmotionHistory
+from models.domain.emotion import EMOTIONS, Mood
+
+_EMOTION_COLUMNS = tuple(getattr(EmotionHistory, name) for name in EMOTIONS)
+
+
+def decay_weights(age_seconds: np.ndarray, half_life_seconds: float) -> np.ndarray:
+    return np.exp2(-np.maximum(age_seconds, 0.0) / half_life_seconds)
+
+
+def blend(vectors: np.ndarray, age_seconds: np.ndarray, half_life_seconds: float) -> np.ndarray:
+    """Time-decayed average of ``(n, 6)`` emotion vectors; zeros when ``n == 0``."""
+    if vectors.shape[0] == 0:
+        return np.zeros(len(EMOTIONS))
+    weights = decay_weights(age_seconds, half_life_seconds)
+    return weights @ vectors / weights.sum()
+
+
+def blend_grouped(
+    groups: np.ndarray,
+    vectors: np.ndarray,
+    age_seconds: np.ndarray,
+    half_life_seconds: float,
+    n_groups: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Blend rows per group in one pass.
+
+    Args:
+        groups: ``(n,)`` group index of each row, in ``[0, n_groups)``.
+        vectors: ``(n, 6)`` emotion vectors.
+        age_seconds: ``(n,)`` row ages.
+
+    Returns:
+        ``(moods, counts)``: ``(n_groups, 6)`` blends (zeros for empty groups) and
+        ``(n_groups,)`` row counts.
+    """
+    weights = decay_weights(age_seconds, half_life_seconds)
+    sums = np.zeros((n_groups, vectors.shape[1]))
+    np.add.at(sums, groups, vectors * weights[:, None])
+    totals = np.bincount(groups, weights=weights, minlength=n_groups)
+    counts = np.bincount(groups, minlength=n_groups)
+    moods = np.divide(sums, totals[:, None], out=np.zeros_like(sums), where=totals[:, None] > 0)
+    return moods, counts
+
+
+class EmotionDynamics:
+    def __init__(self, settings: EmotionSettings) -> None:
+        self._half_life = settings.mood_half_life_minutes * 60.0
+        self._window = timedelta(hours=settings.mood_window_hours)
+        self._window_rows = settings.mood_window_rows
+
+    def _age_seconds(self) -> ColumnElement[Any]:
+        return func.extract("epoch", func.now() - EmotionHistory.created_at).label("age")
+
+    def _window_query(self) -> Select:
+        return (
+            select(*_EMOTION_COLUMNS, self._age_seconds(), EmotionHistory.created_at)
+            .where(EmotionHistory.created_at > func.now() - self._window)
+            .order_by(EmotionHistory.created_at.desc())
+            .limit(self._window_rows)
+        )
+
+    async def current_mood(self, session: AsyncSession, character_id: uuid.UUID) -> Mood:
+        rows = (
+            await session.execute(
+                self._window_query().where(EmotionHistory.character_id == character_id)
+            )
+        ).all()
+        data = np.asarray([row[: len(EMOTIONS) + 1] for row in rows], dtype=np.float64)
+        data = data.reshape(len(rows), len(EMOTIONS) + 1)
+        return Mood(
+            character_id=character_id,
+            vector=blend(data[:, :-1], data[:, -1], self._half_life),
+            samples=len(rows),
+            as_of=rows[0].created_at if rows else None,
+        )
+
+    async def moods(
+        self, session: AsyncSession, character_ids: Sequence[uuid.UUID]
+    ) -> dict[uuid.UUID, Mood]:
+        """Current mood for each character, fetched and blended in one batch."""
+        if not character_ids:
+            return {}
+        ids = list(dict.fromkeys(character_ids))
+        characters = (
+            func.unnest(bindparam("character_ids", ids, type_=ARRAY(UUID(as_uuid=True))))
+            .table_valued("id", with_ordinality="idx")
+            .render_derived("characters")
+        )
+        window = (
+            self._window_query()
+            .where(EmotionHistory.character_id == characters.c.id)
+            .lateral("recent")
+        )
+        rows = (
+            await session.execute(
+                select(characters.c.idx, *window.c).select_from(characters).join(window, true())
+            )
+        ).all()
+
+        n = len(EMOTIONS)
+        data = np.asarray([row[1 : n + 2] for row in rows], dtype=np.float64).reshape(
+            len(rows), n + 1
+        )
+        groups = np.fromiter((row.idx - 1 for row in rows), np.int64, len(rows))
+        vectors, counts = blend_grouped(groups, data[:, :n], data[:, n], self._half_life, len(ids))
+
+        latest: dict[int, datetime] = {}
+        for row in rows:
+            group = row.idx - 1
+            if group not in latest or row.created_at > latest[group]:
+                latest[group] = row.created_at
+        return {
+            character_id: Mood(
+                character_id=character_id,
+                vector=vectors[i],
+                samples=int(counts[i]),
+                as_of=latest.get(i),
+            )
+            for i, character_id in enumerate(ids)
+        }
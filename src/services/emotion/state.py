@@ -0,0 +1,312 @@
+"""In-process ``character_state`` cache with coalesced writes.
+
+Every turn touches the active character's state row, so hot characters contend
+on a single row. Instead, the worker that holds a character's Postgres advisory
+lock keeps its state in memory, applies updates there and writes the row at most
+every ``character_state_flush_interval_seconds``, when the character is released
+(episode end) or on shutdown.
+
+Advisory locks are session-scoped, so they are held on one dedicated autocommit
+connection for the lifetime of the cache. A worker that cannot take the lock
+falls back to write-through: ``SELECT ... FOR UPDATE``, apply, write.
+
+Updates are never lost. Each write bumps ``character_state.version``, and a
+coalesced write only succeeds against the version it last saw. If the lock
+connection dropped and another worker wrote in between, the owner reloads the
+row and replays its pending :class:`StateUpdate` objects on top before writing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import structlog
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+)
+
+from core.config import EmotionSettings
+from database.connection import register_shutdown_hook
+from database.models import CharacterState
+from models.domain.character_state import CharacterStateSnapshot, StateUpdate
+
+logger = structlog.get_logger(__name__)
+
+# First key of the two-key advisory lock form; the second is hashtext(character_id).
+_LOCK_NAMESPACE = 0x454E45
+
+
+@dataclass(slots=True)
+class _Entry:
+    state: CharacterStateSnapshot
+    version: int
+    pending: list[StateUpdate] = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+def _replay(state: CharacterStateSnapshot, updates: list[StateUpdate]) -> CharacterStateSnapshot:
+    for change in updates:
+        state = change.apply(state)
+    return state
+
+
+def _values(state: CharacterStateSnapshot) -> dict:
+    return {
+        "energy_level": state.energy_level,
+        "engagement_level": state.engagement_level,
+        "conversation_mode": state.conversation_mode,
+        "latest_emotion_id": state.latest_emotion_id,
+        "updated_at": func.now(),
+    }
+
+
+async def _load(
+    session: AsyncSession, character_id: uuid.UUID, *, for_update: bool = False
+) -> tuple[CharacterStateSnapshot, int]:
+    """Read (creating if needed) a character's state row and its version."""
+    await session.execute(
+        insert(CharacterState)
+        .values(character_id=character_id)
+        .on_conflict_do_nothing(index_elements=[CharacterState.character_id])
+    )
+    stmt = select(
+        CharacterState.energy_level,
+        CharacterState.engagement_level,
+        CharacterState.conversation_mode,
+        CharacterState.latest_emotion_id,
+        CharacterState.version,
+    ).where(CharacterState.character_id == character_id)
+    if for_update:
+        stmt = stmt.with_for_update()
+    row = (await session.execute(stmt)).one()
+    state = CharacterStateSnapshot(
+        character_id=character_id,
+        energy_level=row.energy_level,
+        engagement_level=row.engagement_level,
+        conversation_mode=row.conversation_mode,
+        latest_emotion_id=row.latest_emotion_id,
+    )
+    return state, row.version
+
+
+class CharacterStateCache:
+    """Owns character states for this worker and persists them in batches."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        session_factory: async_sessionmaker[AsyncSession],
+        settings: EmotionSettings,
+    ) -> None:
+        self._engine = engine
+        self._session_factory = session_factory
+        self._interval = settings.character_state_flush_interval_seconds
+        self._idle = settings.character_state_idle_seconds
+        self._entries: dict[uuid.UUID, _Entry] = {}
+        self._lock_connection: AsyncConnection | None = None
+        self._claim_lock = asyncio.Lock()
+        # An AsyncConnection runs one statement at a time; every lock, unlock and
+        # close on the shared lock connection goes through this.
+        self._connection_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def owned(self) -> int:
+        return len(self._entries)
+
+    async def get(self, character_id: uuid.UUID) -> CharacterStateSnapshot:
+        entry = await self._claim(character_id)
+        if entry is not None:
+            return entry.state
+        async with self._session_factory() as session:
+            state, _ = await _load(session, character_id)
+            await session.commit()
+        return state
+
+    async def update(self, character_id: uuid.UUID, change: StateUpdate) -> CharacterStateSnapshot:
+        """Apply ``change``; in memory when this worker owns the character."""
+        entry = await self._claim(character_id)
+        if entry is not None:
+            entry.state = change.apply(entry.state)
+            entry.pending.append(change)
+            entry.last_used = time.monotonic()
+            return entry.state
+
+        async with self._session_factory() as session, session.begin():
+            state, version = await _load(session, character_id, for_update=True)
+            state = change.apply(state)
+            await session.execute(
+                update(CharacterState)
+                .where(CharacterState.character_id == character_id)
+                .values(**_values(state), version=version + 1)
+            )
+        return state
+
+    async def release(self, character_id: uuid.UUID) -> None:
+        """Persist and give up ownership of a character, e.g. when its episode ends."""
+        await self.flush(character_id)
+        entry = self._entries.get(character_id)
+        if entry is not None and not entry.pending:
+            del self._entries[character_id]
+            await self._unlock(character_id)
+
+    # ------------------------------------------------------------------
+    # Ownership
+    # ------------------------------------------------------------------
+
+    async def _claim(self, character_id: uuid.UUID) -> _Entry | None:
+        entry = self._entries.get(character_id)
+        if entry is not None:
+            return entry
+
+        async with self._claim_lock:
+            entry = self._entries.get(character_id)
+            if entry is not None:
+                return entry
+            if not await self._lock(character_id):
+                return None
+
+            try:
+                async with self._session_factory() as session:
+                    state, version = await _load(session, character_id)
+                    await session.commit()
+            except Exception:
+                await self._unlock(character_id)
+                raise
+            entry = _Entry(state=state, version=version)
+            self._entries[character_id] = entry
+            return entry
+
+    async def _connection(self) -> AsyncConnection:
+        if self._lock_connection is None:
+            connection = await self._engine.connect()
+            self._lock_connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        return self._lock_connection
+
+    async def _drop_connection(self) -> None:
+        # Callers hold _connection_lock. Closing the session releases every lock
+        # it held; version checks keep writes from owned-but-unlocked entries
+        # safe until they are released.
+        if self._lock_connection is not None:
+            with contextlib.suppress(Exception):
+                await self._lock_connection.close()
+            self._lock_connection = None
+
+    async def _lock(self, character_id: uuid.UUID) -> bool:
+        async with self._connection_lock:
+            try:
+                connection = await self._connection()
+                return bool(
+                    await connection.scalar(
+                        text("SELECT pg_try_advisory_lock(:namespace, hashtext(:key))"),
+                        {"namespace": _LOCK_NAMESPACE, "key": str(character_id)},
+                    )
+                )
+            except Exception:
+                logger.exception("character_state.lock_failed", character_id=str(character_id))
+                await self._drop_connection()
+                return False
+
+    async def _unlock(self, character_id: uuid.UUID) -> None:
+        async with self._connection_lock:
+            if self._lock_connection is None:
+                return
+            try:
+                await self._lock_connection.execute(
+                    text("SELECT pg_advisory_unlock(:namespace, hashtext(:key))"),
+                    {"namespace": _LOCK_NAMESPACE, "key": str(character_id)},
+                )
+            except Exception:
+                logger.exception("character_state.unlock_failed", character_id=str(character_id))
+                await self._drop_connection()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    async def flush(self, character_id: uuid.UUID | None = None) -> int:
+        """Write dirty states now (all, or one character). Returns rows written."""
+        async with self._flush_lock:
+            ids = [character_id] if character_id is not None else list(self._entries)
+            written = 0
+            for cid in ids:
+                entry = self._entries.get(cid)
+                if entry is None or not entry.pending:
+                    continue
+                pending, entry.pending = entry.pending, []
+                try:
+                    await self._write(cid, entry, pending)
+                except Exception:
+                    entry.pending = pending + entry.pending
+                    logger.exception("character_state.flush_failed", character_id=str(cid))
+                    continue
+                written += 1
+            return written
+
+    async def _write(
+        self, character_id: uuid.UUID, entry: _Entry, pending: list[StateUpdate]
+    ) -> None:
+        state = entry.state
+        async with self._session_factory() as session, session.begin():
+            version = await session.scalar(
+                update(CharacterState)
+                .where(
+                    CharacterState.character_id == character_id,
+                    CharacterState.version == entry.version,
+                )
+                .values(**_values(state), version=entry.version + 1)
+                .returning(CharacterState.version)
+            )
+            if version is None:
+                # Someone else wrote the row: replay our changes on top of theirs.
+                base, base_version = await _load(session, character_id, for_update=True)
+                state = _replay(base, pending)
+                version = base_version + 1
+                await session.execute(
+                    update(CharacterState)
+                    .where(CharacterState.character_id == character_id)
+                    .values(**_values(state), version=version)
+                )
+                entry.state = _replay(state, entry.pending)
+                logger.warning("character_state.replayed", character_id=str(character_id))
+        entry.version = version
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the periodic flusher and hook the final flush into ``close_db()``."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="character-state-cache")
+            register_shutdown_hook(self.close)
+
+    async def close(self) -> None:
+        """Stop the flusher, write everything out and release all locks."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+        self._entries.clear()
+        async with self._connection_lock:
+            await self._drop_connection()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.flush()
+            cutoff = time.monotonic() - self._idle
+            for cid in [c for c, e in self._entries.items() if e.last_used < cutoff]:
+                await self.release(cid)
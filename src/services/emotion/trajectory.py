@@ -0,0 +1,157 @@
+"""Emotion trajectories read from pre-aggregated rollups.
+
+``emotion_rollup_daily`` and ``emotion_rollup_hourly`` (migration 0009) hold the
+count, sum, min and max of each emotion per character and bucket. A trajectory
+request is answered from the coarsest source whose granularity still fits the
+requested resolution:
+
+- ``resolution >= 1 day``: daily rollup
+- ``resolution >= 1 hour``: hourly rollup
+- otherwise raw ``emotion_history``
+
+The resolution is rounded down to a whole multiple of the source granularity, and
+buckets are merged in SQL with ``date_bin``. The cost therefore depends on the
+time range and resolution, not on how many emotion rows the character has.
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import ColumnElement, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import (
+    EmotionHistory,
+    EmotionRollupColumns,
+    EmotionRollupDaily,
+    EmotionRollupHourly,
+)
+from models.domain.emotion import EMOTIONS
+
+RAW = "raw"
+HOURLY = "hourly"
+DAILY = "daily"
+
+_ROLLUPS: tuple[tuple[str, timedelta, type[EmotionRollupColumns]], ...] = (
+    (DAILY, timedelta(days=1), EmotionRollupDaily),
+    (HOURLY, timedelta(hours=1), EmotionRollupHourly),
+)
+# Buckets are aligned to midnight UTC.
+_ORIGIN = datetime(2000, 1, 1)
+
+
+@dataclass(frozen=True, slots=True)
+class TrajectoryPoint:
+    bucket_start: datetime
+    samples: int
+    mean: np.ndarray  # (6,) in EMOTIONS order
+    minimum: np.ndarray
+    maximum: np.ndarray
+
+
+@dataclass(frozen=True, slots=True)
+class Trajectory:
+    character_id: uuid.UUID
+    source: str
+    resolution: timedelta
+    points: list[TrajectoryPoint]
+
+
+def choose_source(resolution: timedelta) -> tuple[str, timedelta]:
+    """The coarsest source for ``resolution`` and the effective (rounded) resolution."""
+    for name, granularity, _ in _ROLLUPS:
+        if resolution >= granularity:
+            return name, granularity * (resolution // granularity)
+    return RAW, resolution
+
+
+def _rollup_query(
+    model: type[EmotionRollupColumns],
+    character_id: uuid.UUID,
+    start: datetime,
+    end: datetime,
+    stride: timedelta,
+) -> Select:
+    bucket = func.date_bin(stride, model.bucket_start, _ORIGIN).label("bucket")
+    aggregates: list[ColumnElement] = []
+    for emotion in EMOTIONS:
+        aggregates += [
+            func.sum(getattr(model, f"{emotion}_sum")),
+            func.min(getattr(model, f"{emotion}_min")),
+            func.max(getattr(model, f"{emotion}_max")),
+        ]
+    return (
+        select(bucket, func.sum(model.sample_count), *aggregates)
+        .where(
+            model.character_id == character_id,
+            model.bucket_start >= func.date_bin(stride, start, _ORIGIN),
+            model.bucket_start < end,
+        )
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+
+
+def _raw_query(
+    character_id: uuid.UUID, start: datetime, end: datetime, stride: timedelta
+) -> Select:
+    bucket = func.date_bin(stride, EmotionHistory.created_at, _ORIGIN).label("bucket")
+    aggregates: list[ColumnElement] = []
+    for emotion in EMOTIONS:
+        column = getattr(EmotionHistory, emotion)
+        aggregates += [func.sum(column), func.min(column), func.max(column)]
+    return (
+        select(bucket, func.count(), *aggregates)
+        .where(
+            EmotionHistory.character_id == character_id,
+            EmotionHistory.created_at >= start,
+            EmotionHistory.created_at < end,
+        )
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+
+
+async def emotion_trajectory(
+    session: AsyncSession,
+    character_id: uuid.UUID,
+    start: datetime,
+    end: datetime,
+    resolution: timedelta,
+) -> Trajectory:
+    """Per-bucket mean, min and max of each emotion between ``start`` and ``end``."""
+    if resolution <= timedelta(0):
+        raise ValueError("resolution must be positive")
+    source, stride = choose_source(resolution)
+    if source == RAW:
+        stmt = _raw_query(character_id, start, end, stride)
+    else:
+        model = next(model for name, _, model in _ROLLUPS if name == source)
+        stmt = _rollup_query(model, character_id, start, end, stride)
+
+    rows = (await session.execute(stmt)).all()
+    n = len(EMOTIONS)
+    values = np.asarray([row[1:] for row in rows], dtype=np.float64).reshape(len(rows), 1 + 3 * n)
+    samples = values[:, 0]
+    stats = values[:, 1:].reshape(len(rows), n, 3)  # (bucket, emotion, sum|min|max)
+    means = stats[:, :, 0] / np.maximum(samples, 1.0)[:, None]
+
+    return Trajectory(
+        character_id=character_id,
+        source=source,
+        resolution=stride,
+        points=[
+            TrajectoryPoint(
+                bucket_start=row.bucket,
+                samples=int(samples[i]),
+                mean=means[i],
+                minimum=stats[i, :, 1],
+                maximum=stats[i, :, 2],
+            )
+            for i, row in enumerate(rows)
+        ],
+    )
@@ -0,0 +1,205 @@
+"""Response cache for deterministic LLM side calls.
+
+Classification-style calls (importance scoring, emotion tagging, topic extraction)
+are cached in ``llm_response_cache`` keyed by prompt-template ID and a hash of the
+normalised input. When ``llm_cache_similarity_threshold`` is set, a miss on the
+exact key falls back to the nearest cached input of the same template by embedding
+cosine similarity. Entries expire after ``llm_cache_ttl_seconds`` and the table is
+trimmed to ``llm_cache_max_entries`` by least recent hit.
+
+Lookups are read-only. Hits are counted in process and written by
+:meth:`LLMResponseCacheStore.flush_hits` in one batched UPDATE every
+``llm_cache_hit_flush_seconds``. Hit statistics only steer eviction, so a failed
+or lost flush is logged and dropped rather than retried.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from collections.abc import Sequence
+from datetime import timedelta
+from typing import Any, cast
+
+import numpy as np
+import structlog
+from sqlalchemy import CursorResult, bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import LLMSettings
+from database.models import LLMResponseCache
+from services.llm.providers.base import ChatMessage, LLMProvider
+from services.llm.providers.embedding import EmbeddingService, normalise_text
+
+logger = structlog.get_logger(__name__)
+
+_EVICT_EVERY_PUTS = 500
+
+
+def input_hash(text: str) -> str:
+    return hashlib.sha256(normalise_text(text).encode()).hexdigest()
+
+
+class LLMResponseCacheStore:
+    """Postgres-backed storage for cached responses."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        settings: LLMSettings,
+        embeddings: EmbeddingService | None = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self._ttl = timedelta(seconds=settings.llm_cache_ttl_seconds)
+        self._max_entries = settings.llm_cache_max_entries
+        self._threshold = settings.llm_cache_similarity_threshold
+        self._embeddings = embeddings if self._threshold is not None else None
+        self._puts = 0
+        self._hits: Counter[tuple[str, str]] = Counter()
+
+    @property
+    def pending_hits(self) -> int:
+        return len(self._hits)
+
+    async def get(self, template_id: str, text: str) -> str | None:
+        key = input_hash(text)
+        async with self._session_factory() as session:
+            hit = await session.scalar(
+                select(LLMResponseCache.response).where(
+                    LLMResponseCache.template_id == template_id,
+                    LLMResponseCache.input_hash == key,
+                    LLMResponseCache.expires_at > func.now(),
+                )
+            )
+            if hit is not None:
+                self._hits[template_id, key] += 1
+                return hit
+            if self._embeddings is None:
+                return None
+            return await self._similar(session, template_id, await self._embeddings.embed(text))
+
+    async def _similar(
+        self, session: AsyncSession, template_id: str, embedding: np.ndarray
+    ) -> str | None:
+        assert self._threshold is not None
+        distance = LLMResponseCache.embedding.cosine_distance(embedding).label("distance")
+        row = (
+            await session.execute(
+                select(LLMResponseCache.input_hash, LLMResponseCache.response, distance)
+                .where(
+                    LLMResponseCache.template_id == template_id,
+                    LLMResponseCache.expires_at > func.now(),
+                    LLMResponseCache.embedding.is_not(None),
+                )
+                .order_by(distance)
+                .limit(1)
+            )
+        ).first()
+        if row is None or 1.0 - row.distance < self._threshold:
+            return None
+        self._hits[template_id, row.input_hash] += 1
+        return row.response
+
+    async def flush_hits(self) -> int:
+        """Write pending hit counts in one batched UPDATE; returns the entries touched."""
+        if not self._hits:
+            return 0
+        hits, self._hits = self._hits, Counter()
+        table = LLMResponseCache.__table__
+        stmt = (
+            update(table)
+            .where(
+                table.c.template_id == bindparam("b_template_id"),
+                table.c.input_hash == bindparam("b_input_hash"),
+            )
+            .values(hit_count=table.c.hit_count + bindparam("b_hits"), last_hit_at=func.now())
+        )
+        # Sorted, so concurrent flushes from other workers lock rows in the same order.
+        params = [
+            {"b_template_id": template_id, "b_input_hash": key, "b_hits": count}
+            for (template_id, key), count in sorted(hits.items())
+        ]
+        try:
+            async with self._session_factory() as session, session.begin():
+                await session.execute(stmt, params)
+        except Exception:
+            logger.warning("llm_cache.hit_flush_failed", entries=len(params), exc_info=True)
+            return 0
+        return len(params)
+
+    async def put(self, template_id: str, text: str, response: str) -> None:
+        embedding = await self._embeddings.embed(text) if self._embeddings is not None else None
+        stmt = insert(LLMResponseCache).values(
+            template_id=template_id,
+            input_hash=input_hash(text),
+            response=response,
+            embedding=embedding,
+            expires_at=func.now() + self._ttl,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LLMResponseCache.template_id, LLMResponseCache.input_hash],
+            set_={
+                "response": stmt.excluded.response,
+                "embedding": stmt.excluded.embedding,
+                "expires_at": stmt.excluded.expires_at,
+                "last_hit_at": func.now(),
+            },
+        )
+        async with self._session_factory() as session, session.begin():
+            await session.execute(stmt)
+
+        self._puts += 1
+        if self._puts % _EVICT_EVERY_PUTS == 0:
+            await self.evict()
+
+    async def evict(self) -> int:
+        """Drop expired entries, then the least recently hit beyond ``llm_cache_max_entries``."""
+        async with self._session_factory() as session, session.begin():
+            expired = await session.execute(
+                delete(LLMResponseCache).where(LLMResponseCache.expires_at <= func.now())
+            )
+            overflow = (
+                select(LLMResponseCache.template_id, LLMResponseCache.input_hash)
+                .order_by(LLMResponseCache.last_hit_at.desc())
+                .offset(self._max_entries)
+                .subquery()
+            )
+            trimmed = await session.execute(
+                delete(LLMResponseCache).where(
+                    LLMResponseCache.template_id == overflow.c.template_id,
+                    LLMResponseCache.input_hash == overflow.c.input_hash,
+                )
+            )
+        removed = sum(cast(CursorResult[Any], r).rowcount or 0 for r in (expired, trimmed))
+        if removed:
+            logger.info("llm_cache.evicted", removed=removed)
+        return removed
+
+
+class CachedLLM:
+    """Front for the provider router that serves repeated side calls from the cache."""
+
+    def __init__(self, provider: LLMProvider, store: LLMResponseCacheStore) -> None:
+        self._provider = provider
+        self._store = store
+
+    async def complete(
+        self,
+        template_id: str,
+        text: str,
+        messages: Sequence[ChatMessage],
+        *,
+        max_tokens: int | None = None,
+    ) -> str:
+        """Complete ``messages`` rendered from ``template_id`` and ``text``.
+
+        ``text`` is the variable part of the prompt; together with ``template_id``
+        it must fully determine the answer. Calls run at temperature 0.
+        """
+        cached = await self._store.get(template_id, text)
+        if cached is not None:
+            return cached
+        response = await self._provider.complete(messages, temperature=0.0, max_tokens=max_tokens)
+        await self._store.put(template_id, text, response)
+        return response
@@ -0,0 +1,45 @@
+"""Prompt for incremental episode summaries."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+
+from models.domain.episode import EpisodeSummary
+from services.llm.providers.base import ChatMessage
+
+EPISODE_SYSTEM_PROMPT = (
+    "You keep a running summary of one conversation episode between a user and a "
+    "character. Given the current summary (if any) and the messages since, reply "
+    'with a JSON object with the keys "title" (a few words), "summary" (a short '
+    'paragraph covering the whole episode so far), "purpose", "turning_point" and '
+    '"conclusion" (one sentence each, or null when not yet known). Only give a '
+    "conclusion once the episode has ended. Reply with the JSON object only."
+)
+
+
+def episode_summary_messages(
+    current: EpisodeSummary | None, messages: Sequence[ChatMessage], final: bool
+) -> list[ChatMessage]:
+    previous = (
+        json.dumps(
+            {
+                "title": current.title,
+                "summary": current.summary,
+                "purpose": current.purpose,
+                "turning_point": current.turning_point,
+                "conclusion": current.conclusion,
+            },
+            ensure_ascii=False,
+        )
+        if current is not None
+        else "(none yet)"
+    )
+    transcript = "\n".join(f"{message.role}: {message.content}" for message in messages)
+    parts = [f"Current summary:\n{previous}", f"New messages:\n{transcript or '(none)'}"]
+    if final:
+        parts.append("The episode has ended.")
+    return [
+        ChatMessage(role="system", content=EPISODE_SYSTEM_PROMPT),
+        ChatMessage(role="user", content="\n\n".join(parts)),
+    ]
@@ -0,0 +1,20 @@
+"""Prompt for memory importance scoring."""
+
+from __future__ import annotations
+
+from services.llm.providers.base import ChatMessage
+
+IMPORTANCE_TEMPLATE_ID = "importance.v1"
+
+IMPORTANCE_SYSTEM_PROMPT = (
+    "Rate how important the following message is for a character to remember "
+    "long term, on a scale from 1 (mundane small talk) to 10 (life-changing "
+    "event or core fact about someone). Reply with the number only."
+)
+
+
+def importance_messages(text: str) -> list[ChatMessage]:
+    return [
+        ChatMessage(role="system", content=IMPORTANCE_SYSTEM_PROMPT),
+        ChatMessage(role="user", content=text),
+    ]
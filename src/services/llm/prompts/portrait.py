@@ -0,0 +1,24 @@
+"""Prompt for per-turn user interest and preference extraction."""
+
+from __future__ import annotations
+
+from services.llm.providers.base import ChatMessage
+
+PORTRAIT_TEMPLATE_ID = "portrait.v1"
+
+PORTRAIT_SYSTEM_PROMPT = (
+    "Extract what the following user message reveals about the user. Reply with a "
+    'JSON object with the keys "interests" and "preferences". "interests" is a list '
+    'of {"topic": short lowercase noun phrase, "confidence": -1 (actively avoids) '
+    'to 1 (keen on)}. "preferences" is a list of {"type": what the preference is '
+    'about, e.g. "tone" or "language", "value": the preferred option, "confidence": '
+    "0 to 1}. Use empty lists when the message reveals nothing. Reply with the JSON "
+    "object only."
+)
+
+
+def portrait_messages(text: str) -> list[ChatMessage]:
+    return [
+        ChatMessage(role="system", content=PORTRAIT_SYSTEM_PROMPT),
+        ChatMessage(role="user", content=text),
+    ]
@@ -0,0 +1,21 @@
+"""Prompt for reflection generation."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from services.llm.providers.base import ChatMessage
+
+REFLECTION_SYSTEM_PROMPT = (
+    "You help a character reflect on their recent experiences. Given numbered "
+    "memories, write one or two sentences stating the most important higher-level "
+    "insight they support, in the character's own voice. Reply with the insight only."
+)
+
+
+def reflection_messages(memories: Sequence[str]) -> list[ChatMessage]:
+    numbered = "\n".join(f"{i}. {memory}" for i, memory in enumerate(memories, start=1))
+    return [
+        ChatMessage(role="system", content=REFLECTION_SYSTEM_PROMPT),
+        ChatMessage(role="user", content=f"Memories:\n{numbered}"),
+    ]
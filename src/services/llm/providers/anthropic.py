@@ -0,0 +1,60 @@
+"""Streaming chat provider for the Anthropic Messages API."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+import httpx
+
+from services.llm.providers.base import ChatMessage, LLMProvider
+
+ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+DEFAULT_MAX_TOKENS = 4096
+
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+
+    def __init__(self, model: str, api_key: str, client: httpx.AsyncClient) -> None:
+        self._model = model
+        self._headers = {"x-api-key": api_key, "anthropic-version": ANTHROPIC_VERSION}
+        self._client = client
+
+    async def stream(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        system = "\n\n".join(m.content for m in messages if m.role == "system")
+        payload: dict[str, Any] = {
+            "model": self._model,
+            "max_tokens": max_tokens or DEFAULT_MAX_TOKENS,
+            "messages": [
+                {"role": m.role, "content": m.content} for m in messages if m.role != "system"
+            ],
+            "stream": True,
+        }
+        if system:
+            payload["system"] = system
+        if temperature is not None:
+            payload["temperature"] = temperature
+
+        async with self._client.stream(
+            "POST", ANTHROPIC_URL, json=payload, headers=self._headers
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:") :])
+                if event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event.get("type") == "message_stop":
+                    break
@@ -0,0 +1,49 @@
+"""Provider interface shared by all chat LLM backends."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
+from typing import Literal
+
+Role = Literal["system", "user", "assistant"]
+
+
+@dataclass(frozen=True, slots=True)
+class ChatMessage:
+    role: Role
+    content: str
+
+
+class LLMProvider(ABC):
+    """A chat completion backend."""
+
+    name: str
+
+    @abstractmethod
+    def stream(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield completion text deltas as the provider produces them."""
+
+    async def complete(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> str:
+        """Return the full completion."""
+        parts = [
+            delta
+            async for delta in self.stream(messages, temperature=temperature, max_tokens=max_tokens)
+        ]
+        return "".join(parts)
+
+    async def close(self) -> None:
+        """Release any resources held by the provider."""
@@ -0,0 +1,277 @@
+"""Micro-batching embedding service with a content-hash cache.
+
+Callers embed one text at a time; concurrent calls are collected into a single
+provider request bounded by ``embedding_batch_size`` and ``embedding_batch_wait_ms``.
+Results are cached by a hash of the model and normalised text, and identical texts
+that are already in flight share one future, so stock phrases are embedded once.
+
+Supported providers (``embedding_provider``):
+
+- ``openai``, ``lmstudio``, ``localai``: OpenAI-compatible ``POST /embeddings``
+- ``ollama``: ``POST /api/embed``
+
+Given a ``dimension`` (the schema's ``embedding_dimension``), the service asks
+OpenAI's ``text-embedding-3`` models for vectors of that size and rejects any
+response of another size with :class:`EmbeddingDimensionMismatch`, so a model
+that does not match the schema (``nomic-embed-text`` is 768-d) fails loudly
+instead of at insert time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import httpx
+import numpy as np
+import structlog
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+from core.config import LLMSettings
+
+logger = structlog.get_logger(__name__)
+
+_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+@dataclass(frozen=True, slots=True)
+class EmbeddingEndpoint:
+    provider: str
+    url: str
+    model: str
+    api_key: str = ""
+
+
+class EmbeddingDimensionMismatch(ValueError):
+    """The provider's vectors do not have the configured ``embedding_dimension``."""
+
+
+def resolve_endpoint(settings: LLMSettings) -> EmbeddingEndpoint:
+    """Map ``embedding_provider`` to its URL and model."""
+    provider = settings.embedding_provider
+    if provider == "openai":
+        return EmbeddingEndpoint(
+            provider,
+            f"{_OPENAI_BASE_URL}/embeddings",
+            settings.openai_embedding_model,
+            settings.openai_api_key,
+        )
+    if provider == "lmstudio":
+        return EmbeddingEndpoint(
+            provider,
+            f"{settings.lm_studio_base_url.rstrip('/')}/embeddings",
+            settings.lm_studio_embedding_model,
+        )
+    if provider == "localai":
+        return EmbeddingEndpoint(
+            provider,
+            f"{settings.local_ai_base_url.rstrip('/')}/embeddings",
+            settings.local_ai_embedding_model,
+        )
+    if provider == "ollama":
+        return EmbeddingEndpoint(
+            provider,
+            f"{settings.ollama_base_url.rstrip('/')}/api/embed",
+            settings.ollama_embedding_model,
+        )
+    raise ValueError(f"Unsupported embedding provider: {provider!r}")
+
+
+def normalise_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, trimmed, single-spaced."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+class EmbeddingService:
+    """Batches concurrent embedding requests into as few provider calls as possible."""
+
+    def __init__(
+        self,
+        settings: LLMSettings,
+        client: httpx.AsyncClient | None = None,
+        *,
+        dimension: int | None = None,
+    ) -> None:
+        self._endpoint = resolve_endpoint(settings)
+        self._dimension = dimension
+        # Only the text-embedding-3 models accept a requested size.
+        self._request_dimension = (
+            dimension is not None
+            and self._endpoint.provider == "openai"
+            and self._endpoint.model.startswith("text-embedding-3")
+        )
+        self._batch_size = settings.embedding_batch_size
+        self._batch_wait = settings.embedding_batch_wait_ms / 1000.0
+        self._cache_size = settings.embedding_result_cache_size
+        self._client = client or httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0))
+        self._owns_client = client is None
+
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[np.ndarray]] = {}
+        self._queue: list[tuple[str, str]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+
+    @property
+    def model(self) -> str:
+        return self._endpoint.model
+
+    def cache_key(self, text: str) -> str:
+        payload = f"{self._endpoint.provider}\0{self._endpoint.model}\0{normalise_text(text)}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text. The returned array is shared and read-only."""
+        key = self.cache_key(text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        # Shield so one cancelled caller does not cancel a future other callers share.
+        return await asyncio.shield(self._enqueue(key, normalise_text(text)))
+
+    async def embed_many(self, texts: Sequence[str]) -> list[np.ndarray]:
+        """Embed several texts; they join the same batches as concurrent single calls."""
+        return list(await asyncio.gather(*(self.embed(t) for t in texts)))
+
+    async def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._queue:
+            self._dispatch()
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._owns_client:
+            await self._client.aclose()
+
+    # ------------------------------------------------------------------
+    # Batching
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, key: str, text: str) -> asyncio.Future[np.ndarray]:
+        future = self._inflight.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        self._queue.append((key, text))
+
+        if len(self._queue) >= self._batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._batch_wait, self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch = self._queue[: self._batch_size]
+            self._queue = self._queue[self._batch_size :]
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, str]]) -> None:
+        keys = [key for key, _ in batch]
+        try:
+            vectors = await self._request([text for _, text in batch])
+        except Exception as exc:  # noqa: BLE001 - forwarded to every waiter
+            logger.warning("embedding.batch_failed", size=len(batch), error=str(exc))
+            self._fail(keys, exc)
+            return
+        except BaseException:
+            # Cancelled (e.g. on shutdown): the keys must leave _inflight, or later
+            # calls for the same texts would wait on futures nothing will resolve.
+            self._fail(keys, RuntimeError("embedding request was cancelled"))
+            raise
+
+        for key, vector in zip(keys, vectors, strict=True):
+            self._cache_put(key, vector)
+            future = self._inflight.pop(key)
+            if not future.done():
+                future.set_result(vector)
+
+    def _fail(self, keys: list[str], exc: BaseException) -> None:
+        for key in keys:
+            future = self._inflight.pop(key)
+            if not future.done():
+                future.set_exception(exc)
+
+    # ------------------------------------------------------------------
+    # Provider call
+    # ------------------------------------------------------------------
+
+    @retry(
+        retry=retry_if_exception(_is_transient),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential_jitter(initial=0.2, max=2.0),
+        reraise=True,
+    )
+    async def _request(self, texts: list[str]) -> list[np.ndarray]:
+        endpoint = self._endpoint
+        headers = {"Authorization": f"Bearer {endpoint.api_key}"} if endpoint.api_key else {}
+        payload: dict[str, object] = {"model": endpoint.model, "input": texts}
+        if self._request_dimension:
+            payload["dimensions"] = self._dimension
+        response = await self._client.post(endpoint.url, json=payload, headers=headers)
+        response.raise_for_status()
+        body = response.json()
+
+        if endpoint.provider == "ollama":
+            raw = body["embeddings"]
+        else:
+            raw = [item["embedding"] for item in sorted(body["data"], key=lambda d: d["index"])]
+        if len(raw) != len(texts):
+            raise ValueError(f"Provider returned {len(raw)} embeddings for {len(texts)} inputs")
+
+        vectors = []
+        for values in raw:
+            if self._dimension is not None and len(values) != self._dimension:
+                raise EmbeddingDimensionMismatch(
+                    f"{endpoint.provider} model {endpoint.model!r} returned "
+                    f"{len(values)}-dimensional embeddings; embedding_dimension is "
+                    f"{self._dimension}"
+                )
+            vector = np.asarray(values, dtype=np.float32)
+            vector.flags.writeable = False
+            vectors.append(vector)
+        return vectors
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _cache_get(self, key: str) -> np.ndarray | None:
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+        return vector
+
+    def _cache_put(self, key: str, vector: np.ndarray) -> None:
+        if self._cache_size == 0:
+            return
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
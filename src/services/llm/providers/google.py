@@ -0,0 +1,63 @@
+"""Streaming chat provider for the Gemini ``streamGenerateContent`` API."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+import httpx
+
+from services.llm.providers.base import ChatMessage, LLMProvider
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+
+class GoogleProvider(LLMProvider):
+    name = "google"
+
+    def __init__(self, model: str, api_key: str, client: httpx.AsyncClient) -> None:
+        self._url = f"{GEMINI_BASE_URL}/{model}:streamGenerateContent"
+        self._params = {"alt": "sse", "key": api_key}
+        self._client = client
+
+    async def stream(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        system = "\n\n".join(m.content for m in messages if m.role == "system")
+        payload: dict[str, Any] = {
+            "contents": [
+                {
+                    "role": "model" if m.role == "assistant" else "user",
+                    "parts": [{"text": m.content}],
+                }
+                for m in messages
+                if m.role != "system"
+            ],
+        }
+        if system:
+            payload["systemInstruction"] = {"parts": [{"text": system}]}
+        config: dict[str, Any] = {}
+        if temperature is not None:
+            config["temperature"] = temperature
+        if max_tokens is not None:
+            config["maxOutputTokens"] = max_tokens
+        if config:
+            payload["generationConfig"] = config
+
+        async with self._client.stream(
+            "POST", self._url, params=self._params, json=payload
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = json.loads(line[len("data:") :])
+                for candidate in chunk.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
@@ -0,0 +1,52 @@
+"""Streaming chat provider for Ollama's ``/api/chat``."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+import httpx
+
+from services.llm.providers.base import ChatMessage, LLMProvider
+
+
+class OllamaProvider(LLMProvider):
+    name = "ollama"
+
+    def __init__(self, base_url: str, model: str, client: httpx.AsyncClient) -> None:
+        self._url = f"{base_url.rstrip('/')}/api/chat"
+        self._model = model
+        self._client = client
+
+    async def stream(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        options: dict[str, Any] = {}
+        if temperature is not None:
+            options["temperature"] = temperature
+        if max_tokens is not None:
+            options["num_predict"] = max_tokens
+        payload: dict[str, Any] = {
+            "model": self._model,
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "stream": True,
+        }
+        if options:
+            payload["options"] = options
+
+        async with self._client.stream("POST", self._url, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    break
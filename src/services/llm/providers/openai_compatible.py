@@ -0,0 +1,94 @@
+"""Streaming chat provider for OpenAI and OpenAI-compatible servers (LM Studio, LocalAI)."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+import httpx
+
+from core.config import LLMSettings
+from services.llm.providers.base import ChatMessage, LLMProvider
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        model: str,
+        api_key: str = "",
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.name = name
+        self._url = f"{base_url.rstrip('/')}/chat/completions"
+        self._model = model
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = client or httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=5.0))
+        self._owns_client = client is None
+
+    def _payload(
+        self,
+        messages: Sequence[ChatMessage],
+        temperature: float | None,
+        max_tokens: int | None,
+    ) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "model": self._model,
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "stream": True,
+        }
+        if temperature is not None:
+            payload["temperature"] = temperature
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        return payload
+
+    async def stream(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        payload = self._payload(messages, temperature, max_tokens)
+        async with self._client.stream(
+            "POST", self._url, json=payload, headers=self._headers
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    yield delta
+
+    async def close(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
+
+
+def create_openai_compatible_provider(
+    settings: LLMSettings, name: str, client: httpx.AsyncClient | None = None
+) -> OpenAICompatibleProvider:
+    """Build the provider for ``openai``, ``lmstudio`` or ``localai``."""
+    if name == "openai":
+        return OpenAICompatibleProvider(
+            name, OPENAI_BASE_URL, settings.openai_model, settings.openai_api_key, client
+        )
+    if name == "lmstudio":
+        return OpenAICompatibleProvider(
+            name, settings.lm_studio_base_url, settings.lm_studio_model, client=client
+        )
+    if name == "localai":
+        return OpenAICompatibleProvider(
+            name, settings.local_ai_base_url, settings.local_ai_model, client=client
+        )
+    raise ValueError(f"{name!r} is not an OpenAI-compatible provider")
@@ -0,0 +1,176 @@
+"""Multi-provider LLM router.
+
+Keeps one long-lived, keep-alive ``httpx.AsyncClient`` per provider and caps
+in-flight requests per provider with a semaphore. A request goes to
+``default_llm_provider`` first and moves down ``llm_fallback_providers`` when a
+provider times out, answers 429, stays unreachable after retries, or has no free
+slot within ``llm_admission_timeout_seconds``. Failover only happens before the
+first token; once a stream has started, errors propagate to the caller.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+import httpx
+import structlog
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+from core.config import LLMSettings
+from services.llm.providers.anthropic import AnthropicProvider
+from services.llm.providers.base import ChatMessage, LLMProvider
+from services.llm.providers.google import GoogleProvider
+from services.llm.providers.ollama import OllamaProvider
+from services.llm.providers.openai_compatible import create_openai_compatible_provider
+
+logger = structlog.get_logger(__name__)
+
+PROVIDERS = ("openai", "anthropic", "google", "ollama", "lmstudio", "localai")
+
+
+class ProviderUnavailable(Exception):
+    """Every configured provider failed or was saturated."""
+
+
+def _should_fail_over(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.TransportError):  # includes timeouts
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+def _should_retry(exc: BaseException) -> bool:
+    """Retry the same provider only for blips; timeouts and 429s fail over at once."""
+    if isinstance(exc, httpx.TimeoutException):
+        return False
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return False
+
+
+def _build_provider(name: str, settings: LLMSettings, client: httpx.AsyncClient) -> LLMProvider:
+    if name == "anthropic":
+        return AnthropicProvider(settings.anthropic_model, settings.anthropic_api_key, client)
+    if name == "google":
+        return GoogleProvider(settings.google_model, settings.google_api_key, client)
+    if name == "ollama":
+        return OllamaProvider(settings.ollama_base_url, settings.ollama_model, client)
+    return create_openai_compatible_provider(settings, name, client)
+
+
+async def _first_delta(
+    provider: LLMProvider, messages: Sequence[ChatMessage], options: dict[str, Any]
+) -> tuple[AsyncIterator[str], str | None]:
+    """Open a stream and wait for its first delta, so failures surface before we commit."""
+    stream = provider.stream(messages, **options)
+    try:
+        return stream, await anext(stream)
+    except StopAsyncIteration:
+        return stream, None
+    except BaseException:
+        await stream.aclose()
+        raise
+
+
+class LLMRouter(LLMProvider):
+    name = "router"
+
+    def __init__(self, settings: LLMSettings) -> None:
+        order = [settings.default_llm_provider, *settings.llm_fallback_providers]
+        unknown = [name for name in order if name not in PROVIDERS]
+        if unknown:
+            raise ValueError(f"Unknown LLM providers: {unknown}")
+        self._order = list(dict.fromkeys(order))
+        self._admission_timeout = settings.llm_admission_timeout_seconds
+        self._max_retries = settings.llm_max_retries
+
+        timeout = httpx.Timeout(
+            settings.llm_request_timeout_seconds, connect=settings.llm_connect_timeout_seconds
+        )
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._providers: dict[str, LLMProvider] = {}
+        for name in PROVIDERS:
+            limit = settings.llm_provider_concurrency.get(name, settings.llm_max_concurrency)
+            self._clients[name] = httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=limit,
+                    max_keepalive_connections=limit,
+                    keepalive_expiry=60.0,
+                ),
+            )
+            self._slots[name] = asyncio.Semaphore(limit)
+            self._providers[name] = _build_provider(name, settings, self._clients[name])
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        """Pooled client for ``name``, for callers such as the embedding service."""
+        return self._clients[name]
+
+    def provider(self, name: str) -> LLMProvider:
+        return self._providers[name]
+
+    async def stream(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        options = {"temperature": temperature, "max_tokens": max_tokens}
+        failures: list[str] = []
+
+        for name in self._order:
+            slot = self._slots[name]
+            try:
+                await asyncio.wait_for(slot.acquire(), timeout=self._admission_timeout)
+            except TimeoutError:
+                failures.append(f"{name}: saturated")
+                logger.warning("llm_router.saturated", provider=name)
+                continue
+
+            try:
+                retrying = AsyncRetrying(
+                    retry=retry_if_exception(_should_retry),
+                    stop=stop_after_attempt(self._max_retries + 1),
+                    wait=wait_exponential_jitter(initial=0.2, max=2.0),
+                    reraise=True,
+                )
+                stream: AsyncIterator[str]
+                first: str | None
+                try:
+                    stream, first = await retrying(
+                        _first_delta, self._providers[name], messages, options
+                    )
+                except Exception as exc:
+                    if not _should_fail_over(exc):
+                        raise
+                    failures.append(f"{name}: {exc!r}")
+                    logger.warning("llm_router.failover", provider=name, error=repr(exc))
+                    continue
+
+                try:
+                    if first is not None:
+                        yield first
+                    async for delta in stream:
+                        yield delta
+                finally:
+                    await stream.aclose()
+                return
+            finally:
+                slot.release()
+
+        raise ProviderUnavailable("; ".join(failures) or "no providers configured")
+
+    async def close(self) -> None:
+        await asyncio.gather(*(client.aclose() for client in self._clients.values()))
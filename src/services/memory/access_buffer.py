@@ -0,0 +1,226 @@
+"""Write-behind buffer for memory access logging and reinforcement.
+
+Retrieval only appends to an in-process list. A background task flushes the list
+every ``access_flush_interval_seconds`` (or sooner once ``access_buffer_max_events``
+is reached) in a single transaction:
+
+1. multi-row INSERT of ``memory_access_log`` rows (``reinforcement_applied = false``)
+2. one statement that claims those rows, flips ``reinforcement_applied`` and applies
+   one aggregated UPDATE per memory to ``access_count``, ``last_accessed_at`` and
+   ``memory_strength``
+
+Both steps commit together, so no log row is ever left unreinforced; claiming
+through ``reinforcement_applied`` only keeps step 2 from touching rows written by
+anything else. The buffer registers itself with ``close_db()`` so pending events
+are flushed on shutdown. A flush that is interrupted puts its unwritten events
+back, and the periodic flush is shielded so that stopping the flusher never
+abandons a batch mid-write. A batch the database rejects outright (an event for
+a memory deleted since it was retrieved, say) is retried one event at a time,
+and the events that are still rejected are dropped rather than requeued forever.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+import structlog
+from sqlalchemy import Update, func, insert, select, update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from background.tasks.memory_decay import current_strength
+from core.config import MemorySettings
+from database.connection import register_shutdown_hook
+from database.models import MemoryAccessLog, MemoryBase
+from models.domain.memory import RetrievedMemory
+
+logger = structlog.get_logger(__name__)
+
+_INSERT_CHUNK = 1000
+
+
+def _utcnow() -> datetime:
+    # Columns are naive DateTime holding UTC.
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+@dataclass(frozen=True, slots=True)
+class AccessEvent:
+    memory_id: int
+    accessed_at: datetime = field(default_factory=_utcnow)
+    retrieval_score: float | None = None
+    access_context: str | None = None
+
+
+def reinforcement_statement(
+    settings: MemorySettings, log_ids: Sequence[int] | None = None
+) -> Update:
+    """Claim unapplied access logs and reinforce their memories in one statement.
+
+    Each claimed access moves strength a ``memory_reinforcement_factor`` share of the
+    way towards 1, so ``n`` accesses collapse to ``1 - (1 - s) * (1 - f) ** n``.
+    Pending lazy decay is folded in first because ``strength_updated_at`` is reset.
+    """
+    claim = (
+        update(MemoryAccessLog)
+        .where(MemoryAccessLog.reinforcement_applied.is_(False))
+        .values(reinforcement_applied=True)
+        .returning(MemoryAccessLog.memory_id, MemoryAccessLog.accessed_at)
+    )
+    if log_ids is not None:
+        claim = claim.where(MemoryAccessLog.id.in_(log_ids))
+    claimed = claim.cte("claimed")
+
+    hits = (
+        select(
+            claimed.c.memory_id,
+            func.count().label("hits"),
+            func.max(claimed.c.accessed_at).label("last_access"),
+        )
+        .group_by(claimed.c.memory_id)
+        .cte("hits")
+    )
+
+    retain = max(0.0, 1.0 - settings.memory_reinforcement_factor)
+    return (
+        update(MemoryBase)
+        .where(MemoryBase.id == hits.c.memory_id)
+        .values(
+            access_count=MemoryBase.access_count + hits.c.hits,
+            last_accessed_at=func.greatest(MemoryBase.last_accessed_at, hits.c.last_access),
+            memory_strength=func.least(
+                1.0, 1.0 - (1.0 - current_strength(settings)) * func.power(retain, hits.c.hits)
+            ),
+            strength_updated_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+class MemoryAccessBuffer:
+    """Coalesces access events in memory and flushes them periodically."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        settings: MemorySettings,
+    ) -> None:
+        self._session_factory = session_factory
+        self._settings = settings
+        self._interval = settings.access_flush_interval_seconds
+        self._max_events = settings.access_buffer_max_events
+        self._pending: list[AccessEvent] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, event: AccessEvent) -> None:
+        self._pending.append(event)
+        if len(self._pending) >= self._max_events:
+            self._wakeup.set()
+
+    def record_retrieval(
+        self, memories: Iterable[RetrievedMemory], access_context: str | None = None
+    ) -> None:
+        """Record one access per retrieved memory."""
+        now = _utcnow()
+        for memory in memories:
+            self.record(
+                AccessEvent(
+                    memory_id=memory.memory_id,
+                    accessed_at=now,
+                    retrieval_score=memory.score,
+                    access_context=access_context,
+                )
+            )
+
+    def start(self) -> None:
+        """Start the periodic flusher and hook the final flush into ``close_db()``."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="memory-access-buffer")
+            register_shutdown_hook(self.close)
+
+    async def close(self) -> None:
+        """Stop the flusher and write out everything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write pending events now. Returns the number of access logs written."""
+        async with self._flush_lock:
+            events, self._pending = self._pending, []
+            if not events:
+                return 0
+            done = written = 0
+            try:
+                try:
+                    async with self._session_factory() as session, session.begin():
+                        await self._write(session, events)
+                    return len(events)
+                except (IntegrityError, DataError):
+                    logger.warning("memory_access_buffer.batch_rejected", events=len(events))
+                # Retrying the whole batch would fail the same way on every tick.
+                for event in events:
+                    try:
+                        async with self._session_factory() as session, session.begin():
+                            await self._write(session, [event])
+                        written += 1
+                    except (IntegrityError, DataError):
+                        logger.warning(
+                            "memory_access_buffer.event_dropped",
+                            memory_id=event.memory_id,
+                            exc_info=True,
+                        )
+                    done += 1
+                return written
+            except BaseException:
+                # Requeue what was not written ahead of newer events (also when
+                # cancelled); the oldest are dropped if over budget.
+                self._pending = (events[done:] + self._pending)[-self._max_events :]
+                logger.exception("memory_access_buffer.flush_failed", events=len(events) - done)
+                raise
+
+    async def _write(self, session: AsyncSession, events: list[AccessEvent]) -> None:
+        log_ids: list[int] = []
+        for start in range(0, len(events), _INSERT_CHUNK):
+            chunk = events[start : start + _INSERT_CHUNK]
+            stmt = (
+                insert(MemoryAccessLog)
+                .values(
+                    [
+                        {
+                            "memory_id": e.memory_id,
+                            "accessed_at": e.accessed_at,
+                            "retrieval_score": e.retrieval_score,
+                            "access_context": e.access_context,
+                            "reinforcement_applied": False,
+                        }
+                        for e in chunk
+                    ]
+                )
+                .returning(MemoryAccessLog.id)
+            )
+            log_ids.extend((await session.scalars(stmt)).all())
+        await session.execute(reinforcement_statement(self._settings, log_ids))
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._interval)
+            self._wakeup.clear()
+            # Failures are logged by flush() and retried on the next tick. The shield
+            # lets close() cancel this loop while a flush finishes writing.
+            with contextlib.suppress(Exception):
+                await asyncio.shield(self.flush())
@@ -0,0 +1,256 @@
+"""Token-budgeted context assembly.
+
+Fills ``max_context_tokens`` from recent messages, retrieved memories, reflections
+and episode summaries in priority order. Token counts are read from
+``memory_base.metadata["token_count"]``; rows written before counts were stored are
+tokenized once and backfilled in a single UPDATE, so assembly cost depends on the
+number of candidates, not on conversation length.
+"""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import Integer, bindparam, func, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import MemorySettings
+from core.utils.tokens import TOKEN_COUNT_KEY, count_tokens
+from database.models import (
+    Episode,
+    EpisodeStatus,
+    MemoryBase,
+    Message,
+    Observation,
+    Reflection,
+)
+from models.domain.memory import RetrievedMemory
+
+RECENT_MESSAGES = "recent_messages"
+MEMORIES = "memories"
+REFLECTIONS = "reflections"
+EPISODES = "episodes"
+
+DEFAULT_PRIORITY: tuple[str, ...] = (RECENT_MESSAGES, MEMORIES, REFLECTIONS, EPISODES)
+
+
+@dataclass(frozen=True, slots=True)
+class ContextItem:
+    section: str
+    memory_id: int
+    content: str
+    tokens: int
+    created_at: datetime
+    sender_id: uuid.UUID | None = None  # set for recent messages
+
+
+@dataclass(slots=True)
+class AssembledContext:
+    budget: int
+    used_tokens: int = 0
+    items: list[ContextItem] = field(default_factory=list)
+
+    def section(self, name: str) -> list[ContextItem]:
+        return [item for item in self.items if item.section == name]
+
+
+@dataclass(slots=True)
+class _Candidate:
+    memory_id: int
+    content: str
+    created_at: datetime
+    tokens: int | None
+    sender_id: uuid.UUID | None = None
+
+
+def _token_count_column():
+    return MemoryBase.metadata_[TOKEN_COUNT_KEY].as_integer().label("tokens")
+
+
+class ContextAssembler:
+    def __init__(
+        self, settings: MemorySettings, priority: Sequence[str] = DEFAULT_PRIORITY
+    ) -> None:
+        self._max_tokens = settings.max_context_tokens
+        self._priority = tuple(priority)
+
+    async def assemble(
+        self,
+        session: AsyncSession,
+        *,
+        owner_id: uuid.UUID,
+        retrieved: Sequence[RetrievedMemory] = (),
+        episode_id: int | None = None,
+        reserved_tokens: int = 0,
+        recent_limit: int = 50,
+        reflection_limit: int = 10,
+        episode_limit: int = 5,
+    ) -> AssembledContext:
+        """Pack the context for one turn.
+
+        Args:
+            owner_id: Character whose memories, reflections and episodes are used.
+            retrieved: Output of the retriever, best first.
+            episode_id: Current episode; its messages are the "recent messages".
+            reserved_tokens: Tokens kept free for the system prompt and the reply.
+        """
+        candidates: dict[str, list[_Candidate]] = {
+            RECENT_MESSAGES: (
+                await self._recent_messages(session, episode_id, recent_limit)
+                if episode_id is not None
+                else []
+            ),
+            MEMORIES: await self._memories(session, [m.memory_id for m in retrieved]),
+            REFLECTIONS: await self._reflections(session, owner_id, reflection_limit),
+            EPISODES: await self._episodes(session, owner_id, episode_id, episode_limit),
+        }
+        await self._backfill_token_counts(session, candidates)
+
+        context = AssembledContext(budget=max(0, self._max_tokens - reserved_tokens))
+        seen: set[int] = set()
+        for section in self._priority:
+            for candidate in candidates.get(section, []):
+                if candidate.memory_id in seen:
+                    continue
+                tokens = candidate.tokens or 0
+                if context.used_tokens + tokens > context.budget:
+                    if section == RECENT_MESSAGES:
+                        break  # keep the recent window contiguous
+                    continue
+                seen.add(candidate.memory_id)
+                context.used_tokens += tokens
+                context.items.append(
+                    ContextItem(
+                        section=section,
+                        memory_id=candidate.memory_id,
+                        content=candidate.content,
+                        tokens=tokens,
+                        created_at=candidate.created_at,
+                        sender_id=candidate.sender_id,
+                    )
+                )
+
+        # Recent messages are fetched newest first; present them chronologically.
+        recent = [item for item in context.items if item.section == RECENT_MESSAGES]
+        others = [item for item in context.items if item.section != RECENT_MESSAGES]
+        context.items = others + recent[::-1]
+        return context
+
+    # ------------------------------------------------------------------
+    # Candidate queries
+    # ------------------------------------------------------------------
+
+    async def _recent_messages(
+        self, session: AsyncSession, episode_id: int, limit: int
+    ) -> list[_Candidate]:
+        stmt = (
+            select(
+                Message.memory_id,
+                Message.content,
+                Message.created_at,
+                _token_count_column(),
+                Message.sender_id,
+            )
+            .join(MemoryBase, MemoryBase.id == Message.memory_id)
+            .where(Message.episode_id == episode_id)
+            # A turn's two messages share created_at (one transaction); memory_id is
+            # assigned in insert order, unlike the random Message.id.
+            .order_by(Message.created_at.desc(), Message.memory_id.desc())
+            .limit(limit)
+        )
+        return [_Candidate(*row) for row in (await session.execute(stmt)).all()]
+
+    async def _memories(self, session: AsyncSession, memory_ids: list[int]) -> list[_Candidate]:
+        if not memory_ids:
+            return []
+        content = func.coalesce(
+            Message.content, Observation.content, Episode.summary, Reflection.content
+        )
+        stmt = (
+            select(MemoryBase.id, content, MemoryBase.created_at, _token_count_column())
+            .outerjoin(Message, Message.memory_id == MemoryBase.id)
+            .outerjoin(Observation, Observation.memory_id == MemoryBase.id)
+            .outerjoin(Episode, Episode.memory_id == MemoryBase.id)
+            .outerjoin(Reflection, Reflection.memory_id == MemoryBase.id)
+            .where(MemoryBase.id.in_(memory_ids))
+        )
+        by_id: dict[int, _Candidate] = {}
+        for row in (await session.execute(stmt)).all():
+            if row[1] is not None:
+                by_id.setdefault(row[0], _Candidate(*row))
+        # Preserve retrieval ranking.
+        return [by_id[i] for i in memory_ids if i in by_id]
+
+    async def _reflections(
+        self, session: AsyncSession, owner_id: uuid.UUID, limit: int
+    ) -> list[_Candidate]:
+        stmt = (
+            select(
+                Reflection.memory_id,
+                Reflection.content,
+                Reflection.created_at,
+                _token_count_column(),
+            )
+            .join(MemoryBase, MemoryBase.id == Reflection.memory_id)
+            .where(MemoryBase.owner_id == owner_id, MemoryBase.memory_type == "reflection")
+            .order_by(MemoryBase.created_at.desc())
+            .limit(limit)
+        )
+        return [_Candidate(*row) for row in (await session.execute(stmt)).all()]
+
+    async def _episodes(
+        self,
+        session: AsyncSession,
+        owner_id: uuid.UUID,
+        current_episode_id: int | None,
+        limit: int,
+    ) -> list[_Candidate]:
+        stmt = (
+            select(Episode.memory_id, Episode.summary, Episode.created_at, _token_count_column())
+            .join(MemoryBase, MemoryBase.id == Episode.memory_id)
+            .where(
+                MemoryBase.owner_id == owner_id,
+                MemoryBase.memory_type == "episode",
+                Episode.status == EpisodeStatus.COMPLETED,
+                Episode.summary != "",  # closed but not summarized yet
+            )
+            .order_by(MemoryBase.created_at.desc())
+            .limit(limit)
+        )
+        if current_episode_id is not None:
+            stmt = stmt.where(Episode.id != current_episode_id)
+        return [_Candidate(*row) for row in (await session.execute(stmt)).all()]
+
+    # ------------------------------------------------------------------
+    # Token counts
+    # ------------------------------------------------------------------
+
+    async def _backfill_token_counts(
+        self, session: AsyncSession, candidates: dict[str, list[_Candidate]]
+    ) -> None:
+        """Tokenize rows without a stored count once and persist the counts."""
+        missing: dict[int, int] = {}
+        for section in candidates.values():
+            for candidate in section:
+                if candidate.tokens is None:
+                    candidate.tokens = missing.get(candidate.memory_id) or count_tokens(
+                        candidate.content
+                    )
+                    missing[candidate.memory_id] = candidate.tokens
+        if not missing:
+            return
+
+        table = MemoryBase.__table__
+        metadata = table.c["metadata"]
+        token_entry = func.jsonb_build_object(TOKEN_COUNT_KEY, bindparam("b_tokens", type_=Integer))
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values({metadata: func.coalesce(metadata, literal({}, JSONB)).op("||")(token_entry)})
+        )
+        params = [{"b_id": memory_id, "b_tokens": tokens} for memory_id, tokens in missing.items()]
+        await session.execute(stmt, params)
@@ -0,0 +1,379 @@
+"""Memory-mapped embedding cache shared by all worker processes on a host.
+
+Each cached owner is stored as two append-only files in ``embedding_cache_dir``:
+
+- ``<owner_id>.vec``: contiguous float32 matrix of unit-normalised embeddings
+- ``<owner_id>.ids``: int64 ``memory_base.id`` for each matrix row
+
+Workers map the files read-only, so the matrices live once in the page cache no
+matter how many uvicorn workers are running. A ``flock`` on ``.lock`` serialises
+writers against readers that are (re)mapping. Least-recently-used owners, tracked
+by file mtime, are evicted once the directory exceeds ``embedding_cache_max_bytes``.
+
+Loading an owner takes a database snapshot and then writes it out, and rows
+appended in between would otherwise be lost. Before querying, a load writes
+``<owner_id>.loading`` with a fresh token. Appends that find the marker go to
+``<owner_id>.pending.{vec,ids}``, which the load merges when it stores the
+snapshot. A load whose token is gone (replaced by a concurrent load or removed
+by :meth:`EmbeddingCache.invalidate`) does not store its snapshot. Callers append
+only after their rows have committed (see ``MemoryStore``), so every row is
+either in the snapshot or appended after the marker exists.
+
+``flock`` blocks, so the async entry points run file work in a thread. Each
+worker drops its mappings of files that were replaced or evicted, and keeps at
+most ``embedding_cache_max_bytes`` of its own mappings. Without that, the page
+cache would pin unlinked files for as long as the worker holds their maps.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import os
+import threading
+import uuid
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import MemorySettings
+from database.models import MemoryBase
+
+_ID_DTYPE = np.dtype("<i8")
+_VEC_DTYPE = np.dtype("<f4")
+
+
+@dataclass(frozen=True, slots=True)
+class OwnerEmbeddings:
+    """Read-only view of one owner's cached embeddings."""
+
+    ids: np.ndarray  # (n,) int64
+    matrix: np.ndarray  # (n, dim) float32, rows are unit length
+
+
+@dataclass(slots=True)
+class _Mapping:
+    inode: int
+    rows: int
+    view: OwnerEmbeddings
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype=_VEC_DTYPE)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class EmbeddingCache:
+    """LRU cache of per-owner embedding matrices backed by shared memory-mapped files."""
+
+    def __init__(self, settings: MemorySettings) -> None:
+        self._dir = Path(settings.embedding_cache_dir)
+        self._dim = settings.embedding_dimension
+        self._max_bytes = settings.embedding_cache_max_bytes
+        self._row_bytes = self._dim * _VEC_DTYPE.itemsize
+        # Insertion order is recency order: hits move an owner to the end.
+        self._mappings: dict[uuid.UUID, _Mapping] = {}
+        self._mappings_lock = threading.Lock()
+        self._lock_path = self._dir / ".lock"
+        if self.enabled:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            self._lock_path.touch(exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_bytes > 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get(self, session: AsyncSession, owner_id: uuid.UUID) -> OwnerEmbeddings:
+        """Return the owner's embeddings, loading them from the database on a miss."""
+        view = await asyncio.to_thread(self.peek, owner_id)
+        if view is not None:
+            return view
+        token = None
+        if self.enabled:
+            view, token = await asyncio.to_thread(self._begin_load, owner_id)
+            if view is not None:
+                return view
+
+        stmt = (
+            select(MemoryBase.id, MemoryBase.embedding)
+            .where(MemoryBase.owner_id == owner_id, MemoryBase.embedding.is_not(None))
+            .order_by(MemoryBase.id)
+        )
+        rows = (await session.execute(stmt)).all()
+        ids = np.fromiter((r.id for r in rows), _ID_DTYPE, len(rows))
+        matrix = (
+            np.vstack([np.asarray(r.embedding, dtype=_VEC_DTYPE) for r in rows])
+            if rows
+            else np.empty((0, self._dim), dtype=_VEC_DTYPE)
+        )
+        if token is None:
+            return OwnerEmbeddings(ids=ids, matrix=_normalise(matrix))
+
+        view = await asyncio.to_thread(self._store, owner_id, ids, matrix, token)
+        return view if view is not None else OwnerEmbeddings(ids=ids, matrix=_normalise(matrix))
+
+    def peek(self, owner_id: uuid.UUID) -> OwnerEmbeddings | None:
+        """Return the cached view without touching the database, or ``None`` on a miss.
+
+        Blocks on the cache lock; call it from a thread when on the event loop.
+        """
+        if not self.enabled:
+            return None
+        with self._locked(fcntl.LOCK_SH):
+            return self._map(owner_id)
+
+    async def search(
+        self,
+        session: AsyncSession,
+        owner_id: uuid.UUID,
+        query_embedding: Sequence[float] | np.ndarray,
+        k: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Exact cosine search over the owner's cached matrix.
+
+        Returns:
+            ``(ids, similarity)`` for the top ``k`` rows, best first.
+        """
+        view = await self.get(session, owner_id)
+        if view.ids.size == 0:
+            return view.ids, np.empty(0, dtype=_VEC_DTYPE)
+
+        query = _normalise(np.asarray(query_embedding, dtype=_VEC_DTYPE).reshape(1, -1))[0]
+        similarity = view.matrix @ query
+        if k >= similarity.size:
+            order = np.argsort(-similarity, kind="stable")
+        else:
+            part = np.argpartition(-similarity, k - 1)[:k]
+            order = part[np.argsort(-similarity[part], kind="stable")]
+        return view.ids[order], similarity[order]
+
+    def append(
+        self,
+        owner_id: uuid.UUID,
+        ids: Sequence[int] | np.ndarray,
+        embeddings: Sequence[Sequence[float]] | np.ndarray,
+    ) -> None:
+        """Append committed memory_base rows to a cached or loading owner.
+
+        Other owners are ignored; they are loaded in full on next use. Rows the
+        cache already holds are skipped. Blocks on the cache lock, like :meth:`peek`.
+        """
+        if not self.enabled or len(ids) == 0:
+            return
+        ids_arr = np.asarray(ids, dtype=_ID_DTYPE)
+        matrix = _normalise(np.asarray(embeddings, dtype=_VEC_DTYPE).reshape(len(ids_arr), -1))
+
+        vec_path, ids_path = self._paths(owner_id)
+        with self._locked(fcntl.LOCK_EX):
+            if ids_path.exists() and vec_path.exists():
+                # A load may already have picked these rows up from the database.
+                rows = self._consistent_rows(vec_path, ids_path)
+                cached = np.fromfile(ids_path, dtype=_ID_DTYPE, count=rows)
+                fresh = ~np.isin(ids_arr, cached)
+                self._append_rows(vec_path, ids_path, ids_arr[fresh], matrix[fresh])
+            elif self._marker(owner_id).exists():
+                self._append_rows(*self._pending_paths(owner_id), ids_arr, matrix)
+
+    def invalidate(self, owner_id: uuid.UUID) -> None:
+        """Remove an owner from the cache on every worker. Blocks, like :meth:`peek`.
+
+        A load already in progress for the owner is abandoned, since its snapshot
+        may predate whatever made the caller invalidate.
+        """
+        if not self.enabled:
+            return
+        with self._mappings_lock:
+            self._mappings.pop(owner_id, None)
+        with self._locked(fcntl.LOCK_EX):
+            for path in (*self._paths(owner_id), *self._pending_paths(owner_id)):
+                path.unlink(missing_ok=True)
+            self._marker(owner_id).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self, mode: int) -> Iterator[None]:
+        with self._lock_path.open("rb") as fh:
+            fcntl.flock(fh, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _paths(self, owner_id: uuid.UUID) -> tuple[Path, Path]:
+        return self._dir / f"{owner_id}.vec", self._dir / f"{owner_id}.ids"
+
+    def _pending_paths(self, owner_id: uuid.UUID) -> tuple[Path, Path]:
+        return self._dir / f"{owner_id}.pending.vec", self._dir / f"{owner_id}.pending.ids"
+
+    def _marker(self, owner_id: uuid.UUID) -> Path:
+        return self._dir / f"{owner_id}.loading"
+
+    def _append_rows(
+        self, vec_path: Path, ids_path: Path, ids: np.ndarray, matrix: np.ndarray
+    ) -> None:
+        """Append rows to a pair of files. Caller holds the lock."""
+        if ids.size == 0:
+            return
+        if vec_path.exists() and ids_path.exists():
+            rows = self._consistent_rows(vec_path, ids_path)
+            # Drop any half-written tail left by a crashed writer before appending.
+            os.truncate(vec_path, rows * self._row_bytes)
+            os.truncate(ids_path, rows * _ID_DTYPE.itemsize)
+        else:
+            vec_path.unlink(missing_ok=True)
+            ids_path.unlink(missing_ok=True)
+        with vec_path.open("ab") as fh:
+            fh.write(matrix.tobytes())
+        with ids_path.open("ab") as fh:
+            fh.write(ids.tobytes())
+
+    def _begin_load(self, owner_id: uuid.UUID) -> tuple[OwnerEmbeddings | None, str | None]:
+        """Return the owner's view if another load stored it; otherwise mark a load started."""
+        with self._locked(fcntl.LOCK_EX):
+            view = self._map(owner_id)
+            if view is not None:
+                return view, None
+            token = uuid.uuid4().hex
+            self._marker(owner_id).write_text(token)
+            return None, token
+
+    def _consistent_rows(self, vec_path: Path, ids_path: Path) -> int:
+        return min(
+            vec_path.stat().st_size // self._row_bytes,
+            ids_path.stat().st_size // _ID_DTYPE.itemsize,
+        )
+
+    def _map(self, owner_id: uuid.UUID) -> OwnerEmbeddings | None:
+        """(Re)map an owner's files if they changed since the last call. Caller holds the lock."""
+        with self._mappings_lock:
+            return self._map_locked(owner_id)
+
+    def _map_locked(self, owner_id: uuid.UUID) -> OwnerEmbeddings | None:
+        vec_path, ids_path = self._paths(owner_id)
+        try:
+            inode = ids_path.stat().st_ino
+            rows = self._consistent_rows(vec_path, ids_path)
+        except FileNotFoundError:
+            self._mappings.pop(owner_id, None)
+            return None
+
+        os.utime(ids_path)  # LRU bookkeeping shared across workers
+        current = self._mappings.pop(owner_id, None)
+        if current is not None and current.inode == inode and current.rows == rows:
+            self._mappings[owner_id] = current
+            return current.view
+
+        if rows == 0:
+            view = OwnerEmbeddings(
+                ids=np.empty(0, dtype=_ID_DTYPE),
+                matrix=np.empty((0, self._dim), dtype=_VEC_DTYPE),
+            )
+        else:
+            view = OwnerEmbeddings(
+                ids=np.memmap(ids_path, dtype=_ID_DTYPE, mode="r", shape=(rows,)),
+                matrix=np.memmap(vec_path, dtype=_VEC_DTYPE, mode="r", shape=(rows, self._dim)),
+            )
+        self._mappings[owner_id] = _Mapping(inode=inode, rows=rows, view=view)
+        self._prune_mappings()
+        return view
+
+    def _prune_mappings(self) -> None:
+        """Unmap replaced or evicted files and trim to the byte budget, oldest first."""
+        mapped_bytes = 0
+        for owner_id, mapping in list(self._mappings.items()):
+            try:
+                current = self._paths(owner_id)[1].stat().st_ino == mapping.inode
+            except FileNotFoundError:
+                current = False
+            if current:
+                mapped_bytes += mapping.rows * (self._row_bytes + _ID_DTYPE.itemsize)
+            else:
+                del self._mappings[owner_id]
+        for owner_id, mapping in list(self._mappings.items())[:-1]:
+            if mapped_bytes <= self._max_bytes:
+                break
+            del self._mappings[owner_id]
+            mapped_bytes -= mapping.rows * (self._row_bytes + _ID_DTYPE.itemsize)
+
+    def _store(
+        self, owner_id: uuid.UUID, ids: np.ndarray, matrix: np.ndarray, token: str
+    ) -> OwnerEmbeddings | None:
+        """Write a full owner snapshot atomically, evict down to the byte budget and map it.
+
+        Rows appended while the snapshot was loading are merged in. Returns ``None``
+        without storing if the load was superseded or invalidated.
+        """
+        vec_path, ids_path = self._paths(owner_id)
+        vec_tmp = vec_path.with_suffix(f".vec.{os.getpid()}.tmp")
+        ids_tmp = ids_path.with_suffix(f".ids.{os.getpid()}.tmp")
+        ids = ids.astype(_ID_DTYPE, copy=False)
+        vec_tmp.write_bytes(_normalise(matrix).tobytes())
+        ids_tmp.write_bytes(ids.tobytes())
+
+        marker = self._marker(owner_id)
+        pending_vec, pending_ids = self._pending_paths(owner_id)
+        with self._locked(fcntl.LOCK_EX):
+            try:
+                current = marker.read_text()
+            except FileNotFoundError:
+                current = None
+            if current != token:
+                vec_tmp.unlink(missing_ok=True)
+                ids_tmp.unlink(missing_ok=True)
+                return None
+            if pending_ids.exists() and pending_vec.exists():
+                rows = self._consistent_rows(pending_vec, pending_ids)
+                appended_ids = np.fromfile(pending_ids, dtype=_ID_DTYPE, count=rows)
+                appended = np.fromfile(pending_vec, dtype=_VEC_DTYPE, count=rows * self._dim)
+                fresh = ~np.isin(appended_ids, ids)
+                self._append_rows(
+                    vec_tmp,
+                    ids_tmp,
+                    appended_ids[fresh],
+                    appended.reshape(rows, self._dim)[fresh],
+                )
+            os.replace(vec_tmp, vec_path)
+            os.replace(ids_tmp, ids_path)
+            pending_vec.unlink(missing_ok=True)
+            pending_ids.unlink(missing_ok=True)
+            marker.unlink()
+            self._evict(keep=owner_id)
+            return self._map(owner_id)
+
+    def _evict(self, keep: uuid.UUID) -> None:
+        """Delete least-recently-used owners until under budget. Caller holds the lock."""
+        owners: list[tuple[float, int, str]] = []
+        total = 0
+        for ids_path in self._dir.glob("*.ids"):
+            if ids_path.stem.endswith(".pending"):
+                continue  # belongs to a load in progress
+            vec_path = ids_path.with_suffix(".vec")
+            try:
+                size = ids_path.stat().st_size + vec_path.stat().st_size
+                mtime = ids_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            total += size
+            if ids_path.stem != str(keep):
+                owners.append((mtime, size, ids_path.stem))
+
+        owners.sort()
+        for _, size, stem in owners:
+            if total <= self._max_bytes:
+                break
+            (self._dir / f"{stem}.vec").unlink(missing_ok=True)
+            (self._dir / f"{stem}.ids").unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,57 @@
+"""LLM episode summarizer for :class:`~services.memory.episodes.EpisodeSegmenter`."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+
+import structlog
+
+from models.domain.episode import EpisodeSummary
+from services.llm.prompts.episode import episode_summary_messages
+from services.llm.providers.base import ChatMessage, LLMProvider
+
+logger = structlog.get_logger(__name__)
+
+EPISODE_SUMMARY_MAX_TOKENS = 400
+
+
+def _text(value: object) -> str | None:
+    if not isinstance(value, str):
+        return None
+    return value.strip() or None
+
+
+class LLMEpisodeSummarizer:
+    """Extends an episode summary from the messages since the last pass.
+
+    A reply that is not the expected JSON object is kept as the summary text, so
+    the episode still becomes visible to context assembly.
+    """
+
+    def __init__(self, provider: LLMProvider) -> None:
+        self._provider = provider
+
+    async def __call__(
+        self, current: EpisodeSummary | None, messages: Sequence[ChatMessage], final: bool
+    ) -> EpisodeSummary:
+        answer = await self._provider.complete(
+            episode_summary_messages(current, messages, final),
+            max_tokens=EPISODE_SUMMARY_MAX_TOKENS,
+        )
+        try:
+            fields = json.loads(answer.strip().removeprefix("```json").strip("`\n "))
+        except ValueError:
+            fields = None
+        if not isinstance(fields, dict) or not _text(fields.get("summary")):
+            logger.warning("episode_summary.unparsable", answer=answer[:50])
+            fields = {"summary": answer}
+
+        previous = current or EpisodeSummary(title="", summary="")
+        return EpisodeSummary(
+            title=_text(fields.get("title")) or previous.title,
+            summary=_text(fields.get("summary")) or previous.summary,
+            purpose=_text(fields.get("purpose")) or previous.purpose,
+            turning_point=_text(fields.get("turning_point")) or previous.turning_point,
+            conclusion=_text(fields.get("conclusion")) or previous.conclusion,
+        )
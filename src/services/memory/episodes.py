@@ -0,0 +1,390 @@
+"""Streaming episode segmentation.
+
+Each (character, user) pair has at most one ONGOING episode. Its running centroid
+is the mean of the unit-normalised message embeddings, and it is stored as the
+episode's ``memory_base.embedding``. That way retrieval can match the episode as
+a whole while it is still open. For every turn, :meth:`EpisodeSegmenter.observe`
+does the following:
+
+1. locks the pair and reads the ongoing episode and its centroid (one row)
+2. closes the episode when the turn is ``episode_idle_minutes`` after the last
+   message, when the episode reached ``episode_max_messages``, or when the
+   turn's opening message is further than ``episode_drift_threshold`` (cosine
+   distance) from the centroid once the episode has ``episode_min_messages``
+3. folds the turn's embeddings into the centroid of the surviving or new episode
+
+The cost is constant per turn: no earlier message is re-read. Summaries are
+extended incrementally. Every ``episode_summary_every_messages`` new messages,
+and once when the episode closes, a queued job passes the current summary and
+only the messages since the last summary to the summarizer.
+"""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Awaitable, Callable, Sequence
+from datetime import timedelta
+
+import numpy as np
+import structlog
+from sqlalchemy import Row, exists, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from background.queue import TaskQueue
+from core.config import MemorySettings
+from core.utils.tokens import TOKEN_COUNT_KEY, count_tokens
+from database.models import Episode, EpisodeStatus, MemoryBase, Message
+from models.domain.episode import EpisodeAssignment, EpisodeSummary
+from services.emotion.state import CharacterStateCache
+from services.llm.providers.base import ChatMessage
+from services.memory.store import MemoryStore
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_EPISODE_IMPORTANCE = 0.5
+
+# Transaction-level advisory lock namespace for (character, user) pairs ("EPS").
+_LOCK_NAMESPACE = 0x455053
+
+# Extends ``current`` (None for a new episode) with ``messages``; ``final`` is set
+# once the episode has closed and a conclusion is wanted.
+EpisodeSummarizer = Callable[
+    [EpisodeSummary | None, Sequence[ChatMessage], bool], Awaitable[EpisodeSummary]
+]
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def cosine_drift(centroid: np.ndarray, vector: np.ndarray) -> float:
+    """Cosine distance between a centroid and a unit vector."""
+    norm = float(np.linalg.norm(centroid))
+    if norm == 0.0:
+        return 0.0
+    return 1.0 - float(centroid @ vector) / norm
+
+
+class EpisodeSegmenter:
+    def __init__(
+        self,
+        settings: MemorySettings,
+        store: MemoryStore,
+        *,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+        queue: TaskQueue | None = None,
+        summarizer: EpisodeSummarizer | None = None,
+        character_states: CharacterStateCache | None = None,
+    ) -> None:
+        self._drift_threshold = settings.episode_drift_threshold
+        self._min_messages = settings.episode_min_messages
+        self._max_messages = settings.episode_max_messages
+        self._idle = timedelta(minutes=settings.episode_idle_minutes)
+        self._summary_every = settings.episode_summary_every_messages
+        self._store = store
+        self._session_factory = session_factory
+        self._queue = queue
+        self._summarizer = summarizer
+        self._character_states = character_states
+
+    async def current(
+        self, session: AsyncSession, character_id: uuid.UUID, user_id: uuid.UUID
+    ) -> int | None:
+        """The pair's ongoing episode id (``episode_ongoing_pair_idx``)."""
+        return await session.scalar(
+            select(Episode.id).where(
+                Episode.character_id == character_id,
+                Episode.user_id == user_id,
+                Episode.status == EpisodeStatus.ONGOING,
+            )
+        )
+
+    async def observe(
+        self,
+        session: AsyncSession,
+        *,
+        character_id: uuid.UUID,
+        user_id: uuid.UUID,
+        embeddings: np.ndarray,
+    ) -> EpisodeAssignment:
+        """Assign a turn's messages to an episode, closing the ongoing one if needed.
+
+        ``embeddings`` holds one row per message in the turn, opening message first;
+        the opening message decides whether the turn starts a new episode. The
+        caller owns the transaction and attaches the messages to the returned
+        episode.
+        """
+        vectors = _unit(np.asarray(embeddings, dtype=np.float64).reshape(len(embeddings), -1))
+        pair = f"{character_id}:{user_id}"
+        await session.execute(
+            select(func.pg_advisory_xact_lock(_LOCK_NAMESPACE, func.hashtext(pair)))
+        )
+        ongoing = (
+            await session.execute(
+                select(
+                    Episode.id,
+                    Episode.memory_id,
+                    Episode.message_count,
+                    Episode.summarized_count,
+                    MemoryBase.embedding,
+                    (func.now() - Episode.last_message_at > self._idle).label("idle"),
+                )
+                .join(MemoryBase, MemoryBase.id == Episode.memory_id)
+                .where(
+                    Episode.character_id == character_id,
+                    Episode.user_id == user_id,
+                    Episode.status == EpisodeStatus.ONGOING,
+                )
+                # Row lock so close_idle() re-checks last_message_at after this turn.
+                .with_for_update(of=Episode)
+            )
+        ).one_or_none()
+
+        closed_id: int | None = None
+        if ongoing is not None:
+            reason = self._close_reason(ongoing, vectors[0])
+            if reason is not None:
+                await session.execute(
+                    update(Episode)
+                    .where(Episode.id == ongoing.id)
+                    .values(status=EpisodeStatus.COMPLETED)
+                )
+                logger.info(
+                    "episode.closed",
+                    episode_id=ongoing.id,
+                    reason=reason,
+                    messages=ongoing.message_count,
+                )
+                closed_id, ongoing = ongoing.id, None
+
+        if ongoing is None:
+            # The centroid is written separately so the shared embedding cache never
+            # holds a vector that the next turn will move.
+            stored = await self._store.insert(
+                session,
+                owner_id=character_id,
+                memory_type="episode",
+                importance_score=DEFAULT_EPISODE_IMPORTANCE,
+            )
+            episode_id = await session.scalar(
+                insert(Episode)
+                .values(
+                    memory_id=stored.memory_id,
+                    title="",
+                    summary="",
+                    character_id=character_id,
+                    user_id=user_id,
+                    status=EpisodeStatus.ONGOING,
+                    message_count=0,
+                    summarized_count=0,
+                )
+                .returning(Episode.id)
+            )
+            memory_id, count, summarized = stored.memory_id, 0, 0
+            centroid = np.zeros(vectors.shape[1])
+        else:
+            episode_id, memory_id = ongoing.id, ongoing.memory_id
+            count, summarized = ongoing.message_count, ongoing.summarized_count
+            centroid = (
+                np.asarray(ongoing.embedding, dtype=np.float64)
+                if ongoing.embedding is not None
+                else np.zeros(vectors.shape[1])
+            )
+
+        total = count + len(vectors)
+        centroid = (centroid * count + vectors.sum(axis=0)) / total
+        await session.execute(
+            update(MemoryBase).where(MemoryBase.id == memory_id).values(embedding=centroid)
+        )
+        await session.execute(
+            update(Episode)
+            .where(Episode.id == episode_id)
+            .values(message_count=total, last_message_at=func.now())
+        )
+        return EpisodeAssignment(
+            episode_id=episode_id,
+            closed_episode_id=closed_id,
+            summary_due=total - summarized >= self._summary_every,
+        )
+
+    def _close_reason(self, ongoing, opening: np.ndarray) -> str | None:
+        if ongoing.idle:
+            return "idle"
+        if ongoing.message_count >= self._max_messages:
+            return "size"
+        if ongoing.message_count >= self._min_messages and ongoing.embedding is not None:
+            drift = cosine_drift(np.asarray(ongoing.embedding, dtype=np.float64), opening)
+            if drift > self._drift_threshold:
+                return "drift"
+        return None
+
+    # ------------------------------------------------------------------
+    # After commit
+    # ------------------------------------------------------------------
+
+    async def committed(self, character_id: uuid.UUID, assignment: EpisodeAssignment) -> None:
+        """Queue summaries and release state once the turn's transaction has committed."""
+        if assignment.summary_due:
+            self.schedule_summary(assignment.episode_id)
+        if assignment.closed_episode_id is not None:
+            await self._episode_ended(character_id, assignment.closed_episode_id)
+
+    async def close_idle(self) -> int:
+        """Close every episode idle for longer than ``episode_idle_minutes``.
+
+        Turns close idle episodes as they arrive; this catches pairs that never
+        come back. Meant to run periodically.
+        """
+        if self._session_factory is None:
+            raise RuntimeError("close_idle() needs a session factory")
+        async with self._session_factory() as session, session.begin():
+            closed = (
+                await session.execute(
+                    update(Episode)
+                    .where(
+                        Episode.status == EpisodeStatus.ONGOING,
+                        Episode.last_message_at < func.now() - self._idle,
+                    )
+                    .values(status=EpisodeStatus.COMPLETED)
+                    .returning(Episode.id, Episode.character_id)
+                )
+            ).all()
+        for episode_id, character_id in closed:
+            await self._episode_ended(character_id, episode_id)
+        if closed:
+            logger.info("episode.closed_idle", episodes=len(closed))
+        return len(closed)
+
+    async def _episode_ended(self, character_id: uuid.UUID | None, episode_id: int) -> None:
+        self.schedule_summary(episode_id)
+        if (
+            self._character_states is not None
+            and self._session_factory is not None
+            and character_id is not None
+        ):
+            # A character talks to many users; its state stays owned while any of
+            # its episodes is still going.
+            async with self._session_factory() as session:
+                active = await session.scalar(
+                    select(
+                        exists().where(
+                            Episode.character_id == character_id,
+                            Episode.status == EpisodeStatus.ONGOING,
+                        )
+                    )
+                )
+            if not active:
+                await self._character_states.release(character_id)
+
+    # ------------------------------------------------------------------
+    # Incremental summaries
+    # ------------------------------------------------------------------
+
+    def schedule_summary(self, episode_id: int) -> bool:
+        """Queue a summary update; it is the final one if the episode has closed by then."""
+        if self._summarizer is None or self._queue is None or self._session_factory is None:
+            return False
+        return self._queue.submit(
+            lambda: self._summarize(episode_id), key=f"episode-summary:{episode_id}"
+        )
+
+    async def _summarize(self, episode_id: int) -> None:
+        # An episode that closes while a partial update runs is finished here, since
+        # its own job is collapsed into this one by the queue key.
+        assert self._session_factory is not None
+        if not await self._summarize_once(episode_id):
+            async with self._session_factory() as session:
+                status = await session.scalar(
+                    select(Episode.status).where(Episode.id == episode_id)
+                )
+            if status == EpisodeStatus.COMPLETED:
+                await self._summarize_once(episode_id)
+
+    async def _summarize_once(self, episode_id: int) -> bool:
+        """Extend the summary with unsummarized messages; True if it was the final pass."""
+        assert self._summarizer is not None and self._session_factory is not None
+        async with self._session_factory() as session:
+            # One snapshot for the counters and the messages they describe.
+            await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            episode = (
+                await session.execute(
+                    select(
+                        Episode.memory_id,
+                        Episode.title,
+                        Episode.summary,
+                        Episode.purpose,
+                        Episode.turning_point,
+                        Episode.conclusion,
+                        Episode.character_id,
+                        Episode.message_count,
+                        Episode.summarized_count,
+                        Episode.status,
+                    ).where(Episode.id == episode_id)
+                )
+            ).one()
+            # Messages beyond a few batches back are skipped rather than re-read if
+            # summaries fell behind.
+            pending = min(episode.message_count - episode.summarized_count, 4 * self._summary_every)
+            rows: Sequence[Row[uuid.UUID, str]] = ()
+            if pending > 0:
+                rows = (
+                    await session.execute(
+                        select(Message.sender_id, Message.content)
+                        .where(Message.episode_id == episode_id)
+                        .order_by(Message.created_at.desc(), Message.memory_id.desc())
+                        .limit(pending)
+                    )
+                ).all()
+        final = episode.status == EpisodeStatus.COMPLETED
+        if not rows and not final:
+            return False
+
+        current = (
+            EpisodeSummary(
+                title=episode.title,
+                summary=episode.summary,
+                purpose=episode.purpose,
+                turning_point=episode.turning_point,
+                conclusion=episode.conclusion,
+            )
+            if episode.summary
+            else None
+        )
+        messages = [
+            ChatMessage(
+                role="assistant" if sender_id == episode.character_id else "user",
+                content=content,
+            )
+            for sender_id, content in reversed(rows)
+        ]
+        result = await self._summarizer(current, messages, final)
+
+        async with self._session_factory() as session, session.begin():
+            await session.execute(
+                update(Episode)
+                .where(Episode.id == episode_id)
+                .values(
+                    title=result.title,
+                    summary=result.summary,
+                    purpose=result.purpose,
+                    turning_point=result.turning_point,
+                    conclusion=result.conclusion,
+                    summarized_count=func.greatest(Episode.summarized_count, episode.message_count),
+                )
+            )
+            metadata = MemoryBase.metadata_
+            await session.execute(
+                update(MemoryBase)
+                .where(MemoryBase.id == episode.memory_id)
+                .values(
+                    metadata_=func.coalesce(metadata, literal({}, JSONB)).op("||")(
+                        func.jsonb_build_object(TOKEN_COUNT_KEY, count_tokens(result.summary))
+                    )
+                )
+            )
+        logger.info(
+            "episode.summarized", episode_id=episode_id, messages=len(messages), final=final
+        )
+        return final
@@ -0,0 +1,32 @@
+"""LLM importance scoring for new memories, served through the response cache."""
+
+from __future__ import annotations
+
+import re
+
+import structlog
+
+from services.llm.cache import CachedLLM
+from services.llm.prompts.importance import IMPORTANCE_TEMPLATE_ID, importance_messages
+
+logger = structlog.get_logger(__name__)
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+class LLMImportanceScorer:
+    """Maps the model's 1-10 rating onto ``importance_score`` in [0, 1]."""
+
+    def __init__(self, llm: CachedLLM, default: float = 0.3) -> None:
+        self._llm = llm
+        self._default = default
+
+    async def __call__(self, text: str) -> float:
+        answer = await self._llm.complete(
+            IMPORTANCE_TEMPLATE_ID, text, importance_messages(text), max_tokens=4
+        )
+        match = _NUMBER.search(answer)
+        if match is None:
+            logger.warning("importance.unparsable", answer=answer[:50])
+            return self._default
+        return min(max((float(match.group()) - 1.0) / 9.0, 0.0), 1.0)
@@ -0,0 +1,110 @@
+"""Reflection hierarchy queries over ``reflection_closure``.
+
+Each function below is a single query against the closure table (migration
+0012), whatever the depth of the hierarchy, instead of loading ``parent`` /
+``children`` one level at a time. Depth is the shortest path length: 1 for a
+direct parent, child or cited reflection.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import case, func, literal, or_, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import MemoryBase, Reflection, ReflectionClosure, ReflectionSource
+
+
+@dataclass(frozen=True, slots=True)
+class RelatedReflection:
+    reflection_id: int
+    memory_id: int
+    content: str
+    depth: int
+
+
+@dataclass(frozen=True, slots=True)
+class Lineage:
+    reflection_id: int
+    ancestors: list[RelatedReflection]  # higher-order reflections built on this one
+    descendants: list[RelatedReflection]  # reflections this one is built on
+
+
+@dataclass(frozen=True, slots=True)
+class SourceMemory:
+    memory_id: int
+    memory_type: str
+    depth: int  # 0 when cited by the reflection itself
+
+
+async def lineage(session: AsyncSession, reflection_id: int) -> Lineage:
+    """Every ancestor and descendant of a reflection, nearest first."""
+    closure = ReflectionClosure
+    is_ancestor = closure.descendant_id == reflection_id
+    other = case((is_ancestor, closure.ancestor_id), else_=closure.descendant_id)
+    rows = await session.execute(
+        select(
+            is_ancestor.label("is_ancestor"),
+            Reflection.id,
+            Reflection.memory_id,
+            Reflection.content,
+            closure.depth,
+        )
+        .select_from(closure)
+        .join(Reflection, Reflection.id == other)
+        .where(
+            or_(closure.ancestor_id == reflection_id, closure.descendant_id == reflection_id),
+            closure.depth > 0,
+        )
+        .order_by(closure.depth, Reflection.id)
+    )
+    ancestors: list[RelatedReflection] = []
+    descendants: list[RelatedReflection] = []
+    for row in rows:
+        related = RelatedReflection(row.id, row.memory_id, row.content, row.depth)
+        (ancestors if row.is_ancestor else descendants).append(related)
+    return Lineage(reflection_id=reflection_id, ancestors=ancestors, descendants=descendants)
+
+
+async def source_memories(session: AsyncSession, reflection_id: int) -> list[SourceMemory]:
+    """Every memory cited by the reflection or by any reflection beneath it."""
+    depth = func.min(ReflectionClosure.depth).label("depth")
+    rows = await session.execute(
+        select(ReflectionSource.source_memory_id, MemoryBase.memory_type, depth)
+        .select_from(ReflectionClosure)
+        .join(ReflectionSource, ReflectionSource.reflection_id == ReflectionClosure.descendant_id)
+        .join(MemoryBase, MemoryBase.id == ReflectionSource.source_memory_id)
+        .where(ReflectionClosure.ancestor_id == reflection_id)
+        .group_by(ReflectionSource.source_memory_id, MemoryBase.memory_type)
+        .order_by(depth, ReflectionSource.source_memory_id)
+    )
+    return [SourceMemory(memory_id, memory_type, depth) for memory_id, memory_type, depth in rows]
+
+
+async def affected_reflections(session: AsyncSession, memory_id: int) -> list[RelatedReflection]:
+    """Every reflection derived, directly or transitively, from ``memory_id``.
+
+    Depth 0 means the reflection cites the memory itself. If ``memory_id`` is a
+    reflection's own memory, that reflection is excluded and its ancestors
+    follow at their closure depth.
+    """
+    # (reflection, shift): reflections citing the memory sit at depth 0, and the
+    # reflection owning the memory is one step below its ancestors.
+    roots = union(
+        select(
+            ReflectionSource.reflection_id.label("reflection_id"), literal(0).label("shift")
+        ).where(ReflectionSource.source_memory_id == memory_id),
+        select(Reflection.id, literal(-1)).where(Reflection.memory_id == memory_id),
+    ).subquery("roots")
+    depth = func.min(ReflectionClosure.depth + roots.c.shift).label("depth")
+    rows = await session.execute(
+        select(Reflection.id, Reflection.memory_id, Reflection.content, depth)
+        .select_from(roots)
+        .join(ReflectionClosure, ReflectionClosure.descendant_id == roots.c.reflection_id)
+        .join(Reflection, Reflection.id == ReflectionClosure.ancestor_id)
+        .where(Reflection.memory_id != memory_id)
+        .group_by(Reflection.id)
+        .order_by(depth, Reflection.id)
+    )
+    return [RelatedReflection(*row) for row in rows]
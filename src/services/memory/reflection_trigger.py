@@ -0,0 +1,104 @@
+"""O(1) reflection triggering via a per-owner running importance total.
+
+Every non-reflection memory insert adds its ``importance_score`` to
+``reflection_accumulator`` with a single upsert whose RETURNING value answers
+"is a reflection due?" without scanning ``memory_base``. A reflection job first
+claims the row (``claimed_at``) with one conditional UPDATE, so concurrent jobs
+for the same owner, in any process, cannot both draft. Writing a reflection
+subtracts the importance it consumed and clears the claim, so memories stored
+while the reflection was being generated still count towards the next one.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import ReflectionAccumulator
+
+
+async def add_importance(
+    session: AsyncSession, owner_id: uuid.UUID, importance: float, count: int = 1
+) -> float:
+    """Add ``importance`` (from ``count`` memories) to the running total; return the new total."""
+    stmt = (
+        insert(ReflectionAccumulator)
+        .values(owner_id=owner_id, importance_sum=importance, memory_count=count)
+        .on_conflict_do_update(
+            index_elements=[ReflectionAccumulator.owner_id],
+            set_={
+                "importance_sum": ReflectionAccumulator.importance_sum + importance,
+                "memory_count": ReflectionAccumulator.memory_count + count,
+                "updated_at": func.now(),
+            },
+        )
+        .returning(ReflectionAccumulator.importance_sum)
+    )
+    return (await session.execute(stmt)).scalar_one()
+
+
+async def pending_importance(session: AsyncSession, owner_id: uuid.UUID) -> float:
+    """Importance accumulated since the owner's last reflection (primary-key lookup)."""
+    stmt = select(ReflectionAccumulator.importance_sum).where(
+        ReflectionAccumulator.owner_id == owner_id
+    )
+    return (await session.scalar(stmt)) or 0.0
+
+
+async def is_reflection_due(session: AsyncSession, owner_id: uuid.UUID, threshold: float) -> bool:
+    return await pending_importance(session, owner_id) >= threshold
+
+
+async def claim_importance(
+    session: AsyncSession, owner_id: uuid.UUID, threshold: float, ttl_seconds: float
+) -> float | None:
+    """Claim a due, unclaimed accumulator; return the importance the reflection covers.
+
+    None when the owner is not due or another job holds a claim younger than
+    ``ttl_seconds``. A concurrent claim blocks on the row lock and then re-checks
+    ``claimed_at``, so exactly one of them wins.
+    """
+    stmt = (
+        update(ReflectionAccumulator)
+        .where(
+            ReflectionAccumulator.owner_id == owner_id,
+            ReflectionAccumulator.importance_sum >= threshold,
+            or_(
+                ReflectionAccumulator.claimed_at.is_(None),
+                ReflectionAccumulator.claimed_at < func.now() - timedelta(seconds=ttl_seconds),
+            ),
+        )
+        .values(claimed_at=func.now(), updated_at=func.now())
+        .returning(ReflectionAccumulator.importance_sum)
+    )
+    return (await session.execute(stmt)).scalar_one_or_none()
+
+
+async def release_claim(session: AsyncSession, owner_id: uuid.UUID) -> None:
+    """Give up a claim without writing a reflection; the importance stays pending."""
+    stmt = (
+        update(ReflectionAccumulator)
+        .where(ReflectionAccumulator.owner_id == owner_id)
+        .values(claimed_at=None, updated_at=func.now())
+    )
+    await session.execute(stmt)
+
+
+async def consume_importance(session: AsyncSession, owner_id: uuid.UUID, consumed: float) -> None:
+    """Reset the accumulator after a reflection covering ``consumed`` importance is written."""
+    stmt = (
+        update(ReflectionAccumulator)
+        .where(ReflectionAccumulator.owner_id == owner_id)
+        .values(
+            importance_sum=func.greatest(ReflectionAccumulator.importance_sum - consumed, 0.0),
+            memory_count=0,
+            last_reflection_at=func.now(),
+            claimed_at=None,
+            updated_at=func.now(),
+        )
+    )
+    await session.execute(stmt)
@@ -0,0 +1,114 @@
+"""Reflection generation.
+
+A reflection is drafted from the owner's ``reflection_source_limit`` most recent
+memories with an LLM call, outside any transaction. It is then written as a
+``memory_base`` row of type ``reflection``, plus its ``reflection`` row and one
+``reflection_source`` row per cited memory. :meth:`ReflectionGenerator.write`
+runs inside the caller's transaction, so the reflection commits together with
+whatever the caller does next (the scheduler consumes the owner's accumulated
+importance in the same transaction).
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import MemorySettings
+from database.models import Episode, MemoryBase, Message, Observation, Reflection, ReflectionSource
+from services.llm.prompts.reflection import reflection_messages
+from services.llm.providers.base import LLMProvider
+from services.llm.providers.embedding import EmbeddingService
+from services.memory.store import REFLECTION_MEMORY_TYPE, MemoryStore
+
+REFLECTION_MAX_TOKENS = 200
+
+
+@dataclass(frozen=True, slots=True)
+class ReflectionDraft:
+    owner_id: uuid.UUID
+    content: str
+    importance_score: float
+    embedding: np.ndarray
+    source_memory_ids: list[int]
+
+
+class ReflectionGenerator:
+    def __init__(
+        self,
+        settings: MemorySettings,
+        store: MemoryStore,
+        session_factory: async_sessionmaker[AsyncSession],
+        provider: LLMProvider,
+        embeddings: EmbeddingService,
+    ) -> None:
+        self._source_limit = settings.reflection_source_limit
+        self._store = store
+        self._session_factory = session_factory
+        self._provider = provider
+        self._embeddings = embeddings
+
+    async def draft(self, owner_id: uuid.UUID) -> ReflectionDraft | None:
+        """Draft a reflection over the owner's recent memories; None if there are none."""
+        content = func.coalesce(Message.content, Observation.content, Episode.summary)
+        async with self._session_factory() as session:
+            rows = (
+                await session.execute(
+                    select(MemoryBase.id, MemoryBase.importance_score, content.label("content"))
+                    .outerjoin(Message, Message.memory_id == MemoryBase.id)
+                    .outerjoin(Observation, Observation.memory_id == MemoryBase.id)
+                    .outerjoin(Episode, Episode.memory_id == MemoryBase.id)
+                    .where(
+                        MemoryBase.owner_id == owner_id,
+                        MemoryBase.memory_type != REFLECTION_MEMORY_TYPE,
+                        func.coalesce(content, "") != "",
+                    )
+                    .order_by(MemoryBase.created_at.desc(), MemoryBase.id.desc())
+                    .limit(self._source_limit)
+                )
+            ).all()
+        if not rows:
+            return None
+
+        rows = rows[::-1]
+        text = await self._provider.complete(
+            reflection_messages([row.content for row in rows]), max_tokens=REFLECTION_MAX_TOKENS
+        )
+        text = text.strip()
+        if not text:
+            return None
+        return ReflectionDraft(
+            owner_id=owner_id,
+            content=text,
+            importance_score=max(row.importance_score for row in rows),
+            embedding=await self._embeddings.embed(text),
+            source_memory_ids=[row.id for row in rows],
+        )
+
+    async def write(self, session: AsyncSession, draft: ReflectionDraft) -> int:
+        """Insert the reflection and its sources; the caller owns the transaction."""
+        stored = await self._store.insert(
+            session,
+            owner_id=draft.owner_id,
+            memory_type=REFLECTION_MEMORY_TYPE,
+            importance_score=draft.importance_score,
+            content=draft.content,
+            embedding=draft.embedding,
+        )
+        reflection_id = await session.scalar(
+            insert(Reflection)
+            .values(memory_id=stored.memory_id, content=draft.content)
+            .returning(Reflection.id)
+        )
+        await session.execute(
+            insert(ReflectionSource),
+            [
+                {"reflection_id": reflection_id, "source_memory_id": memory_id}
+                for memory_id in draft.source_memory_ids
+            ],
+        )
+        return reflection_id
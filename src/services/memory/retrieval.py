@@ -0,0 +1,216 @@
+"""Hybrid memory retrieval: recency, importance and relevance.
+
+Candidates for a single owner come from :class:`VectorSearch` (owner-filtered HNSW
+or an exact scan, optionally over a quantized index) and are re-scored in a single
+vectorised NumPy pass using the ``MemorySettings`` retrieval weights. That is the
+primary path. Only when an enabled ``EmbeddingCache`` is supplied
+(``embedding_cache_max_bytes > 0``, off by default) does candidate selection run
+on the cached matrix instead, with SQL fetching only scalar columns; the index,
+quantization and recall sampling are then bypassed. Returned memories are
+recorded as accesses on the ``MemoryAccessBuffer``, which reinforces them off the
+request path.
+"""
+
+from __future__ import annotations
+
+import math
+import uuid
+from collections.abc import Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from background.tasks.memory_decay import current_strength
+from core.config import MemorySettings
+from database.models import MemoryBase
+from models.domain.memory import RetrievedMemory
+from services.memory.access_buffer import MemoryAccessBuffer
+from services.memory.embedding_cache import EmbeddingCache
+from services.memory.vector_search import VectorSearch
+
+
+def retrieval_weights(settings: MemorySettings) -> np.ndarray:
+    """Return (recency, importance, relevance) weights, checking they sum to 1."""
+    weights = np.array(
+        [
+            settings.retrieval_weight_recency,
+            settings.retrieval_weight_importance,
+            settings.retrieval_weight_relevance,
+        ],
+        dtype=np.float64,
+    )
+    total = float(weights.sum())
+    if not math.isclose(total, 1.0, abs_tol=1e-6):
+        raise ValueError(f"Retrieval weights must sum to 1.0, got {total:.4f}")
+    return weights
+
+
+def score_candidates(
+    importance: np.ndarray,
+    age_hours: np.ndarray,
+    distance: np.ndarray,
+    weights: np.ndarray,
+    recency_decay: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Score a candidate set in one pass.
+
+    Each component is min-max normalised across the candidates before weighting,
+    so no single signal dominates because of its scale.
+
+    Returns:
+        ``(recency, relevance, score)`` arrays aligned with the inputs.
+    """
+    recency = np.power(recency_decay, np.maximum(age_hours, 0.0))
+    relevance = 1.0 - distance
+
+    components = np.vstack((recency, importance, relevance))
+    low = components.min(axis=1, keepdims=True)
+    span = components.max(axis=1, keepdims=True) - low
+    normalised = np.divide(components - low, span, out=np.zeros_like(components), where=span > 0)
+    return recency, relevance, weights @ normalised
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first."""
+    if k >= scores.size:
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def _scalar_columns(settings: MemorySettings) -> tuple:
+    age_hours = (func.extract("epoch", func.now() - MemoryBase.last_accessed_at) / 3600.0).label(
+        "age_hours"
+    )
+    return (
+        MemoryBase.id,
+        MemoryBase.memory_type,
+        MemoryBase.importance_score,
+        current_strength(settings).label("memory_strength"),
+        MemoryBase.last_accessed_at,
+        age_hours,
+    )
+
+
+class MemoryRetriever:
+    """Retrieve an owner's most useful memories for a query embedding."""
+
+    def __init__(
+        self,
+        settings: MemorySettings,
+        embedding_cache: EmbeddingCache | None = None,
+        vector_search: VectorSearch | None = None,
+        access_buffer: MemoryAccessBuffer | None = None,
+    ) -> None:
+        self._settings = settings
+        self._weights = retrieval_weights(settings)
+        self._recency_decay = settings.retrieval_recency_decay
+        self._candidate_pool = settings.retrieval_candidate_pool
+        self._cache = embedding_cache
+        self._search = vector_search or VectorSearch(settings)
+        self._access = access_buffer
+
+    async def retrieve(
+        self,
+        session: AsyncSession,
+        owner_id: uuid.UUID,
+        query_embedding: Sequence[float] | np.ndarray,
+        *,
+        k: int = 10,
+        memory_types: Sequence[str] | None = None,
+        access_context: str | None = None,
+    ) -> list[RetrievedMemory]:
+        """Return up to ``k`` memories ranked by the weighted hybrid score.
+
+        Args:
+            session: Active database session.
+            owner_id: Participant whose memories are searched.
+            query_embedding: Embedding of the current turn.
+            k: Number of memories to return.
+            memory_types: Optional filter applied inside the same query.
+            access_context: Stored with the access log rows of the returned memories.
+        """
+        pool = max(k, self._candidate_pool)
+        if self._cache is not None and self._cache.enabled:
+            retrieved = await self._retrieve_cached(
+                session, owner_id, query_embedding, k, pool, memory_types
+            )
+        else:
+            retrieved = await self._retrieve_indexed(
+                session, owner_id, query_embedding, k, pool, memory_types
+            )
+        if self._access is not None:
+            self._access.record_retrieval(retrieved, access_context)
+        return retrieved
+
+    async def _retrieve_indexed(
+        self,
+        session: AsyncSession,
+        owner_id: uuid.UUID,
+        query_embedding: Sequence[float] | np.ndarray,
+        k: int,
+        pool: int,
+        memory_types: Sequence[str] | None,
+    ) -> list[RetrievedMemory]:
+        rows = await self._search.search(
+            session,
+            _scalar_columns(self._settings),
+            query_embedding,
+            owner_id=owner_id,
+            limit=pool,
+            memory_types=memory_types,
+        )
+        if not rows:
+            return []
+        distances = np.fromiter((r.distance for r in rows), np.float64, len(rows))
+        return self._rank(owner_id, rows, distances, k)
+
+    async def _retrieve_cached(
+        self,
+        session: AsyncSession,
+        owner_id: uuid.UUID,
+        query_embedding: Sequence[float] | np.ndarray,
+        k: int,
+        pool: int,
+        memory_types: Sequence[str] | None,
+    ) -> list[RetrievedMemory]:
+        assert self._cache is not None
+        ids, similarity = await self._cache.search(session, owner_id, query_embedding, pool)
+        if ids.size == 0:
+            return []
+
+        stmt = select(*_scalar_columns(self._settings)).where(MemoryBase.id.in_(ids.tolist()))
+        if memory_types:
+            stmt = stmt.where(MemoryBase.memory_type.in_(memory_types))
+        rows = (await session.execute(stmt)).all()
+        if not rows:
+            return []
+
+        similarity_by_id = dict(zip(ids.tolist(), similarity.tolist()))
+        distances = np.fromiter((1.0 - similarity_by_id[r.id] for r in rows), np.float64, len(rows))
+        return self._rank(owner_id, rows, distances, k)
+
+    def _rank(
+        self, owner_id: uuid.UUID, rows: Sequence, distance: np.ndarray, k: int
+    ) -> list[RetrievedMemory]:
+        importance = np.fromiter((r.importance_score for r in rows), np.float64, len(rows))
+        age_hours = np.fromiter((r.age_hours for r in rows), np.float64, len(rows))
+
+        recency, relevance, scores = score_candidates(
+            importance, age_hours, distance, self._weights, self._recency_decay
+        )
+        return [
+            RetrievedMemory(
+                memory_id=rows[i].id,
+                owner_id=owner_id,
+                memory_type=rows[i].memory_type,
+                importance_score=rows[i].importance_score,
+                memory_strength=rows[i].memory_strength,
+                last_accessed_at=rows[i].last_accessed_at,
+                recency=float(recency[i]),
+                relevance=float(relevance[i]),
+                score=float(scores[i]),
+            )
+            for i in top_k_indices(scores, k)
+        ]
@@ -0,0 +1,167 @@
+"""Single write path for memory_base rows.
+
+Keeps the derived state that hangs off ``memory_base`` (reflection accumulator,
+shared embedding cache) in step with every insert. The accumulator is updated in
+the caller's transaction. New embeddings are appended to the cache only once
+that transaction commits, so a cache load running concurrently either sees the
+row in the database or receives the append.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import uuid
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import structlog
+from sqlalchemy import event, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from core.config import MemorySettings
+from core.utils.tokens import TOKEN_COUNT_KEY, count_tokens
+from database.models import MemoryBase
+from services.memory.embedding_cache import EmbeddingCache
+from services.memory.reflection_trigger import add_importance
+
+logger = structlog.get_logger(__name__)
+
+REFLECTION_MEMORY_TYPE = "reflection"
+
+_CACHE_APPENDS = "memory_store.cache_appends"
+
+CacheAppend = tuple[uuid.UUID, int, np.ndarray]
+
+
+@dataclass(frozen=True, slots=True)
+class StoredMemory:
+    memory_id: int
+    reflection_due: bool
+
+
+class MemoryStore:
+    def __init__(
+        self, settings: MemorySettings, embedding_cache: EmbeddingCache | None = None
+    ) -> None:
+        self._threshold = settings.reflection_importance_threshold
+        self._cache = embedding_cache
+        self._appending: set[asyncio.Task[None]] = set()
+
+    async def insert(
+        self,
+        session: AsyncSession,
+        *,
+        owner_id: uuid.UUID,
+        memory_type: str,
+        importance_score: float,
+        content: str | None = None,
+        embedding: Sequence[float] | np.ndarray | None = None,
+        metadata: dict[str, Any] | None = None,
+        memory_strength: float = 1.0,
+    ) -> StoredMemory:
+        """Insert a memory_base row and update the owner's reflection accumulator.
+
+        The caller owns the transaction. Reflections do not count towards the next
+        reflection, so they skip the accumulator. When ``content`` is given its token
+        count is stored in ``metadata`` so context assembly never re-tokenizes it.
+        """
+        if content is not None:
+            metadata = {**(metadata or {}), TOKEN_COUNT_KEY: count_tokens(content)}
+        stmt = (
+            insert(MemoryBase)
+            .values(
+                owner_id=owner_id,
+                memory_type=memory_type,
+                importance_score=importance_score,
+                memory_strength=memory_strength,
+                embedding=embedding,
+                metadata_=metadata,
+            )
+            .returning(MemoryBase.id)
+        )
+        memory_id = (await session.execute(stmt)).scalar_one()
+
+        reflection_due = False
+        if memory_type != REFLECTION_MEMORY_TYPE:
+            total = await add_importance(session, owner_id, importance_score)
+            reflection_due = total >= self._threshold
+
+        if self._cache is not None and self._cache.enabled and embedding is not None:
+            self._append_after_commit(
+                session.sync_session, (owner_id, memory_id, np.asarray(embedding))
+            )
+
+        return StoredMemory(memory_id=memory_id, reflection_due=reflection_due)
+
+    async def rescore(
+        self,
+        session: AsyncSession,
+        *,
+        owner_id: uuid.UUID,
+        scores: Mapping[int, float],
+        previous: float,
+    ) -> bool:
+        """Replace the ``previous`` importance of non-reflection memories with ``scores``.
+
+        The accumulator moves by the difference, so it matches what an insert with the
+        final scores would have added. Returns whether a reflection is now due.
+        """
+        for memory_id, importance in scores.items():
+            await session.execute(
+                update(MemoryBase)
+                .where(MemoryBase.id == memory_id)
+                .values(importance_score=importance)
+            )
+        delta = sum(scores.values()) - previous * len(scores)
+        total = await add_importance(session, owner_id, delta, count=0)
+        return total >= self._threshold
+
+    async def close(self) -> None:
+        """Wait for cache appends of committed rows still in flight."""
+        while self._appending:
+            await asyncio.wait(list(self._appending))
+
+    def _append_after_commit(self, session: Session, item: CacheAppend) -> None:
+        appends: list[CacheAppend] | None = session.info.get(_CACHE_APPENDS)
+        if appends is None:
+            appends = session.info[_CACHE_APPENDS] = []
+            event.listen(session, "after_commit", self._committed)
+            event.listen(session, "after_soft_rollback", _rolled_back)
+        appends.append(item)
+
+    def _committed(self, session: Session) -> None:
+        appends = session.info.get(_CACHE_APPENDS)
+        if not appends:
+            return
+        session.info[_CACHE_APPENDS] = []
+        # flock blocks, so the files are written from a thread.
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(self._append, appends))
+        self._appending.add(task)
+        task.add_done_callback(self._appending.discard)
+
+    def _append(self, appends: list[CacheAppend]) -> None:
+        assert self._cache is not None
+        by_owner: dict[uuid.UUID, list[tuple[int, np.ndarray]]] = {}
+        for owner_id, memory_id, embedding in appends:
+            by_owner.setdefault(owner_id, []).append((memory_id, np.asarray(embedding)))
+        for owner_id, rows in by_owner.items():
+            try:
+                self._cache.append(
+                    owner_id, [memory_id for memory_id, _ in rows], np.vstack([e for _, e in rows])
+                )
+            except OSError:
+                logger.exception("memory_store.cache_append_failed", owner_id=str(owner_id))
+                # Drop the owner so it is reloaded instead of served without the rows.
+                with contextlib.suppress(OSError):
+                    self._cache.invalidate(owner_id)
+
+
+def _rolled_back(session: Session, previous_transaction: SessionTransaction) -> None:
+    # A savepoint rollback keeps the outer transaction's appends. Ids it rolled back
+    # are harmless, because retrieval re-reads rows by id.
+    if not session.in_transaction():
+        session.info[_CACHE_APPENDS] = []
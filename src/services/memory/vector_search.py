@@ -0,0 +1,444 @@
+"""Owner-filtered nearest-neighbour search over ``memory_base.embedding``.
+
+Every search is filtered by ``owner_id`` (and often ``memory_type``), but the
+HNSW index is global, so the filter is applied after the index scan. A scan with
+the default ``hnsw.ef_search`` over a table shared by many owners can therefore
+return fewer than ``limit`` rows. :class:`VectorSearch` picks one of two paths per
+query:
+
+``exact``
+    Owners with fewer than ``vector_search_exact_threshold`` embedded memories
+    are scanned exactly: a ``MATERIALIZED`` CTE collects the owner's rows through
+    ``memory_base_owner_idx`` and they are sorted by true cosine distance. The
+    CTE fence keeps the planner from switching to the global index.
+
+``hnsw``
+    Larger owners go through the index with ``hnsw.ef_search`` sized to the
+    share of the table that passes the owner and ``memory_type`` filters
+    (``needed / selectivity``, clamped to
+    ``[vector_search_ef_search, vector_search_max_ef_search]``). If the scan
+    returns fewer rows than the filters allow, ``ef_search`` is doubled and the
+    query retried; once the cap is reached the exact path answers instead.
+
+Quantization (``embedding_quantization``): with ``halfvec`` or ``binary`` the
+index covers a compact expression, so the ``hnsw`` path shortlists
+``limit * embedding_rerank_factor`` rows by compact distance and re-ranks them by
+exact cosine distance. The query expression must match the index expression
+exactly, so both are built from ``embedding_dimension`` here. The index itself is
+switched by the ``background.tasks.embedding_index`` maintenance command, and
+:meth:`VectorSearch.check_index` refuses to start a worker whose settings expect
+an index that is not there.
+
+Latency per path is tracked in :meth:`VectorSearch.stats`. Recall is sampled
+for the ``hnsw`` path at ``vector_search_recall_sample_rate``: the exact
+re-query is queued on the :class:`TaskQueue` with its own session, so it never
+adds to the request's latency, and at most one sample is pending at a time.
+Sampling needs a queue and a session factory. :func:`measure_recall` does the
+same offline for a set of queries.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy import (
+    ColumnElement,
+    Float,
+    Row,
+    Select,
+    bindparam,
+    cast,
+    func,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+from background.queue import TaskQueue
+from core.config import MemorySettings
+from database.models import MemoryBase
+
+EXACT = "exact"
+HNSW = "hnsw"
+
+# HNSW index on memory_base.embedding for each embedding_quantization.
+INDEX_NAMES = {
+    "none": "memory_base_embedding_idx",
+    "halfvec": "memory_base_embedding_halfvec_idx",
+    "binary": "memory_base_embedding_binary_idx",
+}
+
+
+class MissingEmbeddingIndex(RuntimeError):
+    """The index for the configured ``embedding_quantization`` is absent, invalid or stale."""
+
+
+def index_definition(quantization: str, dimension: int) -> str:
+    """``CREATE INDEX CONCURRENTLY`` for ``quantization``, matching the search expressions."""
+    if quantization == "halfvec":
+        operand = f"(embedding::halfvec({dimension})) halfvec_cosine_ops"
+    elif quantization == "binary":
+        operand = f"(binary_quantize(embedding)::bit({dimension})) bit_hamming_ops"
+    else:
+        operand = "embedding vector_cosine_ops"
+    return (
+        f"CREATE INDEX CONCURRENTLY {INDEX_NAMES[quantization]} ON memory_base "
+        f"USING hnsw ({operand}) WITH (m = 16, ef_construction = 64)"
+    )
+
+
+async def index_problem(
+    conn: AsyncConnection | AsyncSession, quantization: str, dimension: int
+) -> str | None:
+    """Why the index for ``quantization`` cannot serve searches, or None if it can."""
+    name = INDEX_NAMES[quantization]
+    row = (
+        await conn.execute(
+            text(
+                "SELECT indisvalid, pg_get_indexdef(indexrelid) FROM pg_index "
+                "WHERE indexrelid = to_regclass(:name)"
+            ),
+            {"name": name},
+        )
+    ).first()
+    if row is None:
+        return f"index {name} does not exist"
+    if not row[0]:
+        return f"index {name} is invalid (an interrupted concurrent build)"
+    # The compact expressions carry the dimension; the full vector's is the column type.
+    if quantization != "none" and f"({dimension})" not in row[1]:
+        return f"index {name} was built for a different embedding_dimension"
+    return None
+
+
+@dataclass(slots=True)
+class SearchStats:
+    """Running counters for one search path."""
+
+    calls: int = 0
+    latency_ms_total: float = 0.0
+    widened: int = 0  # hnsw queries that needed a larger ef_search
+    fell_back: int = 0  # hnsw queries answered by the exact path
+    recall_samples: int = 0
+    recall_total: float = 0.0
+
+    @property
+    def mean_latency_ms(self) -> float:
+        return self.latency_ms_total / self.calls if self.calls else 0.0
+
+    @property
+    def mean_recall(self) -> float | None:
+        return self.recall_total / self.recall_samples if self.recall_samples else None
+
+
+@dataclass(frozen=True, slots=True)
+class RecallReport:
+    queries: int
+    k: int
+    recall: float  # mean fraction of the exact top-k found by the search
+    mean_latency_ms: float
+
+
+class VectorSearch:
+    """Runs owner-filtered candidate queries against the configured embedding index."""
+
+    def __init__(
+        self,
+        settings: MemorySettings,
+        *,
+        queue: TaskQueue | None = None,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ) -> None:
+        self._dimension = settings.embedding_dimension
+        self._quantization = settings.embedding_quantization
+        self._rerank_factor = settings.embedding_rerank_factor
+        self._exact_threshold = settings.vector_search_exact_threshold
+        self._ef_search = settings.vector_search_ef_search
+        self._max_ef_search = settings.vector_search_max_ef_search
+        self._stats_ttl = settings.vector_search_owner_stats_ttl_seconds
+        self._recall_sample_rate = settings.vector_search_recall_sample_rate
+        self._queue = queue
+        self._session_factory = session_factory
+
+        self._owner_rows: dict[uuid.UUID, tuple[dict[str, int], float]] = {}
+        self._table_rows: tuple[int, float] | None = None
+        self._stats = {EXACT: SearchStats(), HNSW: SearchStats()}
+
+    @property
+    def quantization(self) -> str:
+        return self._quantization
+
+    async def check_index(self, session: AsyncSession) -> None:
+        """Raise :class:`MissingEmbeddingIndex` unless the configured index can serve searches."""
+        problem = await index_problem(session, self._quantization, self._dimension)
+        if problem is not None:
+            raise MissingEmbeddingIndex(
+                f"{problem}; run `python -m background.tasks.embedding_index` "
+                f"for embedding_quantization={self._quantization!r}"
+            )
+
+    def stats(self) -> dict[str, SearchStats]:
+        return self._stats
+
+    # ------------------------------------------------------------------
+    # Statements
+    # ------------------------------------------------------------------
+
+    def _query(self, query_embedding: Sequence[float] | np.ndarray) -> ColumnElement:
+        return bindparam("query_embedding", query_embedding, type_=Vector(self._dimension))
+
+    def _compact_distance(self, query: ColumnElement) -> ColumnElement[float]:
+        if self._quantization == "halfvec":
+            halfvec = HALFVEC(self._dimension)
+            return cast(MemoryBase.embedding, halfvec).op("<=>", return_type=Float)(
+                cast(query, halfvec)
+            )
+        bit = BIT(self._dimension)
+        return cast(func.binary_quantize(MemoryBase.embedding), bit).op("<~>", return_type=Float)(
+            cast(func.binary_quantize(query), bit)
+        )
+
+    @staticmethod
+    def _filters(
+        owner_id: uuid.UUID, memory_types: Sequence[str] | None
+    ) -> list[ColumnElement[bool]]:
+        filters = [MemoryBase.owner_id == owner_id, MemoryBase.embedding.is_not(None)]
+        if memory_types:
+            filters.append(MemoryBase.memory_type.in_(memory_types))
+        return filters
+
+    def index_candidates(
+        self,
+        columns: Sequence[ColumnElement],
+        query_embedding: Sequence[float] | np.ndarray,
+        *,
+        owner_id: uuid.UUID,
+        limit: int,
+        memory_types: Sequence[str] | None = None,
+    ) -> Select:
+        """``columns`` plus exact ``distance`` via the HNSW index, nearest first."""
+        query = self._query(query_embedding)
+        distance = MemoryBase.embedding.cosine_distance(query).label("distance")
+        filters = self._filters(owner_id, memory_types)
+
+        if self._quantization == "none":
+            return select(*columns, distance).where(*filters).order_by(distance).limit(limit)
+
+        shortlist = (
+            select(MemoryBase.id)
+            .where(*filters)
+            .order_by(self._compact_distance(query))
+            .limit(limit * self._rerank_factor)
+            .subquery("shortlist")
+        )
+        return (
+            select(*columns, distance)
+            .join(shortlist, shortlist.c.id == MemoryBase.id)
+            .order_by(distance)
+            .limit(limit)
+        )
+
+    def exact_candidates(
+        self,
+        columns: Sequence[ColumnElement],
+        query_embedding: Sequence[float] | np.ndarray,
+        *,
+        owner_id: uuid.UUID,
+        limit: int,
+        memory_types: Sequence[str] | None = None,
+    ) -> Select:
+        """``columns`` plus exact ``distance`` by scanning only the owner's rows."""
+        owned = (
+            select(MemoryBase.id, MemoryBase.embedding)
+            .where(*self._filters(owner_id, memory_types))
+            .cte("owned")
+            .prefix_with("MATERIALIZED")
+        )
+        distance = owned.c.embedding.cosine_distance(self._query(query_embedding)).label("distance")
+        return (
+            select(*columns, distance)
+            .join(owned, owned.c.id == MemoryBase.id)
+            .order_by(distance)
+            .limit(limit)
+        )
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    async def search(
+        self,
+        session: AsyncSession,
+        columns: Sequence[ColumnElement],
+        query_embedding: Sequence[float] | np.ndarray,
+        *,
+        owner_id: uuid.UUID,
+        limit: int,
+        memory_types: Sequence[str] | None = None,
+    ) -> Sequence[Row]:
+        """Up to ``limit`` rows of ``columns`` plus ``distance``, nearest first."""
+        started = time.perf_counter()
+        counts = await self._owner_row_counts(session, owner_id)
+        owner_rows = sum(counts.values())
+        if owner_rows < self._exact_threshold:
+            rows = await self._run_exact(
+                session, columns, query_embedding, owner_id, limit, memory_types
+            )
+            self._record(EXACT, started)
+            return rows
+
+        stats = self._stats[HNSW]
+        # Only rows that pass the memory_type filter can come back, so they, not
+        # the owner's total, bound the result and size the scan.
+        matching = (
+            sum(counts.get(memory_type, 0) for memory_type in set(memory_types))
+            if memory_types
+            else owner_rows
+        )
+        wanted = min(limit, matching)
+        ef_search = await self._initial_ef_search(session, matching, limit)
+        stmt = self.index_candidates(
+            columns, query_embedding, owner_id=owner_id, limit=limit, memory_types=memory_types
+        )
+        while True:
+            await session.execute(
+                text("SELECT set_config('hnsw.ef_search', :value, true)"),
+                {"value": str(ef_search)},
+            )
+            rows = (await session.execute(stmt)).all()
+            if len(rows) >= wanted:
+                break
+            if ef_search >= self._max_ef_search:
+                stats.fell_back += 1
+                rows = await self._run_exact(
+                    session, columns, query_embedding, owner_id, limit, memory_types
+                )
+                break
+            stats.widened += 1
+            ef_search = min(ef_search * 2, self._max_ef_search)
+        self._record(HNSW, started)
+
+        if (
+            self._recall_sample_rate
+            and self._queue is not None
+            and self._session_factory is not None
+            and random.random() < self._recall_sample_rate
+        ):
+            found = {row.id for row in rows}
+            self._queue.submit(
+                lambda: self._sample_recall(found, query_embedding, owner_id, limit, memory_types),
+                key="vector-search:recall-sample",
+            )
+        return rows
+
+    async def _sample_recall(
+        self,
+        found: set[int],
+        query_embedding: Sequence[float] | np.ndarray,
+        owner_id: uuid.UUID,
+        limit: int,
+        memory_types: Sequence[str] | None,
+    ) -> None:
+        assert self._session_factory is not None
+        async with self._session_factory() as session:
+            exact = await self._run_exact(
+                session, [MemoryBase.id], query_embedding, owner_id, limit, memory_types
+            )
+        if exact:
+            stats = self._stats[HNSW]
+            stats.recall_samples += 1
+            stats.recall_total += sum(row.id in found for row in exact) / len(exact)
+
+    async def _run_exact(
+        self,
+        session: AsyncSession,
+        columns: Sequence[ColumnElement],
+        query_embedding: Sequence[float] | np.ndarray,
+        owner_id: uuid.UUID,
+        limit: int,
+        memory_types: Sequence[str] | None,
+    ) -> Sequence[Row]:
+        stmt = self.exact_candidates(
+            columns, query_embedding, owner_id=owner_id, limit=limit, memory_types=memory_types
+        )
+        return (await session.execute(stmt)).all()
+
+    def _record(self, path: str, started: float) -> None:
+        stats = self._stats[path]
+        stats.calls += 1
+        stats.latency_ms_total += (time.perf_counter() - started) * 1000.0
+
+    async def _initial_ef_search(self, session: AsyncSession, matching: int, limit: int) -> int:
+        """ef_search large enough that the filtered share of the scan covers the shortlist."""
+        shortlist = limit if self._quantization == "none" else limit * self._rerank_factor
+        total = max(await self._table_row_count(session), matching, 1)
+        needed = math.ceil(shortlist * total / max(matching, 1))
+        return max(self._ef_search, shortlist, min(needed, self._max_ef_search))
+
+    async def _owner_row_counts(self, session: AsyncSession, owner_id: uuid.UUID) -> dict[str, int]:
+        """Embedded rows per ``memory_type`` for one owner, cached for the stats TTL."""
+        now = time.monotonic()
+        cached = self._owner_rows.get(owner_id)
+        if cached is not None and now - cached[1] < self._stats_ttl:
+            return cached[0]
+        result = await session.execute(
+            select(MemoryBase.memory_type, func.count())
+            .where(MemoryBase.owner_id == owner_id, MemoryBase.embedding.is_not(None))
+            .group_by(MemoryBase.memory_type)
+        )
+        counts = {memory_type: count for memory_type, count in result.all()}
+        self._owner_rows[owner_id] = (counts, now)
+        return counts
+
+    async def _table_row_count(self, session: AsyncSession) -> int:
+        """Planner estimate of memory_base size; exact counts are not worth a scan."""
+        now = time.monotonic()
+        if self._table_rows is not None and now - self._table_rows[1] < self._stats_ttl:
+            return self._table_rows[0]
+        estimate = await session.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'memory_base'::regclass")
+        )
+        self._table_rows = (max(estimate or 0, 0), now)
+        return self._table_rows[0]
+
+
+async def measure_recall(
+    session: AsyncSession,
+    search: VectorSearch,
+    owner_id: uuid.UUID,
+    queries: Sequence[np.ndarray],
+    *,
+    k: int = 10,
+) -> RecallReport:
+    """Recall@k of the index path for one owner against exact cosine similarity."""
+    hits = 0
+    expected = 0
+    elapsed = 0.0
+    for query in queries:
+        exact = await session.scalars(
+            search.exact_candidates([MemoryBase.id], query, owner_id=owner_id, limit=k)
+        )
+        exact_ids = set(exact.all())
+
+        started = time.perf_counter()
+        found = await session.scalars(
+            search.index_candidates([MemoryBase.id], query, owner_id=owner_id, limit=k)
+        )
+        elapsed += time.perf_counter() - started
+
+        hits += len(exact_ids.intersection(found.all()))
+        expected += len(exact_ids)
+
+    return RecallReport(
+        queries=len(queries),
+        k=k,
+        recall=hits / expected if expected else 1.0,
+        mean_latency_ms=elapsed * 1000.0 / len(queries) if queries else 0.0,
+    )
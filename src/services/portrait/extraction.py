@@ -0,0 +1,72 @@
+"""LLM extraction of interest and preference signals from a user message."""
+
+from __future__ import annotations
+
+import json
+
+import structlog
+
+from models.domain.portrait import InterestSignal, PreferenceSignal
+from services.llm.cache import CachedLLM
+from services.llm.prompts.portrait import PORTRAIT_TEMPLATE_ID, portrait_messages
+
+logger = structlog.get_logger(__name__)
+
+PORTRAIT_MAX_TOKENS = 300
+
+PortraitSignals = tuple[list[InterestSignal], list[PreferenceSignal]]
+
+
+def _text(value: object) -> str | None:
+    if not isinstance(value, str):
+        return None
+    return value.strip() or None
+
+
+def _items(fields: dict, key: str) -> list:
+    value = fields.get(key)
+    return value if isinstance(value, list) else []
+
+
+def _confidence(value: object, default: float) -> float:
+    if isinstance(value, bool) or not isinstance(value, int | float):
+        return default
+    return min(max(float(value), -1.0), 1.0)
+
+
+class LLMPortraitExtractor:
+    """Reads interests and preferences off one user message, served through the response cache.
+
+    A reply that is not the expected JSON object yields no signals.
+    """
+
+    def __init__(self, llm: CachedLLM) -> None:
+        self._llm = llm
+
+    async def __call__(self, text: str) -> PortraitSignals:
+        answer = await self._llm.complete(
+            PORTRAIT_TEMPLATE_ID, text, portrait_messages(text), max_tokens=PORTRAIT_MAX_TOKENS
+        )
+        try:
+            fields = json.loads(answer.strip().removeprefix("```json").strip("`\n "))
+        except ValueError:
+            fields = None
+        if not isinstance(fields, dict):
+            logger.warning("portrait.unparsable", answer=answer[:50])
+            return [], []
+
+        interests = []
+        for item in _items(fields, "interests"):
+            topic = _text(item.get("topic")) if isinstance(item, dict) else None
+            if topic is not None:
+                interests.append(InterestSignal(topic, _confidence(item.get("confidence"), 0.5)))
+        preferences = []
+        for item in _items(fields, "preferences"):
+            if not isinstance(item, dict):
+                continue
+            kind, value = _text(item.get("type")), _text(item.get("value"))
+            if kind is not None and value is not None:
+                preferences.append(
+                    PreferenceSignal(kind, value, _confidence(item.get("confidence"), 0.5))
+                )
+        return interests, preferences
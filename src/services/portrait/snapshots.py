@@ -0,0 +1,202 @@
+"""Keyframe/delta user state snapshots.
+
+Link-based snapshots (``snapshot_trait`` / ``snapshot_interest`` /
+``snapshot_preference``) reference every live profile row, so storage grows with
+snapshots times profile size. Snapshots written here store values in
+``snapshot_entry`` instead:
+
+- a ``keyframe`` snapshot records every trait, interest and preference
+- a ``delta`` snapshot records only entries that changed since the previous
+  snapshot, plus ``removed`` markers for entries that disappeared
+
+A keyframe is written after ``snapshot_keyframe_interval`` deltas. To reconstruct
+the profile at a point in time, take the newest keyframe at or before it, then the
+newest entry per ``(kind, entry_key)`` since that keyframe. That is one
+``DISTINCT ON`` query over ``snapshot_entry_user_idx``, bounded by the keyframe
+interval rather than by the user's full history.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import distinct_on
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import PortraitSettings
+from database.models import (
+    SnapshotEntry,
+    UserInterest,
+    UserPortrait,
+    UserPreference,
+    UserStateSnapshot,
+    UserTrait,
+)
+
+TRAIT = "trait"
+INTEREST = "interest"
+PREFERENCE = "preference"
+
+KEYFRAME = "keyframe"
+DELTA = "delta"
+
+ProfileKey = tuple[str, str]  # (kind, entry_key)
+Profile = dict[ProfileKey, dict[str, Any]]
+
+
+async def current_profile(session: AsyncSession, user_id: uuid.UUID) -> Profile:
+    """The user's live traits, interests and preferences as snapshot entries."""
+    profile: Profile = {}
+    traits = await session.execute(
+        select(UserTrait.trait_name, UserTrait.trait_value, UserTrait.confidence)
+        .join(UserPortrait, UserPortrait.id == UserTrait.portrait_id)
+        .where(UserPortrait.user_id == user_id)
+    )
+    for name, value, confidence in traits:
+        profile[(TRAIT, name)] = {"value": value, "confidence": confidence}
+
+    interests = await session.execute(
+        select(UserInterest.topic, UserInterest.confidence, UserInterest.frequency).where(
+            UserInterest.user_id == user_id
+        )
+    )
+    for topic, confidence, frequency in interests:
+        profile[(INTEREST, topic)] = {"confidence": confidence, "frequency": frequency}
+
+    preferences = await session.execute(
+        select(
+            UserPreference.preference_type,
+            UserPreference.preference_value,
+            UserPreference.confidence,
+        ).where(UserPreference.user_id == user_id)
+    )
+    for preference_type, value, confidence in preferences:
+        profile[(PREFERENCE, preference_type)] = {"value": value, "confidence": confidence}
+    return profile
+
+
+async def profile_at(
+    session: AsyncSession, user_id: uuid.UUID, at: datetime | None = None
+) -> Profile:
+    """Reconstruct the profile recorded by the latest snapshot at or before ``at``."""
+    upper = at if at is not None else func.now()
+    keyframe_at = (
+        select(func.max(UserStateSnapshot.created_at))
+        .where(
+            UserStateSnapshot.user_id == user_id,
+            UserStateSnapshot.storage == KEYFRAME,
+            UserStateSnapshot.created_at <= upper,
+        )
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            SnapshotEntry.kind,
+            SnapshotEntry.entry_key,
+            SnapshotEntry.data,
+            SnapshotEntry.removed,
+        )
+        .where(
+            SnapshotEntry.user_id == user_id,
+            SnapshotEntry.created_at >= keyframe_at,
+            SnapshotEntry.created_at <= upper,
+        )
+        .ext(distinct_on(SnapshotEntry.kind, SnapshotEntry.entry_key))
+        .order_by(
+            SnapshotEntry.kind,
+            SnapshotEntry.entry_key,
+            SnapshotEntry.created_at.desc(),
+            SnapshotEntry.snapshot_id.desc(),
+        )
+    )
+    return {
+        (row.kind, row.entry_key): row.data
+        for row in await session.execute(stmt)
+        if not row.removed
+    }
+
+
+class SnapshotWriter:
+    def __init__(self, settings: PortraitSettings) -> None:
+        self._keyframe_interval = settings.snapshot_keyframe_interval
+
+    async def take(self, session: AsyncSession, user_id: uuid.UUID) -> int | None:
+        """Snapshot the user's profile. Returns the snapshot id, or None if nothing changed."""
+        current = await current_profile(session, user_id)
+
+        last_keyframe = (
+            select(func.max(UserStateSnapshot.created_at))
+            .where(UserStateSnapshot.user_id == user_id, UserStateSnapshot.storage == KEYFRAME)
+            .scalar_subquery()
+        )
+        deltas_since = (
+            select(func.count())
+            .where(
+                UserStateSnapshot.user_id == user_id,
+                UserStateSnapshot.storage == DELTA,
+                UserStateSnapshot.created_at >= last_keyframe,
+            )
+            .scalar_subquery()
+        )
+        chain = (
+            await session.execute(
+                select(last_keyframe.label("keyframe_at"), deltas_since.label("deltas"))
+            )
+        ).one()
+
+        entries: list[tuple[ProfileKey, dict[str, Any] | None, bool]]
+        if chain.keyframe_at is None or chain.deltas >= self._keyframe_interval:
+            storage = KEYFRAME
+            entries = [(key, data, False) for key, data in current.items()]
+        else:
+            storage = DELTA
+            previous = await profile_at(session, user_id)
+            entries = [
+                (key, data, False) for key, data in current.items() if previous.get(key) != data
+            ]
+            entries += [(key, None, True) for key in previous.keys() - current.keys()]
+            if not entries:
+                return None
+
+        snapshot = (
+            await session.execute(
+                insert(UserStateSnapshot)
+                .values(
+                    user_id=user_id,
+                    user_portrait_id=await self._portrait_id(session, user_id),
+                    storage=storage,
+                )
+                .returning(UserStateSnapshot.id, UserStateSnapshot.created_at)
+            )
+        ).one()
+        if entries:
+            await session.execute(
+                insert(SnapshotEntry),
+                [
+                    {
+                        "snapshot_id": snapshot.id,
+                        "kind": kind,
+                        "entry_key": entry_key,
+                        "user_id": user_id,
+                        "created_at": snapshot.created_at,
+                        "data": data,
+                        "removed": removed,
+                    }
+                    for (kind, entry_key), data, removed in entries
+                ],
+            )
+        return snapshot.id
+
+    @staticmethod
+    async def _portrait_id(session: AsyncSession, user_id: uuid.UUID) -> int:
+        portrait_id = await session.scalar(
+            select(UserPortrait.id).where(UserPortrait.user_id == user_id)
+        )
+        if portrait_id is None:
+            portrait_id = await session.scalar(
+                insert(UserPortrait).values(user_id=user_id).returning(UserPortrait.id)
+            )
+        return portrait_id
@@ -0,0 +1,275 @@
+"""Batched user interest / preference updates.
+
+All interest and preference signals extracted from a turn (or, through
+:class:`DeferredPortraitUpdater`, from several turns) are merged in memory into
+at most one row per conflict key. They are then written with one multi-row
+``INSERT ... ON CONFLICT`` per table, against ``uq_user_interest`` and
+``uq_user_preference``. Merging happens in SQL against the stored row:
+
+interests
+    ``frequency`` adds up, ``confidence`` becomes the frequency-weighted mean of the
+    stored and incoming confidence, ``first_mentioned`` / ``last_mentioned`` take
+    the min / max.
+
+preferences
+    Restating the same value reinforces it (``1 - (1 - old) * (1 - new)``, clamped
+    to [-1, 1]); a different value replaces the old one together with its
+    confidence.
+
+The in-memory merge uses the same rules, so deferring and merging several turns
+gives the same result as writing each turn separately.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import structlog
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import PortraitSettings
+from database.connection import register_shutdown_hook
+from database.models import UserInterest, UserPreference
+from models.domain.portrait import InterestSignal, PreferenceSignal
+
+logger = structlog.get_logger(__name__)
+
+
+def _clamp(value: float) -> float:
+    return min(max(value, -1.0), 1.0)
+
+
+def reinforce(old: float, new: float) -> float:
+    return _clamp(1.0 - (1.0 - old) * (1.0 - new))
+
+
+@dataclass(slots=True)
+class _Interest:
+    confidence: float
+    frequency: int
+    first_mentioned: datetime
+    last_mentioned: datetime
+
+
+@dataclass(slots=True)
+class _Preference:
+    value: str
+    confidence: float
+
+
+@dataclass(slots=True)
+class PortraitUpdate:
+    """Interest and preference changes merged per ``(user, key)``."""
+
+    interests: dict[tuple[uuid.UUID, str], _Interest] = field(default_factory=dict)
+    preferences: dict[tuple[uuid.UUID, str], _Preference] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.interests or self.preferences)
+
+    def add_interest(self, user_id: uuid.UUID, signal: InterestSignal) -> None:
+        key = (user_id, signal.topic)
+        current = self.interests.get(key)
+        if current is None:
+            self.interests[key] = _Interest(
+                confidence=_clamp(signal.confidence),
+                frequency=1,
+                first_mentioned=signal.mentioned_at,
+                last_mentioned=signal.mentioned_at,
+            )
+            return
+        total = current.frequency + 1
+        current.confidence = _clamp(
+            (current.confidence * current.frequency + signal.confidence) / total
+        )
+        current.frequency = total
+        current.first_mentioned = min(current.first_mentioned, signal.mentioned_at)
+        current.last_mentioned = max(current.last_mentioned, signal.mentioned_at)
+
+    def add_preference(self, user_id: uuid.UUID, signal: PreferenceSignal) -> None:
+        key = (user_id, signal.preference_type)
+        current = self.preferences.get(key)
+        if current is not None and current.value == signal.preference_value:
+            current.confidence = reinforce(current.confidence, signal.confidence)
+        else:
+            self.preferences[key] = _Preference(
+                value=signal.preference_value, confidence=_clamp(signal.confidence)
+            )
+
+    def add(
+        self,
+        user_id: uuid.UUID,
+        interests: Iterable[InterestSignal] = (),
+        preferences: Iterable[PreferenceSignal] = (),
+    ) -> None:
+        for interest in interests:
+            self.add_interest(user_id, interest)
+        for preference in preferences:
+            self.add_preference(user_id, preference)
+
+
+async def apply_portrait_update(session: AsyncSession, update: PortraitUpdate) -> None:
+    """Write ``update`` with one upsert per table."""
+    if update.interests:
+        stmt = insert(UserInterest).values(
+            [
+                {
+                    "user_id": user_id,
+                    "topic": topic,
+                    "confidence": item.confidence,
+                    "frequency": item.frequency,
+                    "first_mentioned": item.first_mentioned,
+                    "last_mentioned": item.last_mentioned,
+                }
+                for (user_id, topic), item in update.interests.items()
+            ]
+        )
+        new = stmt.excluded
+        total = UserInterest.frequency + new.frequency
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_user_interest",
+            set_={
+                "confidence": func.greatest(
+                    -1.0,
+                    func.least(
+                        1.0,
+                        (
+                            UserInterest.confidence * UserInterest.frequency
+                            + new.confidence * new.frequency
+                        )
+                        / total,
+                    ),
+                ),
+                "frequency": total,
+                "first_mentioned": func.least(UserInterest.first_mentioned, new.first_mentioned),
+                "last_mentioned": func.greatest(UserInterest.last_mentioned, new.last_mentioned),
+            },
+        )
+        await session.execute(stmt)
+
+    if update.preferences:
+        stmt = insert(UserPreference).values(
+            [
+                {
+                    "user_id": user_id,
+                    "preference_type": preference_type,
+                    "preference_value": item.value,
+                    "confidence": item.confidence,
+                }
+                for (user_id, preference_type), item in update.preferences.items()
+            ]
+        )
+        new = stmt.excluded
+        same_value = UserPreference.preference_value == new.preference_value
+        reinforced = func.greatest(
+            -1.0,
+            func.least(1.0, 1.0 - (1.0 - UserPreference.confidence) * (1.0 - new.confidence)),
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_user_preference",
+            set_={
+                "preference_value": new.preference_value,
+                "confidence": case((same_value, reinforced), else_=new.confidence),
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
+
+
+class DeferredPortraitUpdater:
+    """Merges portrait updates across turns and writes them periodically."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        settings: PortraitSettings,
+    ) -> None:
+        self._session_factory = session_factory
+        self._interval = settings.portrait_flush_interval_seconds
+        self._max_keys = settings.portrait_buffer_max_keys
+        self._pending = PortraitUpdate()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def add(
+        self,
+        user_id: uuid.UUID,
+        interests: Iterable[InterestSignal] = (),
+        preferences: Iterable[PreferenceSignal] = (),
+    ) -> None:
+        self._pending.add(user_id, interests, preferences)
+        if len(self._pending.interests) + len(self._pending.preferences) >= self._max_keys:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the periodic flusher and hook the final flush into ``close_db()``."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="portrait-updater")
+            register_shutdown_hook(self.close)
+
+    async def close(self) -> None:
+        """Stop the flusher and write out everything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            update, self._pending = self._pending, PortraitUpdate()
+            if not update:
+                return
+            try:
+                async with self._session_factory() as session, session.begin():
+                    await apply_portrait_update(session, update)
+            except BaseException:
+                # Requeue under anything added since (also when cancelled).
+                self._requeue(update)
+                logger.exception(
+                    "portrait_updater.flush_failed",
+                    interests=len(update.interests),
+                    preferences=len(update.preferences),
+                )
+                raise
+
+    def _requeue(self, update: PortraitUpdate) -> None:
+        """Fold a failed batch back into ``_pending`` as if it had come first."""
+        for key, item in update.interests.items():
+            newer = self._pending.interests.get(key)
+            if newer is not None:
+                total = item.frequency + newer.frequency
+                item.confidence = _clamp(
+                    (item.confidence * item.frequency + newer.confidence * newer.frequency) / total
+                )
+                item.frequency = total
+                item.first_mentioned = min(item.first_mentioned, newer.first_mentioned)
+                item.last_mentioned = max(item.last_mentioned, newer.last_mentioned)
+            self._pending.interests[key] = item
+        for key, preference in update.preferences.items():
+            newer_preference = self._pending.preferences.get(key)
+            if newer_preference is None:
+                self._pending.preferences[key] = preference
+            elif newer_preference.value == preference.value:
+                newer_preference.confidence = reinforce(
+                    preference.confidence, newer_preference.confidence
+                )
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._interval)
+            self._wakeup.clear()
+            # Failures are logged by flush() and retried on the next tick. The shield
+            # lets close() cancel this loop while a flush finishes writing.
+            with contextlib.suppress(Exception):
+                await asyncio.shield(self.flush())
@@ -0,0 +1,170 @@
+"""Fixtures for tests that run against PostgreSQL with pgvector.
+
+Set ``TEST_DATABASE_URL`` to an asyncpg URL for a server where the tests may
+create databases, e.g. ``postgresql+asyncpg://postgres@localhost/postgres``. A
+fresh database is migrated to head once per session and dropped afterwards, and
+every table is truncated before each test. Without the variable these tests are
+skipped.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator, Sequence
+from pathlib import Path
+
+import numpy as np
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from core.config import get_settings
+from database.connection import create_session_factory
+from database.models import Base, Episode, EpisodeStatus, MemoryBase, Participant, ParticipantType
+from services.llm.providers.base import ChatMessage, LLMProvider
+
+ROOT = Path(__file__).resolve().parents[2]
+DIMENSION = 1536
+
+MakeParticipant = Callable[..., Awaitable[uuid.UUID]]
+MakeEpisode = Callable[[uuid.UUID, uuid.UUID], Awaitable[int]]
+
+
+@pytest.fixture(scope="session")
+def database_url() -> Iterator[str]:
+    raw = os.environ.get("TEST_DATABASE_URL")
+    if not raw:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    url = make_url(raw)
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(url.set(drivername="postgresql+psycopg2"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+
+    previous = os.environ.get("DATABASE_SYNC_URL")
+    sync_url = url.set(drivername="postgresql+psycopg2", database=name)
+    os.environ["DATABASE_SYNC_URL"] = sync_url.render_as_string(hide_password=False)
+    get_settings.cache_clear()
+    try:
+        config = Config(str(ROOT / "alembic.ini"))
+        config.set_main_option("script_location", str(ROOT / "src" / "database" / "migrations"))
+        command.upgrade(config, "head")
+        yield url.set(database=name).render_as_string(hide_password=False)
+    finally:
+        if previous is None:
+            os.environ.pop("DATABASE_SYNC_URL", None)
+        else:
+            os.environ["DATABASE_SYNC_URL"] = previous
+        get_settings.cache_clear()
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+        admin.dispose()
+
+
+@pytest.fixture
+async def engine(database_url: str) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(database_url)
+    tables = ", ".join(f'"{table.name}"' for table in Base.metadata.sorted_tables)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return create_session_factory(engine)
+
+
+@pytest.fixture
+def make_participant(session_factory: async_sessionmaker[AsyncSession]) -> MakeParticipant:
+    async def make(
+        type: ParticipantType = ParticipantType.AI_CHARACTER, name: str = "Ene"
+    ) -> uuid.UUID:
+        async with session_factory() as session, session.begin():
+            return await session.scalar(
+                insert(Participant)
+                .values(id=uuid.uuid4(), type=type, name=name)
+                .returning(Participant.id)
+            )
+
+    return make
+
+
+@pytest.fixture
+def make_episode(session_factory: async_sessionmaker[AsyncSession]) -> MakeEpisode:
+    """An ONGOING episode between ``character`` and ``user``; returns its id."""
+
+    async def make(character: uuid.UUID, user: uuid.UUID) -> int:
+        async with session_factory() as session, session.begin():
+            memory_id = await session.scalar(
+                insert(MemoryBase)
+                .values(
+                    owner_id=character,
+                    memory_type="episode",
+                    importance_score=0.5,
+                    memory_strength=1.0,
+                )
+                .returning(MemoryBase.id)
+            )
+            return await session.scalar(
+                insert(Episode)
+                .values(
+                    memory_id=memory_id,
+                    title="",
+                    summary="",
+                    character_id=character,
+                    user_id=user,
+                    status=EpisodeStatus.ONGOING,
+                )
+                .returning(Episode.id)
+            )
+
+    return make
+
+
+def unit_vector(*hot: int, dimension: int = DIMENSION) -> np.ndarray:
+    """A unit vector with equal weight on the ``hot`` axes."""
+    vector = np.zeros(dimension)
+    vector[list(hot)] = 1.0
+    return vector / np.linalg.norm(vector)
+
+
+class FakeProvider(LLMProvider):
+    """Streams ``reply`` word by word and records every prompt it was sent."""
+
+    name = "fake"
+
+    def __init__(self, reply: str = "Noted.") -> None:
+        self.reply = reply
+        self.prompts: list[list[ChatMessage]] = []
+
+    async def stream(
+        self,
+        messages: Sequence[ChatMessage],
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        self.prompts.append(list(messages))
+        for i, word in enumerate(self.reply.split(" ")):
+            yield word if i == 0 else f" {word}"
+
+
+class FakeEmbeddings:
+    """Stands in for ``EmbeddingService``: one deterministic unit vector per text."""
+
+    async def embed(self, text: str) -> np.ndarray:
+        return unit_vector(sum(text.encode()) % DIMENSION)
+
+    async def embed_many(self, texts: Sequence[str]) -> list[np.ndarray]:
+        return [await self.embed(text) for text in texts]
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import select
+
+from core.config import MemorySettings
+from database.models import MemoryAccessLog, MemoryBase
+from services.memory.access_buffer import AccessEvent, MemoryAccessBuffer
+from services.memory.retrieval import MemoryRetriever
+from services.memory.store import MemoryStore
+from tests.integration.conftest import unit_vector
+
+
+async def test_retrieval_is_logged_and_reinforced_on_flush(
+    session_factory, make_participant
+) -> None:
+    settings = MemorySettings(memory_reinforcement_factor=0.5)
+    owner = await make_participant()
+    store = MemoryStore(settings)
+    async with session_factory() as session, session.begin():
+        memory_id = (
+            await store.insert(
+                session,
+                owner_id=owner,
+                memory_type="message",
+                importance_score=0.5,
+                embedding=unit_vector(0),
+                memory_strength=0.5,
+            )
+        ).memory_id
+
+    buffer = MemoryAccessBuffer(session_factory, settings)
+    retriever = MemoryRetriever(settings, access_buffer=buffer)
+    async with session_factory() as session:
+        for _ in range(2):
+            await retriever.retrieve(session, owner, unit_vector(0), access_context="chat")
+    assert buffer.pending == 2
+
+    assert await buffer.flush() == 2
+
+    async with session_factory() as session:
+        logs = (await session.execute(select(MemoryAccessLog))).scalars().all()
+        memory = (
+            await session.execute(
+                select(MemoryBase.access_count, MemoryBase.memory_strength).where(
+                    MemoryBase.id == memory_id
+                )
+            )
+        ).one()
+    assert [(log.memory_id, log.access_context) for log in logs] == [(memory_id, "chat")] * 2
+    assert all(log.reinforcement_applied for log in logs)
+    assert memory.access_count == 2
+    # Two accesses each move strength halfway to 1: 0.5 -> 0.75 -> 0.875.
+    assert memory.memory_strength == pytest.approx(0.875)
+
+
+async def test_events_the_database_rejects_are_dropped(session_factory, make_participant) -> None:
+    settings = MemorySettings()
+    owner = await make_participant()
+    async with session_factory() as session, session.begin():
+        memory_id = (
+            await MemoryStore(settings).insert(
+                session,
+                owner_id=owner,
+                memory_type="message",
+                importance_score=0.5,
+                embedding=unit_vector(0),
+            )
+        ).memory_id
+
+    buffer = MemoryAccessBuffer(session_factory, settings)
+    buffer.record(AccessEvent(memory_id=memory_id))
+    buffer.record(AccessEvent(memory_id=memory_id + 1_000_000))  # no such memory
+
+    assert await buffer.flush() == 1
+    assert buffer.pending == 0
+    assert await buffer.flush() == 0
+
+    async with session_factory() as session:
+        logged = (await session.scalars(select(MemoryAccessLog.memory_id))).all()
+    assert logged == [memory_id]
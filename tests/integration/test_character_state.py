@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select, update
+
+from core.config import EmotionSettings
+from database.models import CharacterState
+from models.domain.character_state import StateUpdate
+from services.emotion import state as state_module
+from services.emotion.state import CharacterStateCache
+
+
+@pytest.fixture
+async def cache(engine, session_factory):
+    cache = CharacterStateCache(engine, session_factory, EmotionSettings())
+    yield cache
+    await cache.close()
+
+
+async def _row(session_factory, character) -> tuple[float, int]:
+    async with session_factory() as session:
+        row = (
+            await session.execute(
+                select(CharacterState.energy_level, CharacterState.version).where(
+                    CharacterState.character_id == character
+                )
+            )
+        ).one()
+    return row.energy_level, row.version
+
+
+async def _lockable(engine, character) -> bool:
+    key = (state_module._LOCK_NAMESPACE, func.hashtext(str(character)))
+    async with engine.connect() as conn:
+        acquired = await conn.scalar(select(func.pg_try_advisory_lock(*key)))
+        if acquired:
+            await conn.scalar(select(func.pg_advisory_unlock(*key)))
+    return acquired
+
+
+class TrackingConnection:
+    """Wraps the lock connection and records how many statements overlap."""
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+        self.active = 0
+        self.peak = 0
+
+    async def _call(self, method: str, *args, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0)
+            return await getattr(self.connection, method)(*args, **kwargs)
+        finally:
+            self.active -= 1
+
+    async def scalar(self, *args, **kwargs):
+        return await self._call("scalar", *args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        return await self._call("execute", *args, **kwargs)
+
+    async def close(self) -> None:
+        await self._call("close")
+
+
+async def test_owned_updates_are_coalesced_until_flush(
+    cache, session_factory, make_participant
+) -> None:
+    character = await make_participant()
+
+    await cache.update(character, StateUpdate(energy_delta=0.1))
+    state = await cache.update(character, StateUpdate(energy_delta=0.1))
+
+    assert state.energy_level == pytest.approx(0.7)
+    assert await _row(session_factory, character) == (pytest.approx(0.5), 0)
+    assert await cache.flush() == 1
+    assert await _row(session_factory, character) == (pytest.approx(0.7), 1)
+
+
+async def test_concurrent_claims_and_releases_share_the_lock_connection(
+    engine, cache, make_participant
+) -> None:
+    characters = [await make_participant(name=f"C{i}") for i in range(16)]
+    owned, claimed = characters[:8], characters[8:]
+    await asyncio.gather(*(cache.update(c, StateUpdate(energy_delta=0.1)) for c in owned))
+    assert cache.owned == len(owned)
+    tracking = cache._lock_connection = TrackingConnection(cache._lock_connection)
+
+    # Releases interleave with fresh claims; none may trip over the shared
+    # connection or drop the locks the others hold.
+    await asyncio.gather(*(cache.release(c) for c in owned), *(cache.get(c) for c in claimed))
+
+    assert tracking.peak == 1
+    assert cache.owned == len(claimed)
+    assert [await _lockable(engine, c) for c in characters] == [True] * 8 + [False] * 8
+
+
+async def test_second_worker_writes_through(
+    engine, cache, session_factory, make_participant
+) -> None:
+    character = await make_participant()
+    await cache.get(character)
+    other = CharacterStateCache(engine, session_factory, EmotionSettings())
+    try:
+        state = await other.update(character, StateUpdate(energy_delta=0.2))
+    finally:
+        await other.close()
+
+    assert other.owned == 0
+    assert state.energy_level == pytest.approx(0.7)
+    assert await _row(session_factory, character) == (pytest.approx(0.7), 1)
+
+
+async def test_pending_updates_are_replayed_over_a_concurrent_write(
+    cache, session_factory, make_participant
+) -> None:
+    character = await make_participant()
+    await cache.update(character, StateUpdate(energy_delta=0.1))
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            update(CharacterState)
+            .where(CharacterState.character_id == character)
+            .values(energy_level=0.2, version=CharacterState.version + 1)
+        )
+
+    assert await cache.flush() == 1
+
+    assert await _row(session_factory, character) == (pytest.approx(0.3), 2)
+    assert (await cache.get(character)).energy_level == pytest.approx(0.3)
@@ -0,0 +1,212 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from core.config import MemorySettings, PortraitSettings
+from database.models import (
+    EmotionHistory,
+    MemoryBase,
+    Message,
+    ParticipantType,
+    UserInterest,
+    UserPreference,
+)
+from models.domain.portrait import InterestSignal, PreferenceSignal
+from services.dialogue.chat import DEFAULT_MESSAGE_IMPORTANCE, ChatService, ChatTurn
+from services.memory.context import ContextAssembler
+from services.memory.embedding_cache import EmbeddingCache
+from services.memory.reflection_trigger import pending_importance
+from services.memory.retrieval import MemoryRetriever
+from services.memory.store import MemoryStore
+from services.memory.vector_search import VectorSearch
+from services.portrait.updater import DeferredPortraitUpdater
+from tests.integration.conftest import FakeEmbeddings, FakeProvider
+
+
+class RecordingQueue:
+    """Keeps submitted jobs without running them; ``accept=False`` rejects them."""
+
+    def __init__(self, accept: bool = True) -> None:
+        self.accept = accept
+        self.jobs = []
+
+    def submit(self, factory, *, key=None) -> bool:
+        if self.accept:
+            self.jobs.append(factory)
+        return self.accept
+
+
+class SlowReplyEmbeddings(FakeEmbeddings):
+    """Holds the embedding of ``text`` until ``release`` is set."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.release = asyncio.Event()
+
+    async def embed(self, text: str):
+        if text == self.text:
+            await self.release.wait()
+        return await super().embed(text)
+
+
+async def _importance(text: str) -> float:
+    return 0.9 if "?" in text else 0.1
+
+
+async def _emotion(text: str) -> dict[str, float]:
+    return {"joy": 0.7}
+
+
+async def _portrait(text: str) -> tuple[list[InterestSignal], list[PreferenceSignal]]:
+    return [InterestSignal("tea", 0.8)], [PreferenceSignal("drink", "green tea", 0.6)]
+
+
+def _service(session_factory, queue, provider=None, embeddings=None, **extra) -> ChatService:
+    settings = MemorySettings()
+    return ChatService(
+        session_factory=session_factory,
+        provider=provider or FakeProvider("Sure."),
+        embeddings=embeddings or FakeEmbeddings(),
+        retriever=MemoryRetriever(settings, EmbeddingCache(settings), VectorSearch(settings)),
+        assembler=ContextAssembler(settings),
+        store=MemoryStore(settings),
+        queue=queue,
+        importance_scorer=_importance,
+        emotion_tagger=_emotion,
+        **extra,
+    )
+
+
+async def _say(service: ChatService, turn: ChatTurn) -> str:
+    return "".join([delta async for delta in service.stream_reply(turn)])
+
+
+async def _messages(session_factory, episode_id) -> list[str]:
+    async with session_factory() as session:
+        return list(
+            await session.scalars(
+                select(Message.content)
+                .where(Message.episode_id == episode_id)
+                .order_by(Message.created_at, Message.memory_id)
+            )
+        )
+
+
+@pytest.fixture
+async def conversation(make_participant, make_episode):
+    character = await make_participant()
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    return character, user, await make_episode(character, user)
+
+
+async def test_follow_up_prompt_includes_the_previous_exchange(
+    session_factory, conversation
+) -> None:
+    character, user, episode_id = conversation
+    provider = FakeProvider("Sure.")
+    service = _service(session_factory, RecordingQueue(), provider)
+
+    await _say(service, ChatTurn(character, user, "Tea?", episode_id))
+    await _say(service, ChatTurn(character, user, "Now?", episode_id))
+    await service.close()
+
+    # Scoring jobs never ran, but the exchange was already written.
+    assert [m.content for m in provider.prompts[1][1:]] == ["Tea?", "Sure.", "Now?"]
+    assert await _messages(session_factory, episode_id) == ["Tea?", "Sure.", "Now?", "Sure."]
+
+
+async def test_writes_are_chained_per_conversation(session_factory, conversation) -> None:
+    character, user, episode_id = conversation
+    embeddings = SlowReplyEmbeddings("first reply")
+    service = _service(session_factory, RecordingQueue(), embeddings=embeddings)
+
+    # Two sockets on the same conversation: both prompts are built before either
+    # write starts, and the first write is held up on its reply embedding.
+    first_turn, second_turn = (
+        ChatTurn(character, user, "one", episode_id),
+        ChatTurn(character, user, "two", episode_id),
+    )
+    service._provider = FakeProvider("first reply")
+    first = service.stream_reply(first_turn)
+    await anext(first)
+    service._provider = FakeProvider("second reply")
+    second = service.stream_reply(second_turn)
+    await anext(second)
+    async for _ in first:
+        pass
+    async for _ in second:
+        pass
+    await asyncio.sleep(0.05)
+    assert await _messages(session_factory, episode_id) == []
+
+    embeddings.release.set()
+    await service.close()
+
+    assert await _messages(session_factory, episode_id) == [
+        "one",
+        "first reply",
+        "two",
+        "second reply",
+    ]
+
+
+async def test_scoring_runs_inline_when_the_queue_rejects_it(session_factory, conversation) -> None:
+    character, user, episode_id = conversation
+    service = _service(session_factory, RecordingQueue(accept=False))
+
+    await _say(service, ChatTurn(character, user, "Tea?", episode_id))
+    await service.close()
+
+    async with session_factory() as session:
+        scores = list(
+            await session.scalars(
+                select(MemoryBase.importance_score)
+                .where(MemoryBase.memory_type == "message")
+                .order_by(MemoryBase.id)
+            )
+        )
+        emotions = list(await session.scalars(select(EmotionHistory.joy)))
+        pending = await pending_importance(session, character)
+    assert scores == [pytest.approx(0.9), pytest.approx(0.1)]
+    assert emotions == [pytest.approx(0.7)]
+    # The accumulator matches the final scores, not the defaults written first.
+    assert pending == pytest.approx(1.0)
+    assert pending != pytest.approx(2 * DEFAULT_MESSAGE_IMPORTANCE)
+
+
+async def test_extracted_portrait_signals_are_merged_across_turns(
+    session_factory, conversation
+) -> None:
+    character, user, episode_id = conversation
+    portraits = DeferredPortraitUpdater(session_factory, PortraitSettings())
+    service = _service(
+        session_factory,
+        RecordingQueue(accept=False),
+        portrait_extractor=_portrait,
+        portraits=portraits,
+    )
+
+    await _say(service, ChatTurn(character, user, "Tea?", episode_id))
+    await _say(service, ChatTurn(character, user, "More tea?", episode_id))
+    await service.close()
+    await portraits.close()
+
+    async with session_factory() as session:
+        interests = (
+            await session.execute(
+                select(UserInterest.topic, UserInterest.frequency).where(
+                    UserInterest.user_id == user
+                )
+            )
+        ).all()
+        preferences = (
+            await session.execute(
+                select(UserPreference.preference_value, UserPreference.confidence).where(
+                    UserPreference.user_id == user
+                )
+            )
+        ).all()
+    assert interests == [("tea", 2)]
+    # Restating a preference reinforces it: 1 - (1 - 0.6) * (1 - 0.6).
+    assert preferences == [("green tea", pytest.approx(0.84))]
@@ -0,0 +1,117 @@
+import uuid
+
+from sqlalchemy import insert, select
+
+from core.config import MemorySettings
+from core.utils.tokens import TOKEN_COUNT_KEY, count_tokens
+from database.models import MemoryBase, Message
+from database.repositories.messages import MessageRepository
+from services.memory.context import RECENT_MESSAGES, ContextAssembler
+from services.memory.store import MemoryStore
+
+SETTINGS = MemorySettings(max_context_tokens=1000)
+
+
+async def _message(
+    session_factory, store, owner: uuid.UUID, episode_id: int, content: str, *, counted=True
+) -> int:
+    async with session_factory() as session, session.begin():
+        stored = await store.insert(
+            session,
+            owner_id=owner,
+            memory_type="message",
+            importance_score=0.3,
+            content=content if counted else None,
+        )
+        await session.execute(
+            insert(Message).values(
+                memory_id=stored.memory_id, episode_id=episode_id, sender_id=owner, content=content
+            )
+        )
+        return stored.memory_id
+
+
+async def test_recent_messages_fill_the_budget_newest_first_and_read_chronologically(
+    session_factory, make_participant, make_episode
+) -> None:
+    character, user = await make_participant(), await make_participant(name="User")
+    store = MemoryStore(SETTINGS)
+    episode_id = await make_episode(character, user)
+    contents = ["the first message " * 5, "the second message " * 5, "the third message " * 5]
+    for content in contents:
+        await _message(session_factory, store, character, episode_id, content)
+    newest_two = count_tokens(contents[1]) + count_tokens(contents[2])
+
+    async with session_factory() as session:
+        context = await ContextAssembler(SETTINGS).assemble(
+            session,
+            owner_id=character,
+            episode_id=episode_id,
+            reserved_tokens=SETTINGS.max_context_tokens - newest_two,
+        )
+
+    assert [item.content for item in context.section(RECENT_MESSAGES)] == contents[1:]
+    assert context.used_tokens == newest_two <= context.budget
+
+
+async def test_missing_token_counts_are_backfilled(
+    session_factory, make_participant, make_episode
+) -> None:
+    character, user = await make_participant(), await make_participant(name="User")
+    store = MemoryStore(SETTINGS)
+    episode_id = await make_episode(character, user)
+    memory_id = await _message(
+        session_factory, store, character, episode_id, "written before counts", counted=False
+    )
+
+    async with session_factory() as session, session.begin():
+        context = await ContextAssembler(SETTINGS).assemble(
+            session, owner_id=character, episode_id=episode_id
+        )
+
+    async with session_factory() as session:
+        metadata = await session.scalar(
+            select(MemoryBase.metadata_).where(MemoryBase.id == memory_id)
+        )
+    assert metadata[TOKEN_COUNT_KEY] == count_tokens("written before counts")
+    assert context.used_tokens == metadata[TOKEN_COUNT_KEY]
+
+
+async def test_messages_written_in_one_transaction_keep_insert_order(
+    session_factory, make_participant, make_episode
+) -> None:
+    character, user = await make_participant(), await make_participant(name="User")
+    store = MemoryStore(SETTINGS)
+    episode_id = await make_episode(character, user)
+    # Both rows get the same created_at; their random ids sort opposite to insert order.
+    async with session_factory() as session, session.begin():
+        for message_id, sender, content in (
+            (uuid.UUID(int=2), user, "How are you?"),
+            (uuid.UUID(int=1), character, "Fine, thanks."),
+        ):
+            stored = await store.insert(
+                session,
+                owner_id=character,
+                memory_type="message",
+                importance_score=0.3,
+                content=content,
+            )
+            await session.execute(
+                insert(Message).values(
+                    id=message_id,
+                    memory_id=stored.memory_id,
+                    episode_id=episode_id,
+                    sender_id=sender,
+                    content=content,
+                )
+            )
+
+    async with session_factory() as session:
+        context = await ContextAssembler(SETTINGS).assemble(
+            session, owner_id=character, episode_id=episode_id
+        )
+        tail = await MessageRepository(session).episode_tail(episode_id)
+
+    expected = ["How are you?", "Fine, thanks."]
+    assert [item.content for item in context.section(RECENT_MESSAGES)] == expected
+    assert [message.content for message in tail] == expected
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import func, insert, text
+
+from core.config import EmotionSettings
+from database.models import EmotionHistory
+from services.emotion.dynamics import EmotionDynamics
+
+
+async def _feel(session_factory, character, minutes_ago: float, **emotions: float) -> None:
+    values = {name: 0.0 for name in ("joy", "sadness", "anger", "surprise", "fear", "disgust")}
+    values.update(emotions)
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            insert(EmotionHistory).values(
+                character_id=character,
+                created_at=func.localtimestamp() - text(f"interval '{minutes_ago} minutes'"),
+                **values,
+            )
+        )
+
+
+def _dynamics(**overrides) -> EmotionDynamics:
+    return EmotionDynamics(EmotionSettings(mood_half_life_minutes=30.0, **overrides))
+
+
+async def test_current_mood_weights_recent_emotions_more(session_factory, make_participant) -> None:
+    character = await make_participant()
+    await _feel(session_factory, character, 0, joy=1.0)
+    await _feel(session_factory, character, 30, sadness=1.0)
+
+    async with session_factory() as session:
+        mood = await _dynamics().current_mood(session, character)
+
+    assert mood.samples == 2
+    assert mood.dominant == "joy"
+    assert mood.as_dict()["joy"] == pytest.approx(2 / 3, abs=1e-3)
+    assert mood.as_dict()["sadness"] == pytest.approx(1 / 3, abs=1e-3)
+
+
+async def test_window_bounds_rows_by_age_and_count(session_factory, make_participant) -> None:
+    character = await make_participant()
+    await _feel(session_factory, character, 3 * 60, anger=1.0)  # outside the window
+    for minutes in (1, 2, 3):
+        await _feel(session_factory, character, minutes, fear=1.0)
+
+    async with session_factory() as session:
+        by_age = await _dynamics(mood_window_hours=2.0).current_mood(session, character)
+        by_count = await _dynamics(mood_window_rows=2).current_mood(session, character)
+
+    assert by_age.samples == 3
+    assert by_age.as_dict()["anger"] == 0.0
+    assert by_count.samples == 2
+    assert by_count.as_of == by_age.as_of
+
+
+async def test_batch_moods_match_single_reads(session_factory, make_participant) -> None:
+    happy = await make_participant(name="Happy")
+    sad = await make_participant(name="Sad")
+    quiet = await make_participant(name="Quiet")
+    await _feel(session_factory, happy, 5, joy=0.9, surprise=0.2)
+    await _feel(session_factory, happy, 50, joy=0.1)
+    await _feel(session_factory, sad, 10, sadness=0.7)
+    dynamics = _dynamics()
+
+    async with session_factory() as session:
+        moods = await dynamics.moods(session, [happy, sad, quiet, happy])
+        singles = {c: await dynamics.current_mood(session, c) for c in (happy, sad, quiet)}
+
+    assert list(moods) == [happy, sad, quiet]
+    for character, single in singles.items():
+        assert moods[character].samples == single.samples
+        assert moods[character].as_dict() == pytest.approx(single.as_dict(), abs=1e-3)
+        assert moods[character].as_of == single.as_of
+    assert moods[quiet].samples == 0 and moods[quiet].as_of is None
+
+
+async def test_no_characters_means_no_query(session_factory) -> None:
+    async with session_factory() as session:
+        assert await _dynamics().moods(session, []) == {}
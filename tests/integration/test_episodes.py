@@ -0,0 +1,147 @@
+import uuid
+
+from sqlalchemy import func, insert, select, text, update
+
+from core.config import EmotionSettings, MemorySettings
+from database.models import Episode, EpisodeStatus, Message, ParticipantType
+from services.emotion.state import CharacterStateCache
+from services.memory.context import EPISODES, ContextAssembler
+from services.memory.episode_summaries import LLMEpisodeSummarizer
+from services.memory.episodes import EpisodeSegmenter
+from services.memory.store import MemoryStore
+from tests.integration.conftest import FakeProvider
+
+SETTINGS = MemorySettings()
+
+
+class RecordingQueue:
+    def __init__(self) -> None:
+        self.jobs = {}
+
+    def submit(self, factory, *, key=None) -> bool:
+        if key in self.jobs:
+            return False
+        self.jobs[key] = factory
+        return True
+
+    async def drain(self) -> None:
+        jobs, self.jobs = self.jobs, {}
+        for job in jobs.values():
+            await job()
+
+
+async def _talk(session_factory, episode_id: int, *turns: tuple[uuid.UUID, str]) -> None:
+    """Attach messages to an episode and leave it idle for longer than the limit."""
+    store = MemoryStore(SETTINGS)
+    async with session_factory() as session, session.begin():
+        for sender, content in turns:
+            stored = await store.insert(
+                session,
+                owner_id=sender,
+                memory_type="message",
+                importance_score=0.3,
+                content=content,
+            )
+            await session.execute(
+                insert(Message).values(
+                    memory_id=stored.memory_id,
+                    episode_id=episode_id,
+                    sender_id=sender,
+                    content=content,
+                )
+            )
+        await session.execute(
+            update(Episode)
+            .where(Episode.id == episode_id)
+            .values(
+                message_count=Episode.message_count + len(turns),
+                last_message_at=func.localtimestamp() - text("interval '2 hours'"),
+            )
+        )
+
+
+def _segmenter(session_factory, queue, **kwargs) -> EpisodeSegmenter:
+    return EpisodeSegmenter(
+        SETTINGS, MemoryStore(SETTINGS), session_factory=session_factory, queue=queue, **kwargs
+    )
+
+
+async def test_idle_episode_is_closed_summarized_and_offered_as_context(
+    session_factory, make_participant, make_episode
+) -> None:
+    character = await make_participant()
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    episode_id = await make_episode(character, user)
+    await _talk(session_factory, episode_id, (user, "I love green tea."), (character, "Me too!"))
+    provider = FakeProvider('{"title": "Tea", "summary": "They bonded over green tea."}')
+    queue = RecordingQueue()
+    segmenter = _segmenter(session_factory, queue, summarizer=LLMEpisodeSummarizer(provider))
+
+    assert await segmenter.close_idle() == 1
+    await queue.drain()
+
+    async with session_factory() as session:
+        episode = await session.get(Episode, episode_id)
+        context = await ContextAssembler(SETTINGS).assemble(session, owner_id=character)
+    assert (episode.status, episode.title) == (EpisodeStatus.COMPLETED, "Tea")
+    assert [item.content for item in context.section(EPISODES)] == ["They bonded over green tea."]
+    prompt = provider.prompts[0][-1].content
+    assert "user: I love green tea.\nassistant: Me too!" in prompt
+    assert prompt.endswith("The episode has ended.")
+
+
+async def test_sweep_keeps_episodes_that_are_still_active(
+    session_factory, make_participant, make_episode
+) -> None:
+    character = await make_participant()
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    idle = await make_episode(character, user)
+    active = await make_episode(character, await make_participant(name="Bob"))
+    await _talk(session_factory, idle, (user, "Bye."))
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            update(Episode).where(Episode.id == active).values(last_message_at=func.now())
+        )
+
+    assert await _segmenter(session_factory, RecordingQueue()).close_idle() == 1
+
+    async with session_factory() as session:
+        statuses = dict((await session.execute(select(Episode.id, Episode.status))).all())
+    assert statuses == {idle: EpisodeStatus.COMPLETED, active: EpisodeStatus.ONGOING}
+
+
+async def test_character_state_is_released_with_its_last_ongoing_episode(
+    engine, session_factory, make_participant, make_episode
+) -> None:
+    character = await make_participant()
+    alice = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    bob = await make_participant(type=ParticipantType.HUMAN, name="Bob")
+    with_alice = await make_episode(character, alice)
+    with_bob = await make_episode(character, bob)
+    states = CharacterStateCache(engine, session_factory, EmotionSettings())
+    segmenter = _segmenter(session_factory, RecordingQueue(), character_states=states)
+    try:
+        await states.get(character)
+        assert states.owned == 1
+
+        await _talk(session_factory, with_alice, (alice, "See you."))
+        assert await segmenter.close_idle() == 1
+        assert states.owned == 1  # still talking to Bob
+
+        await _talk(session_factory, with_bob, (bob, "Later."))
+        assert await segmenter.close_idle() == 1
+        assert states.owned == 0
+    finally:
+        await states.close()
+
+
+async def test_summary_is_skipped_without_a_summarizer(
+    session_factory, make_participant, make_episode
+) -> None:
+    character = await make_participant()
+    episode_id = await make_episode(character, await make_participant(name="Alice"))
+    queue = RecordingQueue()
+    segmenter = _segmenter(session_factory, queue)
+
+    assert not segmenter.schedule_summary(episode_id)
+    assert queue.jobs == {}
@@ -0,0 +1,79 @@
+import uuid
+
+import pytest
+from sqlalchemy import insert
+
+from core.config import MemorySettings
+from database.models import Message
+from services.dialogue.history import episode_messages, sender_messages
+from services.memory.store import MemoryStore
+
+
+async def _write(session_factory, owner, episode_id, sender, contents: list[str]) -> None:
+    """Write ``contents`` in one transaction, so they share created_at."""
+    store = MemoryStore(MemorySettings())
+    async with session_factory() as session, session.begin():
+        for content in contents:
+            stored = await store.insert(
+                session, owner_id=owner, memory_type="message", importance_score=0.3
+            )
+            await session.execute(
+                insert(Message).values(
+                    memory_id=stored.memory_id,
+                    episode_id=episode_id,
+                    sender_id=sender,
+                    content=content,
+                )
+            )
+
+
+async def _walk(page_fn, session_factory, scope, order, limit) -> list[str]:
+    seen, cursor = [], None
+    async with session_factory() as session:
+        while True:
+            page = await page_fn(session, scope, cursor=cursor, limit=limit, order=order)
+            seen.extend(item.content for item in page.items)
+            if page.next_cursor is None:
+                return seen
+            cursor = page.next_cursor
+
+
+@pytest.fixture
+async def conversation(session_factory, make_participant, make_episode):
+    character, user = await make_participant(), await make_participant(name="User")
+    episode_id = await make_episode(character, user)
+    batches = [["a1", "a2", "a3"], ["b1"], ["c1", "c2"]]
+    for batch in batches:
+        await _write(session_factory, character, episode_id, user, batch)
+    return episode_id, user, batches
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 50])
+async def test_pages_cover_every_message_once_in_both_orders(
+    session_factory, conversation, limit
+) -> None:
+    episode_id, user, batches = conversation
+
+    for page_fn, scope in ((episode_messages, episode_id), (sender_messages, user)):
+        ascending = await _walk(page_fn, session_factory, scope, "asc", limit)
+        descending = await _walk(page_fn, session_factory, scope, "desc", limit)
+
+        # Messages sharing a transaction (and created_at) keep their write order.
+        assert ascending == [m for batch in batches for m in batch]
+        assert descending == ascending[::-1]
+
+
+async def test_last_page_has_no_cursor(session_factory, conversation) -> None:
+    episode_id, _, _ = conversation
+    async with session_factory() as session:
+        page = await episode_messages(session, episode_id, limit=6)
+        empty = await episode_messages(session, episode_id + 1)
+
+    assert len(page.items) == 6 and page.next_cursor is None
+    assert empty.items == [] and empty.next_cursor is None
+
+
+async def test_unknown_sender_has_no_history(session_factory, conversation) -> None:
+    async with session_factory() as session:
+        page = await sender_messages(session, uuid.uuid4())
+    assert page.items == []
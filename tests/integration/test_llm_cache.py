@@ -0,0 +1,50 @@
+from sqlalchemy import select
+
+from core.config import LLMSettings
+from database.models import LLMResponseCache
+from services.llm.cache import CachedLLM, LLMResponseCacheStore
+from services.llm.providers.base import ChatMessage
+from tests.integration.conftest import FakeProvider
+
+PROMPT = [ChatMessage(role="user", content="Rate: hello")]
+
+
+async def _hit_count(session_factory) -> int:
+    async with session_factory() as session:
+        return await session.scalar(select(LLMResponseCache.hit_count))
+
+
+async def test_repeated_calls_are_served_from_the_cache(session_factory) -> None:
+    provider = FakeProvider("3")
+    store = LLMResponseCacheStore(session_factory, LLMSettings())
+    llm = CachedLLM(provider, store)
+
+    answers = [await llm.complete("importance.v1", "  Hello ", PROMPT) for _ in range(3)]
+
+    assert answers == ["3", "3", "3"]
+    assert len(provider.prompts) == 1
+    # Lookups do not write; hits are counted in process until flushed.
+    assert store.pending_hits == 1
+    assert await _hit_count(session_factory) == 0
+
+    assert await store.flush_hits() == 1
+    assert store.pending_hits == 0
+    assert await _hit_count(session_factory) == 2
+
+
+async def test_failed_hit_flush_is_dropped(session_factory) -> None:
+    store = LLMResponseCacheStore(session_factory, LLMSettings())
+    await store.put("importance.v1", "hello", "3")
+    assert await store.get("importance.v1", "hello") == "3"
+
+    def unavailable():
+        raise ConnectionError("database unavailable")
+
+    store._session_factory = unavailable
+    assert await store.flush_hits() == 0
+    assert store.pending_hits == 0
+
+    store._session_factory = session_factory
+    assert await store.get("importance.v1", "hello") == "3"
+    assert await store.flush_hits() == 1
+    assert await _hit_count(session_factory) == 1
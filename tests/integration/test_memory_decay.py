@@ -0,0 +1,76 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from background.tasks.memory_decay import current_strength, run_memory_decay
+from core.config import MemorySettings
+from database.models import MemoryBase
+
+SETTINGS = MemorySettings(
+    memory_decay_rate=0.1,
+    memory_decay_threshold_days=30,
+    memory_weak_threshold=0.1,
+    memory_decay_batch_rows=2,
+)
+
+
+async def _memory(session, owner, *, accessed_days_ago: float, strength: float) -> int:
+    at = datetime.now() - timedelta(days=accessed_days_ago)
+    return await session.scalar(
+        insert(MemoryBase)
+        .values(
+            owner_id=owner,
+            memory_type="message",
+            importance_score=0.5,
+            memory_strength=strength,
+            last_accessed_at=at,
+            strength_updated_at=at,
+        )
+        .returning(MemoryBase.id)
+    )
+
+
+async def test_decay_folds_elapsed_decay_in_id_ranges(session_factory, make_participant) -> None:
+    owners = [await make_participant(), await make_participant(name="Other")]
+    async with session_factory() as session, session.begin():
+        stale = [await _memory(session, o, accessed_days_ago=40, strength=1.0) for o in owners]
+        fresh = await _memory(session, owners[0], accessed_days_ago=1, strength=1.0)
+        weak = await _memory(session, owners[1], accessed_days_ago=40, strength=0.05)
+        expected = {
+            row.id: row.strength
+            for row in await session.execute(
+                select(MemoryBase.id, current_strength(SETTINGS).label("strength"))
+            )
+        }
+
+    report = await run_memory_decay(session_factory, SETTINGS)
+
+    assert report.ranges_scanned == 2
+    assert report.rows_updated == 2
+    async with session_factory() as session:
+        rows = {
+            row.id: row
+            for row in await session.execute(
+                select(
+                    MemoryBase.id,
+                    MemoryBase.memory_strength,
+                    current_strength(SETTINGS).label("current"),
+                )
+            )
+        }
+    for memory_id in stale:
+        # About ten days past the threshold at 0.1 per day.
+        assert rows[memory_id].memory_strength == pytest.approx(math.exp(-1.0), rel=1e-3)
+        assert rows[memory_id].memory_strength == pytest.approx(expected[memory_id], rel=1e-6)
+        assert rows[memory_id].current == pytest.approx(rows[memory_id].memory_strength)
+    assert rows[fresh].memory_strength == 1.0
+    assert rows[weak].memory_strength == 0.05
+
+
+async def test_decay_on_empty_table(session_factory) -> None:
+    report = await run_memory_decay(session_factory, SETTINGS)
+    assert (report.ranges_scanned, report.rows_updated) == (0, 0)
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(MemoryBase)) == 0
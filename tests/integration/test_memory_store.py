@@ -0,0 +1,58 @@
+import pytest
+
+from core.config import MemorySettings
+from services.memory.embedding_cache import EmbeddingCache
+from services.memory.store import MemoryStore
+from tests.integration.conftest import unit_vector
+
+
+@pytest.fixture
+def cache(tmp_path) -> EmbeddingCache:
+    return EmbeddingCache(
+        MemorySettings(embedding_cache_dir=str(tmp_path), embedding_cache_max_bytes=1 << 24)
+    )
+
+
+async def _insert(store, session, owner, axis: int) -> int:
+    stored = await store.insert(
+        session,
+        owner_id=owner,
+        memory_type="message",
+        importance_score=0.3,
+        embedding=unit_vector(axis),
+    )
+    return stored.memory_id
+
+
+async def test_cache_appends_wait_for_the_commit(cache, session_factory, make_participant) -> None:
+    owner = await make_participant()
+    store = MemoryStore(MemorySettings(), cache)
+    async with session_factory() as session:
+        await cache.get(session, owner)
+
+    async with session_factory() as session, session.begin():
+        committed = await _insert(store, session, owner, 1)
+        await store.close()
+        assert cache.peek(owner).ids.tolist() == []
+    await store.close()
+
+    assert cache.peek(owner).ids.tolist() == [committed]
+
+
+async def test_rolled_back_inserts_are_not_appended(
+    cache, session_factory, make_participant
+) -> None:
+    owner = await make_participant()
+    store = MemoryStore(MemorySettings(), cache)
+    async with session_factory() as session:
+        await cache.get(session, owner)
+
+    async with session_factory() as session:
+        async with session.begin():
+            await _insert(store, session, owner, 1)
+            await session.rollback()
+        async with session.begin():
+            kept = await _insert(store, session, owner, 2)
+    await store.close()
+
+    assert cache.peek(owner).ids.tolist() == [kept]
@@ -0,0 +1,84 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import DatabaseSettings
+from core.utils.metrics import REGISTRY
+from database import connection
+from database.connection import TimedQueuePool, instrument_engine
+
+
+@pytest.fixture
+async def timed_engine(database_url, monkeypatch):
+    # The metric objects are process-wide; a unique engine label keeps these
+    # samples apart from anything else the suite has recorded.
+    monkeypatch.setattr(connection, "_instrumented", {})
+    monkeypatch.setattr(connection, "_fingerprints", {})
+    monkeypatch.setattr(connection, "_fingerprint_sql", {})
+    engine = create_async_engine(
+        database_url, poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2
+    )
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    instrument_engine(engine, name, DatabaseSettings())
+    yield engine, name
+    await engine.dispose()
+
+
+def _samples(name: str) -> dict[str, float]:
+    samples = {}
+    for line in REGISTRY.render().splitlines():
+        if not line.startswith("#") and f'"{name}"' in line:
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+
+def _matching(samples: dict[str, float], *parts: str) -> dict[str, float]:
+    return {series: value for series, value in samples.items() if all(p in series for p in parts)}
+
+
+async def test_statements_are_timed_per_fingerprint(timed_engine) -> None:
+    engine, name = timed_engine
+    async with engine.connect() as conn:
+        for value in (1, 2, 3):
+            await conn.execute(text(f"SELECT {value} AS n"))
+        with pytest.raises(DBAPIError):
+            await conn.execute(text("SELECT * FROM missing_table"))
+
+    (fingerprint,) = [
+        fp for fp, sql in connection._fingerprint_sql.items() if sql == "SELECT ? AS n"
+    ]
+    samples = _samples(name)
+    assert _matching(samples, "db_statement_duration_seconds_count", fingerprint) == {
+        f'db_statement_duration_seconds_count{{engine="{name}",operation="select",'
+        f'fingerprint="{fingerprint}"}}': 3.0
+    }
+    assert sum(_matching(samples, "db_statement_errors_total").values()) == 1.0
+    assert f'db_statement_info{{fingerprint="{fingerprint}",statement="SELECT ? AS n"}} 1.0' in (
+        REGISTRY.render().splitlines()
+    )
+
+
+async def test_pool_gauges_and_checkout_timeouts(timed_engine) -> None:
+    engine, name = timed_engine
+    async with engine.connect():
+        samples = _samples(name)
+        assert samples[f'db_pool_size{{engine="{name}"}}'] == 1.0
+        assert samples[f'db_pool_checked_out{{engine="{name}"}}'] == 1.0
+
+        with pytest.raises(TimeoutError):
+            async with engine.connect():
+                pass
+
+    samples = _samples(name)
+    assert samples[f'db_pool_checked_out{{engine="{name}"}}'] == 0.0
+    assert samples[f'db_pool_checkout_timeouts_total{{engine="{name}"}}'] == 1.0
+    assert samples[f'db_pool_checkout_wait_seconds_count{{engine="{name}"}}'] >= 2.0
+    assert _matching(samples, "db_pool_checkout_wait_seconds_bucket", 'le="0.1"') == {
+        f'db_pool_checkout_wait_seconds_bucket{{engine="{name}",le="0.1"}}': pytest.approx(
+            samples[f'db_pool_checkout_wait_seconds_count{{engine="{name}"}}'] - 1
+        )
+    }
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from background.tasks.partition_maintenance import (
+    MEMORY_ACCESS_LOG,
+    PartitionedTable,
+    drop_expired_partitions,
+    run_partition_maintenance,
+)
+from core.config import DatabaseSettings
+
+
+async def _partitions(engine, parent: str) -> list[str]:
+    async with engine.connect() as conn:
+        rows = await conn.scalars(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:parent AS regclass) ORDER BY c.relname"
+            ),
+            {"parent": parent},
+        )
+        return list(rows)
+
+
+async def _exists(engine, name: str) -> bool:
+    async with engine.connect() as conn:
+        return await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+
+
+async def _ensure(engine, table: PartitionedTable, month: date) -> str:
+    async with engine.begin() as conn:
+        return await conn.scalar(
+            text("SELECT ensure_monthly_partition(:parent, :key, :month)"),
+            {"parent": table.name, "key": table.key_column, "month": month},
+        )
+
+
+async def test_maintenance_creates_upcoming_and_drops_expired_partitions(engine) -> None:
+    old = await _ensure(engine, MEMORY_ACCESS_LOG, date(2020, 1, 1))
+    settings = DatabaseSettings(
+        partition_months_ahead=2,
+        memory_access_log_retention_months=6,
+        emotion_history_retention_months=None,
+    )
+
+    report = await run_partition_maintenance(engine, settings)
+
+    assert report.dropped == [old] and report.skipped == []
+    assert len(report.ensured) == 2 * 3  # current month and two ahead, per table
+    partitions = await _partitions(engine, MEMORY_ACCESS_LOG.name)
+    assert old not in partitions
+    assert set(report.ensured[:3]) <= set(partitions)
+    assert not await _exists(engine, old)
+
+
+async def test_busy_parent_is_skipped_until_the_next_run(engine) -> None:
+    old = await _ensure(engine, MEMORY_ACCESS_LOG, date(2020, 2, 1))
+    async with engine.connect() as reader:
+        # An open reader holds ACCESS SHARE on the parent, which DETACH must wait for.
+        await reader.execute(text(f"LOCK TABLE {MEMORY_ACCESS_LOG.name} IN ACCESS SHARE MODE"))
+        dropped, skipped = await drop_expired_partitions(
+            engine, MEMORY_ACCESS_LOG, 6, lock_timeout_ms=100
+        )
+        assert (dropped, skipped) == ([], [old])
+        assert old in await _partitions(engine, MEMORY_ACCESS_LOG.name)
+        await reader.rollback()
+
+    dropped, skipped = await drop_expired_partitions(
+        engine, MEMORY_ACCESS_LOG, 6, lock_timeout_ms=100
+    )
+    assert (dropped, skipped) == ([old], [])
+
+
+@pytest.fixture
+async def no_default_parent(engine):
+    table = PartitionedTable("maintenance_probe", "at")
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(f"CREATE TABLE {table.name} (id int, at timestamp) PARTITION BY RANGE (at)")
+        )
+    yield table
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE {table.name}"))
+
+
+async def test_parent_without_default_partition_detaches_concurrently(
+    engine, no_default_parent
+) -> None:
+    old = await _ensure(engine, no_default_parent, date(2020, 3, 1))
+    current = await _ensure(engine, no_default_parent, date.today())
+    async with engine.connect() as reader:
+        # CONCURRENTLY waits for readers instead of failing on the lock timeout.
+        await reader.execute(text(f"LOCK TABLE {no_default_parent.name} IN ACCESS SHARE MODE"))
+        task = asyncio.create_task(
+            drop_expired_partitions(engine, no_default_parent, 6, lock_timeout_ms=100)
+        )
+        await asyncio.sleep(0.3)
+        assert not task.done()
+        await reader.rollback()
+    dropped, skipped = await asyncio.wait_for(task, timeout=10)
+
+    assert (dropped, skipped) == ([old], [])
+    assert await _partitions(engine, no_default_parent.name) == [current]
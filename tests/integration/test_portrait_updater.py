@@ -0,0 +1,164 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from core.config import PortraitSettings
+from database.models import ParticipantType, UserInterest, UserPreference
+from models.domain.portrait import InterestSignal, PreferenceSignal
+from services.portrait import updater as updater_module
+from services.portrait.updater import (
+    DeferredPortraitUpdater,
+    PortraitUpdate,
+    apply_portrait_update,
+)
+
+TURNS = [
+    (
+        [InterestSignal("tea", 0.8, datetime(2026, 3, 1))],
+        [PreferenceSignal("tone", "casual", 0.4)],
+    ),
+    (
+        [InterestSignal("tea", 0.2, datetime(2026, 3, 2))],
+        [PreferenceSignal("tone", "casual", 0.5)],
+    ),
+    (
+        [InterestSignal("chess", -0.4, datetime(2026, 3, 3))],
+        [PreferenceSignal("lang", "en")],
+    ),
+]
+
+
+async def _profile(session_factory, user: uuid.UUID) -> tuple[dict, dict]:
+    async with session_factory() as session:
+        interests = (
+            await session.scalars(select(UserInterest).where(UserInterest.user_id == user))
+        ).all()
+        preferences = (
+            await session.scalars(select(UserPreference).where(UserPreference.user_id == user))
+        ).all()
+    return (
+        {
+            row.topic: (
+                pytest.approx(row.confidence),
+                row.frequency,
+                row.first_mentioned,
+                row.last_mentioned,
+            )
+            for row in interests
+        },
+        {
+            row.preference_type: (row.preference_value, pytest.approx(row.confidence))
+            for row in preferences
+        },
+    )
+
+
+async def _users(make_participant) -> tuple[uuid.UUID, uuid.UUID]:
+    return (
+        await make_participant(type=ParticipantType.HUMAN, name="Alice"),
+        await make_participant(type=ParticipantType.HUMAN, name="Bob"),
+    )
+
+
+async def test_merged_batch_matches_writing_each_turn(session_factory, make_participant) -> None:
+    separate, merged = await _users(make_participant)
+    batch = PortraitUpdate()
+    for interests, preferences in TURNS:
+        turn = PortraitUpdate()
+        turn.add(separate, interests, preferences)
+        async with session_factory() as session, session.begin():
+            await apply_portrait_update(session, turn)
+        batch.add(merged, interests, preferences)
+
+    async with session_factory() as session, session.begin():
+        await apply_portrait_update(session, batch)
+
+    assert await _profile(session_factory, merged) == await _profile(session_factory, separate)
+    interests, preferences = await _profile(session_factory, merged)
+    assert interests["tea"][:2] == (pytest.approx(0.5), 2)
+    assert preferences["tone"] == ("casual", pytest.approx(0.7))
+
+
+async def test_failed_flush_is_requeued_under_newer_updates(
+    session_factory, make_participant, monkeypatch
+) -> None:
+    separate, deferred = await _users(make_participant)
+    for interests, preferences in TURNS:
+        turn = PortraitUpdate()
+        turn.add(separate, interests, preferences)
+        async with session_factory() as session, session.begin():
+            await apply_portrait_update(session, turn)
+
+    updater = DeferredPortraitUpdater(session_factory, PortraitSettings())
+    updater.add(deferred, *TURNS[0])
+
+    async def failing(session, update):
+        # A newer turn arrives while the batch is in flight.
+        updater.add(deferred, *TURNS[1])
+        raise ConnectionError("database went away")
+
+    monkeypatch.setattr(updater_module, "apply_portrait_update", failing)
+    with pytest.raises(ConnectionError):
+        await updater.flush()
+    monkeypatch.undo()
+    updater.add(deferred, *TURNS[2])
+    await updater.flush()
+
+    assert await _profile(session_factory, deferred) == await _profile(session_factory, separate)
+
+
+async def test_cancelled_flush_keeps_its_batch(
+    session_factory, make_participant, monkeypatch
+) -> None:
+    user, _ = await _users(make_participant)
+    updater = DeferredPortraitUpdater(session_factory, PortraitSettings())
+    updater.add(user, *TURNS[0])
+    started = asyncio.Event()
+
+    async def hanging(session, update):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(updater_module, "apply_portrait_update", hanging)
+    flush = asyncio.create_task(updater.flush())
+    await started.wait()
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+    monkeypatch.undo()
+
+    await updater.close()
+
+    interests, preferences = await _profile(session_factory, user)
+    assert set(interests) == {"tea"} and set(preferences) == {"tone"}
+
+
+async def test_close_waits_for_a_running_flush(
+    session_factory, make_participant, monkeypatch
+) -> None:
+    user, _ = await _users(make_participant)
+    updater = DeferredPortraitUpdater(session_factory, PortraitSettings(portrait_buffer_max_keys=1))
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow(session, update):
+        started.set()
+        await release.wait()
+        await apply_portrait_update(session, update)
+
+    monkeypatch.setattr(updater_module, "apply_portrait_update", slow)
+    monkeypatch.setattr(updater_module, "register_shutdown_hook", lambda hook: None)
+    updater.start()
+    updater.add(user, *TURNS[0])  # reaching max keys wakes the flusher
+    await started.wait()
+
+    closing = asyncio.create_task(updater.close())
+    await asyncio.sleep(0.05)
+    release.set()
+    await asyncio.wait_for(closing, timeout=5)
+
+    # The background flush was shielded from close()'s cancellation and finished.
+    interests, preferences = await _profile(session_factory, user)
+    assert set(interests) == {"tea"} and set(preferences) == {"tone"}
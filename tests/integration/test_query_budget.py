@@ -0,0 +1,184 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import InvalidRequestError
+
+from core.config import EmotionSettings, MemorySettings
+from database import query_counter
+from database.models import Message, ParticipantType, UserInterest, UserPortrait, UserTrait
+from database.query_counter import (
+    QueryBudgetExceeded,
+    budgeted,
+    count_queries,
+    install_query_counter,
+    query_budget,
+)
+from database.repositories.participants import ParticipantRepository
+from services.dialogue import chat
+from services.dialogue.chat import ChatService, ChatTurn
+from services.emotion.state import CharacterStateCache
+from services.memory.context import ContextAssembler
+from services.memory.embedding_cache import EmbeddingCache
+from services.memory.episodes import EpisodeSegmenter
+from services.memory.retrieval import MemoryRetriever
+from services.memory.store import MemoryStore
+from services.memory.vector_search import VectorSearch
+from tests.integration.conftest import FakeEmbeddings, FakeProvider
+
+
+@pytest.fixture
+def budget_mode(engine, monkeypatch):
+    """Count statements on ``engine`` and fail any budget overrun."""
+    monkeypatch.setattr(query_counter, "_mode", query_counter._mode)
+    install_query_counter(engine, "raise")
+
+
+class RecordingQueue:
+    def __init__(self) -> None:
+        self.jobs = []
+
+    def submit(self, factory, *, key=None) -> bool:
+        self.jobs.append(factory)
+        return True
+
+
+async def _select_one(session_factory, times: int) -> None:
+    async with session_factory() as session:
+        for _ in range(times):
+            await session.execute(select(1))
+
+
+async def test_scopes_count_their_own_and_nested_statements(session_factory, budget_mode) -> None:
+    with count_queries("outer") as outer:
+        await _select_one(session_factory, 2)
+        with count_queries("inner") as inner:
+            await _select_one(session_factory, 1)
+
+    assert (outer.total, inner.total) == (3, 1)
+    assert inner.parent is outer
+
+
+async def test_overrun_raises_with_the_statements(session_factory, budget_mode) -> None:
+    with (
+        pytest.raises(QueryBudgetExceeded, match="too_many: 3 SQL statements, budget 2"),
+        query_budget(2, "too_many"),
+    ):
+        await _select_one(session_factory, 3)
+
+    with query_budget(3, "enough") as count:
+        await _select_one(session_factory, 3)
+    assert count.total == 3
+
+
+async def test_budgeted_decorator_uses_the_qualified_name(session_factory, budget_mode) -> None:
+    @budgeted(1)
+    async def lookup() -> None:
+        await _select_one(session_factory, 2)
+
+    with pytest.raises(QueryBudgetExceeded, match="lookup"):
+        await lookup()
+
+
+async def test_off_mode_counts_nothing(session_factory, monkeypatch) -> None:
+    monkeypatch.setattr(query_counter, "_mode", "off")
+
+    with query_budget(0, "free") as count:
+        await _select_one(session_factory, 2)
+
+    assert count is None
+
+
+async def test_user_profile_loads_everything_in_four_statements(
+    session_factory, make_participant, budget_mode
+) -> None:
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    now = datetime(2026, 3, 1)
+    async with session_factory() as session, session.begin():
+        portrait_id = await session.scalar(
+            insert(UserPortrait).values(user_id=user).returning(UserPortrait.id)
+        )
+        await session.execute(
+            insert(UserTrait).values(portrait_id=portrait_id, trait_name="calm", trait_value=0.5)
+        )
+        await session.execute(
+            insert(UserInterest).values(
+                user_id=user, topic="tea", confidence=0.5, first_mentioned=now, last_mentioned=now
+            )
+        )
+
+    async with session_factory() as session:
+        with count_queries("profile") as count:
+            profile = await ParticipantRepository(session).user_profile(user)
+        assert count.total == 4
+        assert [trait.trait_name for trait in profile.user_portrait.traits] == ["calm"]
+        assert [interest.topic for interest in profile.user_interests] == ["tea"]
+        assert profile.user_preferences == []
+        # Anything not named up front raises instead of lazy-loading per row.
+        with pytest.raises(InvalidRequestError):
+            profile.emotion_histories  # noqa: B018
+
+
+@pytest.fixture
+async def states(engine, session_factory):
+    states = CharacterStateCache(engine, session_factory, EmotionSettings())
+    yield states
+    await states.close()
+
+
+def _chat_service(session_factory, states, queue: RecordingQueue) -> ChatService:
+    settings = MemorySettings()
+    store = MemoryStore(settings)
+    return ChatService(
+        session_factory=session_factory,
+        provider=FakeProvider("Hello there, friend."),
+        embeddings=FakeEmbeddings(),
+        retriever=MemoryRetriever(settings, EmbeddingCache(settings), VectorSearch(settings)),
+        assembler=ContextAssembler(settings),
+        store=store,
+        queue=queue,
+        character_states=states,
+        segmenter=EpisodeSegmenter(
+            settings, store, session_factory=session_factory, character_states=states
+        ),
+        emotion_tagger=lambda reply: _emotion(),
+    )
+
+
+async def _emotion() -> dict[str, float]:
+    return {"joy": 0.8}
+
+
+async def test_chat_turn_stays_within_its_query_budgets(
+    session_factory, states, make_participant, budget_mode
+) -> None:
+    character = await make_participant()
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    queue = RecordingQueue()
+    service = _chat_service(session_factory, states, queue)
+    turn = ChatTurn(character_id=character, user_id=user, content="Hi!")
+
+    for _ in range(2):  # the second turn also reads the first one back
+        reply = "".join([delta async for delta in service.stream_reply(turn)])
+        await service.close()
+        await queue.jobs.pop()()  # importance and emotion
+
+    assert reply == "Hello there, friend."
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(Message)) == 4
+
+
+async def test_chat_persist_overrun_is_reported(
+    session_factory, states, make_participant, budget_mode, monkeypatch
+) -> None:
+    character = await make_participant()
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    queue = RecordingQueue()
+    service = _chat_service(session_factory, states, queue)
+    monkeypatch.setattr(chat, "PERSIST_QUERY_BUDGET", 1)
+
+    turn = ChatTurn(character_id=character, user_id=user, content="Hi!")
+    async for _ in service.stream_reply(turn):
+        pass
+    with pytest.raises(QueryBudgetExceeded, match="chat.persist"):
+        await service._writes[turn.conversation]
@@ -0,0 +1,30 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import DatabaseSettings
+from database.connection import ReadRouter
+
+
+async def test_replica_serves_a_key_once_it_has_seen_the_write(
+    engine, session_factory, database_url
+) -> None:
+    # The test server is not a standby, so it always reports itself caught up.
+    replica = create_async_engine(database_url)
+    router = ReadRouter(
+        engine, session_factory, [replica], DatabaseSettings(replica_max_lag_seconds=60.0)
+    )
+    try:
+        assert router.pick() is None  # no lag sample yet
+        await router.refresh()
+        assert router.pick() is not None
+
+        router.note_write("participant:1")
+        assert router.pick("participant:1") is None
+        async with router("participant:2") as session:
+            assert await session.scalar(text("SELECT 1")) == 1
+
+        await router.refresh()
+        assert router.pick("participant:1") is not None
+        assert set(router.lag_seconds()) == {replica.url.render_as_string(hide_password=True)}
+    finally:
+        await router.dispose()
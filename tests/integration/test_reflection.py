@@ -0,0 +1,160 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import insert, select
+
+from background.queue import TaskQueue
+from background.tasks.reflection import ReflectionScheduler
+from core.config import MemorySettings
+from database.models import MemoryBase, Message, Reflection, ReflectionSource
+from services.memory.reflection_trigger import pending_importance
+from services.memory.reflections import ReflectionDraft, ReflectionGenerator
+from services.memory.store import MemoryStore
+from tests.integration.conftest import FakeEmbeddings, FakeProvider
+
+
+async def _remember(session_factory, store, owner: uuid.UUID, *contents: str) -> list[int]:
+    ids = []
+    async with session_factory() as session, session.begin():
+        for content in contents:
+            stored = await store.insert(
+                session,
+                owner_id=owner,
+                memory_type="message",
+                importance_score=0.8,
+                content=content,
+            )
+            await session.execute(
+                insert(Message).values(memory_id=stored.memory_id, sender_id=owner, content=content)
+            )
+            ids.append(stored.memory_id)
+    return ids
+
+
+def _settings() -> MemorySettings:
+    return MemorySettings(reflection_importance_threshold=0.5)
+
+
+def _scheduler(session_factory, generator) -> ReflectionScheduler:
+    return ReflectionScheduler(_settings(), TaskQueue(), session_factory, generator)
+
+
+async def test_reflection_is_written_with_sources_and_consumes_importance(
+    session_factory, make_participant
+) -> None:
+    settings = _settings()
+    owner = await make_participant()
+    store = MemoryStore(settings)
+    source_ids = await _remember(
+        session_factory, store, owner, "I like tea.", "Tea again today.", "Green tea is best."
+    )
+    provider = FakeProvider("I really enjoy tea.")
+    generator = ReflectionGenerator(settings, store, session_factory, provider, FakeEmbeddings())
+
+    await _scheduler(session_factory, generator)._run(owner)
+
+    async with session_factory() as session:
+        reflection = (await session.execute(select(Reflection))).scalar_one()
+        sources = (
+            await session.scalars(
+                select(ReflectionSource.source_memory_id).order_by(
+                    ReflectionSource.source_memory_id
+                )
+            )
+        ).all()
+        memory_type = await session.scalar(
+            select(MemoryBase.memory_type).where(MemoryBase.id == reflection.memory_id)
+        )
+        remaining = await pending_importance(session, owner)
+    assert reflection.content == "I really enjoy tea."
+    assert memory_type == "reflection"
+    assert sources == source_ids
+    assert remaining == pytest.approx(0.0)
+    # Oldest first, so the prompt reads chronologically.
+    assert provider.prompts[0][-1].content.endswith(
+        "1. I like tea.\n2. Tea again today.\n3. Green tea is best."
+    )
+
+
+async def test_failed_write_keeps_accumulated_importance(session_factory, make_participant) -> None:
+    settings = _settings()
+    owner = await make_participant()
+    store = MemoryStore(settings)
+    await _remember(session_factory, store, owner, "Something happened.")
+
+    class FailingGenerator(ReflectionGenerator):
+        async def write(self, session, draft: ReflectionDraft) -> int:
+            await super().write(session, draft)
+            raise RuntimeError("crash after the reflection rows were written")
+
+    generator = FailingGenerator(
+        settings, store, session_factory, FakeProvider("Insight."), FakeEmbeddings()
+    )
+    with pytest.raises(RuntimeError):
+        await _scheduler(session_factory, generator)._run(owner)
+
+    async with session_factory() as session:
+        reflections = (await session.execute(select(Reflection))).scalars().all()
+        remaining = await pending_importance(session, owner)
+    assert reflections == []
+    assert remaining == pytest.approx(0.8)
+
+    # The failed job released its claim, so the next one can reflect.
+    retry = ReflectionGenerator(
+        settings, store, session_factory, FakeProvider("Insight."), FakeEmbeddings()
+    )
+    await _scheduler(session_factory, retry)._run(owner)
+    async with session_factory() as session:
+        assert len((await session.execute(select(Reflection))).scalars().all()) == 1
+
+
+async def test_concurrent_jobs_for_one_owner_reflect_once(
+    session_factory, make_participant
+) -> None:
+    settings = _settings()
+    owner = await make_participant()
+    store = MemoryStore(settings)
+    await _remember(session_factory, store, owner, "I like tea.")
+    drafting = asyncio.Event()
+    proceed = asyncio.Event()
+
+    class SlowGenerator(ReflectionGenerator):
+        drafts = 0
+
+        async def draft(self, owner_id: uuid.UUID) -> ReflectionDraft | None:
+            SlowGenerator.drafts += 1
+            drafting.set()
+            await proceed.wait()
+            return await super().draft(owner_id)
+
+    def generator() -> SlowGenerator:
+        return SlowGenerator(
+            settings, store, session_factory, FakeProvider("Insight."), FakeEmbeddings()
+        )
+
+    # Separate schedulers and queues stand in for two worker processes.
+    first = asyncio.create_task(_scheduler(session_factory, generator())._run(owner))
+    await drafting.wait()
+    await _scheduler(session_factory, generator())._run(owner)
+    proceed.set()
+    await first
+    # Once the importance is consumed the owner is no longer due.
+    await _scheduler(session_factory, generator())._run(owner)
+
+    async with session_factory() as session:
+        reflections = (await session.execute(select(Reflection))).scalars().all()
+    assert len(reflections) == 1
+    assert SlowGenerator.drafts == 1
+
+
+async def test_no_memories_means_no_reflection(session_factory, make_participant) -> None:
+    settings = MemorySettings()
+    owner = await make_participant()
+    provider = FakeProvider("Insight.")
+    generator = ReflectionGenerator(
+        settings, MemoryStore(settings), session_factory, provider, FakeEmbeddings()
+    )
+
+    assert await generator.draft(owner) is None
+    assert provider.prompts == []
@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.exc import DBAPIError
+
+from database.models import MemoryBase, Reflection, ReflectionClosure, ReflectionSource
+from services.memory.reflection_graph import affected_reflections, lineage, source_memories
+
+
+async def _memory(session, owner, memory_type: str = "message") -> int:
+    return await session.scalar(
+        insert(MemoryBase)
+        .values(owner_id=owner, memory_type=memory_type, importance_score=0.5, memory_strength=1.0)
+        .returning(MemoryBase.id)
+    )
+
+
+async def _reflect(session, owner, content: str, *, parent=None, cites=()) -> tuple[int, int]:
+    """Insert a reflection citing ``cites`` (memory ids); returns (reflection, memory) ids."""
+    memory_id = await _memory(session, owner, "reflection")
+    reflection_id = await session.scalar(
+        insert(Reflection)
+        .values(memory_id=memory_id, parent_reflection_id=parent, content=content)
+        .returning(Reflection.id)
+    )
+    for cited in cites:
+        await session.execute(
+            insert(ReflectionSource).values(reflection_id=reflection_id, source_memory_id=cited)
+        )
+    return reflection_id, memory_id
+
+
+async def _closure(session_factory) -> set[tuple[int, int, int]]:
+    async with session_factory() as session:
+        rows = await session.execute(
+            select(
+                ReflectionClosure.ancestor_id,
+                ReflectionClosure.descendant_id,
+                ReflectionClosure.depth,
+            )
+        )
+        return {tuple(row) for row in rows}
+
+
+async def _closure_versions(session_factory) -> set[str]:
+    # A rebuild deletes and re-inserts every row, so the row versions change.
+    async with session_factory() as session:
+        return set(await session.scalars(text("SELECT xmin::text FROM reflection_closure")))
+
+
+@pytest.fixture
+async def chain(session_factory, make_participant):
+    """``top`` cites ``middle``'s memory, which cites ``bottom``'s, which cites a message."""
+    owner = await make_participant()
+    async with session_factory() as session, session.begin():
+        message = await _memory(session, owner)
+        bottom = await _reflect(session, owner, "bottom", cites=[message])
+        middle = await _reflect(session, owner, "middle", cites=[bottom[1]])
+        top = await _reflect(session, owner, "top", cites=[middle[1]])
+    return owner, message, bottom, middle, top
+
+
+async def test_queries_walk_the_whole_hierarchy(session_factory, chain) -> None:
+    _, message, bottom, middle, top = chain
+
+    async with session_factory() as session:
+        family = await lineage(session, middle[0])
+        sources = await source_memories(session, top[0])
+        affected = await affected_reflections(session, message)
+
+    assert [(r.reflection_id, r.depth) for r in family.ancestors] == [(top[0], 1)]
+    assert [(r.reflection_id, r.depth) for r in family.descendants] == [(bottom[0], 1)]
+    assert [(s.memory_id, s.depth) for s in sources] == [
+        (middle[1], 0),
+        (bottom[1], 1),
+        (message, 2),
+    ]
+    assert [(r.content, r.depth) for r in affected] == [("bottom", 0), ("middle", 1), ("top", 2)]
+
+
+async def test_deleting_a_reflection_disconnects_paths_through_it(session_factory, chain) -> None:
+    _, _, bottom, middle, top = chain
+
+    async with session_factory() as session, session.begin():
+        await session.execute(delete(Reflection).where(Reflection.id == middle[0]))
+
+    assert await _closure(session_factory) == {(bottom[0], bottom[0], 0), (top[0], top[0], 0)}
+
+
+async def test_reparenting_rebuilds_and_no_op_statements_do_not(session_factory, chain) -> None:
+    owner, _, _, middle, top = chain
+    async with session_factory() as session, session.begin():
+        loose = await _reflect(session, owner, "loose")
+    before = await _closure_versions(session_factory)
+
+    async with session_factory() as session, session.begin():
+        await session.execute(update(Reflection).where(Reflection.id == -1).values(content="x"))
+        await session.execute(delete(Reflection).where(Reflection.id == -1))
+        await session.execute(
+            update(Reflection).where(Reflection.id == top[0]).values(content="top, reworded")
+        )
+        # Setting the parent it already has changes nothing either.
+        await session.execute(
+            update(Reflection)
+            .where(Reflection.id == middle[0])
+            .values(parent_reflection_id=Reflection.parent_reflection_id)
+        )
+    assert await _closure_versions(session_factory) == before
+
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            update(Reflection).where(Reflection.id == loose[0]).values(parent_reflection_id=top[0])
+        )
+    assert await _closure_versions(session_factory) != before
+    assert {(a, d) for a, d, _ in await _closure(session_factory) if d == loose[0]} == {
+        (loose[0], loose[0]),
+        (top[0], loose[0]),
+    }
+
+
+async def test_rebuild_waits_for_a_concurrent_link(engine, session_factory, chain) -> None:
+    owner, _, bottom, middle, top = chain
+    async with engine.connect() as linker:
+        # An open transaction that has linked a new reflection under ``top``.
+        await linker.begin()
+        memory_id = await _memory(linker, owner, "reflection")
+        child = await linker.scalar(
+            insert(Reflection)
+            .values(memory_id=memory_id, parent_reflection_id=top[0], content="late")
+            .returning(Reflection.id)
+        )
+
+        async def remove_middle() -> None:
+            async with session_factory() as session, session.begin():
+                await session.execute(delete(Reflection).where(Reflection.id == middle[0]))
+
+        rebuild = asyncio.create_task(remove_middle())
+        await asyncio.sleep(0.3)
+        assert not rebuild.done()
+        await linker.commit()
+    await asyncio.wait_for(rebuild, timeout=10)
+
+    assert await _closure(session_factory) == {
+        (bottom[0], bottom[0], 0),
+        (top[0], top[0], 0),
+        (child, child, 0),
+        (top[0], child, 1),
+    }
+
+
+async def test_cycles_are_rejected(session_factory, chain) -> None:
+    _, _, bottom, _, top = chain
+
+    with pytest.raises(DBAPIError, match="own descendant"):
+        async with session_factory() as session, session.begin():
+            await session.execute(
+                insert(ReflectionSource).values(reflection_id=bottom[0], source_memory_id=top[1])
+            )
@@ -0,0 +1,61 @@
+import pytest
+
+from core.config import MemorySettings
+from services.memory.retrieval import MemoryRetriever
+from services.memory.store import MemoryStore
+from tests.integration.conftest import unit_vector
+
+
+async def test_retrieve_ranks_by_hybrid_score(session_factory, make_participant) -> None:
+    settings = MemorySettings(
+        retrieval_weight_recency=0.0,
+        retrieval_weight_importance=0.2,
+        retrieval_weight_relevance=0.8,
+    )
+    owner = await make_participant()
+    other = await make_participant(name="Other")
+    store = MemoryStore(settings)
+    async with session_factory() as session, session.begin():
+        ids = [
+            (
+                await store.insert(
+                    session,
+                    owner_id=owner,
+                    memory_type=memory_type,
+                    importance_score=importance,
+                    embedding=embedding,
+                )
+            ).memory_id
+            for memory_type, importance, embedding in (
+                ("message", 0.1, unit_vector(0)),
+                ("message", 0.9, unit_vector(0, 1)),
+                ("observation", 0.5, unit_vector(2)),
+            )
+        ]
+        await store.insert(
+            session,
+            owner_id=other,
+            memory_type="message",
+            importance_score=1.0,
+            embedding=unit_vector(0),
+        )
+
+    retriever = MemoryRetriever(settings)
+    async with session_factory() as session:
+        retrieved = await retriever.retrieve(session, owner, unit_vector(0), k=2)
+        messages = await retriever.retrieve(
+            session, owner, unit_vector(2), memory_types=["message"]
+        )
+
+    assert [m.memory_id for m in retrieved] == [ids[0], ids[1]]
+    assert all(m.owner_id == owner for m in retrieved)
+    assert retrieved[0].relevance == pytest.approx(1.0)
+    assert {m.memory_id for m in messages} == {ids[0], ids[1]}
+
+
+async def test_retrieve_without_memories_is_empty(session_factory, make_participant) -> None:
+    owner = await make_participant()
+    async with session_factory() as session:
+        assert (
+            await MemoryRetriever(MemorySettings()).retrieve(session, owner, unit_vector(0)) == []
+        )
@@ -0,0 +1,32 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from background.queue import TaskQueue
+from background.scheduler import _LOCK_NAMESPACE, PeriodicScheduler
+
+
+async def test_exclusive_job_skips_while_another_process_holds_it(engine) -> None:
+    queue = TaskQueue()
+    queue.start()
+    scheduler = PeriodicScheduler(queue, engine)
+    runs = 0
+
+    async def job() -> None:
+        nonlocal runs
+        runs += 1
+
+    scheduler.add("decay", 0.02, job, exclusive=True)
+    async with engine.connect() as holder:
+        key = (_LOCK_NAMESPACE, func.hashtext("decay"))
+        assert await holder.scalar(select(func.pg_try_advisory_lock(*key)))
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        await queue._jobs.join()
+        assert runs == 0
+        await holder.scalar(select(func.pg_advisory_unlock(*key)))
+
+    await asyncio.sleep(0.1)
+    await scheduler.close()
+    await queue.close()
+    assert runs >= 1
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, update
+
+from core.config import PortraitSettings
+from database.models import (
+    ParticipantType,
+    SnapshotEntry,
+    UserInterest,
+    UserPortrait,
+    UserPreference,
+    UserStateSnapshot,
+    UserTrait,
+)
+from services.portrait.snapshots import (
+    DELTA,
+    INTEREST,
+    KEYFRAME,
+    PREFERENCE,
+    TRAIT,
+    SnapshotWriter,
+    current_profile,
+    profile_at,
+)
+
+
+async def _seed_profile(session_factory, user) -> None:
+    now = datetime(2026, 3, 1)
+    async with session_factory() as session, session.begin():
+        portrait_id = await session.scalar(
+            insert(UserPortrait).values(user_id=user).returning(UserPortrait.id)
+        )
+        await session.execute(
+            insert(UserTrait).values(
+                portrait_id=portrait_id, trait_name="openness", trait_value=0.4, confidence=0.6
+            )
+        )
+        await session.execute(
+            insert(UserInterest),
+            [
+                {
+                    "user_id": user,
+                    "topic": topic,
+                    "confidence": 0.5,
+                    "frequency": 1,
+                    "first_mentioned": now,
+                    "last_mentioned": now,
+                }
+                for topic in ("tea", "chess")
+            ],
+        )
+        await session.execute(
+            insert(UserPreference).values(
+                user_id=user, preference_type="tone", preference_value="casual", confidence=0.7
+            )
+        )
+
+
+async def _take(session_factory, writer: SnapshotWriter, user) -> int | None:
+    async with session_factory() as session, session.begin():
+        return await writer.take(session, user)
+
+
+async def _snapshot(session_factory, snapshot_id: int) -> tuple[str, datetime, set]:
+    async with session_factory() as session:
+        snapshot = await session.get(UserStateSnapshot, snapshot_id)
+        keys = set(
+            (
+                await session.execute(
+                    select(
+                        SnapshotEntry.kind, SnapshotEntry.entry_key, SnapshotEntry.removed
+                    ).where(SnapshotEntry.snapshot_id == snapshot_id)
+                )
+            ).tuples()
+        )
+    return snapshot.storage, snapshot.created_at, keys
+
+
+async def _profiles(session_factory, user, at: datetime | None = None):
+    async with session_factory() as session:
+        return await current_profile(session, user), await profile_at(session, user, at)
+
+
+async def test_deltas_record_only_changes_and_reconstruct_any_point(
+    session_factory, make_participant
+) -> None:
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    await _seed_profile(session_factory, user)
+    writer = SnapshotWriter(PortraitSettings())
+
+    first = await _take(session_factory, writer, user)
+    storage, first_at, keys = await _snapshot(session_factory, first)
+    assert storage == KEYFRAME
+    assert keys == {
+        (TRAIT, "openness", False),
+        (INTEREST, "tea", False),
+        (INTEREST, "chess", False),
+        (PREFERENCE, "tone", False),
+    }
+    before, _ = await _profiles(session_factory, user)
+
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            update(UserInterest).where(UserInterest.topic == "tea").values(frequency=2)
+        )
+        await session.execute(delete(UserPreference))
+    second = await _take(session_factory, writer, user)
+
+    storage, _, keys = await _snapshot(session_factory, second)
+    assert storage == DELTA
+    assert keys == {(INTEREST, "tea", False), (PREFERENCE, "tone", True)}
+    now, latest = await _profiles(session_factory, user)
+    assert latest == now
+    assert (PREFERENCE, "tone") not in latest
+    _, then = await _profiles(session_factory, user, first_at)
+    assert then == before
+
+
+async def test_unchanged_profile_writes_no_snapshot(session_factory, make_participant) -> None:
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    await _seed_profile(session_factory, user)
+    writer = SnapshotWriter(PortraitSettings())
+
+    assert await _take(session_factory, writer, user) is not None
+    assert await _take(session_factory, writer, user) is None
+
+
+async def test_keyframe_follows_the_configured_number_of_deltas(
+    session_factory, make_participant
+) -> None:
+    user = await make_participant(type=ParticipantType.HUMAN, name="Alice")
+    await _seed_profile(session_factory, user)
+    writer = SnapshotWriter(PortraitSettings(snapshot_keyframe_interval=2))
+
+    storages = []
+    for frequency in range(1, 6):
+        async with session_factory() as session, session.begin():
+            await session.execute(update(UserInterest).values(frequency=frequency))
+        snapshot_id = await _take(session_factory, writer, user)
+        storages.append((await _snapshot(session_factory, snapshot_id))[0])
+
+    assert storages == [KEYFRAME, DELTA, DELTA, KEYFRAME, DELTA]
+    now, latest = await _profiles(session_factory, user)
+    assert latest == now
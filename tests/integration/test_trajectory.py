@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import insert, select
+
+from database.models import EmotionHistory, EmotionRollupDaily
+from models.domain.emotion import EMOTIONS
+from services.emotion.trajectory import DAILY, HOURLY, RAW, emotion_trajectory
+
+START = datetime(2026, 3, 2)
+END = START + timedelta(days=3)
+
+
+def _history(character, seed: int, count: int) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(count):
+        at = START + timedelta(minutes=int(rng.integers(0, 3 * 24 * 60)))
+        values = dict(zip(EMOTIONS, rng.random(len(EMOTIONS)).round(3).tolist()))
+        rows.append({"character_id": character, "created_at": at, **values})
+    return rows
+
+
+def _expected(rows: list[dict], stride: timedelta) -> dict[datetime, np.ndarray]:
+    buckets: dict[datetime, list[list[float]]] = {}
+    for row in rows:
+        bucket = START + stride * ((row["created_at"] - START) // stride)
+        buckets.setdefault(bucket, []).append([row[e] for e in EMOTIONS])
+    return {bucket: np.asarray(values) for bucket, values in sorted(buckets.items())}
+
+
+async def _insert(session_factory, rows: list[dict]) -> None:
+    async with session_factory() as session, session.begin():
+        await session.execute(insert(EmotionHistory), rows)
+
+
+async def test_trigger_merges_every_insert_into_the_rollups(
+    session_factory, make_participant
+) -> None:
+    character = await make_participant()
+    rows = _history(character, 1, 40)
+    # Two statements touching the same buckets must merge, not overwrite.
+    await _insert(session_factory, rows[:25])
+    await _insert(session_factory, rows[25:])
+
+    async with session_factory() as session:
+        daily = (
+            await session.scalars(
+                select(EmotionRollupDaily).order_by(EmotionRollupDaily.bucket_start)
+            )
+        ).all()
+
+    expected = _expected(rows, timedelta(days=1))
+    assert [bucket.bucket_start for bucket in daily] == list(expected)
+    for bucket, values in zip(daily, expected.values()):
+        assert bucket.sample_count == len(values)
+        for i, emotion in enumerate(EMOTIONS):
+            assert getattr(bucket, f"{emotion}_sum") == pytest.approx(values[:, i].sum())
+            assert getattr(bucket, f"{emotion}_min") == pytest.approx(values[:, i].min())
+            assert getattr(bucket, f"{emotion}_max") == pytest.approx(values[:, i].max())
+
+
+@pytest.mark.parametrize(
+    ("resolution", "source", "stride"),
+    [
+        (timedelta(minutes=30), RAW, timedelta(minutes=30)),
+        (timedelta(hours=6, minutes=10), HOURLY, timedelta(hours=6)),
+        (timedelta(days=1), DAILY, timedelta(days=1)),
+    ],
+)
+async def test_trajectory_buckets_match_the_history(
+    session_factory, make_participant, resolution, source, stride
+) -> None:
+    character = await make_participant()
+    other = await make_participant(name="Other")
+    rows = _history(character, 2, 60)
+    await _insert(session_factory, rows + _history(other, 3, 20))
+
+    async with session_factory() as session:
+        trajectory = await emotion_trajectory(session, character, START, END, resolution)
+
+    assert (trajectory.source, trajectory.resolution) == (source, stride)
+    expected = _expected(rows, stride)
+    assert [point.bucket_start for point in trajectory.points] == list(expected)
+    for point, values in zip(trajectory.points, expected.values()):
+        assert point.samples == len(values)
+        np.testing.assert_allclose(point.mean, values.mean(axis=0))
+        np.testing.assert_allclose(point.minimum, values.min(axis=0))
+        np.testing.assert_allclose(point.maximum, values.max(axis=0))
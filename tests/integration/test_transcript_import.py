@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+
+from background.tasks import transcript_import
+from background.tasks.transcript_import import ImportInProgress, TranscriptImporter
+from database.models import MemoryBase, Message, ReflectionAccumulator, TranscriptImport
+from models.domain.transcript import Transcript, TranscriptMessage
+from tests.integration.conftest import FakeEmbeddings
+
+START = datetime(2026, 1, 1, 12, 0)
+
+
+def _transcript(character, count: int = 5) -> Transcript:
+    return Transcript(
+        import_key="log-1",
+        character_id=character,
+        user_name="Alice",
+        messages=[
+            TranscriptMessage(
+                role="user" if i % 2 == 0 else "character",
+                content=f"message {i}",
+                created_at=START + timedelta(minutes=i),
+            )
+            for i in range(count)
+        ],
+    )
+
+
+class FlakyEmbeddings(FakeEmbeddings):
+    """Fails the ``fail_on``-th embed_many call once."""
+
+    def __init__(self, fail_on: int) -> None:
+        self.calls = 0
+        self.fail_on = fail_on
+
+    async def embed_many(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise ConnectionError("embedding provider down")
+        return await super().embed_many(texts)
+
+
+async def _counts(session_factory) -> tuple[int, int, int, bool]:
+    async with session_factory() as session:
+        messages = await session.scalar(select(func.count()).select_from(Message))
+        accumulated = await session.scalar(select(ReflectionAccumulator.memory_count))
+        progress = (await session.execute(select(TranscriptImport))).scalar_one()
+    return messages, accumulated, progress.imported_messages, progress.completed
+
+
+async def test_import_loads_every_chunk(engine, session_factory, make_participant) -> None:
+    character = await make_participant()
+    importer = TranscriptImporter(engine, FakeEmbeddings(), chunk_size=2, embedding_batch_size=1)
+
+    result = await importer.run(_transcript(character))
+
+    assert (result.imported_messages, result.resumed_from) == (5, 0)
+    assert await _counts(session_factory) == (5, 5, 5, True)
+    async with session_factory() as session:
+        rows = (
+            await session.execute(
+                select(Message.content, Message.created_at, MemoryBase.embedding)
+                .join(MemoryBase, MemoryBase.id == Message.memory_id)
+                .order_by(Message.created_at)
+            )
+        ).all()
+    assert [row.content for row in rows] == [f"message {i}" for i in range(5)]
+    expected = await FakeEmbeddings().embed("message 0")
+    np.testing.assert_allclose(np.asarray(rows[0].embedding), expected, atol=1e-6)
+
+
+async def test_interrupted_import_resumes_at_the_first_uncommitted_chunk(
+    engine, session_factory, make_participant
+) -> None:
+    character = await make_participant()
+    importer = TranscriptImporter(engine, FlakyEmbeddings(fail_on=2), chunk_size=2)
+
+    with pytest.raises(ConnectionError):
+        await importer.run(_transcript(character))
+    assert await _counts(session_factory) == (2, 2, 2, False)
+
+    result = await importer.run(_transcript(character))
+
+    assert (result.imported_messages, result.resumed_from) == (5, 2)
+    assert await _counts(session_factory) == (5, 5, 5, True)
+
+
+async def test_concurrent_import_of_the_same_transcript_is_refused(
+    engine, make_participant
+) -> None:
+    character = await make_participant()
+    importer = TranscriptImporter(engine, FakeEmbeddings())
+    key = (transcript_import._LOCK_NAMESPACE, func.hashtext("log-1"))
+
+    async with engine.connect() as holder:
+        assert await holder.scalar(select(func.pg_try_advisory_lock(*key)))
+        with pytest.raises(ImportInProgress):
+            await importer.run(_transcript(character))
+        await holder.scalar(select(func.pg_advisory_unlock(*key)))
+
+    assert (await importer.run(_transcript(character))).imported_messages == 5
+    # The lock is released again once the import finishes.
+    async with engine.connect() as conn:
+        assert await conn.scalar(select(func.pg_try_advisory_lock(*key)))
+        await conn.scalar(select(func.pg_advisory_unlock(*key)))
+
+
+async def test_vector_codec_is_registered_once_per_import(
+    engine, make_participant, monkeypatch
+) -> None:
+    character = await make_participant()
+    registered = []
+    register = transcript_import.register_vector
+
+    async def counting_register(connection):
+        registered.append(connection)
+        await register(connection)
+
+    monkeypatch.setattr(transcript_import, "register_vector", counting_register)
+    importer = TranscriptImporter(engine, FakeEmbeddings(), chunk_size=1)
+
+    await importer.run(_transcript(character))
+
+    assert len(registered) == 1
@@ -0,0 +1,205 @@
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from background.tasks.embedding_index import switch_embedding_index
+from core.config import MemorySettings
+from database.models import MemoryBase
+from services.memory.embedding_cache import EmbeddingCache
+from services.memory.retrieval import MemoryRetriever
+from services.memory.store import MemoryStore
+from services.memory.vector_search import (
+    EXACT,
+    HNSW,
+    INDEX_NAMES,
+    MissingEmbeddingIndex,
+    VectorSearch,
+)
+from tests.integration.conftest import DIMENSION
+
+
+def _embeddings(count: int, seed: int = 7) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, DIMENSION))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def _seed(
+    session_factory, owner, embeddings: np.ndarray, memory_type: str = "message"
+) -> list[int]:
+    store = MemoryStore(MemorySettings())
+    async with session_factory() as session, session.begin():
+        return [
+            (
+                await store.insert(
+                    session,
+                    owner_id=owner,
+                    memory_type=memory_type,
+                    importance_score=0.5,
+                    embedding=embedding,
+                )
+            ).memory_id
+            for embedding in embeddings
+        ]
+
+
+async def _pgvector_version(session_factory) -> tuple[int, ...]:
+    async with session_factory() as session:
+        version = await session.scalar(
+            text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        )
+    return tuple(int(part) for part in version.split("."))
+
+
+@pytest.mark.parametrize("quantization", ["none", "halfvec", "binary"])
+async def test_index_path_returns_exact_neighbours_for_each_quantization(
+    session_factory, make_participant, quantization
+) -> None:
+    if quantization != "none" and await _pgvector_version(session_factory) < (0, 7):
+        pytest.skip("halfvec and binary_quantize need pgvector 0.7")
+    owner = await make_participant()
+    embeddings = _embeddings(40)
+    ids = await _seed(session_factory, owner, embeddings)
+    query = embeddings[3]
+    expected = [ids[i] for i in np.argsort(1.0 - embeddings @ query)[:5]]
+    search = VectorSearch(
+        MemorySettings(
+            embedding_quantization=quantization,
+            embedding_rerank_factor=8,
+            vector_search_exact_threshold=0,
+        )
+    )
+
+    async with session_factory() as session:
+        rows = await search.search(session, [MemoryBase.id], query, owner_id=owner, limit=5)
+
+    # The shortlist (5 * 8) covers every row, so re-ranking must restore exact order.
+    assert [row.id for row in rows] == expected
+    assert rows[0].distance == pytest.approx(0.0, abs=1e-6)
+    assert search.stats()[HNSW].calls == 1
+
+
+async def test_type_filter_bounds_the_expected_result(session_factory, make_participant) -> None:
+    owner = await make_participant()
+    embeddings = _embeddings(22)
+    await _seed(session_factory, owner, embeddings[:20])
+    reflections = await _seed(session_factory, owner, embeddings[20:], memory_type="reflection")
+    search = VectorSearch(MemorySettings(vector_search_exact_threshold=0))
+
+    async with session_factory() as session:
+        rows = await search.search(
+            session,
+            [MemoryBase.id],
+            embeddings[0],
+            owner_id=owner,
+            limit=5,
+            memory_types=["reflection"],
+        )
+
+    # Two reflections are all the filter allows, so a two-row scan is complete.
+    assert sorted(row.id for row in rows) == reflections
+    stats = search.stats()[HNSW]
+    assert (stats.calls, stats.widened, stats.fell_back) == (1, 0, 0)
+
+
+async def test_small_owners_are_scanned_exactly(session_factory, make_participant) -> None:
+    owner = await make_participant()
+    other = await make_participant(name="Other")
+    embeddings = _embeddings(10)
+    ids = await _seed(session_factory, owner, embeddings[:5])
+    await _seed(session_factory, other, embeddings[5:])
+    search = VectorSearch(MemorySettings())
+
+    async with session_factory() as session:
+        rows = await search.search(
+            session, [MemoryBase.id], embeddings[5], owner_id=owner, limit=10
+        )
+
+    assert sorted(row.id for row in rows) == ids
+    assert search.stats()[EXACT].calls == 1
+
+
+async def test_retrieval_goes_through_vector_search_by_default(
+    session_factory, make_participant
+) -> None:
+    settings = MemorySettings()
+    owner = await make_participant()
+    embeddings = _embeddings(3)
+    await _seed(session_factory, owner, embeddings)
+    cache = EmbeddingCache(settings)
+    search = VectorSearch(settings)
+
+    async with session_factory() as session:
+        retrieved = await MemoryRetriever(settings, cache, search).retrieve(
+            session, owner, embeddings[0]
+        )
+
+    assert not cache.enabled
+    assert len(retrieved) == 3
+    assert search.stats()[EXACT].calls == 1
+
+
+class RecordingQueue:
+    def __init__(self) -> None:
+        self.jobs = {}
+
+    def submit(self, factory, *, key=None) -> bool:
+        if key in self.jobs:
+            return False
+        self.jobs[key] = factory
+        return True
+
+
+async def test_recall_is_sampled_off_the_request_path(session_factory, make_participant) -> None:
+    owner = await make_participant()
+    embeddings = _embeddings(20)
+    await _seed(session_factory, owner, embeddings)
+    queue = RecordingQueue()
+    search = VectorSearch(
+        MemorySettings(vector_search_exact_threshold=0, vector_search_recall_sample_rate=1.0),
+        queue=queue,
+        session_factory=session_factory,
+    )
+
+    async with session_factory() as session:
+        for query in embeddings[:2]:
+            await search.search(session, [MemoryBase.id], query, owner_id=owner, limit=5)
+
+    stats = search.stats()
+    assert (stats[EXACT].calls, stats[HNSW].recall_samples) == (0, 0)
+    (sample,) = queue.jobs.values()  # the second sample collapsed into the pending one
+
+    await sample()
+
+    assert stats[HNSW].recall_samples == 1
+    assert stats[HNSW].mean_recall == pytest.approx(1.0)
+
+
+async def test_startup_check_requires_the_configured_index(session_factory) -> None:
+    async with session_factory() as session:
+        await VectorSearch(MemorySettings()).check_index(session)
+        with pytest.raises(MissingEmbeddingIndex, match=INDEX_NAMES["halfvec"]):
+            await VectorSearch(MemorySettings(embedding_quantization="halfvec")).check_index(
+                session
+            )
+
+
+async def test_maintenance_command_builds_the_index_and_drops_the_others(
+    engine, session_factory
+) -> None:
+    settings = MemorySettings()
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP INDEX {INDEX_NAMES['none']}"))
+        # Stands in for an index left by an earlier quantization setting.
+        await conn.execute(text(f"CREATE INDEX {INDEX_NAMES['halfvec']} ON memory_base (id)"))
+
+    async with session_factory() as session:
+        with pytest.raises(MissingEmbeddingIndex, match="does not exist"):
+            await VectorSearch(settings).check_index(session)
+
+    report = await switch_embedding_index(engine, settings)
+    rerun = await switch_embedding_index(engine, settings)
+
+    assert (report.built, report.dropped) == (INDEX_NAMES["none"], [INDEX_NAMES["halfvec"]])
+    assert (rerun.built, rerun.dropped) == (None, [])
+    async with session_factory() as session:
+        await VectorSearch(settings).check_index(session)
@@ -0,0 +1,114 @@
+import asyncio
+import contextlib
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from core.config import MemorySettings
+from services.memory.access_buffer import AccessEvent, MemoryAccessBuffer
+
+
+class NullSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    def begin(self):
+        return self
+
+
+def make_buffer(**overrides) -> tuple[MemoryAccessBuffer, list[list[AccessEvent]]]:
+    settings = MemorySettings(**overrides)
+    buffer = MemoryAccessBuffer(NullSession, settings)
+    written: list[list[AccessEvent]] = []
+    return buffer, written
+
+
+async def test_cancelled_flush_requeues_its_events() -> None:
+    buffer, _ = make_buffer()
+    started = asyncio.Event()
+
+    async def hang(session, events) -> None:
+        started.set()
+        await asyncio.Event().wait()
+
+    buffer._write = hang
+    buffer.record(AccessEvent(memory_id=1))
+    buffer.record(AccessEvent(memory_id=2))
+    flush = asyncio.create_task(buffer.flush())
+    await started.wait()
+    buffer.record(AccessEvent(memory_id=3))
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+
+    assert [e.memory_id for e in buffer._pending] == [1, 2, 3]
+
+
+async def test_close_lets_an_in_flight_flush_finish() -> None:
+    buffer, written = make_buffer(access_flush_interval_seconds=0.01)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow(session, events) -> None:
+        started.set()
+        await release.wait()
+        written.append(list(events))
+
+    buffer._write = slow
+    buffer.record(AccessEvent(memory_id=1))
+    buffer.start()
+    await started.wait()
+    buffer.record(AccessEvent(memory_id=2))
+
+    closing = asyncio.create_task(buffer.close())
+    await asyncio.sleep(0.02)
+    release.set()
+    await closing
+
+    assert [[e.memory_id for e in batch] for batch in written] == [[1], [2]]
+    assert buffer.pending == 0
+
+
+async def test_failed_flush_keeps_newest_events_within_budget() -> None:
+    buffer, _ = make_buffer(access_buffer_max_events=2)
+
+    async def fail(session, events) -> None:
+        raise RuntimeError("database down")
+
+    buffer._write = fail
+    for memory_id in (1, 2):
+        buffer.record(AccessEvent(memory_id=memory_id))
+    with contextlib.suppress(RuntimeError):
+        await buffer.flush()
+    assert [e.memory_id for e in buffer._pending] == [1, 2]
+
+    buffer.record(AccessEvent(memory_id=3))
+    with contextlib.suppress(RuntimeError):
+        await buffer.flush()
+    assert [e.memory_id for e in buffer._pending] == [2, 3]
+
+
+async def test_rejected_batch_is_retried_per_event_and_requeues_the_rest() -> None:
+    buffer, written = make_buffer()
+
+    async def write(session, events) -> None:
+        ids = [e.memory_id for e in events]
+        if 2 in ids:
+            raise IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        if ids == [4]:
+            raise RuntimeError("database down")
+        if len(ids) == 1:
+            written.append(list(events))
+
+    buffer._write = write
+    for memory_id in (1, 2, 3, 4, 5):
+        buffer.record(AccessEvent(memory_id=memory_id))
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+
+    assert [[e.memory_id for e in batch] for batch in written] == [[1], [3]]
+    # 2 is dropped for good; 4 and 5 were never written and go back in the queue.
+    assert [e.memory_id for e in buffer._pending] == [4, 5]
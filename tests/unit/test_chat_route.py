@@ -0,0 +1,70 @@
+import json
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import chat
+
+CHARACTER = uuid.uuid4()
+USER = uuid.uuid4()
+
+
+class FakeChatService:
+    def __init__(self, *replies: list[str] | Exception) -> None:
+        self.replies = list(replies)
+        self.turns = []
+
+    async def stream_reply(self, turn):
+        self.turns.append(turn)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        for delta in reply:
+            yield delta
+
+
+def _client(service: FakeChatService) -> TestClient:
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.state.chat_service = service
+    return TestClient(app)
+
+
+def _request(content: str = "hi") -> str:
+    return json.dumps({"user_id": str(USER), "content": content})
+
+
+def _events(ws, count: int) -> list[tuple[str, str]]:
+    return [
+        (event["type"], event["content"]) for event in (ws.receive_json() for _ in range(count))
+    ]
+
+
+def test_reply_is_streamed_token_by_token() -> None:
+    service = FakeChatService(["Hel", "lo", "!"])
+    with _client(service).websocket_connect(f"/ws/chat/{CHARACTER}") as ws:
+        ws.send_text(_request("hello"))
+        events = _events(ws, 5)
+
+    assert events == [("start", ""), ("token", "Hel"), ("token", "lo"), ("token", "!"), ("end", "")]
+    (turn,) = service.turns
+    assert (turn.character_id, turn.user_id, turn.content, turn.episode_id) == (
+        CHARACTER,
+        USER,
+        "hello",
+        None,
+    )
+
+
+def test_invalid_request_and_failed_generation_keep_the_connection_open() -> None:
+    service = FakeChatService(RuntimeError("provider down"), ["ok"])
+    with _client(service).websocket_connect(f"/ws/chat/{CHARACTER}") as ws:
+        ws.send_text(json.dumps({"user_id": str(USER), "content": ""}))
+        assert ws.receive_json()["type"] == "error"
+
+        ws.send_text(_request())
+        assert _events(ws, 2) == [("start", ""), ("error", "generation failed")]
+
+        ws.send_text(_request())
+        assert _events(ws, 3) == [("start", ""), ("token", "ok"), ("end", "")]
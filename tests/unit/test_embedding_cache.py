@@ -0,0 +1,179 @@
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+
+from core.config import MemorySettings
+from services.memory.embedding_cache import EmbeddingCache
+
+DIMENSION = 4
+
+
+class FakeSession:
+    """Answers the cache's load query with fixed (id, embedding) rows.
+
+    ``during_load`` runs after the rows are read, like a write that commits while
+    the load is still on its way to storing the snapshot.
+    """
+
+    def __init__(self, rows: dict[int, list[float]], during_load=None) -> None:
+        self.rows = rows
+        self.queries = 0
+        self.during_load = during_load
+
+    async def execute(self, stmt):
+        self.queries += 1
+        rows = [SimpleNamespace(id=i, embedding=e) for i, e in sorted(self.rows.items())]
+        if self.during_load is not None:
+            self.during_load()
+        return SimpleNamespace(all=lambda: rows)
+
+
+def make_cache(tmp_path, max_bytes: int = 1 << 20) -> EmbeddingCache:
+    settings = MemorySettings(
+        embedding_dimension=DIMENSION,
+        embedding_cache_dir=str(tmp_path),
+        embedding_cache_max_bytes=max_bytes,
+    )
+    return EmbeddingCache(settings)
+
+
+async def test_get_loads_once_and_serves_from_the_mapped_files(tmp_path) -> None:
+    cache = make_cache(tmp_path)
+    owner = uuid.uuid4()
+    session = FakeSession({1: [1, 0, 0, 0], 2: [0, 3, 0, 0]})
+
+    view = await cache.get(session, owner)
+    again = await cache.get(session, owner)
+
+    assert session.queries == 1
+    assert again is view
+    assert view.ids.tolist() == [1, 2]
+    np.testing.assert_allclose(view.matrix, [[1, 0, 0, 0], [0, 1, 0, 0]])
+
+
+async def test_search_ranks_by_cosine_similarity(tmp_path) -> None:
+    cache = make_cache(tmp_path)
+    owner = uuid.uuid4()
+    session = FakeSession({1: [1, 0, 0, 0], 2: [1, 1, 0, 0], 3: [0, 0, 1, 0]})
+
+    ids, similarity = await cache.search(session, owner, [2, 0, 0, 0], k=2)
+
+    assert ids.tolist() == [1, 2]
+    np.testing.assert_allclose(similarity, [1.0, np.sqrt(0.5)], rtol=1e-6)
+
+
+async def test_append_extends_cached_owners_only(tmp_path) -> None:
+    cache = make_cache(tmp_path)
+    cached, uncached = uuid.uuid4(), uuid.uuid4()
+    await cache.get(FakeSession({1: [1, 0, 0, 0]}), cached)
+
+    cache.append(cached, [7], [[0, 0, 0, 2]])
+    cache.append(uncached, [8], [[0, 0, 0, 2]])
+
+    view = cache.peek(cached)
+    assert view is not None
+    assert view.ids.tolist() == [1, 7]
+    np.testing.assert_allclose(view.matrix[1], [0, 0, 0, 1])
+    assert cache.peek(uncached) is None
+
+
+async def test_eviction_also_drops_this_workers_mappings(tmp_path) -> None:
+    row_bytes = DIMENSION * 4 + 8
+    cache = make_cache(tmp_path, max_bytes=3 * row_bytes)
+    first, second = uuid.uuid4(), uuid.uuid4()
+    await cache.get(FakeSession({1: [1, 0, 0, 0], 2: [0, 1, 0, 0]}), first)
+    assert first in cache._mappings
+
+    await cache.get(FakeSession({3: [0, 0, 1, 0], 4: [0, 0, 0, 1]}), second)
+
+    assert list(cache._mappings) == [second]
+    assert cache.peek(first) is None
+
+
+async def test_invalidate_removes_the_owner(tmp_path) -> None:
+    cache = make_cache(tmp_path)
+    owner = uuid.uuid4()
+    await cache.get(FakeSession({1: [1, 0, 0, 0]}), owner)
+
+    cache.invalidate(owner)
+
+    assert cache.peek(owner) is None
+    assert owner not in cache._mappings
+
+
+async def test_rows_appended_during_a_load_are_kept(tmp_path) -> None:
+    cache = make_cache(tmp_path)
+    owner = uuid.uuid4()
+    session = FakeSession(
+        {1: [1, 0, 0, 0], 2: [0, 1, 0, 0]},
+        # 2 was read by the load and is not duplicated; 3 committed after the read.
+        during_load=lambda: cache.append(owner, [2, 3], [[0, 1, 0, 0], [0, 0, 5, 0]]),
+    )
+
+    view = await cache.get(session, owner)
+
+    assert view.ids.tolist() == [1, 2, 3]
+    np.testing.assert_allclose(view.matrix[2], [0, 0, 1, 0])
+    assert cache.peek(owner).ids.tolist() == [1, 2, 3]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".lock", f"{owner}.ids", f"{owner}.vec"]
+
+
+async def test_appends_already_cached_are_skipped(tmp_path) -> None:
+    cache = make_cache(tmp_path)
+    owner = uuid.uuid4()
+    await cache.get(FakeSession({1: [1, 0, 0, 0]}), owner)
+
+    cache.append(owner, [1, 2], [[1, 0, 0, 0], [0, 1, 0, 0]])
+
+    assert cache.peek(owner).ids.tolist() == [1, 2]
+
+
+async def test_load_invalidated_midway_is_not_stored(tmp_path) -> None:
+    cache = make_cache(tmp_path)
+    owner = uuid.uuid4()
+    session = FakeSession({1: [1, 0, 0, 0]}, during_load=lambda: cache.invalidate(owner))
+
+    view = await cache.get(session, owner)
+
+    assert view.ids.tolist() == [1]
+    assert cache.peek(owner) is None
+    assert [p.name for p in tmp_path.iterdir()] == [".lock"]
+
+
+async def test_disabled_cache_creates_no_files(tmp_path) -> None:
+    directory = tmp_path / "cache"
+    cache = make_cache(directory, max_bytes=0)
+    owner = uuid.uuid4()
+
+    await cache.get(FakeSession({1: [1, 0, 0, 0]}), owner)
+    cache.append(owner, [2], [[0, 1, 0, 0]])
+    cache.invalidate(owner)
+
+    assert not directory.exists()
+
+
+async def test_disabled_cache_reads_through(tmp_path) -> None:
+    cache = make_cache(tmp_path, max_bytes=0)
+    owner = uuid.uuid4()
+    session = FakeSession({1: [0, 2, 0, 0]})
+
+    view = await cache.get(session, owner)
+    await cache.get(session, owner)
+
+    assert not cache.enabled
+    assert session.queries == 2
+    np.testing.assert_allclose(view.matrix, [[0, 1, 0, 0]])
+    assert not list(tmp_path.glob("*.ids"))
+
+
+async def test_owner_without_embeddings_is_cached_empty(tmp_path) -> None:
+    cache = make_cache(tmp_path)
+    owner = uuid.uuid4()
+    session = FakeSession({})
+
+    ids, similarity = await cache.search(session, owner, [1, 0, 0, 0], k=5)
+    await cache.get(session, owner)
+
+    assert ids.size == similarity.size == 0
+    assert session.queries == 1
@@ -0,0 +1,154 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pytest
+
+from core.config import LLMSettings
+from services.llm.providers.embedding import (
+    EmbeddingDimensionMismatch,
+    EmbeddingService,
+    normalise_text,
+)
+
+
+class Provider:
+    """OpenAI-style /embeddings stub that embeds a text as [len(text), index]."""
+
+    def __init__(self, status: int = 200) -> None:
+        self.requests: list[list[str]] = []
+        self.status = status
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        texts = json.loads(request.content)["input"]
+        self.requests.append(texts)
+        if self.status != 200:
+            return httpx.Response(self.status, json={"error": "nope"})
+        data = [{"index": i, "embedding": [len(t), i]} for i, t in enumerate(texts)]
+        return httpx.Response(200, json={"data": list(reversed(data))})
+
+
+def make_service(provider, dimension: int | None = None, **overrides) -> EmbeddingService:
+    overrides.setdefault("embedding_provider", "lmstudio")
+    settings = LLMSettings(embedding_batch_wait_ms=5, **overrides)
+    return EmbeddingService(
+        settings, httpx.AsyncClient(transport=httpx.MockTransport(provider)), dimension=dimension
+    )
+
+
+async def test_concurrent_calls_share_one_request() -> None:
+    provider = Provider()
+    service = make_service(provider)
+
+    vectors = await asyncio.gather(
+        service.embed("a"), service.embed("bb"), service.embed("  a "), service.embed("ccc")
+    )
+
+    assert provider.requests == [["a", "bb", "ccc"]]
+    assert [v.tolist() for v in vectors] == [[1, 0], [2, 1], [1, 0], [3, 2]]
+    assert not vectors[0].flags.writeable
+
+
+async def test_results_are_cached_by_normalised_text() -> None:
+    provider = Provider()
+    service = make_service(provider)
+
+    first = await service.embed("hello  world")
+    second = await service.embed("hello world")
+
+    assert second is first
+    assert len(provider.requests) == 1
+
+
+async def test_batches_are_bounded_by_batch_size() -> None:
+    provider = Provider()
+    service = make_service(provider, embedding_batch_size=2)
+
+    await service.embed_many(["a", "b", "c", "d", "e"])
+
+    assert sorted(map(len, provider.requests)) == [1, 2, 2]
+
+
+async def test_failed_batch_fails_every_caller_and_is_not_cached() -> None:
+    provider = Provider(status=400)
+    service = make_service(provider)
+
+    results = await asyncio.gather(service.embed("a"), service.embed("b"), return_exceptions=True)
+
+    assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+    provider.status = 200
+    assert (await service.embed("a")).tolist() == [1, 0]
+    assert len(provider.requests) == 2
+
+
+async def test_ollama_response_format() -> None:
+    def ollama(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/embed"
+        texts = json.loads(request.content)["input"]
+        return httpx.Response(200, json={"embeddings": [[float(len(t))] for t in texts]})
+
+    settings = LLMSettings(embedding_provider="ollama", embedding_batch_wait_ms=0)
+    service = EmbeddingService(settings, httpx.AsyncClient(transport=httpx.MockTransport(ollama)))
+
+    np.testing.assert_array_equal(await service.embed("abcd"), [4.0])
+
+
+async def test_vectors_of_the_wrong_dimension_are_rejected() -> None:
+    provider = Provider()
+    service = make_service(provider, dimension=1536)
+
+    with pytest.raises(EmbeddingDimensionMismatch, match="2-dimensional.*is 1536"):
+        await service.embed("a")
+
+
+async def test_dimension_is_requested_only_from_models_that_accept_it() -> None:
+    payloads = []
+
+    def provider(request: httpx.Request) -> httpx.Response:
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, json={"data": [{"index": 0, "embedding": [0.0, 1.0]}]})
+
+    await make_service(provider, dimension=2, embedding_provider="openai").embed("a")
+    await make_service(
+        provider,
+        dimension=2,
+        embedding_provider="openai",
+        openai_embedding_model="text-embedding-ada-002",
+    ).embed("a")
+    await make_service(provider, dimension=2).embed("a")
+
+    assert [p.get("dimensions") for p in payloads] == [2, None, None]
+
+
+async def test_cancelled_batch_releases_its_texts() -> None:
+    started = asyncio.Event()
+    hang = True
+
+    async def provider(request: httpx.Request) -> httpx.Response:
+        texts = json.loads(request.content)["input"]
+        if hang:
+            started.set()
+            await asyncio.Event().wait()
+        return httpx.Response(200, json={"data": [{"index": 0, "embedding": [len(texts[0])]}]})
+
+    service = make_service(provider)
+    waiter = asyncio.create_task(service.embed("abc"))
+    await started.wait()
+    for batch in list(service._batches):
+        batch.cancel()
+
+    with pytest.raises(RuntimeError, match="cancelled"):
+        await waiter
+    assert service._inflight == {}
+    hang = False
+    assert (await service.embed("abc")).tolist() == [3]
+
+
+def test_unknown_provider_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unsupported embedding provider"):
+        EmbeddingService(LLMSettings(embedding_provider="nope"))
+
+
+def test_normalise_text() -> None:
+    assert normalise_text("  Café \n au\tlait ") == "Café au lait"
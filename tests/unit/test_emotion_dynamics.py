@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from services.emotion.dynamics import blend, blend_grouped, decay_weights
+
+
+def test_weights_halve_every_half_life() -> None:
+    weights = decay_weights(np.array([0.0, 60.0, 120.0, -5.0]), 60.0)
+
+    # Rows stamped slightly in the future count as brand new, not heavier.
+    np.testing.assert_allclose(weights, [1.0, 0.5, 0.25, 1.0])
+
+
+def test_blend_is_the_decay_weighted_mean() -> None:
+    vectors = np.array([[1.0, 0, 0, 0, 0, 0], [0, 1.0, 0, 0, 0, 0]])
+
+    mood = blend(vectors, np.array([0.0, 60.0]), 60.0)
+
+    np.testing.assert_allclose(mood, [2 / 3, 1 / 3, 0, 0, 0, 0])
+
+
+def test_blend_of_nothing_is_neutral() -> None:
+    np.testing.assert_array_equal(blend(np.empty((0, 6)), np.empty(0), 60.0), np.zeros(6))
+
+
+def test_grouped_blend_matches_blending_each_group_alone() -> None:
+    rng = np.random.default_rng(3)
+    vectors = rng.random((30, 6))
+    ages = rng.random(30) * 3600
+    groups = rng.integers(0, 3, 30)
+
+    moods, counts = blend_grouped(groups, vectors, ages, 600.0, n_groups=4)
+
+    for group in range(3):
+        rows = groups == group
+        np.testing.assert_allclose(moods[group], blend(vectors[rows], ages[rows], 600.0))
+        assert counts[group] == rows.sum()
+    # A group with no rows stays neutral instead of dividing by zero.
+    assert counts[3] == 0
+    np.testing.assert_array_equal(moods[3], np.zeros(6))
+
+
+@pytest.mark.parametrize("half_life", [1.0, 1e6])
+def test_blend_stays_within_the_observed_range(half_life) -> None:
+    vectors = np.array([[0.2] * 6, [0.8] * 6])
+
+    mood = blend(vectors, np.array([0.0, 7200.0]), half_life)
+
+    assert np.all((mood >= 0.2) & (mood <= 0.8))
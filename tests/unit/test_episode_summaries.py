@@ -0,0 +1,57 @@
+import pytest
+
+from models.domain.episode import EpisodeSummary
+from services.llm.providers.base import ChatMessage, LLMProvider
+from services.memory.episode_summaries import LLMEpisodeSummarizer
+
+MESSAGES = [ChatMessage(role="user", content="Let's plan the trip.")]
+CURRENT = EpisodeSummary(title="Trip", summary="Planning a trip.", purpose="Plan a trip")
+
+
+class ReplyProvider(LLMProvider):
+    name = "reply"
+
+    def __init__(self, reply: str) -> None:
+        self.reply = reply
+        self.prompts = []
+
+    async def stream(self, messages, *, temperature=None, max_tokens=None):
+        self.prompts.append(list(messages))
+        yield self.reply
+
+
+async def test_json_reply_becomes_the_summary() -> None:
+    provider = ReplyProvider(
+        '{"title": "Trip to Kyoto", "summary": "They planned Kyoto.", '
+        '"purpose": null, "turning_point": "Picked May", "conclusion": ""}'
+    )
+
+    summary = await LLMEpisodeSummarizer(provider)(CURRENT, MESSAGES, False)
+
+    # Missing or empty fields keep what the previous pass found.
+    assert summary == EpisodeSummary(
+        title="Trip to Kyoto",
+        summary="They planned Kyoto.",
+        purpose="Plan a trip",
+        turning_point="Picked May",
+    )
+    prompt = provider.prompts[0][-1].content
+    assert '"title": "Trip"' in prompt and "user: Let's plan the trip." in prompt
+    assert "The episode has ended." not in prompt
+
+
+async def test_fenced_json_is_accepted() -> None:
+    provider = ReplyProvider('```json\n{"title": "Trip", "summary": "Done planning."}\n```')
+
+    summary = await LLMEpisodeSummarizer(provider)(None, MESSAGES, True)
+
+    assert (summary.title, summary.summary) == ("Trip", "Done planning.")
+    assert provider.prompts[0][-1].content.endswith("The episode has ended.")
+
+
+@pytest.mark.parametrize("reply", ["They planned a trip.", '{"title": "Trip"}', "[1, 2]"])
+async def test_unparsable_reply_is_kept_as_the_summary_text(reply) -> None:
+    summary = await LLMEpisodeSummarizer(ReplyProvider(reply))(CURRENT, MESSAGES, False)
+
+    assert summary.summary == reply
+    assert (summary.title, summary.purpose) == ("Trip", "Plan a trip")
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+
+from services.dialogue.history import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips() -> None:
+    created_at = datetime(2026, 10, 17, 12, 30, 1, 123456)
+
+    cursor = encode_cursor(created_at, 9_007_199_254_740_993)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 9_007_199_254_740_993)
+
+
+# The last one is a cursor from before memory_id keys (it holds a message uuid).
+LEGACY = "WyIyMDI2LTEwLTE3VDEyOjMwOjAxIiwgIjVmMGIxYjZhLTk5ZjQtNGI2ZS1hNWE2LTNiMmE0YjU4OWQ3NiJd"
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "WyJ4Il0", encode_cursor.__name__, LEGACY])
+def test_malformed_cursors_are_rejected(cursor: str) -> None:
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
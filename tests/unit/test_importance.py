@@ -0,0 +1,28 @@
+import pytest
+
+from services.memory.importance import LLMImportanceScorer
+
+
+class FakeCachedLLM:
+    def __init__(self, answer: str) -> None:
+        self.answer = answer
+        self.calls = []
+
+    async def complete(self, template_id, text, messages, *, max_tokens=None) -> str:
+        self.calls.append((template_id, text))
+        return self.answer
+
+
+@pytest.mark.parametrize(
+    ("answer", "expected"),
+    [("1", 0.0), ("10", 1.0), ("7", 2 / 3), (" 5.5\n", 0.5), ("Rating: 12", 1.0), ("0", 0.0)],
+)
+async def test_ratings_map_onto_unit_importance(answer: str, expected: float) -> None:
+    llm = FakeCachedLLM(answer)
+
+    assert await LLMImportanceScorer(llm)("we got married") == pytest.approx(expected)
+    assert llm.calls == [("importance.v1", "we got married")]
+
+
+async def test_unparsable_answer_uses_the_default() -> None:
+    assert await LLMImportanceScorer(FakeCachedLLM("very"), default=0.4)("hm") == 0.4
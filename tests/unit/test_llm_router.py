@@ -0,0 +1,136 @@
+import httpx
+import pytest
+
+from core.config import LLMSettings
+from services.llm.providers.base import ChatMessage, LLMProvider
+from services.llm.providers.router import LLMRouter, ProviderUnavailable
+
+PROMPT = [ChatMessage(role="user", content="hi")]
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://provider.test/chat")
+    return httpx.HTTPStatusError(
+        str(status), request=request, response=httpx.Response(status, request=request)
+    )
+
+
+class ScriptedProvider(LLMProvider):
+    """Raises ``error`` before the first delta, or yields ``deltas`` then ``late_error``."""
+
+    def __init__(
+        self,
+        name: str,
+        deltas: tuple[str, ...] = (),
+        *,
+        error: Exception | None = None,
+        late_error: Exception | None = None,
+    ) -> None:
+        self.name = name
+        self.deltas = deltas
+        self.error = error
+        self.late_error = late_error
+        self.calls = 0
+
+    async def stream(self, messages, *, temperature=None, max_tokens=None):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        for delta in self.deltas:
+            yield delta
+        if self.late_error is not None:
+            raise self.late_error
+
+
+@pytest.fixture
+async def router():
+    router = LLMRouter(
+        LLMSettings(
+            default_llm_provider="openai",
+            llm_fallback_providers=["anthropic"],
+            llm_max_retries=1,
+            llm_admission_timeout_seconds=0.05,
+            llm_provider_concurrency={"openai": 1},
+        )
+    )
+    yield router
+    await router.close()
+
+
+def _script(router: LLMRouter, **providers: ScriptedProvider) -> None:
+    router._providers.update(providers)
+
+
+async def _collect(router: LLMRouter) -> str:
+    return "".join([delta async for delta in router.stream(PROMPT)])
+
+
+async def test_primary_provider_answers(router) -> None:
+    _script(router, openai=ScriptedProvider("openai", ("a", "b")))
+
+    assert await _collect(router) == "ab"
+
+
+@pytest.mark.parametrize(
+    "error", [_status_error(429), httpx.ConnectTimeout("slow"), httpx.ConnectError("down")]
+)
+async def test_fails_over_before_the_first_token(router, error) -> None:
+    primary = ScriptedProvider("openai", error=error)
+    _script(router, openai=primary, anthropic=ScriptedProvider("anthropic", ("fallback",)))
+
+    assert await _collect(router) == "fallback"
+    # Connection blips are retried once; timeouts and 429s move on at once.
+    assert primary.calls == (2 if isinstance(error, httpx.ConnectError) else 1)
+
+
+async def test_client_errors_are_not_failed_over(router) -> None:
+    fallback = ScriptedProvider("anthropic", ("fallback",))
+    _script(router, openai=ScriptedProvider("openai", error=_status_error(400)), anthropic=fallback)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await _collect(router)
+    assert fallback.calls == 0
+
+
+async def test_errors_after_the_first_token_propagate(router) -> None:
+    fallback = ScriptedProvider("anthropic", ("fallback",))
+    primary = ScriptedProvider("openai", ("partial",), late_error=httpx.ReadError("reset"))
+    _script(router, openai=primary, anthropic=fallback)
+
+    received = []
+    with pytest.raises(httpx.ReadError):
+        async for delta in router.stream(PROMPT):
+            received.append(delta)
+    assert received == ["partial"]
+    assert fallback.calls == 0
+
+
+async def test_saturated_provider_is_skipped_and_its_slot_released(router) -> None:
+    _script(
+        router,
+        openai=ScriptedProvider("openai", ("primary", "more")),
+        anthropic=ScriptedProvider("anthropic", ("fallback",)),
+    )
+    held = router.stream(PROMPT)
+    assert await anext(held) == "primary"  # holds openai's only slot
+
+    assert await _collect(router) == "fallback"
+
+    await held.aclose()
+    assert await _collect(router) == "primarymore"
+
+
+async def test_every_provider_failing_raises_provider_unavailable(router) -> None:
+    _script(
+        router,
+        openai=ScriptedProvider("openai", error=_status_error(503)),
+        anthropic=ScriptedProvider("anthropic", error=_status_error(429)),
+    )
+
+    with pytest.raises(ProviderUnavailable, match="openai.*anthropic"):
+        await _collect(router)
+
+
+def test_unknown_providers_are_rejected() -> None:
+    with pytest.raises(ValueError, match="nope"):
+        LLMRouter(LLMSettings(llm_fallback_providers=["nope"]))
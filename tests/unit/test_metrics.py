@@ -0,0 +1,141 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import metrics as metrics_route
+from core.utils.metrics import (
+    CONTENT_TYPE,
+    CallbackCounter,
+    CallbackGauge,
+    Counter,
+    Histogram,
+    Registry,
+)
+from database import connection
+from database.connection import OTHER_FINGERPRINT, normalise_statement
+from services.memory.vector_search import EXACT, HNSW, SearchStats
+
+
+def _lines(metric) -> list[str]:
+    return list(metric.render())
+
+
+def test_counter_renders_one_sample_per_label_set() -> None:
+    counter = Counter("jobs_total", "Jobs run.", ("queue",))
+    counter.inc("fast")
+    counter.inc("fast", amount=2.5)
+    counter.inc('sl"ow\n')
+
+    assert _lines(counter) == [
+        "# HELP jobs_total Jobs run.",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="fast"} 3.5',
+        'jobs_total{queue="sl\\"ow\\n"} 1.0',
+    ]
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive() -> None:
+    histogram = Histogram("wait_seconds", "Wait.", ("engine",), buckets=(1.0, 0.1))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "primary")
+
+    assert _lines(histogram)[2:] == [
+        'wait_seconds_bucket{engine="primary",le="0.1"} 2',
+        'wait_seconds_bucket{engine="primary",le="1.0"} 3',
+        'wait_seconds_bucket{engine="primary",le="+Inf"} 4',
+        'wait_seconds_sum{engine="primary"} 3.65',
+        'wait_seconds_count{engine="primary"} 4',
+    ]
+
+
+def test_callback_metrics_are_collected_at_render_time() -> None:
+    values = {"a": 1.0}
+    gauge = CallbackGauge(
+        "size", "Size.", ("name",), lambda: [((k,), v) for k, v in values.items()]
+    )
+    counter = CallbackCounter("hits_total", "Hits.", (), lambda: [((), 7.0)])
+
+    values["b"] = 2.0
+
+    assert _lines(gauge)[1:] == ["# TYPE size gauge", 'size{name="a"} 1.0', 'size{name="b"} 2.0']
+    assert _lines(counter)[1:] == ["# TYPE hits_total counter", "hits_total 7.0"]
+
+
+def test_registry_replaces_metrics_registered_under_the_same_name() -> None:
+    registry = Registry()
+    registry.register(CallbackGauge("up", "Old.", (), lambda: [((), 0.0)]))
+    registry.register(CallbackGauge("up", "New.", (), lambda: [((), 1.0)]))
+    registry.register(Counter("empty_total", "Nothing yet."))
+
+    assert registry.render() == (
+        "# HELP up New.\n"
+        "# TYPE up gauge\n"
+        "up 1.0\n"
+        "# HELP empty_total Nothing yet.\n"
+        "# TYPE empty_total counter\n"
+    )
+
+
+def test_statements_are_normalised_to_one_shape() -> None:
+    first = normalise_statement(
+        "SELECT id FROM memory_base\n  WHERE owner_id = $1 AND id IN ($2, $3, $4) LIMIT 10"
+    )
+    second = normalise_statement(
+        "SELECT id FROM memory_base WHERE owner_id = 'x''y' AND id IN ($5,$6) LIMIT 3"
+    )
+
+    assert (
+        first == second == "SELECT id FROM memory_base WHERE owner_id = ? AND id IN (...) LIMIT ?"
+    )
+
+
+def test_fingerprints_past_the_cap_share_one_label(monkeypatch) -> None:
+    monkeypatch.setattr(connection, "_fingerprints", {})
+    monkeypatch.setattr(connection, "_fingerprint_sql", {})
+
+    first = connection._classify("SELECT 1 FROM a WHERE id = $1", 2)
+    same_shape = connection._classify("SELECT 1 FROM a WHERE id = 42", 2)
+    second = connection._classify("UPDATE b SET x = $1", 2)
+    third = connection._classify("DELETE FROM c", 2)
+
+    assert first == same_shape and first[0] == "select"
+    assert second[0] == "update" and second[1] not in (first[1], OTHER_FINGERPRINT)
+    assert third == ("delete", OTHER_FINGERPRINT)
+    assert set(connection._fingerprint_sql) == {first[1], second[1]}
+
+
+class FakeSearch:
+    def __init__(self) -> None:
+        self.paths = {
+            HNSW: SearchStats(calls=4, latency_ms_total=1500.0, widened=1, fell_back=2),
+            EXACT: SearchStats(calls=2, latency_ms_total=10.0, recall_samples=2, recall_total=1.5),
+        }
+
+    def stats(self) -> dict[str, SearchStats]:
+        return self.paths
+
+
+def test_endpoint_serves_vector_search_stats(monkeypatch) -> None:
+    monkeypatch.setattr(metrics_route, "REGISTRY", Registry())
+    search = FakeSearch()
+    metrics_route.register_vector_search(search)
+    app = FastAPI()
+    app.include_router(metrics_route.router)
+    client = TestClient(app)
+
+    search.paths[HNSW].calls += 1
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    samples = [line for line in response.text.splitlines() if not line.startswith("#")]
+    assert samples == [
+        'vector_search_queries_total{path="hnsw"} 5.0',
+        'vector_search_queries_total{path="exact"} 2.0',
+        'vector_search_duration_seconds_total{path="hnsw"} 1.5',
+        'vector_search_duration_seconds_total{path="exact"} 0.01',
+        'vector_search_widened_total{path="hnsw"} 1.0',
+        'vector_search_widened_total{path="exact"} 0.0',
+        'vector_search_exact_fallback_total{path="hnsw"} 2.0',
+        'vector_search_exact_fallback_total{path="exact"} 0.0',
+        'vector_search_sampled_recall{path="exact"} 0.75',
+    ]
@@ -0,0 +1,34 @@
+from models.domain.portrait import PreferenceSignal
+from services.portrait.extraction import LLMPortraitExtractor
+
+
+class FakeCachedLLM:
+    def __init__(self, answer: str) -> None:
+        self.answer = answer
+        self.calls = []
+
+    async def complete(self, template_id, text, messages, *, max_tokens=None) -> str:
+        self.calls.append((template_id, text))
+        return self.answer
+
+
+async def test_signals_are_read_from_the_json_reply() -> None:
+    llm = FakeCachedLLM(
+        "```json\n"
+        '{"interests": [{"topic": " chess ", "confidence": -2}, {"topic": ""}, "tea"],'
+        ' "preferences": [{"type": "tone", "value": "casual", "confidence": 0.7},'
+        ' {"type": "language"}]}\n'
+        "```"
+    )
+
+    interests, preferences = await LLMPortraitExtractor(llm)("I can't stand chess, keep it casual")
+
+    assert [(i.topic, i.confidence) for i in interests] == [("chess", -1.0)]
+    assert preferences == [PreferenceSignal("tone", "casual", 0.7)]
+    assert llm.calls == [("portrait.v1", "I can't stand chess, keep it casual")]
+
+
+async def test_unparsable_reply_yields_no_signals() -> None:
+    for answer in ("nothing to report", '["tea"]', '{"interests": "tea"}'):
+        interests, preferences = await LLMPortraitExtractor(FakeCachedLLM(answer))("hi")
+        assert (interests, preferences) == ([], [])
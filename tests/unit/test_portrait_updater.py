@@ -0,0 +1,48 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from models.domain.portrait import InterestSignal, PreferenceSignal
+from services.portrait.updater import PortraitUpdate, reinforce
+
+USER = uuid.uuid4()
+
+
+def test_interests_merge_into_one_entry_per_topic() -> None:
+    update = PortraitUpdate()
+    update.add(
+        USER,
+        interests=[
+            InterestSignal("tea", 0.9, datetime(2026, 3, 2)),
+            InterestSignal("tea", 0.3, datetime(2026, 3, 1)),
+            InterestSignal("chess", -0.5, datetime(2026, 3, 3)),
+        ],
+    )
+
+    tea = update.interests[(USER, "tea")]
+    assert len(update.interests) == 2
+    assert (tea.frequency, tea.confidence) == (2, pytest.approx(0.6))
+    assert (tea.first_mentioned, tea.last_mentioned) == (
+        datetime(2026, 3, 1),
+        datetime(2026, 3, 2),
+    )
+
+
+def test_restated_preference_is_reinforced_and_a_new_value_replaces_it() -> None:
+    update = PortraitUpdate()
+    update.add(USER, preferences=[PreferenceSignal("tone", "casual", 0.5)] * 2)
+    assert update.preferences[(USER, "tone")].confidence == pytest.approx(0.75)
+
+    update.add(USER, preferences=[PreferenceSignal("tone", "formal", 0.2)])
+    preference = update.preferences[(USER, "tone")]
+    assert (preference.value, preference.confidence) == ("formal", pytest.approx(0.2))
+
+
+def test_reinforcement_is_clamped() -> None:
+    assert reinforce(-1.0, -1.0) == -1.0
+    assert reinforce(0.9, 0.9) == pytest.approx(0.99)
+
+
+def test_empty_update_is_falsy() -> None:
+    assert not PortraitUpdate()
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import DatabaseSettings
+from database import connection
+from database.connection import ReadRouter, create_session_factory
+
+URL = "postgresql+asyncpg://app@db.test/app"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(connection, "time", clock)
+    return clock
+
+
+def _router(replicas: int) -> ReadRouter:
+    primary = create_async_engine(URL)
+    return ReadRouter(
+        primary,
+        create_session_factory(primary),
+        [create_async_engine(URL.replace("db.test", f"replica{i}.test")) for i in range(replicas)],
+        DatabaseSettings(replica_max_lag_seconds=5.0),
+    )
+
+
+def test_without_replicas_writes_are_not_tracked(clock) -> None:
+    router = _router(0)
+
+    router.note_write("participant:1", "episode:2")
+
+    assert router._writes == {}
+    assert router.pick("participant:1") is None
+
+
+def test_recent_write_pins_its_key_to_the_primary(clock) -> None:
+    router = _router(1)
+    (replica,) = router._replicas
+    replica.caught_up_at = clock.now - 1.0
+
+    router.note_write("participant:1")
+
+    assert router.pick("participant:1") is None
+    assert router.pick("participant:2") is replica
+    replica.caught_up_at = clock.now + 0.5  # the replica has replayed the write
+    assert router.pick("participant:1") is replica
+
+
+def test_stale_writes_are_pruned_as_new_ones_arrive(clock) -> None:
+    router = _router(1)
+    router.note_write("a", "b")
+    clock.now += 3.0
+    router.note_write("c", "a")  # "a" is written again and moves to the back
+    clock.now += 3.0
+
+    router.note_write("d")
+
+    assert list(router._writes) == ["c", "a", "d"]
+    clock.now += 10.0
+    router.note_write("e")
+    assert list(router._writes) == ["e"]
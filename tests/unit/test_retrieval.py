@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from core.config import MemorySettings
+from services.memory.retrieval import retrieval_weights, score_candidates, top_k_indices
+
+
+def test_retrieval_weights_follow_settings() -> None:
+    weights = retrieval_weights(MemorySettings())
+    np.testing.assert_allclose(weights, [0.3, 0.3, 0.4])
+
+
+def test_retrieval_weights_must_sum_to_one() -> None:
+    settings = MemorySettings(retrieval_weight_recency=0.5)
+    with pytest.raises(ValueError, match="sum to 1.0"):
+        retrieval_weights(settings)
+
+
+def test_score_candidates_normalises_each_component() -> None:
+    importance = np.array([0.2, 0.9, 0.5])
+    age_hours = np.array([0.0, 100.0, 10.0])
+    distance = np.array([0.5, 0.5, 0.1])
+    recency, relevance, scores = score_candidates(
+        importance, age_hours, distance, np.array([0.3, 0.3, 0.4]), 0.99
+    )
+
+    np.testing.assert_allclose(recency, 0.99**age_hours)
+    np.testing.assert_allclose(relevance, [0.5, 0.5, 0.9])
+    # Candidate 0 is the newest, 1 the most important, 2 the most relevant.
+    normalised_recency = (recency - recency.min()) / (recency.max() - recency.min())
+    expected = (
+        0.3 * normalised_recency
+        + 0.3 * np.array([0.0, 1.0, 3 / 7])
+        + 0.4 * np.array([0.0, 0.0, 1.0])
+    )
+    np.testing.assert_allclose(scores, expected)
+
+
+def test_score_candidates_ignores_constant_components() -> None:
+    _, _, scores = score_candidates(
+        np.array([0.5, 0.5]),
+        np.array([1.0, 1.0]),
+        np.array([0.4, 0.2]),
+        np.array([0.3, 0.3, 0.4]),
+        0.99,
+    )
+    np.testing.assert_allclose(scores, [0.0, 0.4])
+
+
+def test_top_k_indices_returns_best_first() -> None:
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 4, 0]
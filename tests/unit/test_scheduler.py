@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from background.queue import TaskQueue
+from background.scheduler import PeriodicScheduler
+
+
+async def test_jobs_repeat_without_overlapping() -> None:
+    queue = TaskQueue(concurrency=2)
+    queue.start()
+    scheduler = PeriodicScheduler(queue)
+    running = 0
+    overlapped = False
+    runs = 0
+
+    async def job() -> None:
+        nonlocal running, overlapped, runs
+        running += 1
+        overlapped |= running > 1
+        await asyncio.sleep(0.03)  # longer than the interval
+        running -= 1
+        runs += 1
+
+    scheduler.add("slow", 0.01, job)
+    scheduler.start()
+    await asyncio.sleep(0.2)
+    await scheduler.close()
+    await queue.close()
+
+    assert runs >= 2
+    assert not overlapped
+
+
+def test_exclusive_jobs_need_an_engine() -> None:
+    scheduler = PeriodicScheduler(TaskQueue())
+
+    async def job() -> None: ...
+
+    with pytest.raises(ValueError, match="advisory lock"):
+        scheduler.add("decay", 60.0, job, exclusive=True)
@@ -0,0 +1,41 @@
+import pytest
+
+from core.utils import tokens
+from core.utils.tokens import count_tokens
+
+
+@pytest.fixture
+def fresh_encoding():
+    tokens._encoding.cache_clear()
+    yield
+    tokens._encoding.cache_clear()
+
+
+def test_estimate_without_an_encoding(monkeypatch) -> None:
+    monkeypatch.setattr(tokens, "_encoding", lambda: None)
+
+    assert count_tokens("abcdefgh") == 2
+    assert count_tokens("abcdefghi") == 3
+    assert count_tokens("") == 1
+
+
+def test_unloadable_encoding_falls_back_to_the_estimate(monkeypatch, fresh_encoding) -> None:
+    tiktoken = pytest.importorskip("tiktoken")
+
+    def offline(name: str):
+        raise ConnectionError("no route to the BPE download")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", offline)
+
+    assert tokens._encoding() is None
+    assert count_tokens("abcdefgh") == 2
+
+
+def test_counts_with_tiktoken_when_the_encoding_loads(fresh_encoding) -> None:
+    pytest.importorskip("tiktoken")
+    if tokens._encoding() is None:
+        pytest.skip("cl100k_base is not cached and cannot be downloaded")
+
+    assert count_tokens("hello world") == 2
+    # Special-token text is counted as plain text instead of raising.
+    assert count_tokens("<|endoftext|>") > 1
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.emotion.trajectory import DAILY, HOURLY, RAW, choose_source, emotion_trajectory
+
+
+@pytest.mark.parametrize(
+    ("resolution", "expected"),
+    [
+        (timedelta(minutes=15), (RAW, timedelta(minutes=15))),
+        (timedelta(hours=1), (HOURLY, timedelta(hours=1))),
+        (timedelta(hours=5, minutes=59), (HOURLY, timedelta(hours=5))),
+        (timedelta(days=1), (DAILY, timedelta(days=1))),
+        (timedelta(days=7, hours=12), (DAILY, timedelta(days=7))),
+    ],
+)
+def test_coarsest_source_that_fits_and_rounded_stride(resolution, expected) -> None:
+    assert choose_source(resolution) == expected
+
+
+async def test_non_positive_resolution_is_rejected() -> None:
+    with pytest.raises(ValueError, match="resolution"):
+        await emotion_trajectory(
+            None, None, datetime(2026, 1, 1), datetime(2026, 1, 2), timedelta()
+        )